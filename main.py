@@ -1,21 +1,44 @@
 #!/usr/bin/env python3
 
 import argparse
-import importlib
 import json
 import os
+import random
+import sqlite3
 import sys
 from datetime import datetime
+from modules.base import TuningError
+from utils.ablation import AblationStudy, Knob
+from utils.benchmark_runner import BenchmarkRunner
+from utils.fleet import FleetAgent, FleetCoordinator, FleetError
+from utils.journal import TuningJournal
 from utils.logger import setup_logger
+from utils.registry import PluginRegistry, RegistryError
+from utils.regression import RegressionChecker, candidates_from_document, print_report
+from utils.result_cache import RESULT_SECTIONS, ResultCache, cache_key
+from utils.result_store import ResultStore
+from utils.scheduler import BenchmarkScheduler
+from utils.search import TuningSearch, expand_search_space
+from utils.stats import mann_whitney_u, welch_t_test
 from utils.system_info import SystemInfo
 
 class PerformanceTuningFramework:
-    def __init__(self, config_path="config/default.conf"):
+    def __init__(self, config_path="config/default.conf", registry=None):
         self.logger = setup_logger()
+        self.registry = registry or PluginRegistry()
         self.system_info = SystemInfo()
         self.config = self._load_config(config_path)
+        self.runner = BenchmarkRunner(self.config)
+        self.cache = ResultCache(self.config)
+        self.scheduler = BenchmarkScheduler(self.config)
+        journal_options = self.config.get("journal", {})
+        self.journal = TuningJournal(journal_options.get("path", "results/journal/tuning.journal"))
+        self.rollback_on_failure = journal_options.get("rollback_on_failure", True)
+        self.txn = None
         self.tuners = []
+        self.tuner_classes = []
         self.benchmarks = []
+        self.benchmark_names = []
 
     def _load_config(self, config_path):
         """加载配置文件"""
@@ -27,54 +50,285 @@ class PerformanceTuningFramework:
             sys.exit(1)
 
     def register_tuner(self, tuner_module):
-        """注册调优模块"""
+        """注册调优模块，失败时抛出 RegistryError"""
+        tuner_class = self.registry.load("tuner", tuner_module)
         try:
-            module = importlib.import_module(f"modules.{tuner_module}")
-            tuner_class = getattr(module, tuner_module.title().replace("_", ""))
-            self.tuners.append(tuner_class(self.config))
-            self.logger.info(f"已注册调优模块: {tuner_module}")
+            tuner = tuner_class(self.config)
         except Exception as e:
-            self.logger.error(f"注册调优模块失败 {tuner_module}: {e}")
+            raise RegistryError(f"初始化调优模块 {tuner_module} 失败: {e}") from e
+        self._warn_if_needs_root(tuner_module, tuner_class)
+        self.tuners.append(tuner)
+        self.tuner_classes.append(tuner_class)
+        self.logger.info(f"已注册调优模块: {tuner_module}")
 
     def register_benchmark(self, benchmark_module):
-        """注册基准测试模块"""
-        try:
-            module = importlib.import_module(f"modules.{benchmark_module}")
-            benchmark_class = getattr(module, benchmark_module.title().replace("_", ""))
-            self.benchmarks.append(benchmark_class(self.config))
-            self.logger.info(f"已注册基准测试模块: {benchmark_module}")
-        except Exception as e:
-            self.logger.error(f"注册基准测试模块失败 {benchmark_module}: {e}")
+        """注册基准测试模块，失败时抛出 RegistryError"""
+        benchmark = self.registry.create("benchmark", benchmark_module, self.config)
+        self._warn_if_needs_root(benchmark_module, benchmark)
+        self.benchmarks.append(benchmark)
+        self.benchmark_names.append(benchmark_module)
+        self.logger.info(f"已注册基准测试模块: {benchmark_module}")
+
+    def _warn_if_needs_root(self, name, plugin):
+        if getattr(plugin, "needs_root", False) and hasattr(os, "geteuid") and os.geteuid() != 0:
+            self.logger.warning(f"{name} 需要 root 权限，当前用户可能无法修改相关参数")
+
+    def run_benchmarks(self, max_runs=None, prune=None):
+        """运行所有基准测试（预热 + 重复测量）
 
-    def run_benchmarks(self):
-        """运行所有基准测试"""
+        prune(name, stats) 为真时提前终止对应基准测试的重复测量。
+        """
         results = {}
+        keys = {}
+        pending = []
+        fingerprint = self.system_info.fingerprint() if self.cache.enabled else None
+        tuning_state = self.tuning_state() if self.cache.enabled else None
         for benchmark in self.benchmarks:
-            self.logger.info(f"开始运行基准测试: {benchmark.name}")
-            result = benchmark.run()
-            results[benchmark.name] = result
-            self.logger.info(f"{benchmark.name} 测试完成: {result}")
-        return results
+            key = cache_key(
+                fingerprint,
+                tuning_state,
+                benchmark.name,
+                # command_benchmark:实例名 形式的名称对应 command_benchmark 配置节
+                benchmark.config.get(benchmark.name.partition(":")[0], {}),
+                {section: self.config.get(section, {}) for section in RESULT_SECTIONS},
+                max_runs
+            )
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.logger.info(f"{benchmark.name} 命中结果缓存 ({key[:12]})，跳过运行")
+                results[benchmark.name] = dict(cached, cached=True)
+                continue
+            keys[benchmark.name] = key
+            pending.append(benchmark)
+
+        plan = self.scheduler.plan(pending)
+        # per_run 只对串行测试逐次等待，并行批次仍在开始前等待一次
+        parallel = any(not exclusive for _, _, exclusive in plan)
+        if pending and self.runner.gate and (not self.runner.gate_per_run or parallel):
+            report = self.runner.gate.wait()
+            state = "已静默" if report["settled"] else "未能静默"
+            self.logger.info(
+                f"系统{state} (等待 {report['waited_seconds']:.1f} 秒): 负载/CPU {report['load_per_cpu']}, "
+                f"空闲 {report['idle_percent']}%, 最高温度 {report['max_temp_c']}°C"
+            )
+
+        for benchmark, cpus, exclusive in plan:
+            placement = f"CPU {cpus}" if cpus else "不绑定 CPU"
+            mode = "独占" if exclusive else "并行"
+            self.logger.info(f"开始运行基准测试: {benchmark.name} ({mode}, {placement})")
+
+        for name, result in self.scheduler.run(pending, self.runner, max_runs, prune, plan).items():
+            results[name] = result
+            if result["success"] and not result["pruned"]:
+                self.cache.put(keys[name], result, {"benchmark": name, "fingerprint": fingerprint})
+            stats = result["stats"]
+            self.logger.info(
+                f"{name} 测试完成: 均值 {stats['mean']:.2f}, 中位数 {stats['median']:.2f}, "
+                f"标准差 {stats['stddev']:.2f}, {stats['confidence']:.0%} 置信区间 "
+                f"[{stats['ci_low']:.2f}, {stats['ci_high']:.2f}], 运行 {stats['n']} 次, "
+                f"离群值 {stats['outliers']} 个"
+            )
+        return {benchmark.name: results[benchmark.name] for benchmark in self.benchmarks}
+
+    def tuning_state(self):
+        """收集各调优模块所管理参数的当前实际值"""
+        return {
+            tuner.name: tuner.current_state()
+            for tuner in self.tuners
+            if hasattr(tuner, "current_state")
+        }
 
     def apply_tunings(self):
-        """应用所有调优设置"""
+        """应用所有调优设置；任一模块失败时根据预写日志回滚整批修改"""
+        self.txn = self.journal.begin()
         for tuner in self.tuners:
+            tuner.journal, tuner.txn = self.journal, self.txn
             self.logger.info(f"开始应用调优: {tuner.name}")
             try:
                 tuner.apply()
                 self.logger.info(f"{tuner.name} 调优应用成功")
             except Exception as e:
                 self.logger.error(f"{tuner.name} 调优应用失败: {e}")
+                if self.rollback_on_failure:
+                    self.rollback_tunings()
+                    raise TuningError(f"{tuner.name} 调优应用失败，已回滚本批次的全部修改: {e}") from e
+
+    def rollback_tunings(self):
+        """按预写日志逆序恢复当前事务中的所有修改"""
+        restored, failed = self.journal.rollback(self.txn)
+        for entry in restored:
+            self.logger.info(f"已回滚 {entry['key']} = {entry['prior']}")
+        for entry in failed:
+            self.logger.error(f"回滚 {entry['key']} 失败: {entry['error']}")
+        if not failed:
+            self.txn = None
+        return not failed
 
     def reset_tunings(self):
-        """重置所有调优设置"""
+        """重置所有调优设置，全部成功后结束日志事务"""
+        failed = False
         for tuner in self.tuners:
             self.logger.info(f"开始重置调优: {tuner.name}")
             try:
                 tuner.reset()
                 self.logger.info(f"{tuner.name} 调优重置成功")
             except Exception as e:
+                failed = True
                 self.logger.error(f"{tuner.name} 调优重置失败: {e}")
+        if self.txn is not None:
+            if failed:
+                self.logger.error(f"部分调优未能恢复，可运行 --recover 根据日志 {self.journal.path} 恢复")
+            else:
+                self.journal.end(self.txn)
+                self.txn = None
+
+    def recover(self):
+        """根据预写日志恢复此前未正常结束的调优事务"""
+        pending = self.journal.pending()
+        if not pending:
+            self.logger.info("没有需要恢复的调优修改")
+            return True
+        self.logger.info(f"发现 {len(pending)} 条未恢复的调优修改，开始恢复")
+        self.txn = None
+        restored, failed = self.journal.rollback()
+        for entry in restored:
+            self.logger.info(f"已恢复 {entry['key']} = {entry['prior']} ({entry['tuner']})")
+        for entry in failed:
+            self.logger.error(f"恢复 {entry['key']} 失败: {entry['error']}")
+        return not failed
+
+    def run_interleaved(self):
+        """交替测量基线与调优后的系统，返回 (基线结果, 调优后结果, 调优状态下的系统信息)
+
+        每轮依次测量一批基线和一批调优后的结果（quiescence.interleave 为 abab），或每轮随机
+        决定先后（random），使缓存、温度和系统漂移对两组的影响相同。每批都会重新等待静默，
+        测量期间不使用结果缓存。
+        """
+        options = self.config.get("quiescence", {})
+        mode = options.get("interleave", "none")
+        if mode not in ("abab", "random"):
+            raise ValueError(f"未知的交替方式: {mode}")
+        rounds = options.get("rounds") or self.runner.max_runs
+        block_runs = options.get("block_runs", 1)
+        rng = random.Random(options.get("seed"))
+        blocks = {"baseline": [], "tuned": []}
+        final_system_info = None
+        cache_enabled, self.cache.enabled = self.cache.enabled, False
+        try:
+            for index in range(rounds):
+                order = ["baseline", "tuned"]
+                if mode == "random":
+                    rng.shuffle(order)
+                for phase in order:
+                    self.logger.info(f"交替测量第 {index + 1}/{rounds} 轮: {'调优后' if phase == 'tuned' else '基线'}")
+                    if phase == "baseline":
+                        blocks[phase].append(self.run_benchmarks(block_runs))
+                        continue
+                    self.apply_tunings()
+                    try:
+                        blocks[phase].append(self.run_benchmarks(block_runs))
+                        final_system_info = self.system_info.collect_all()
+                    finally:
+                        self.reset_tunings()
+        finally:
+            self.cache.enabled = cache_enabled
+        return self.runner.combine(blocks["baseline"]), self.runner.combine(blocks["tuned"]), final_system_info
+
+    def run_profile(self, config, max_runs=None, prune=None, disabled_tuners=()):
+        """按给定配置创建调优和基准测试模块，完成一次 apply/run_benchmarks/reset 循环"""
+        registered_tuners, registered_benchmarks = self.tuners, self.benchmarks
+        self.tuners = [
+            tuner_class(config)
+            for tuner_class in self.tuner_classes
+            if tuner_class.name not in disabled_tuners
+        ]
+        try:
+            # 基准测试的配置（如 Himeno 编译变体）也可能是搜索维度
+            self.benchmarks = [self.registry.create("benchmark", name, config) for name in self.benchmark_names]
+            self.apply_tunings()
+            return self.run_benchmarks(max_runs, prune)
+        finally:
+            self.reset_tunings()
+            self.tuners, self.benchmarks = registered_tuners, registered_benchmarks
+
+    def search(self):
+        """在 search.space 定义的参数空间中搜索最优配置"""
+        objective = self.config.get("search", {}).get("objective") or self.benchmarks[0].name
+        tuning_search = TuningSearch(self._expand_search_space(), self.run_profile, objective)
+        best = tuning_search.run()
+        if best:
+            self.logger.info(f"最优配置 (得分 {best['score']:.2f}): {best['candidate']}")
+            best["config"] = tuning_search.space.apply_to(self.config, best["candidate"])
+        else:
+            self.logger.warning("参数搜索没有产生任何成功的试验")
+        return best
+
+    def ablate(self):
+        """逐项归因：测量各调优项单独及组合开关时对目标基准测试的影响"""
+        options = self.config.get("ablation", {})
+        objective = options.get("objective") or self.benchmarks[0].name
+        knobs = []
+        for tuner in self.tuners:
+            tuner_knobs = tuner.knobs()
+            if tuner_knobs is None:
+                knobs.append(Knob(tuner.name, tuner.name))
+            else:
+                knobs.extend(Knob(name, tuner.name, path, off) for name, path, off in tuner_knobs)
+        self.logger.info(f"消融分析 {len(knobs)} 个调优项: {', '.join(knob.name for knob in knobs)}")
+
+        def evaluate(config, disabled_tuners):
+            return self.run_profile(config, options.get("max_runs"), disabled_tuners=disabled_tuners)
+
+        report, minimal_config = AblationStudy(self.config, knobs, evaluate, objective).run()
+        for row in report["knobs"]:
+            ci = "样本不足" if row["ci_low"] is None else f"[{row['ci_low']:.2f}, {row['ci_high']:.2f}]"
+            percent = "" if row["percent"] is None else f" ({row['percent']:+.2f}%)"
+            self.logger.info(f"{row['name']}: 效应 {row['effect']:+.2f}{percent}, 置信区间 {ci}, {row['verdict']}")
+        for pair in report["interacting_pairs"]:
+            self.logger.info(f"存在交互作用: {pair[0]} × {pair[1]}")
+        self.logger.info(f"建议的最小调优组合: {', '.join(report['minimal_profile']) or '无'}")
+        return report, minimal_config
+
+    def tunable_space(self):
+        """合并各调优模块探测到的候选值"""
+        spaces = {}
+        for tuner in self.tuners:
+            spaces.update(tuner.tunable_space())
+        return spaces
+
+    def _expand_search_space(self):
+        """把 search.space 中取值为 "auto" 的配置节替换为调优模块探测到的候选值"""
+        spaces = self.tunable_space()
+        config, missing = expand_search_space(self.config, spaces)
+        for section, node in spaces.items():
+            if self.config.get("search", {}).get("space", {}).get(section) == "auto":
+                self.logger.info(f"{section} 搜索空间: {node}")
+        for section in missing:
+            self.logger.warning(f"没有调优模块为 {section} 提供搜索空间，已忽略该维度")
+        return config
+
+    def store_results(self, document):
+        """把本次运行的结果追加到结果库（result_store.enable）"""
+        options = self.config.get("result_store", {})
+        if not options.get("enable", True):
+            return
+        try:
+            store = ResultStore(options.get("path", "results/results.db"))
+            try:
+                rows = store.add_document(document)
+            finally:
+                store.close()
+            self.logger.info(f"已向结果库 {store.path} 追加 {rows} 条结果")
+        except sqlite3.Error as e:
+            self.logger.error(f"写入结果库失败: {e}")
+
+    def check_regression(self, document):
+        """把结果文档中的结果与结果库中的历史基线比较（regression 配置）"""
+        store = ResultStore(self.config.get("result_store", {}).get("path", "results/results.db"))
+        try:
+            return RegressionChecker(store, self.config).check(candidates_from_document(document))
+        finally:
+            store.close()
 
     def save_results(self, results, filename=None):
         """保存测试结果"""
@@ -93,74 +347,249 @@ def main():
     parser.add_argument("--benchmark", nargs="+", default=["himeno"], help="要运行的基准测试")
     parser.add_argument("--tuner", nargs="+", default=["sysctl_tuner", "cpu_governor"], help="要使用的调优模块")
     parser.add_argument("--output", help="结果输出文件")
+    parser.add_argument("--search", action="store_true", help="在 search.space 参数空间中自动搜索最优配置")
+    parser.add_argument("--ablation", action="store_true", help="逐项归因分析各调优项的效果与交互作用")
+    parser.add_argument("--regression-check", action="store_true",
+                        help="不调优，运行基准测试并与结果库中的历史基线比较，发现退化时以非零状态退出")
+    parser.add_argument("--fleet-coordinator", action="store_true",
+                        help="作为集群协调端，把参数搜索试验分派给各主机上的代理（fleet 配置）")
+    parser.add_argument("--fleet-agent", metavar="URL", help="作为集群代理连接协调端，在本机执行分派的试验")
+    parser.add_argument("--no-cache", action="store_true", help="不使用基准测试结果缓存")
+    parser.add_argument("--list", action="store_true", help="列出可用的基准测试和调优模块")
+    parser.add_argument("--recover", action="store_true", help="根据调优日志恢复上次未正常结束的修改")
     args = parser.parse_args()
 
+    if args.list:
+        list_plugins(PluginRegistry())
+        return
+
     # 初始化框架
     framework = PerformanceTuningFramework(args.config)
+    if args.no_cache:
+        framework.cache.enabled = False
+
+    if args.recover:
+        sys.exit(0 if framework.recover() else 1)
+    if args.fleet_coordinator:
+        # 协调端只分派试验，不修改本机设置
+        try:
+            summary = FleetCoordinator(framework.config, args.tuner, args.benchmark).serve()
+        except (OSError, ValueError) as e:
+            framework.logger.error(f"集群协调端启动失败: {e}")
+            sys.exit(1)
+        framework.save_results(summary, args.output or "results/fleet/summary.json")
+        return
+    if framework.journal.pending():
+        framework.logger.error(
+            f"发现上次未恢复的调优修改 ({framework.journal.path})，请先运行 --recover 恢复系统设置"
+        )
+        sys.exit(1)
+
+    if args.fleet_agent:
+        def prepare(tuners, benchmarks):
+            for tuner in tuners:
+                framework.register_tuner(tuner)
+            for benchmark in benchmarks:
+                framework.register_benchmark(benchmark)
+            return framework.tunable_space()
+
+        agent = FleetAgent(args.fleet_agent, framework.config, framework.system_info.collect_all(),
+                           prepare, framework.run_profile)
+        try:
+            agent.run()
+        except (FleetError, RegistryError) as e:
+            framework.logger.error(f"集群代理退出: {e}")
+            sys.exit(1)
+        return
 
     # 注册模块
-    for tuner in args.tuner:
-        framework.register_tuner(tuner)
+    try:
+        for tuner in args.tuner:
+            framework.register_tuner(tuner)
 
-    for benchmark in args.benchmark:
-        framework.register_benchmark(benchmark)
+        for benchmark in args.benchmark:
+            framework.register_benchmark(benchmark)
+    except RegistryError as e:
+        framework.logger.error(f"注册模块失败: {e}")
+        sys.exit(1)
+
+    if args.search:
+        best = framework.search()
+        if best:
+            framework.save_results(best["config"], args.output or "results/search/best_profile.conf")
+        return
+
+    if args.ablation:
+        try:
+            report, minimal_config = framework.ablate()
+        except (RuntimeError, ValueError) as e:
+            framework.logger.error(f"消融分析失败: {e}")
+            sys.exit(1)
+        framework.save_results(report, args.output or "results/ablation/report.json")
+        framework.save_results(minimal_config, "results/ablation/minimal_profile.conf")
+        return
+
+    if args.regression_check:
+        # 固件、微码等变化不影响系统指纹，缓存中的旧结果会掩盖回归，因此总是重新测量
+        framework.cache.enabled = False
+        document = {
+            "initial_system_info": framework.system_info.collect_all(),
+            "initial_results": framework.run_benchmarks(),
+            "config": framework.config
+        }
+        try:
+            document["regression"] = framework.check_regression(document)
+        except (sqlite3.Error, ValueError) as e:
+            framework.logger.error(f"回归检查失败: {e}")
+            sys.exit(2)
+        framework.save_results(document, args.output or "results/regression/latest.json")
+        framework.store_results(document)
+        print_report(document["regression"])
+        sys.exit(1 if document["regression"]["regressed"] else 0)
 
     # 记录初始系统状态
     initial_system_info = framework.system_info.collect_all()
 
-    # 运行初始基准测试
-    initial_results = framework.run_benchmarks()
-    framework.save_results({
-        "initial_system_info": initial_system_info,
-        "initial_results": initial_results
-    }, "results/initial_results.json")
+    if framework.config.get("quiescence", {}).get("interleave", "none") != "none":
+        # 基线与调优后交替测量，消除运行顺序带来的偏差
+        try:
+            initial_results, tuned_results, final_system_info = framework.run_interleaved()
+        except (TuningError, ValueError) as e:
+            framework.logger.error(str(e))
+            sys.exit(1)
+    else:
+        # 运行初始基准测试
+        initial_results = framework.run_benchmarks()
+        framework.save_results({
+            "initial_system_info": initial_system_info,
+            "initial_results": initial_results
+        }, "results/initial_results.json")
 
-    # 应用调优设置
-    framework.apply_tunings()
+        # 应用调优设置
+        try:
+            framework.apply_tunings()
+        except TuningError as e:
+            framework.logger.error(str(e))
+            sys.exit(1)
 
-    # 运行调优后的基准测试
-    tuned_results = framework.run_benchmarks()
+        try:
+            # 运行调优后的基准测试
+            tuned_results = framework.run_benchmarks()
+            final_system_info = framework.system_info.collect_all()
+        finally:
+            # 重置调优设置（异常退出时同样恢复）
+            framework.reset_tunings()
 
     # 保存最终结果
-    final_system_info = framework.system_info.collect_all()
-    framework.save_results({
+    document = {
         "initial_system_info": initial_system_info,
         "initial_results": initial_results,
         "tuned_results": tuned_results,
         "final_system_info": final_system_info,
-        "improvement": calculate_improvement(initial_results, tuned_results)
-    }, args.output)
-
-    # 重置调优设置（可选）
-    framework.reset_tunings()
+        "improvement": calculate_improvement(initial_results, tuned_results, **significance_options(framework.config)),
+        "config": framework.config
+    }
+    framework.save_results(document, args.output)
+    framework.store_results(document)
 
     # 打印改进情况
-    print_improvement(initial_results, tuned_results)
+    print_improvement(initial_results, tuned_results, **significance_options(framework.config))
+
+def list_plugins(registry):
+    """打印已发现的插件及其元数据（不导入插件模块）"""
+    for kind, title in (("benchmark", "基准测试模块"), ("tuner", "调优模块")):
+        print(f"{title}:")
+        for spec in sorted(registry.plugins(kind), key=lambda spec: spec.name):
+            metadata = spec.metadata
+            flags = []
+            if kind == "benchmark":
+                flags.append("独占" if metadata.get("exclusive", True) else "可并行")
+            if metadata.get("needs_root", kind == "tuner"):
+                flags.append("需要 root")
+            if metadata.get("estimated_duration"):
+                flags.append(f"约 {metadata['estimated_duration']} 秒")
+            print(f"  {spec.name:<20} {metadata.get('description', '')} [{', '.join(flags)}] ({spec.source})")
+
+def significance_options(config):
+    """从配置中读取显著性检验参数"""
+    options = config.get("run_engine", {})
+    return {
+        "test": options.get("significance_test", "welch"),
+        "alpha": options.get("alpha", 0.05)
+    }
 
-def calculate_improvement(initial, tuned):
-    """计算性能改进百分比"""
+def calculate_improvement(initial, tuned, test="welch", alpha=0.05):
+    """计算性能改进百分比及其显著性（Welch t 检验或 Mann-Whitney U 检验）"""
     improvement = {}
     for benchmark in initial:
         if benchmark in tuned:
+            initial_scores = initial[benchmark].get("scores", [initial[benchmark].get("score", 0)])
+            tuned_scores = tuned[benchmark].get("scores", [tuned[benchmark].get("score", 0)])
             initial_score = initial[benchmark].get("score", 0)
             tuned_score = tuned[benchmark].get("score", 0)
-            if initial_score > 0:
-                improvement[benchmark] = (tuned_score - initial_score) / initial_score * 100
+            if initial_score <= 0:
+                continue
+
+            if test == "mann_whitney":
+                statistic, p_value = mann_whitney_u(initial_scores, tuned_scores)
+            else:
+                statistic, _, p_value = welch_t_test(initial_scores, tuned_scores)
+
+            improvement[benchmark] = {
+                "percent": (tuned_score - initial_score) / initial_score * 100,
+                "test": test,
+                "statistic": statistic,
+                "p_value": p_value,
+                "alpha": alpha,
+                "significant": p_value is not None and p_value < alpha
+            }
+            if "metric" in tuned[benchmark]:
+                improvement[benchmark]["metric"] = tuned[benchmark]["metric"]
+            for key in ("counters", "energy"):
+                changes = metric_changes(initial[benchmark].get(key), tuned[benchmark].get(key))
+                if changes:
+                    improvement[benchmark][key] = changes
     return improvement
 
-def print_improvement(initial, tuned):
+def metric_changes(initial, tuned):
+    """对比调优前后的附加指标（计数器派生的 IPC、缓存/TLB 缺失、频率，或能耗与功率），用于解释得分变化"""
+    changes = {}
+    for metric, before in (initial or {}).items():
+        after = (tuned or {}).get(metric)
+        if after is None:
+            continue
+        changes[metric] = {
+            "initial": before,
+            "tuned": after,
+            "percent": (after - before) / before * 100 if before else None
+        }
+    return changes
+
+def print_improvement(initial, tuned, test="welch", alpha=0.05):
     """打印性能改进情况"""
+    improvements = calculate_improvement(initial, tuned, test, alpha)
     print("\n性能改进报告:")
     print("=" * 50)
     for benchmark in initial:
         if benchmark in tuned:
             initial_score = initial[benchmark].get("score", 0)
             tuned_score = tuned[benchmark].get("score", 0)
-            improvement = calculate_improvement(initial, tuned).get(benchmark, 0)
+            improvement = improvements.get(benchmark)
             print(f"{benchmark}:")
             print(f"  初始成绩: {initial_score}")
             print(f"  调优后成绩: {tuned_score}")
-            print(f"  改进: {improvement:.2f}%")
+            if not improvement:
+                continue
+            metric = " (score_per_watt)" if improvement.get("metric") == "score_per_watt" else ""
+            print(f"  改进{metric}: {improvement['percent']:.2f}%")
+            if improvement["p_value"] is None:
+                print("  显著性: 样本不足，无法检验")
+            else:
+                verdict = "显著" if improvement["significant"] else "不显著"
+                print(f"  显著性: p = {improvement['p_value']:.4f} ({improvement['test']}, α = {alpha}) {verdict}")
+            for metric, change in {**improvement.get("counters", {}), **improvement.get("energy", {})}.items():
+                percent = "" if change["percent"] is None else f" ({change['percent']:+.2f}%)"
+                print(f"  {metric}: {change['initial']:.4g} -> {change['tuned']:.4g}{percent}")
     print("=" * 50)
 
 if __name__ == "__main__":
@@ -0,0 +1,68 @@
+class TuningError(Exception):
+    """调优参数写入失败，框架据此回滚整批修改"""
+
+
+class Benchmark:
+    """基准测试模块的基类
+
+    子类在类属性中声明元数据，注册表通过静态分析读取这些属性，
+    因此列出插件时无需导入模块。元数据必须是字面量。
+    """
+
+    name = None
+    description = ""
+    # 是否需要独占整台机器（不能与其他基准测试并行运行）
+    exclusive = True
+    needs_root = False
+    # 单次运行的预计耗时（秒），仅用于展示和调度估算
+    estimated_duration = None
+
+    def __init__(self, config):
+        self.config = config
+
+    def run(self):
+        """运行一次基准测试，返回至少包含 score 和 success 的字典"""
+        raise NotImplementedError
+
+
+class Tuner:
+    """调优模块的基类"""
+
+    name = None
+    description = ""
+    needs_root = True
+    estimated_duration = None
+
+    def __init__(self, config):
+        self.config = config
+        # 由框架注入的预写日志及当前事务 ID
+        self.journal = None
+        self.txn = None
+
+    def _journal(self, changes):
+        """在修改参数之前把原始值写入日志，changes 为 [(类型, 键, 原始值)]"""
+        if self.journal is not None and self.txn is not None:
+            self.journal.record(self.txn, self.name, changes)
+
+    def current_state(self):
+        """返回受管参数的当前实际值"""
+        return {}
+
+    def knobs(self):
+        """返回可单独开关的调优项 [(名称, 配置路径, 关闭时的取值)]，供消融分析使用
+
+        返回 None 表示整个模块作为一个调优项。
+        """
+        return None
+
+    def tunable_space(self):
+        """返回可供参数搜索的候选值，结构与 search.space 相同（以配置节为键）"""
+        return {}
+
+    def apply(self):
+        """应用调优设置并保存原始值"""
+        raise NotImplementedError
+
+    def reset(self):
+        """恢复 apply() 之前的原始值"""
+        raise NotImplementedError
@@ -0,0 +1,342 @@
+import errno
+import json
+import os
+import re
+import subprocess
+import time
+
+from modules.base import Benchmark
+from utils.stream_runner import StreamingProcess
+
+DIRECTIONS = ("higher", "lower")
+# 超过该行数的输出不再保留用于提取指标
+MAX_OUTPUT_LINES = 100000
+
+
+def _command(command):
+    """列表形式直接执行，字符串交给 /bin/sh（可使用管道和重定向）"""
+    if isinstance(command, str):
+        return ["/bin/sh", "-c", command]
+    return [str(part) for part in command]
+
+
+def _json_path(document, path):
+    """按 "a.b.0.c" 形式的路径取值"""
+    node = document
+    for key in path.split("."):
+        if isinstance(node, list):
+            node = node[int(key)]
+        else:
+            node = node[key]
+    return node
+
+
+def _parse_json(text):
+    """整体解析输出；失败时取最后一个能解析为 JSON 对象的行（如带日志前缀的输出）"""
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    for line in reversed(text.splitlines()):
+        line = line.strip()
+        if line.startswith(("{", "[")):
+            try:
+                return json.loads(line)
+            except ValueError:
+                continue
+    raise ValueError("输出中没有 JSON 内容")
+
+
+class CgroupSlice:
+    """为一次运行创建的 cgroup v2 子组：设置资源上限，运行结束后读取统计并删除"""
+
+    CONTROLLERS = ("cpu", "memory", "io", "cpuset")
+
+    def __init__(self, root, parent, name, limits):
+        self.parent = os.path.join(root, parent)
+        self.path = os.path.join(self.parent, name)
+        self.limits = limits
+
+    def _write(self, name, value, path=None):
+        with open(os.path.join(path or self.path, name), "w") as f:
+            f.write(str(value))
+
+    def create(self):
+        """创建子组并写入资源上限；父组缺少上限所需的控制器时抛出说明原因的 OSError"""
+        os.makedirs(self.parent, exist_ok=True)
+        # cpu.max 需要 cpu 控制器，memory.max 需要 memory 控制器，以此类推
+        needed = {name.split(".", 1)[0] for name in self.limits} - {"cgroup"}
+        # 父组自己的 cgroup.controllers 决定它能在 cgroup.subtree_control 中为子组启用哪些控制器
+        try:
+            with open(os.path.join(self.parent, "cgroup.controllers")) as f:
+                available = f.read().split()
+        except OSError as e:
+            if needed:
+                raise OSError(e.errno, f"无法读取 {self.parent} 的 cgroup.controllers: {e.strerror or e}") from e
+            available = []
+        missing = sorted(needed - set(available))
+        if missing:
+            raise OSError(errno.EOPNOTSUPP, f"{self.parent} 没有可用的 {', '.join(missing)} 控制器"
+                                            f"（需在上一级的 cgroup.subtree_control 中启用）")
+        for controller in list(self.CONTROLLERS) + sorted(needed - set(self.CONTROLLERS)):
+            if controller not in available:
+                continue
+            try:
+                self._write("cgroup.subtree_control", f"+{controller}", self.parent)
+            except OSError as e:
+                if controller in needed:
+                    raise OSError(e.errno, f"无法在 {self.parent} 中启用 {controller} 控制器: "
+                                           f"{e.strerror or e}") from e
+        os.mkdir(self.path)
+        for name, value in self.limits.items():
+            self._write(name, value)
+
+    def wrap(self, command):
+        """包装命令：由 shell 先把自身加入子组再 exec 原命令
+
+        不使用 preexec_fn，因为 fork 时测量线程（遥测、能耗采样）仍在运行，
+        在子进程中执行 Python 代码并不安全。加入失败时以 125 退出，不会在组外运行。
+        """
+        script = 'echo $$ > "$0" || exit 125; exec "$@"'
+        return ["/bin/sh", "-c", script, os.path.join(self.path, "cgroup.procs")] + command
+
+    def _read(self, name):
+        try:
+            with open(os.path.join(self.path, name)) as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def stats(self):
+        """cpu.stat、memory.peak/memory.current、memory.events 与各设备 io.stat 之和"""
+        stats = {}
+        text = self._read("cpu.stat")
+        if text:
+            stats["cpu"] = {key: int(value) for key, value in (line.split() for line in text.splitlines() if line)}
+        for name in ("memory.peak", "memory.current"):
+            text = self._read(name)
+            if text and text.strip().isdigit():
+                stats[name.replace(".", "_")] = int(text)
+        text = self._read("memory.events")
+        if text:
+            stats["memory_events"] = {key: int(value) for key, value in (line.split() for line in text.splitlines() if line)}
+        text = self._read("io.stat")
+        if text:
+            io = {}
+            for line in text.splitlines():
+                for field in line.split()[1:]:
+                    key, _, value = field.partition("=")
+                    if value.isdigit():
+                        io[key] = io.get(key, 0) + int(value)
+            stats["io"] = io
+        return stats
+
+    def remove(self):
+        """结束残留进程后删除子组"""
+        try:
+            self._write("cgroup.kill", 1)
+        except OSError:
+            pass
+        for _ in range(50):
+            try:
+                os.rmdir(self.path)
+                return
+            except OSError as e:
+                # 只有组内进程尚未全部退出（EBUSY）时才值得重试
+                if e.errno != errno.EBUSY:
+                    return
+                time.sleep(0.1)
+
+
+class CommandBenchmark(Benchmark):
+    """运行配置文件中定义的任意命令，从输出中提取指标作为得分，无需编写模块
+
+    command_benchmark 配置节下每个键是一个实例，用 --benchmark command_benchmark:实例名 选择
+    （只定义了一个实例时可省略实例名）。指标可用正则表达式或 JSON 路径从 stdout、stderr 或
+    命令写出的文件中提取；score_metric 指定作为得分的指标，direction 为 lower 时得分取其
+    倒数（如耗时越短越好），使框架中"得分越高越好"的比较保持成立。
+    """
+
+    name = "command_benchmark"
+    description = "运行配置中定义的命令并提取指标，可放入独立的 cgroup v2 子组"
+    exclusive = True
+
+    def __init__(self, config, instance=None):
+        super().__init__(config)
+        instances = config.get("command_benchmark", {})
+        if instance is None:
+            if len(instances) != 1:
+                raise ValueError(f"请用 command_benchmark:实例名 选择实例（已定义: {', '.join(instances) or '无'}）")
+            instance = next(iter(instances))
+        if instance not in instances:
+            raise ValueError(f"command_benchmark 中没有实例 {instance}（已定义: {', '.join(instances) or '无'}）")
+        self.instance = instance
+        self.name = f"command_benchmark:{instance}"
+        options = instances[instance]
+        if not options.get("command"):
+            raise ValueError(f"实例 {instance} 没有定义 command")
+        self.command = _command(options["command"])
+        self.setup = [_command(step) for step in options.get("setup", [])]
+        self.teardown = [_command(step) for step in options.get("teardown", [])]
+        self.cwd = options.get("cwd")
+        self.env = {key: str(value) for key, value in options.get("env", {}).items()}
+        self.timeout = options.get("timeout", 600)
+        self.metrics = options.get("metrics", {})
+        self.score_metric = options.get("score_metric") or next(iter(self.metrics), "elapsed_seconds")
+        self.direction = options.get("direction", "higher")
+        self.success_codes = options.get("success_codes", [0])
+        self.output_tail_lines = options.get("output_tail_lines", 20)
+        self.cgroup = options.get("cgroup", {})
+        self.runs = 0
+
+        if self.direction not in DIRECTIONS:
+            raise ValueError(f"direction 只能是 higher 或 lower: {self.direction}")
+        if self.score_metric != "elapsed_seconds" and self.score_metric not in self.metrics:
+            raise ValueError(f"score_metric {self.score_metric} 没有对应的指标定义")
+        # 编译后的正则表达式单独保存，不写回配置（配置会随结果一起保存为 JSON）
+        self._patterns = {}
+        for metric, spec in self.metrics.items():
+            if ("regex" in spec) == ("json" in spec):
+                raise ValueError(f"指标 {metric} 必须且只能指定 regex 或 json 之一")
+            if "regex" in spec:
+                self._patterns[metric] = re.compile(spec["regex"], re.MULTILINE)
+
+    # ---- 指标提取 ----
+
+    def _source_text(self, source, output):
+        if source in ("stdout", "stderr"):
+            return "\n".join(output[source])
+        path = os.path.join(self.cwd or ".", source)
+        with open(path) as f:
+            return f.read()
+
+    def _extract(self, output):
+        """按定义提取各项指标，返回 (指标, 错误)"""
+        values = {}
+        errors = {}
+        for metric, spec in self.metrics.items():
+            try:
+                text = self._source_text(spec.get("source", "stdout"), output)
+                if metric in self._patterns:
+                    matches = list(self._patterns[metric].finditer(text))
+                    if not matches:
+                        raise ValueError(f"输出中没有匹配 {spec['regex']} 的内容")
+                    match = matches[0] if spec.get("match") == "first" else matches[-1]
+                    value = match.group(spec.get("group", 1))
+                else:
+                    value = _json_path(_parse_json(text), spec["json"])
+                values[metric] = float(value) * spec.get("scale", 1)
+            except (OSError, ValueError, KeyError, IndexError, TypeError) as e:
+                errors[metric] = str(e)
+        return values, errors
+
+    # ---- 运行 ----
+
+    def _run_steps(self, steps, label):
+        for step in steps:
+            completed = subprocess.run(step, cwd=self.cwd, env=dict(os.environ, **self.env),
+                                       capture_output=True, text=True, timeout=self.timeout)
+            if completed.returncode != 0:
+                raise RuntimeError(f"{label}步骤 {step} 失败 (退出码 {completed.returncode}): "
+                                   f"{completed.stderr.strip()[-500:]}")
+
+    def _create_cgroup(self):
+        """按配置创建 cgroup 子组；失败时 required 为真则报错，否则不使用 cgroup"""
+        if not self.cgroup.get("enable", False):
+            return None, None
+        limits = {}
+        if self.cgroup.get("cpu_max"):
+            # 可用的 CPU 数，如 2.5 表示每 100ms 周期内最多 250ms
+            limits["cpu.max"] = f"{int(float(self.cgroup['cpu_max']) * 100000)} 100000"
+        if self.cgroup.get("memory_max"):
+            # memory.max 本身接受 512M、2G 形式的大小
+            limits["memory.max"] = str(self.cgroup["memory_max"]).rstrip("Bb")
+        if self.cgroup.get("cpuset"):
+            limits["cpuset.cpus"] = self.cgroup["cpuset"]
+        for name, value in self.cgroup.get("limits", {}).items():
+            limits[name] = value
+        self.runs += 1
+        cgroup = CgroupSlice(
+            self.cgroup.get("root", "/sys/fs/cgroup"),
+            self.cgroup.get("parent", "performance_tuning.slice"),
+            f"{self.instance}-{os.getpid()}-{self.runs}",
+            limits
+        )
+        try:
+            cgroup.create()
+        except OSError as e:
+            cgroup.remove()
+            message = f"创建 cgroup {cgroup.path} 失败: {e.strerror or e}"
+            if self.cgroup.get("required", False):
+                raise RuntimeError(message) from e
+            return None, message
+        return cgroup, None
+
+    def run(self):
+        """依次执行 setup、命令（在独立 cgroup 中）与 teardown，提取指标并计算得分"""
+        cgroup = None
+        try:
+            self._run_steps(self.setup, "准备")
+            cgroup, cgroup_error = self._create_cgroup()
+            output = {"stdout": [], "stderr": []}
+
+            def on_line(stream, line):
+                if len(output[stream]) < MAX_OUTPUT_LINES:
+                    output[stream].append(line)
+                return None
+
+            result = StreamingProcess(
+                cgroup.wrap(self.command) if cgroup else self.command,
+                env=dict(os.environ, **self.env),
+                timeout=self.timeout,
+                tail_lines=self.output_tail_lines,
+                on_line=on_line,
+                cwd=self.cwd
+            ).run()
+            cgroup_stats = cgroup.stats() if cgroup else {"error": cgroup_error} if cgroup_error else None
+
+            metrics, metric_errors = self._extract(output)
+            metrics["elapsed_seconds"] = result["elapsed"]
+            value = metrics.get(self.score_metric)
+            error = None
+            if result["aborted"]:
+                error = result["abort_reason"]
+            elif result["returncode"] not in self.success_codes:
+                error = "\n".join([f"命令退出码 {result['returncode']}"] + result["error_tail"][-5:])
+            elif value is None:
+                error = f"提取 {self.score_metric} 失败: {metric_errors[self.score_metric]}"
+            elif self.direction == "lower" and value <= 0:
+                error = f"{self.score_metric} 为 {value}，无法取倒数作为得分"
+            success = error is None
+
+            score = 0
+            if success:
+                score = value if self.direction == "higher" else 1 / value
+            return {
+                "score": score,
+                "score_metric": self.score_metric,
+                "direction": self.direction,
+                "metric_value": value,
+                "metrics": metrics,
+                "metric_errors": metric_errors,
+                "returncode": result["returncode"],
+                "time_seconds": result["elapsed"],
+                "cgroup": cgroup_stats,
+                "output_tail": result["output_tail"],
+                "error": error,
+                "success": success
+            }
+        except Exception as e:
+            return {
+                "score": 0,
+                "time_seconds": 0,
+                "error": str(e),
+                "success": False
+            }
+        finally:
+            if cgroup:
+                cgroup.remove()
+            try:
+                self._run_steps(self.teardown, "清理")
+            except Exception as e:
+                print(f"{self.name} 清理失败: {e}")
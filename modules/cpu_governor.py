@@ -1,49 +1,256 @@
-import subprocess
+import glob
 import os
+import re
+
+from modules.base import Tuner, TuningError
+from utils.scheduler import parse_cpu_list
+
+# 按 cpufreq 策略（policy）写入的参数，写入顺序即应用顺序：
+# intel_pstate 在 performance 调速器下拒绝修改 EPP，因此先写调速器
+POLICY_KNOBS = (
+    ("governor", "scaling_governor"),
+    ("energy_performance_preference", "energy_performance_preference"),
+    ("scaling_min_freq", "scaling_min_freq"),
+    ("scaling_max_freq", "scaling_max_freq"),
+    ("boost", "boost")
+)
+# 全局参数：acpi-cpufreq 的 cpufreq/boost 与 intel_pstate 的 no_turbo
+GLOBAL_KNOBS = (
+    ("boost", os.path.join("cpufreq", "boost")),
+    ("no_turbo", os.path.join("intel_pstate", "no_turbo"))
+)
+BOOLEAN_KNOBS = ("boost", "no_turbo")
+FREQ_KNOBS = ("scaling_min_freq", "scaling_max_freq")
+
+
+def _read(path):
+    try:
+        with open(path, "r") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _write(path, value):
+    with open(path, "w") as f:
+        f.write(str(value))
+
+
+class CpuFreqPolicy:
+    """一个 cpufreq 策略：同一策略下的 CPU 共享调速器和频率设置，只需写入一次"""
+
+    def __init__(self, name, path, cpus):
+        self.name = name
+        self.path = path
+        self.cpus = cpus
+
+    def file(self, knob):
+        return os.path.join(self.path, dict(POLICY_KNOBS)[knob])
+
+    def read(self, knob):
+        return _read(self.file(knob))
+
+    def available(self, filename):
+        """读取 scaling_available_governors 等以空格分隔的候选值列表"""
+        value = _read(os.path.join(self.path, filename))
+        return value.split() if value else []
+
+
+def discover_policies(sysfs_root="/sys/devices/system/cpu"):
+    """枚举 cpufreq 策略
+
+    优先使用 cpufreq/policyN 目录及其 affected_cpus；旧内核没有策略目录时，
+    按 cpuN/cpufreq 的真实路径去重（同一策略的 CPU 指向同一目录）。
+    """
+    policies = []
+    for path in glob.glob(os.path.join(sysfs_root, "cpufreq", "policy[0-9]*")):
+        cpus = _read(os.path.join(path, "affected_cpus")) or _read(os.path.join(path, "related_cpus"))
+        if cpus is None:
+            continue
+        cpus = parse_cpu_list(cpus.replace(" ", ","))
+        if cpus:
+            policies.append(CpuFreqPolicy(os.path.basename(path), path, cpus))
+
+    if not policies:
+        grouped = {}
+        for path in glob.glob(os.path.join(sysfs_root, "cpu[0-9]*", "cpufreq")):
+            cpu = int(re.search(r"cpu(\d+)", os.path.basename(os.path.dirname(path))).group(1))
+            grouped.setdefault(os.path.realpath(path), []).append(cpu)
+        for path, cpus in grouped.items():
+            cpus.sort()
+            policies.append(CpuFreqPolicy(f"cpu{cpus[0]}", path, cpus))
+
+    return sorted(policies, key=lambda policy: policy.cpus[0])
+
+
+class CpuGovernor(Tuner):
+    """按 cpufreq 策略设置调速器、EPP、频率范围与睿频，并逐策略保存和恢复原始值"""
+
+    name = "cpu_governor"
+    description = "设置 CPU 频率调速器、EPP、频率范围与睿频"
 
-class CpuGovernor:
     def __init__(self, config):
-        self.name = "cpu_governor"
-        self.config = config
-        self.original_governor = None
-        self.new_governor = config.get("cpu_governor", "performance")
-        self.cpu_count = os.cpu_count()
-        self.governor_files = []
-
-        # 检查每个CPU的调速器文件是否存在
-        for i in range(self.cpu_count):
-            governor_file = f"/sys/devices/system/cpu/cpu{i}/cpufreq/scaling_governor"
-            if os.path.exists(governor_file):
-                self.governor_files.append(governor_file)
+        super().__init__(config)
+        options = config.get("cpu_governor", "performance")
+        self.legacy_config = not isinstance(options, dict)
+        if self.legacy_config:
+            # 兼容旧配置 "cpu_governor": "performance"
+            options = {"governor": options}
+        self.sysfs_root = options.get("sysfs_root", "/sys/devices/system/cpu")
+        self.settings = {
+            knob: options[knob]
+            for knob in dict.fromkeys(knob for knob, _ in POLICY_KNOBS + GLOBAL_KNOBS)
+            if options.get(knob) is not None
+        }
+
+        self.policies = discover_policies(self.sysfs_root)
+        if options.get("cpus") is not None:
+            # 策略内的 CPU 共享设置，只要包含任一指定 CPU 就修改整个策略
+            selected = set(parse_cpu_list(options["cpus"]))
+            self.policies = [policy for policy in self.policies if selected & set(policy.cpus)]
+        self.original_values = {}
+
+    def _global_file(self, knob):
+        return os.path.join(self.sysfs_root, dict(GLOBAL_KNOBS)[knob])
+
+    def _format(self, policy, knob, value):
+        """把配置值转换为 sysfs 写入值：布尔值写 0/1，频率支持 min/max 关键字（kHz）"""
+        if knob in BOOLEAN_KNOBS:
+            return "1" if value in (True, 1, "1", "on", "true") else "0"
+        if knob in FREQ_KNOBS and str(value) in ("min", "max"):
+            limit = _read(os.path.join(policy.path, f"cpuinfo_{value}_freq"))
+            if limit is None:
+                raise TuningError(f"{policy.name} 不支持 cpuinfo_{value}_freq")
+            return limit
+        return str(value)
+
+    def _targets(self):
+        """返回 [(文件, 参数, 目标值)]，只包含系统中存在的参数"""
+        targets = []
+        for policy in self.policies:
+            writes = []
+            for knob, _ in POLICY_KNOBS:
+                if knob not in self.settings or not os.path.exists(policy.file(knob)):
+                    continue
+                # 存在全局 boost 时只写全局开关
+                if knob == "boost" and os.path.exists(self._global_file("boost")):
+                    continue
+                writes.append((policy.file(knob), knob, self._format(policy, knob, self.settings[knob])))
+            targets.extend(self._order_freq_writes(policy, writes))
+        for knob, _ in GLOBAL_KNOBS:
+            path = self._global_file(knob)
+            if knob in self.settings and os.path.exists(path):
+                targets.append((path, knob, self._format(None, knob, self.settings[knob])))
+        return targets
+
+    @staticmethod
+    def _order_freq_writes(policy, writes):
+        """新的最低频率高于当前最高频率时必须先写最高频率，否则内核拒绝写入"""
+        values = {knob: value for _, knob, value in writes}
+        current_max = policy.read("scaling_max_freq")
+        if ("scaling_min_freq" in values and "scaling_max_freq" in values and current_max is not None
+                and int(values["scaling_min_freq"]) > int(current_max)):
+            return sorted(writes, key=lambda write: write[1] != "scaling_max_freq")
+        return writes
+
+    def current_state(self):
+        """读取各策略及全局参数的当前值"""
+        state = {}
+        for policy in self.policies:
+            state[policy.name] = {
+                knob: policy.read(knob)
+                for knob, _ in POLICY_KNOBS
+                if os.path.exists(policy.file(knob))
+            }
+        for knob, _ in GLOBAL_KNOBS:
+            if os.path.exists(self._global_file(knob)):
+                state[knob] = _read(self._global_file(knob))
+        return state
+
+    def knobs(self):
+        """每个已配置的 cpufreq 参数都是一个调优项"""
+        if self.legacy_config:
+            return [(f"cpu_governor.{knob}", ("cpu_governor",), None) for knob in self.settings]
+        return [(f"cpu_governor.{knob}", ("cpu_governor", knob), None) for knob in self.settings]
+
+    def tunable_space(self):
+        """根据各策略支持的候选值生成搜索空间（取所有策略的交集）"""
+        space = {}
+        for knob, filename in (("governor", "scaling_available_governors"),
+                               ("energy_performance_preference", "energy_performance_available_preferences")):
+            choices = None
+            for policy in self.policies:
+                available = policy.available(filename)
+                choices = available if choices is None else [value for value in choices if value in available]
+            if choices:
+                space[knob] = choices
+        boost_files = [self._global_file("boost")] + [policy.file("boost") for policy in self.policies]
+        if any(os.path.exists(path) for path in boost_files):
+            space["boost"] = [True, False]
+        if os.path.exists(self._global_file("no_turbo")):
+            space["no_turbo"] = [True, False]
+        return {"cpu_governor": space} if space else {}
 
     def apply(self):
-        """设置 CPU 调速器为性能模式"""
-        if not self.governor_files:
+        """按策略写入 cpufreq 设置，每个策略每个参数只写一次"""
+        try:
+            targets = self._targets()
+        except (TuningError, ValueError) as e:
+            raise TuningError(f"解析 CPU 频率设置失败: {e}") from e
+        if not targets:
             print("系统不支持CPU调速器设置，跳过")
             return
 
-        try:
-            # 获取当前调速器（从第一个可用的CPU）
-            with open(self.governor_files[0], "r") as f:
-                self.original_governor = f.read().strip()
+        self.original_values = {}
+        for path, _, _ in targets:
+            value = _read(path)
+            if value is not None:
+                self.original_values[path] = value
+        # 日志回滚按相反顺序恢复，因此逆序记录：恢复时先恢复调速器再恢复 EPP
+        self._journal([("file", path, self.original_values.get(path)) for path, _, _ in reversed(targets)])
+
+        errors = []
+        for path, knob, value in targets:
+            try:
+                _write(path, value)
+            except OSError as e:
+                errors.append(f"{path}: {e.strerror or e}")
+                continue
+            if knob not in FREQ_KNOBS and _read(path) != value:
+                # 频率会被内核钳制到硬件范围内，不做回读校验
+                errors.append(f"{path}: 写入 {value} 后读回 {_read(path)}")
 
-            # 设置所有可用的CPU调速器
-            for governor_file in self.governor_files:
-                with open(governor_file, "w") as f:
-                    f.write(self.new_governor)
+        if errors:
+            print(f"设置 CPU 频率参数失败: {'; '.join(errors)}")
+            raise TuningError(f"设置 CPU 频率参数失败: {'; '.join(errors)}")
 
-            print(f"已设置 CPU 调速器为 {self.new_governor} 模式")
-        except Exception as e:
-            print(f"设置 CPU 调速器失败: {e}")
+        summary = ", ".join(f"{knob}={value}" for knob, value in self.settings.items())
+        print(f"已为 {len(self.policies)} 个 cpufreq 策略设置 {summary}")
 
     def reset(self):
-        """恢复原始 CPU 调速器设置"""
-        if self.original_governor and self.governor_files:
-            try:
-                for governor_file in self.governor_files:
-                    with open(governor_file, "w") as f:
-                        f.write(self.original_governor)
+        """逐策略恢复原始设置（调速器先于 EPP 恢复）"""
+        if not self.original_values:
+            return
+        writes = []
+        for policy in self.policies:
+            policy_writes = [
+                (policy.file(knob), knob, self.original_values[policy.file(knob)])
+                for knob, _ in POLICY_KNOBS
+                if policy.file(knob) in self.original_values
+            ]
+            writes.extend(self._order_freq_writes(policy, policy_writes))
+        for knob, _ in GLOBAL_KNOBS:
+            if self._global_file(knob) in self.original_values:
+                writes.append((self._global_file(knob), knob, self.original_values[self._global_file(knob)]))
 
-                print(f"已恢复 CPU 调速器为 {self.original_governor} 模式")
-            except Exception as e:
-                print(f"恢复 CPU 调速器失败: {e}")
+        errors = []
+        for path, _, value in writes:
+            try:
+                if _read(path) != value:
+                    _write(path, value)
+            except OSError as e:
+                errors.append(f"{path}: {e.strerror or e}")
+        if errors:
+            print(f"恢复 CPU 频率参数失败: {'; '.join(errors)}")
+            raise TuningError(f"恢复 CPU 频率参数失败: {'; '.join(errors)}")
+        print(f"已恢复 {len(self.policies)} 个 cpufreq 策略的原始设置")
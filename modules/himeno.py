@@ -1,142 +1,268 @@
+import hashlib
+import json
 import subprocess
 import os
 import re
-import urllib.request
-import tarfile
-from datetime import datetime
+import time
 
-class Himeno:
-    def __init__(self, config):
-        self.name = "himeno"
-        self.config = config
-        self.binary_path = config.get("himeno", {}).get("binary_path", "/usr/local/bin/himeno")
-        self.compile_source = config.get("himeno", {}).get("compile_source", True)
-        self.source_dir = config.get("himeno", {}).get("source_dir", "/tmp/himeno")
+from modules.base import Benchmark
+from utils.stream_runner import StreamingProcess
+
+# 标准网格尺寸 (MIMAX, MJMAX, MKMAX)，与 RIKEN 原程序的定义一致
+GRID_SIZES = {
+    "XS": (33, 33, 65),
+    "S": (65, 65, 129),
+    "M": (129, 129, 257),
+    "L": (257, 257, 513),
+    "XL": (513, 513, 1025)
+}
+SIZE_ALIASES = {
+    "xsmall": "XS", "ssmall": "XS",
+    "small": "S",
+    "medium": "M", "middle": "M",
+    "large": "L",
+    "xlarge": "XL", "elarge": "XL"
+}
+# 源码中选择网格尺寸的编译宏
+GRID_MACROS = {"XS": "XSMALL", "S": "SMALL", "M": "MIDDLE", "L": "LARGE", "XL": "ELARGE"}
+SOURCE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "himeno_src", "himeno.c")
+# Himeno 输出中的进度行
+REHEARSAL_PATTERN = re.compile(r"^\s*MFLOPS\s*:\s*([\d.]+)\s+time\(s\)\s*:\s*([\d.]+)")
+PLANNED_PATTERN = re.compile(r"loop will be excuted in\s+(\d+)\s+times", re.IGNORECASE)
+GOSA_PATTERN = re.compile(r"Gosa\s*:\s*([\d.eE+-]+)")
+MEASURED_PATTERN = re.compile(r"MFLOPS measured\s*:\s*([\d.]+)\s+cpu\s*:\s*([\d.]+)")
+DEFAULT_VARIANTS = {
+    "native": {"compiler": "gcc", "cflags": ["-O3", "-march=native", "-mtune=native"]}
+}
+
+
+def resolve_grid_size(size):
+    """将 "large"、"L" 等写法统一为标准网格名"""
+    size = str(size)
+    if size.upper() in GRID_SIZES:
+        return size.upper()
+    if size.lower() in SIZE_ALIASES:
+        return SIZE_ALIASES[size.lower()]
+    raise ValueError(f"未知的 Himeno 网格尺寸: {size}")
 
-        if not os.path.exists(self.binary_path) and self.compile_source:
-            self._download_and_compile_himeno()
 
-    def _download_and_compile_himeno(self):
-        """下载并编译 Himeno 基准测试程序"""
-        os.makedirs(self.source_dir, exist_ok=True)
+class HimenoBuildCache:
+    """Himeno 二进制缓存，按 (网格尺寸, 编译器, 编译选项, CPU 型号, 源码) 的哈希寻址"""
 
-        # 下载 Himeno 基准测试源代码
-        himeno_url = "http://accc.riken.jp/wp-content/uploads/2016/06/himenobmtxp_20160606.tar.gz"
-        himeno_tar_path = os.path.join(self.source_dir, "himeno.tar.gz")
+    def __init__(self, cache_dir, source_path=SOURCE_PATH):
+        self.cache_dir = os.path.expanduser(cache_dir)
+        self.source_path = source_path
 
+    def _compiler_version(self, compiler):
         try:
-            print("正在下载 Himeno 基准测试源代码...")
-            urllib.request.urlretrieve(himeno_url, himeno_tar_path)
-
-            # 解压源代码
-            print("正在解压源代码...")
-            with tarfile.open(himeno_tar_path, "r:gz") as tar:
-                tar.extractall(self.source_dir)
-
-            # 查找 himeno.c 文件
-            himeno_c_path = None
-            for root, dirs, files in os.walk(self.source_dir):
-                if "himeno.c" in files:
-                    himeno_c_path = os.path.join(root, "himeno.c")
-                    break
-
-            if not himeno_c_path:
-                raise FileNotFoundError("在下载的源代码中找不到 himeno.c 文件")
-
-            # 编译 Himeno
-            print("正在编译 Himeno...")
-            compile_cmd = [
-                "gcc", "-O3", "-march=native", "-mtune=native",
-                "-o", self.binary_path,
-                himeno_c_path,
-                "-lm"
-            ]
-
-            result = subprocess.run(compile_cmd, check=True, capture_output=True, text=True)
-            print("Himeno 编译成功")
-
-            # 清理临时文件
-            os.remove(himeno_tar_path)
+            output = subprocess.run([compiler, "--version"], capture_output=True, text=True, timeout=10).stdout
+            return output.splitlines()[0] if output else compiler
+        except (OSError, subprocess.TimeoutExpired):
+            return compiler
 
-        except Exception as e:
-            print(f"Himeno 编译失败: {e}")
-            # 尝试使用系统包管理器安装
-            self._install_himeno_from_package()
+    def _cpu_model(self):
+        from utils.system_info import SystemInfo
+        return SystemInfo().get_cpu_model()
+
+    def key(self, grid_size, compiler, cflags):
+        """计算构建缓存键"""
+        with open(self.source_path, "rb") as f:
+            source_hash = hashlib.sha256(f.read()).hexdigest()
+        payload = json.dumps({
+            "grid_size": grid_size,
+            "compiler": self._compiler_version(compiler),
+            "cflags": list(cflags),
+            "cpu_model": self._cpu_model(),
+            "source": source_hash
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get_or_build(self, grid_size, compiler, cflags):
+        """返回缓存中的二进制路径，未命中时编译"""
+        key = self.key(grid_size, compiler, cflags)
+        binary_path = os.path.join(self.cache_dir, f"himeno-{grid_size}-{key[:16]}")
+        if os.path.exists(binary_path):
+            return binary_path
 
-    def _install_himeno_from_package(self):
-        """尝试从系统包管理器安装 Himeno"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{binary_path}.{os.getpid()}.tmp"
+        compile_cmd = [compiler] + list(cflags) + [
+            f"-D{GRID_MACROS[grid_size]}",
+            "-o", tmp_path,
+            self.source_path,
+            "-lm"
+        ]
+        print(f"正在编译 Himeno ({grid_size}): {' '.join(compile_cmd)}")
         try:
-            print("尝试通过包管理器安装 Himeno...")
-            # 对于 CentOS/RHEL 系统
-            result = subprocess.run(["sudo", "dnf", "install", "-y", "himeno-benchmark"],
-                                  capture_output=True, text=True)
-            if result.returncode == 0:
-                print("Himeno 通过包管理器安装成功")
-                # 更新二进制路径
-                self.binary_path = "/usr/bin/himeno"
-            else:
-                print("无法通过包管理器安装 Himeno")
-                raise Exception("Himeno 安装失败")
-        except Exception as e:
-            print(f"Himeno 安装失败: {e}")
-            raise
+            subprocess.run(compile_cmd, check=True, capture_output=True, text=True)
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError(f"Himeno 编译失败: {e.stderr.strip()}") from e
+        # 先编译到临时文件再原子替换，避免并发构建读到不完整的二进制
+        os.replace(tmp_path, binary_path)
+        with open(f"{binary_path}.json", "w") as f:
+            json.dump({"grid_size": grid_size, "compiler": compiler, "cflags": list(cflags), "key": key}, f)
+        print(f"Himeno 编译成功: {binary_path}")
+        return binary_path
+
+
+class Himeno(Benchmark):
+    name = "himeno"
+    description = "Himeno 流体力学 Poisson 求解基准测试"
+    # Himeno 会占满所有核心，不能与其他基准测试并行
+    exclusive = True
+    estimated_duration = 120
+
+    def __init__(self, config):
+        super().__init__(config)
+        options = config.get("himeno", {})
+        prebuilt = options.get("binary_path")
+        self.binary_path = prebuilt or "/usr/local/bin/himeno"
+        self.compile_source = options.get("compile_source", True)
+        if self.compile_source and prebuilt and os.path.exists(prebuilt):
+            # 显式指定且已存在的二进制直接使用，不需要编译器
+            print(f"使用已有的 Himeno 二进制 {prebuilt}，不编译 himeno.variants 中的变体")
+            self.compile_source = False
+        self.grid_size = resolve_grid_size(options.get("problem_size", "M"))
+        self.variants = options.get("variants", DEFAULT_VARIANTS)
+        self.variant = options.get("variant", next(iter(self.variants)))
+        self.threads = None
+        # 试跑吞吐量下限和整体时间预算，用于提前终止异常运行
+        self.min_mflops = options.get("min_mflops")
+        self.time_budget = options.get("time_budget")
+        self.output_tail_lines = options.get("output_tail_lines", 20)
+
+        if self.compile_source:
+            if self.variant not in self.variants:
+                raise ValueError(f"未知的 Himeno 编译变体: {self.variant}")
+            self.build_cache = HimenoBuildCache(
+                options.get("build_cache_dir", "~/.cache/performance_tuning/himeno")
+            )
+            # 预先编译其他变体只是为参数搜索做准备，个别变体失败不影响当前变体
+            self.build_errors = {}
+            if options.get("build_all_variants", False):
+                for name in self.variants:
+                    if name == self.variant:
+                        continue
+                    try:
+                        self._build_variant(name)
+                    except (RuntimeError, OSError) as e:
+                        self.build_errors[name] = str(e)
+                        print(f"Himeno 编译变体 {name} 编译失败: {e}")
+            try:
+                self.binary_path = self._build_variant(self.variant)
+            except (RuntimeError, OSError) as e:
+                raise RuntimeError(
+                    f"无法构建 Himeno 编译变体 {self.variant}: {e}（可检查编译器与 cflags，"
+                    f"或设置 compile_source 为 false 并用 binary_path 指定已有的二进制）"
+                ) from e
+            self.threads = self.variants[self.variant].get("threads")
+
+    def _build_variant(self, name):
+        """编译（或从缓存取得）指定编译变体的二进制"""
+        variant = self.variants[name]
+        return self.build_cache.get_or_build(
+            self.grid_size,
+            variant.get("compiler", "gcc"),
+            variant.get("cflags", [])
+        )
+
+    def _parse_line(self, line, state):
+        """解析一行 Himeno 输出，更新解析状态并返回进度事件"""
+        match = REHEARSAL_PATTERN.search(line)
+        if match:
+            state["rehearsal_mflops"] = float(match.group(1))
+            state["rehearsal_time"] = float(match.group(2))
+            return {"event": "rehearsal", "mflops": state["rehearsal_mflops"], "time": state["rehearsal_time"]}
+        match = PLANNED_PATTERN.search(line)
+        if match:
+            state["iterations"] = int(match.group(1))
+            return {"event": "planned", "iterations": state["iterations"]}
+        match = GOSA_PATTERN.search(line)
+        if match:
+            state["gosa"] = float(match.group(1))
+            return None
+        match = MEASURED_PATTERN.search(line)
+        if match:
+            state["mflops"] = float(match.group(1))
+            state["time_seconds"] = float(match.group(2))
+            return {"event": "measured", "mflops": state["mflops"], "time": state["time_seconds"]}
+        return None
+
+    def _check_progress(self, event, state, started):
+        """根据进度事件判断是否需要提前终止，返回终止原因"""
+        if event["event"] == "rehearsal":
+            if self.min_mflops and event["mflops"] < self.min_mflops:
+                return f"试跑吞吐量 {event['mflops']:.1f} MFLOPS 低于下限 {self.min_mflops}"
+        elif event["event"] == "planned" and self.time_budget and state.get("rehearsal_time"):
+            # 试跑 3 次的耗时可以估算正式测量所需的时间
+            expected = event["iterations"] * state["rehearsal_time"] / 3
+            elapsed = time.monotonic() - started
+            if elapsed + expected > self.time_budget:
+                return f"预计耗时 {elapsed + expected:.1f} 秒超过时间预算 {self.time_budget} 秒"
+        return None
 
     def run(self):
-        """运行 Himeno 基准测试"""
+        """以流式方式运行 Himeno 基准测试，边运行边解析输出"""
         try:
             # 检查二进制文件是否存在
             if not os.path.exists(self.binary_path):
                 raise FileNotFoundError(f"Himeno 二进制文件不存在: {self.binary_path}")
 
-            # 设置运行参数
+            # 网格尺寸在编译时确定，程序本身不接受参数
             run_cmd = [self.binary_path]
-            if self.config.get("himeno", {}).get("problem_size"):
-                run_cmd.extend(["-s", str(self.config["himeno"]["problem_size"])])
-
-            # 执行测试
-            start_time = datetime.now()
-            result = subprocess.run(
-                run_cmd,
-                capture_output=True,
-                text=True,
-                timeout=self.config.get("himeno", {}).get("timeout", 300)
-            )
-            end_time = datetime.now()
+            env = None
+            if self.threads is not None:
+                env = dict(os.environ, OMP_NUM_THREADS=str(self.threads or os.cpu_count()))
 
-            # 解析结果
-            output = result.stdout
-            error = result.stderr
+            state = {}
+            progress = []
+            started = time.monotonic()
 
-            # 提取 MFLOPS 值
-            mflops_match = re.search(r"MFLOPS\s*:\s*([\d.]+)", output)
-            mflops = float(mflops_match.group(1)) if mflops_match else 0
+            def on_line(stream, line):
+                if stream != "stdout":
+                    return None
+                event = self._parse_line(line, state)
+                if event is None:
+                    return None
+                event["elapsed"] = time.monotonic() - started
+                progress.append(event)
+                print(f"Himeno 进度: {event}")
+                return self._check_progress(event, state, started)
 
-            # 提取时间信息
-            time_match = re.search(r"Time\s*:\s*([\d.]+)", output)
-            time_taken = float(time_match.group(1)) if time_match else 0
+            timeout = self.config.get("himeno", {}).get("timeout", 300)
+            if self.time_budget:
+                timeout = min(timeout, self.time_budget)
+            result = StreamingProcess(
+                run_cmd,
+                env=env,
+                timeout=timeout,
+                tail_lines=self.output_tail_lines,
+                on_line=on_line
+            ).run()
 
+            success = result["returncode"] == 0 and not result["aborted"] and "mflops" in state
+            error = result["abort_reason"] or "\n".join(result["error_tail"])
             return {
-                "score": mflops,
-                "time_seconds": time_taken,
-                "run_time": (end_time - start_time).total_seconds(),
-                "output": output,
+                "score": state.get("mflops", 0) if success else 0,
+                "time_seconds": state.get("time_seconds", 0),
+                "rehearsal_mflops": state.get("rehearsal_mflops"),
+                "iterations": state.get("iterations"),
+                "gosa": state.get("gosa"),
+                "grid_size": self.grid_size,
+                "variant": self.variant if self.compile_source else None,
+                "run_time": result["elapsed"],
+                "progress": progress,
+                "aborted": result["aborted"],
+                "output_tail": result["output_tail"],
                 "error": error,
-                "success": result.returncode == 0
+                "success": success
             }
 
-        except subprocess.TimeoutExpired:
-            return {
-                "score": 0,
-                "time_seconds": 0,
-                "output": "",
-                "error": "测试超时",
-                "success": False
-            }
         except Exception as e:
             return {
                 "score": 0,
                 "time_seconds": 0,
-                "output": "",
+                "output_tail": [],
                 "error": str(e),
                 "success": False
             }
@@ -0,0 +1,174 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from modules.base import Benchmark
+from modules.himeno import GRID_SIZES, resolve_grid_size
+
+# 每个网格点每次迭代的浮点运算数
+FLOPS_PER_POINT = 34
+OMEGA = 0.8
+# 原程序以 Pentium III 600MHz 的 MFLOPS 为基准计算 Score
+PENTIUM3_MFLOPS = 82.84
+
+
+class HimenoNumpy(Benchmark):
+    """纯 Python/NumPy 实现的 Himeno 基准测试，无需网络和编译器"""
+
+    name = "himeno_numpy"
+    description = "NumPy 实现的 Himeno Jacobi 迭代基准测试"
+    exclusive = True
+    estimated_duration = 30
+
+    def __init__(self, config):
+        super().__init__(config)
+        if np is None:
+            raise RuntimeError("himeno_numpy 需要安装 NumPy")
+
+        options = config.get("himeno_numpy", {})
+        size = options.get("problem_size", config.get("himeno", {}).get("problem_size", "M"))
+        self.grid_size = resolve_grid_size(size)
+        self.iterations = options.get("iterations")
+        self.target_seconds = options.get("target_seconds", 10)
+        self.threads = max(1, options.get("threads", 1))
+
+    def _init_matrix(self):
+        """按原程序 initmt() 初始化压力场 p[i][j][k] = i² / (imax-1)²"""
+        mimax, mjmax, mkmax = GRID_SIZES[self.grid_size]
+        imax, jmax, kmax = mimax - 1, mjmax - 1, mkmax - 1
+        p = np.zeros((mimax, mjmax, mkmax), dtype=np.float32)
+        rows = (np.arange(imax, dtype=np.float32) ** 2) / float((imax - 1) ** 2)
+        p[:imax, :jmax, :kmax] = rows[:, None, None]
+        return p, (imax, jmax, kmax)
+
+    def _chunks(self, imax):
+        """把内部 i 平面 [1, imax-1) 划分给各个线程"""
+        interior = imax - 2
+        count = min(self.threads, interior)
+        bounds = [1 + interior * n // count for n in range(count + 1)]
+        return list(zip(bounds[:-1], bounds[1:]))
+
+    @staticmethod
+    def _jacobi_slab(p, wrk2, i0, i1, jmax, kmax, buf, tmp):
+        """计算 i ∈ [i0, i1) 平面的一次 Jacobi 更新，返回该部分的残差平方和
+
+        原程序中的系数数组 a、b、c、bnd 和 wrk1 都是常数（a=1, a3=1/6, b=0, c=1,
+        bnd=1, wrk1=0），这里直接用标量代替，但保留全部 34 次浮点运算。
+        """
+        j, k = slice(1, jmax - 1), slice(1, kmax - 1)
+        jp, jm = slice(2, jmax), slice(0, jmax - 2)
+        kp, km = slice(2, kmax), slice(0, kmax - 2)
+        i, ip, im = slice(i0, i1), slice(i0 + 1, i1 + 1), slice(i0 - 1, i1 - 1)
+        a0 = a1 = a2 = 1.0
+        a3 = np.float32(1.0 / 6.0)
+        b0 = b1 = b2 = 0.0
+        c0 = c1 = c2 = 1.0
+
+        s0 = buf[:i1 - i0]
+        t = tmp[:i1 - i0]
+        np.multiply(p[ip, j, k], a0, out=s0)
+        s0 += np.multiply(p[i, jp, k], a1, out=t)
+        s0 += np.multiply(p[i, j, kp], a2, out=t)
+
+        np.subtract(p[ip, jp, k], p[ip, jm, k], out=t)
+        t -= p[im, jp, k]
+        t += p[im, jm, k]
+        t *= b0
+        s0 += t
+        np.subtract(p[i, jp, kp], p[i, jm, kp], out=t)
+        t -= p[i, jp, km]
+        t += p[i, jm, km]
+        t *= b1
+        s0 += t
+        np.subtract(p[ip, j, kp], p[im, j, kp], out=t)
+        t -= p[ip, j, km]
+        t += p[im, j, km]
+        t *= b2
+        s0 += t
+
+        s0 += np.multiply(p[im, j, k], c0, out=t)
+        s0 += np.multiply(p[i, jm, k], c1, out=t)
+        s0 += np.multiply(p[i, j, km], c2, out=t)
+
+        # ss = (s0 * a3 - p) * bnd；wrk2 = p + omega * ss
+        s0 *= a3
+        s0 -= p[i, j, k]
+        gosa = float(np.vdot(s0, s0))
+        s0 *= np.float32(OMEGA)
+        np.add(p[i, j, k], s0, out=wrk2[i, j, k])
+        return gosa
+
+    def _jacobi(self, p, wrk2, dims, iterations, pool, workspaces):
+        """执行 iterations 次 Jacobi 迭代，返回最后一次的残差"""
+        imax, jmax, kmax = dims
+        chunks = self._chunks(imax)
+        gosa = 0.0
+        for _ in range(iterations):
+            if pool is None:
+                gosa = self._jacobi_slab(p, wrk2, 1, imax - 1, jmax, kmax, *workspaces[0])
+            else:
+                # NumPy 的逐元素运算会释放 GIL，各线程处理互不重叠的 i 平面
+                futures = [
+                    pool.submit(self._jacobi_slab, p, wrk2, i0, i1, jmax, kmax, *workspace)
+                    for (i0, i1), workspace in zip(chunks, workspaces)
+                ]
+                gosa = sum(future.result() for future in futures)
+            p[1:imax - 1, 1:jmax - 1, 1:kmax - 1] = wrk2[1:imax - 1, 1:jmax - 1, 1:kmax - 1]
+        return gosa
+
+    def run(self):
+        """运行 NumPy 版 Himeno 基准测试"""
+        try:
+            p, dims = self._init_matrix()
+            imax, jmax, kmax = dims
+            wrk2 = p.copy()
+            chunks = self._chunks(imax)
+            workspaces = [
+                tuple(np.empty((i1 - i0, jmax - 2, kmax - 2), dtype=np.float32) for _ in range(2))
+                for i0, i1 in chunks
+            ]
+            flops_per_iteration = FLOPS_PER_POINT * (imax - 2) * (jmax - 2) * (kmax - 2)
+
+            pool = ThreadPoolExecutor(max_workers=len(chunks)) if len(chunks) > 1 else None
+            try:
+                iterations = self.iterations
+                if not iterations:
+                    # 与原程序一样先试跑 3 次，估算达到目标时长所需的迭代次数
+                    start = time.perf_counter()
+                    self._jacobi(p, wrk2, dims, 3, pool, workspaces)
+                    rehearsal = time.perf_counter() - start
+                    iterations = max(1, int(self.target_seconds / (rehearsal / 3)))
+                    p, _ = self._init_matrix()
+                    wrk2 = p.copy()
+
+                start = time.perf_counter()
+                gosa = self._jacobi(p, wrk2, dims, iterations, pool, workspaces)
+                elapsed = time.perf_counter() - start
+            finally:
+                if pool is not None:
+                    pool.shutdown()
+
+            mflops = flops_per_iteration * iterations / elapsed / 1e6
+            return {
+                "score": mflops,
+                "mflops": mflops,
+                "score_pentium3": mflops / PENTIUM3_MFLOPS,
+                "gosa": gosa,
+                "iterations": iterations,
+                "time_seconds": elapsed,
+                "grid_size": self.grid_size,
+                "grid": [imax, jmax, kmax],
+                "threads": len(chunks),
+                "success": True
+            }
+        except Exception as e:
+            return {
+                "score": 0,
+                "time_seconds": 0,
+                "error": str(e),
+                "success": False
+            }
@@ -0,0 +1,232 @@
+/*
+ * Himeno benchmark (Jacobi iteration of the pressure Poisson equation).
+ *
+ * Reimplementation of RIKEN's himenoBMTxp for offline builds: same grid
+ * sizes, initial conditions, 34-flop stencil, rehearsal/measurement flow
+ * and output format as the reference program.
+ *
+ * The grid size is selected at compile time with one of -DXSMALL, -DSMALL,
+ * -DMIDDLE, -DLARGE or -DELARGE (default MIDDLE).  Compile with -fopenmp to
+ * parallelise the i loop; OMP_NUM_THREADS controls the thread count.
+ */
+#include <stdio.h>
+#include <stdlib.h>
+#include <sys/time.h>
+
+#if defined(XSMALL)
+#define MIMAX 33
+#define MJMAX 33
+#define MKMAX 65
+#elif defined(SMALL)
+#define MIMAX 65
+#define MJMAX 65
+#define MKMAX 129
+#elif defined(LARGE)
+#define MIMAX 257
+#define MJMAX 257
+#define MKMAX 513
+#elif defined(ELARGE)
+#define MIMAX 513
+#define MJMAX 513
+#define MKMAX 1025
+#else
+#define MIDDLE
+#define MIMAX 129
+#define MJMAX 129
+#define MKMAX 257
+#endif
+
+#ifndef TARGET_SECONDS
+#define TARGET_SECONDS 60.0
+#endif
+
+#define IDX(i, j, k) (((size_t)(i) * MJMAX + (j)) * MKMAX + (k))
+#define PLANE ((size_t)MIMAX * MJMAX * MKMAX)
+
+static float *p, *bnd, *wrk1, *wrk2;
+static float *a, *b, *c;
+static int imax, jmax, kmax;
+static const float omega = 0.8f;
+
+static double second(void)
+{
+    struct timeval tm;
+    gettimeofday(&tm, NULL);
+    return tm.tv_sec + tm.tv_usec * 1.0e-6;
+}
+
+static float *allocate(size_t planes)
+{
+    float *m = (float *)malloc(planes * PLANE * sizeof(float));
+    if (m == NULL) {
+        fprintf(stderr, "Memory allocation failed\n");
+        exit(1);
+    }
+    return m;
+}
+
+static void initmt(void)
+{
+    int i, j, k;
+
+#pragma omp parallel for private(j, k)
+    for (i = 0; i < MIMAX; i++)
+        for (j = 0; j < MJMAX; j++)
+            for (k = 0; k < MKMAX; k++) {
+                a[0 * PLANE + IDX(i, j, k)] = 0.0f;
+                a[1 * PLANE + IDX(i, j, k)] = 0.0f;
+                a[2 * PLANE + IDX(i, j, k)] = 0.0f;
+                a[3 * PLANE + IDX(i, j, k)] = 0.0f;
+                b[0 * PLANE + IDX(i, j, k)] = 0.0f;
+                b[1 * PLANE + IDX(i, j, k)] = 0.0f;
+                b[2 * PLANE + IDX(i, j, k)] = 0.0f;
+                c[0 * PLANE + IDX(i, j, k)] = 0.0f;
+                c[1 * PLANE + IDX(i, j, k)] = 0.0f;
+                c[2 * PLANE + IDX(i, j, k)] = 0.0f;
+                p[IDX(i, j, k)] = 0.0f;
+                wrk1[IDX(i, j, k)] = 0.0f;
+                wrk2[IDX(i, j, k)] = 0.0f;
+                bnd[IDX(i, j, k)] = 0.0f;
+            }
+
+#pragma omp parallel for private(j, k)
+    for (i = 0; i < imax; i++)
+        for (j = 0; j < jmax; j++)
+            for (k = 0; k < kmax; k++) {
+                a[0 * PLANE + IDX(i, j, k)] = 1.0f;
+                a[1 * PLANE + IDX(i, j, k)] = 1.0f;
+                a[2 * PLANE + IDX(i, j, k)] = 1.0f;
+                a[3 * PLANE + IDX(i, j, k)] = 1.0f / 6.0f;
+                b[0 * PLANE + IDX(i, j, k)] = 0.0f;
+                b[1 * PLANE + IDX(i, j, k)] = 0.0f;
+                b[2 * PLANE + IDX(i, j, k)] = 0.0f;
+                c[0 * PLANE + IDX(i, j, k)] = 1.0f;
+                c[1 * PLANE + IDX(i, j, k)] = 1.0f;
+                c[2 * PLANE + IDX(i, j, k)] = 1.0f;
+                p[IDX(i, j, k)] = (float)(i * i) / (float)((imax - 1) * (imax - 1));
+                wrk1[IDX(i, j, k)] = 0.0f;
+                bnd[IDX(i, j, k)] = 1.0f;
+            }
+}
+
+static float jacobi(int nn)
+{
+    int i, j, k, n;
+    float gosa = 0.0f, s0, ss;
+
+    for (n = 0; n < nn; ++n) {
+        gosa = 0.0f;
+
+#pragma omp parallel for private(j, k, s0, ss) reduction(+:gosa)
+        for (i = 1; i < imax - 1; i++)
+            for (j = 1; j < jmax - 1; j++)
+                for (k = 1; k < kmax - 1; k++) {
+                    s0 = a[0 * PLANE + IDX(i, j, k)] * p[IDX(i + 1, j, k)]
+                       + a[1 * PLANE + IDX(i, j, k)] * p[IDX(i, j + 1, k)]
+                       + a[2 * PLANE + IDX(i, j, k)] * p[IDX(i, j, k + 1)]
+                       + b[0 * PLANE + IDX(i, j, k)]
+                         * (p[IDX(i + 1, j + 1, k)] - p[IDX(i + 1, j - 1, k)]
+                            - p[IDX(i - 1, j + 1, k)] + p[IDX(i - 1, j - 1, k)])
+                       + b[1 * PLANE + IDX(i, j, k)]
+                         * (p[IDX(i, j + 1, k + 1)] - p[IDX(i, j - 1, k + 1)]
+                            - p[IDX(i, j + 1, k - 1)] + p[IDX(i, j - 1, k - 1)])
+                       + b[2 * PLANE + IDX(i, j, k)]
+                         * (p[IDX(i + 1, j, k + 1)] - p[IDX(i - 1, j, k + 1)]
+                            - p[IDX(i + 1, j, k - 1)] + p[IDX(i - 1, j, k - 1)])
+                       + c[0 * PLANE + IDX(i, j, k)] * p[IDX(i - 1, j, k)]
+                       + c[1 * PLANE + IDX(i, j, k)] * p[IDX(i, j - 1, k)]
+                       + c[2 * PLANE + IDX(i, j, k)] * p[IDX(i, j, k - 1)]
+                       + wrk1[IDX(i, j, k)];
+
+                    ss = (s0 * a[3 * PLANE + IDX(i, j, k)] - p[IDX(i, j, k)]) * bnd[IDX(i, j, k)];
+                    gosa += ss * ss;
+                    wrk2[IDX(i, j, k)] = p[IDX(i, j, k)] + omega * ss;
+                }
+
+#pragma omp parallel for private(j, k)
+        for (i = 1; i < imax - 1; ++i)
+            for (j = 1; j < jmax - 1; ++j)
+                for (k = 1; k < kmax - 1; ++k)
+                    p[IDX(i, j, k)] = wrk2[IDX(i, j, k)];
+    }
+
+    return gosa;
+}
+
+static double fflop(int mx, int my, int mz)
+{
+    return (double)(mz - 2) * (double)(my - 2) * (double)(mx - 2) * 34.0;
+}
+
+static double mflops(int nn, double cpu, double flop)
+{
+    return flop / cpu * 1.e-6 * (double)nn;
+}
+
+int main(void)
+{
+    int nn;
+    float gosa;
+    double cpu0, cpu1, cpu, flop;
+    const double target = TARGET_SECONDS;
+
+    imax = MIMAX - 1;
+    jmax = MJMAX - 1;
+    kmax = MKMAX - 1;
+
+    p = allocate(1);
+    bnd = allocate(1);
+    wrk1 = allocate(1);
+    wrk2 = allocate(1);
+    a = allocate(4);
+    b = allocate(3);
+    c = allocate(3);
+
+    initmt();
+    printf("mimax = %d mjmax = %d mkmax = %d\n", MIMAX, MJMAX, MKMAX);
+    printf("imax = %d jmax = %d kmax =%d\n", imax, jmax, kmax);
+
+    nn = 3;
+    printf(" Start rehearsal measurement process.\n");
+    printf(" Measure the performance in %d times.\n\n", nn);
+    fflush(stdout);
+
+    cpu0 = second();
+    gosa = jacobi(nn);
+    cpu1 = second();
+    cpu = cpu1 - cpu0;
+    flop = fflop(imax, jmax, kmax);
+
+    printf(" MFLOPS: %f time(s): %f %e\n\n", mflops(nn, cpu, flop), cpu, gosa);
+    fflush(stdout);
+
+    nn = (int)(target / (cpu / 3.0));
+    if (nn < 1)
+        nn = 1;
+
+    printf(" Now, start the actual measurement process.\n");
+    printf(" The loop will be excuted in %d times\n", nn);
+    printf(" This will take about one minute.\n");
+    printf(" Wait for a while\n\n");
+    fflush(stdout);
+
+    cpu0 = second();
+    gosa = jacobi(nn);
+    cpu1 = second();
+    cpu = cpu1 - cpu0;
+
+    printf(" Loop executed for %d times\n", nn);
+    printf(" Gosa : %e \n", gosa);
+    printf(" MFLOPS measured : %f\tcpu : %f\n", mflops(nn, cpu, flop), cpu);
+    printf(" Score based on Pentium III 600MHz using Fortran 77: %f\n",
+           mflops(nn, cpu, flop) / 82.84);
+
+    free(p);
+    free(bnd);
+    free(wrk1);
+    free(wrk2);
+    free(a);
+    free(b);
+    free(c);
+    return 0;
+}
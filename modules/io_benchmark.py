@@ -0,0 +1,245 @@
+import math
+import mmap
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from modules.base import Benchmark
+from utils.histogram import LatencyHistogram
+
+MODES = ("buffered", "direct", "mmap")
+# 工作负载: (是否写入, 是否随机访问, 每次写入后是否 fsync)
+WORKLOADS = {
+    "seq_read": (False, False, False),
+    "seq_write": (True, False, False),
+    "rand_read": (False, True, False),
+    "rand_write": (True, True, False),
+    "fsync_write": (True, False, True)
+}
+SIZE_UNITS = {"k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+
+
+def parse_size(value):
+    """解析 4096、"4k"、"1M" 形式的字节数"""
+    text = str(value).strip().lower().rstrip("b")
+    if text and text[-1] in SIZE_UNITS:
+        return int(float(text[:-1]) * SIZE_UNITS[text[-1]])
+    return int(text)
+
+
+class IoBenchmark(Benchmark):
+    """对临时文件进行顺序/随机读写与 fsync 测试，用于评估 vm.dirty_* 等参数"""
+
+    name = "io_benchmark"
+    description = "缓冲、O_DIRECT 与 mmap 的顺序/随机读写及 fsync 测试"
+    exclusive = True
+    estimated_duration = 60
+
+    def __init__(self, config):
+        super().__init__(config)
+        options = config.get("io_benchmark", {})
+        self.directory = os.path.expanduser(options.get("directory", "/var/tmp"))
+        self.file_size = parse_size(options.get("file_size", "1G"))
+        self.block_size = parse_size(options.get("block_size", "4k"))
+        self.queue_depth = max(1, int(options.get("queue_depth", 1)))
+        self.runtime = options.get("runtime", 5)
+        self.modes = options.get("modes", list(MODES))
+        self.workloads = options.get("workloads", list(WORKLOADS))
+        self.drop_cache = options.get("drop_cache", True)
+        self.score_test = options.get("score_test")
+        self.seed = options.get("seed")
+
+        unknown = [mode for mode in self.modes if mode not in MODES]
+        unknown += [workload for workload in self.workloads if workload not in WORKLOADS]
+        if unknown:
+            raise ValueError(f"未知的 I/O 模式或工作负载: {', '.join(unknown)}")
+        if self.block_size % mmap.PAGESIZE:
+            raise ValueError(f"block_size 必须是页大小 {mmap.PAGESIZE} 的整数倍（O_DIRECT 与 mmap 要求对齐）")
+        # 文件大小向下取整到 block_size × queue_depth 的整数倍，使每个队列的区间都对齐
+        unit = self.block_size * self.queue_depth
+        self.file_size = max(unit, self.file_size // unit * unit)
+        self.path = os.path.join(self.directory, f".io_benchmark.{os.getpid()}.dat")
+
+    # ---- 测试文件 ----
+
+    def _prepare_file(self):
+        """写入完整的测试文件（避免读取稀疏文件的空洞）并落盘"""
+        os.makedirs(self.directory, exist_ok=True)
+        chunk = os.urandom(1024 * 1024)
+        fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            written = 0
+            while written < self.file_size:
+                written += os.write(fd, chunk[:self.file_size - written])
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _settle(self):
+        """把脏页写回并（可选）从页缓存中丢弃测试文件，使各项测试互不影响"""
+        fd = os.open(self.path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+            if self.drop_cache and hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+    # ---- 单项测试 ----
+
+    def _offsets(self, queue, rng, sequential):
+        """为第 queue 个队列生成无限的块偏移序列：顺序测试各队列负责连续的一段区间"""
+        region = self.file_size // self.queue_depth
+        base = queue * region
+        blocks = region // self.block_size
+        position = 0
+        while True:
+            if sequential:
+                yield base + position * self.block_size
+                position = (position + 1) % blocks
+            else:
+                yield rng.randrange(self.file_size // self.block_size) * self.block_size
+
+    def _worker(self, mode, workload, queue, deadline, target):
+        """一个队列的 I/O 循环，返回 (操作数, 字节数, 延迟直方图)"""
+        write, random_access, sync = WORKLOADS[workload]
+        rng = random.Random(None if self.seed is None else f"{self.seed}/{workload}/{queue}")
+        offsets = self._offsets(queue, rng, not random_access)
+        histogram = LatencyHistogram()
+        # 匿名映射按页对齐，可直接用作 O_DIRECT 的缓冲区
+        buffer = mmap.mmap(-1, self.block_size)
+        buffer.write(os.urandom(self.block_size))
+        ops = 0
+        clock = time.perf_counter_ns
+        try:
+            if mode == "mmap":
+                pages = target
+                for offset in offsets:
+                    start = clock()
+                    if write:
+                        pages[offset:offset + self.block_size] = buffer
+                        if sync:
+                            pages.flush(offset, self.block_size)
+                    else:
+                        buffer[:] = pages[offset:offset + self.block_size]
+                    end = clock()
+                    histogram.record(end - start)
+                    ops += 1
+                    if end >= deadline:
+                        break
+            else:
+                fd = target
+                for offset in offsets:
+                    start = clock()
+                    if write:
+                        os.pwritev(fd, [buffer], offset)
+                        if sync:
+                            os.fsync(fd)
+                    else:
+                        os.preadv(fd, [buffer], offset)
+                    end = clock()
+                    histogram.record(end - start)
+                    ops += 1
+                    if end >= deadline:
+                        break
+        finally:
+            buffer.close()
+        return ops, ops * self.block_size, histogram
+
+    def _open(self, mode, write):
+        flags = os.O_RDWR if write or mode == "mmap" else os.O_RDONLY
+        if mode == "direct":
+            if not hasattr(os, "O_DIRECT"):
+                raise OSError("当前平台不支持 O_DIRECT")
+            flags |= os.O_DIRECT
+        return os.open(self.path, flags)
+
+    def _run_test(self, mode, workload):
+        """运行一项测试，queue_depth 个线程并发发出同步 I/O（os.pread/pwrite 会释放 GIL）"""
+        write = WORKLOADS[workload][0]
+        self._settle()
+        fd = self._open(mode, write)
+        pages = None
+        try:
+            if mode == "mmap":
+                pages = mmap.mmap(fd, self.file_size)
+            target = pages if pages is not None else fd
+            start = time.perf_counter_ns()
+            deadline = start + int(self.runtime * 1e9)
+            with ThreadPoolExecutor(max_workers=self.queue_depth) as pool:
+                futures = [
+                    pool.submit(self._worker, mode, workload, queue, deadline, target)
+                    for queue in range(self.queue_depth)
+                ]
+                outcomes = [future.result() for future in futures]
+            elapsed = (time.perf_counter_ns() - start) / 1e9
+        finally:
+            if pages is not None:
+                pages.close()
+            os.close(fd)
+
+        histogram = LatencyHistogram()
+        for _, _, worker_histogram in outcomes:
+            histogram.merge(worker_histogram)
+        ops = sum(outcome[0] for outcome in outcomes)
+        total_bytes = sum(outcome[1] for outcome in outcomes)
+        return {
+            "ops": ops,
+            "bytes": total_bytes,
+            "elapsed": elapsed,
+            "iops": ops / elapsed,
+            "throughput_mbps": total_bytes / elapsed / 1e6,
+            "latency_us": histogram.summary(scale=1000)
+        }
+
+    def run(self):
+        """依次运行 modes × workloads 中的各项测试"""
+        try:
+            start = time.perf_counter()
+            self._prepare_file()
+            tests = {}
+            for mode in self.modes:
+                for workload in self.workloads:
+                    test = f"{mode}/{workload}"
+                    try:
+                        tests[test] = self._run_test(mode, workload)
+                    except OSError as e:
+                        # 例如 tmpfs 不支持 O_DIRECT：记录错误并继续其他测试
+                        tests[test] = {"error": e.strerror or str(e)}
+
+            measured = {test: result for test, result in tests.items() if "error" not in result}
+            if not measured:
+                raise RuntimeError("所有 I/O 测试均失败: " + "; ".join(
+                    f"{test}: {result['error']}" for test, result in tests.items()
+                ))
+            if self.score_test:
+                if self.score_test not in measured:
+                    raise RuntimeError(f"得分测试 {self.score_test} 未成功运行")
+                score = measured[self.score_test]["throughput_mbps"]
+            else:
+                # 默认以各项吞吐量的几何平均值作为得分
+                score = math.exp(sum(
+                    math.log(max(result["throughput_mbps"], 1e-9)) for result in measured.values()
+                ) / len(measured))
+
+            return {
+                "score": score,
+                "score_test": self.score_test or "geomean",
+                "tests": tests,
+                "block_size": self.block_size,
+                "queue_depth": self.queue_depth,
+                "file_size": self.file_size,
+                "time_seconds": time.perf_counter() - start,
+                "success": True
+            }
+        except Exception as e:
+            return {
+                "score": 0,
+                "time_seconds": 0,
+                "error": str(e),
+                "success": False
+            }
+        finally:
+            if os.path.exists(self.path):
+                os.unlink(self.path)
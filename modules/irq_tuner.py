@@ -0,0 +1,430 @@
+import errno
+import glob
+import os
+import re
+import shutil
+import struct
+import subprocess
+
+from modules.base import Tuner, TuningError
+from utils.scheduler import parse_cpu_list
+
+# /sys/kernel/debug/sched 下的 CFS/EEVDF 参数；5.13 之前的内核位于 /proc/sys/kernel/sched_*
+SCHED_KNOBS = ("base_slice_ns", "latency_ns", "min_granularity_ns", "wakeup_granularity_ns",
+               "migration_cost_ns", "nr_migrate")
+# 搜索空间中调度参数相对当前值的倍数
+SCHED_FACTORS = (0.5, 1, 2)
+
+
+def _read(path):
+    try:
+        with open(path, "r") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _write(path, value):
+    with open(path, "w") as f:
+        f.write(str(value))
+
+
+def cpu_mask(cpus):
+    """CPU 列表转换为十六进制掩码，每 32 位以逗号分隔（rps_cpus、default_smp_affinity 的格式）"""
+    value = 0
+    for cpu in cpus:
+        value |= 1 << cpu
+    text = f"{value:x}"
+    groups = []
+    while len(text) > 8:
+        groups.insert(0, text[-8:])
+        text = text[:-8]
+    return ",".join([text] + groups)
+
+
+def mask_value(mask):
+    return int(mask.replace(",", "") or "0", 16)
+
+
+def _format_cpus(cpus):
+    """[0, 1, 2, 5] -> "0-2,5" """
+    ranges = []
+    for cpu in sorted(set(cpus)):
+        if ranges and cpu == ranges[-1][1] + 1:
+            ranges[-1][1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+    return ",".join(str(start) if start == end else f"{start}-{end}" for start, end in ranges)
+
+
+class IrqTuner(Tuner):
+    """把中断与网络软中断从基准测试所用的核心上移走，调整调度器参数并限制深度 C-state
+
+    isolate_cpus 指定基准测试使用的核心，其余在线核心作为处理中断的 housekeeping 核心。
+    每次写入前保存原始值并写入调优日志，重置时逆序恢复；用 PM QoS 限制 C-state 时
+    /dev/cpu_dma_latency 的请求在文件关闭（包括进程退出）时由内核自动撤销。
+    """
+
+    name = "irq_tuner"
+    description = "中断亲和性、RPS/XPS、调度器参数与 C-state 限制"
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.options = config.get("irq_tuning", {})
+        self.sysfs_root = self.options.get("sysfs_root", "/sys")
+        self.procfs_root = self.options.get("procfs_root", "/proc")
+        self.dev_root = self.options.get("dev_root", "/dev")
+        self.cpu_root = os.path.join(self.sysfs_root, "devices", "system", "cpu")
+        self.original_values = {}
+        self.irqbalance_stopped = False
+        self.latency_fd = None
+        self.latency_request = None
+        self.skipped_irqs = []
+
+    # ---- CPU 集合 ----
+
+    def online_cpus(self):
+        online = _read(os.path.join(self.cpu_root, "online"))
+        return parse_cpu_list(online) if online else list(range(os.cpu_count() or 1))
+
+    def isolated_cpus(self):
+        isolate = self.options.get("isolate_cpus")
+        return parse_cpu_list(isolate) if isolate is not None else []
+
+    def housekeeping_cpus(self):
+        """处理中断的核心：housekeeping_cpus 或在线核心中除 isolate_cpus 以外的部分"""
+        if self.options.get("housekeeping_cpus") is not None:
+            cpus = parse_cpu_list(self.options["housekeeping_cpus"])
+        else:
+            if not self.isolated_cpus():
+                raise TuningError("引导中断需要指定 isolate_cpus 或 housekeeping_cpus")
+            isolated = set(self.isolated_cpus())
+            cpus = [cpu for cpu in self.online_cpus() if cpu not in isolated]
+        if not cpus:
+            raise TuningError("没有可用于处理中断的核心")
+        return cpus
+
+    # ---- 中断 ----
+
+    def irqs(self):
+        """可设置亲和性的中断号及其在 /proc/interrupts 中的描述"""
+        descriptions = {}
+        for line in (_read(os.path.join(self.procfs_root, "interrupts")) or "").splitlines():
+            match = re.match(r"\s*(\d+):\s*(.*)", line)
+            if match:
+                descriptions[int(match.group(1))] = " ".join(match.group(2).split())
+        irqs = {}
+        for path in glob.glob(os.path.join(self.procfs_root, "irq", "[0-9]*", "smp_affinity_list")):
+            irq = int(os.path.basename(os.path.dirname(path)))
+            irqs[irq] = descriptions.get(irq, "")
+        return dict(sorted(irqs.items()))
+
+    def _selected_irqs(self):
+        """irq_affinity.irqs 为空时选择全部中断，否则按中断号或描述中的正则表达式匹配"""
+        patterns = self.options.get("irq_affinity", {}).get("irqs")
+        irqs = self.irqs()
+        if not patterns:
+            return list(irqs)
+        return [
+            irq for irq, description in irqs.items()
+            if any(str(pattern) == str(irq) or re.search(str(pattern), description) for pattern in patterns)
+        ]
+
+    def _affinity_file(self, irq):
+        return os.path.join(self.procfs_root, "irq", str(irq), "smp_affinity_list")
+
+    def _probe_irq(self, irq):
+        """写回当前值以探测能否修改：托管中断与每 CPU 中断（如本地定时器）返回 EIO"""
+        path = self._affinity_file(irq)
+        current = _read(path)
+        try:
+            _write(path, current)
+        except OSError as e:
+            if e.errno == errno.EIO:
+                return False
+            raise
+        return True
+
+    def irqbalance_running(self):
+        for path in glob.glob(os.path.join(self.procfs_root, "[0-9]*", "comm")):
+            if _read(path) == "irqbalance":
+                return True
+        return False
+
+    def _stop_irqbalance(self):
+        """irqbalance 会周期性地重新分配中断亲和性，修改前先停止，重置时再启动"""
+        mode = self.options.get("irq_affinity", {}).get("irqbalance", "stop")
+        if mode not in ("stop", "ignore"):
+            raise TuningError(f"未知的 irqbalance 处理方式: {mode}")
+        if not self.irqbalance_running():
+            return
+        if mode == "ignore":
+            print("警告: irqbalance 正在运行，可能覆盖设置的中断亲和性")
+            return
+        if shutil.which("systemctl") is None:
+            raise TuningError("irqbalance 正在运行，但无法通过 systemctl 停止")
+        self._journal([("service", "irqbalance", "active")])
+        result = subprocess.run(["systemctl", "stop", "irqbalance"], capture_output=True, text=True, timeout=60)
+        if result.returncode != 0:
+            raise TuningError(f"停止 irqbalance 失败: {result.stderr.strip()}")
+        self.irqbalance_stopped = True
+        print("已停止 irqbalance")
+
+    def _start_irqbalance(self):
+        if not self.irqbalance_stopped:
+            return None
+        result = subprocess.run(["systemctl", "start", "irqbalance"], capture_output=True, text=True, timeout=60)
+        if result.returncode != 0:
+            return f"启动 irqbalance 失败: {result.stderr.strip()}"
+        self.irqbalance_stopped = False
+        return None
+
+    # ---- 网络队列 ----
+
+    def _queue_files(self, section, prefix, filename):
+        """各网卡队列的 rps_cpus 或 xps_cpus 文件，默认跳过 lo"""
+        devices = self.options.get(section, {}).get("devices")
+        files = []
+        pattern = os.path.join(self.sysfs_root, "class", "net", "*", "queues", f"{prefix}-*", filename)
+        for path in sorted(glob.glob(pattern)):
+            device = path.split(os.sep)[-4]
+            if (devices is None and device != "lo") or (devices is not None and device in devices):
+                files.append(path)
+        return files
+
+    def _queue_mask(self, section):
+        cpus = self.options.get(section, {}).get("cpus")
+        if cpus == "none":
+            return "0"
+        return cpu_mask(parse_cpu_list(cpus) if cpus is not None else self.housekeeping_cpus())
+
+    # ---- 调度器与 C-state ----
+
+    def _sched_file(self, knob):
+        path = os.path.join(self.sysfs_root, "kernel", "debug", "sched", knob)
+        if os.path.exists(path):
+            return path
+        legacy = os.path.join(self.procfs_root, "sys", "kernel", f"sched_{knob}")
+        return legacy if os.path.exists(legacy) else None
+
+    def _cstate_cpus(self):
+        cpus = self.options.get("cstates", {}).get("cpus")
+        if cpus is not None:
+            return parse_cpu_list(cpus)
+        return self.isolated_cpus() or self.online_cpus()
+
+    def idle_states(self, cpu):
+        """[(状态目录, 名称, 退出延迟 us)]"""
+        states = []
+        for path in sorted(glob.glob(os.path.join(self.cpu_root, f"cpu{cpu}", "cpuidle", "state[0-9]*")),
+                           key=lambda path: int(re.search(r"state(\d+)$", path).group(1))):
+            latency = _read(os.path.join(path, "latency"))
+            if latency is not None and latency.isdigit():
+                states.append((path, _read(os.path.join(path, "name")), int(latency)))
+        return states
+
+    # ---- 配置解析 ----
+
+    def _targets(self):
+        """返回 [(文件, 目标值, 比较方式)]，比较方式为 cpus、mask 或 text，按写入顺序排列"""
+        targets = []
+        affinity = self.options.get("irq_affinity", {})
+        if affinity.get("enable", False):
+            cpus = self.housekeeping_cpus()
+            default_file = os.path.join(self.procfs_root, "irq", "default_smp_affinity")
+            if affinity.get("default_affinity", True) and os.path.exists(default_file):
+                targets.append((default_file, cpu_mask(cpus), "mask"))
+            for irq in self._selected_irqs():
+                targets.append((self._affinity_file(irq), _format_cpus(cpus), "cpus"))
+
+        for section, prefix, filename in (("rps", "rx", "rps_cpus"), ("xps", "tx", "xps_cpus")):
+            if self.options.get(section, {}).get("enable", False):
+                mask = self._queue_mask(section)
+                targets.extend((path, mask, "mask") for path in self._queue_files(section, prefix, filename))
+
+        for knob, value in (self.options.get("sched") or {}).items():
+            if value is None:
+                continue
+            path = self._sched_file(knob)
+            if path is None:
+                print(f"内核没有调度器参数 {knob}，跳过")
+                continue
+            targets.append((path, str(int(value)), "text"))
+
+        cstates = self.options.get("cstates", {})
+        if cstates.get("max_latency_us") is not None and cstates.get("method", "pm_qos") == "cpuidle":
+            for cpu in self._cstate_cpus():
+                for path, _, latency in self.idle_states(cpu):
+                    if latency > cstates["max_latency_us"] and os.path.exists(os.path.join(path, "disable")):
+                        targets.append((os.path.join(path, "disable"), "1", "text"))
+        return targets
+
+    @staticmethod
+    def _matches(current, value, compare):
+        if current is None:
+            return False
+        if compare == "cpus":
+            return set(parse_cpu_list(current)) == set(parse_cpu_list(value))
+        if compare == "mask":
+            return mask_value(current) == mask_value(value)
+        return current == value
+
+    # ---- 调优接口 ----
+
+    def current_state(self):
+        """读取中断亲和性、网卡队列掩码、调度器参数与 C-state 限制的当前值"""
+        state = {
+            "irq_affinity": {irq: _read(self._affinity_file(irq)) for irq in self.irqs()},
+            "default_smp_affinity": _read(os.path.join(self.procfs_root, "irq", "default_smp_affinity")),
+            "irqbalance": self.irqbalance_running(),
+            "rps": {path: _read(path) for path in self._queue_files("rps", "rx", "rps_cpus")},
+            "xps": {path: _read(path) for path in self._queue_files("xps", "tx", "xps_cpus")},
+            "sched": {},
+            "cpuidle_disabled": {},
+            "cpu_dma_latency": self.latency_request
+        }
+        for knob in SCHED_KNOBS:
+            path = self._sched_file(knob)
+            if path is not None:
+                state["sched"][knob] = _read(path)
+        for cpu in self.online_cpus():
+            disabled = [name for path, name, _ in self.idle_states(cpu)
+                        if _read(os.path.join(path, "disable")) == "1"]
+            if disabled:
+                state["cpuidle_disabled"][cpu] = disabled
+        return state
+
+    def knobs(self):
+        """中断亲和性、RPS、XPS、各调度器参数与 C-state 限制分别作为调优项"""
+        knobs = []
+        for section in ("irq_affinity", "rps", "xps"):
+            if self.options.get(section, {}).get("enable", False):
+                knobs.append((section, ("irq_tuning", section, "enable"), False))
+        for knob, value in (self.options.get("sched") or {}).items():
+            if value is not None:
+                knobs.append((f"sched.{knob}", ("irq_tuning", "sched", knob), None))
+        if self.options.get("cstates", {}).get("max_latency_us") is not None:
+            knobs.append(("cstates", ("irq_tuning", "cstates", "max_latency_us"), None))
+        return knobs
+
+    def tunable_space(self):
+        """根据系统中存在的中断、网卡队列、调度器参数与 idle 状态生成搜索空间"""
+        space = {}
+        steerable = self.options.get("isolate_cpus") is not None or self.options.get("housekeeping_cpus") is not None
+        if steerable and self.irqs():
+            space["irq_affinity"] = {"enable": [False, True]}
+        if steerable and self._queue_files("rps", "rx", "rps_cpus"):
+            space["rps"] = {"enable": [False, True]}
+
+        sched = {}
+        for knob in SCHED_KNOBS:
+            path = self._sched_file(knob)
+            value = _read(path) if path else None
+            if value is not None and value.isdigit() and int(value) > 0:
+                sched[knob] = list(dict.fromkeys(int(int(value) * factor) for factor in SCHED_FACTORS))
+        if sched:
+            space["sched"] = sched
+
+        # 候选的最大退出延迟取各 idle 状态的延迟，None 表示不限制
+        latencies = sorted({latency for _, _, latency in self.idle_states(self._cstate_cpus()[0])}) \
+            if self._cstate_cpus() else []
+        if latencies:
+            space["cstates"] = {"max_latency_us": [None] + latencies}
+        return {"irq_tuning": space} if space else {}
+
+    def apply(self):
+        """停止 irqbalance，写入中断亲和性、队列掩码、调度器参数与 idle 状态，并设置 PM QoS 延迟请求"""
+        try:
+            targets = self._targets()
+        except (ValueError, TypeError) as e:
+            raise TuningError(f"解析中断与调度调优配置失败: {e}") from e
+        cstates = self.options.get("cstates", {})
+        pm_qos = cstates.get("max_latency_us") is not None and cstates.get("method", "pm_qos") == "pm_qos"
+        if cstates.get("method", "pm_qos") not in ("pm_qos", "cpuidle"):
+            raise TuningError(f"未知的 C-state 限制方式: {cstates['method']}")
+        if not targets and not pm_qos:
+            print("没有可应用的中断与调度调优设置，跳过")
+            return
+
+        self.skipped_irqs = []
+        irq_files = {self._affinity_file(irq): irq for irq in self.irqs()}
+        writable = []
+        for path, value, compare in targets:
+            if path in irq_files:
+                try:
+                    if not self._probe_irq(irq_files[path]):
+                        self.skipped_irqs.append(irq_files[path])
+                        continue
+                except OSError as e:
+                    raise TuningError(f"{path}: {e.strerror or e}") from e
+            writable.append((path, value, compare))
+
+        if any(path in irq_files for path, _, _ in writable):
+            self._stop_irqbalance()
+
+        self.original_values = {}
+        for path, _, _ in writable:
+            self.original_values[path] = _read(path)
+        self._journal([("file", path, value) for path, value in self.original_values.items()])
+
+        errors = []
+        for path, value, compare in writable:
+            try:
+                _write(path, value)
+            except OSError as e:
+                errors.append(f"{path}: {e.strerror or e}")
+                continue
+            if not self._matches(_read(path), value, compare):
+                errors.append(f"{path}: 写入 {value} 后读回 {_read(path)}")
+
+        if pm_qos and not errors:
+            try:
+                self._request_latency(int(cstates["max_latency_us"]))
+            except OSError as e:
+                errors.append(f"cpu_dma_latency: {e.strerror or e}")
+
+        if errors:
+            print(f"设置中断与调度参数失败: {'; '.join(errors)}")
+            raise TuningError(f"设置中断与调度参数失败: {'; '.join(errors)}")
+
+        if self.skipped_irqs:
+            print(f"跳过 {len(self.skipped_irqs)} 个不允许修改亲和性的中断: "
+                  f"{', '.join(str(irq) for irq in self.skipped_irqs)}")
+        print(f"已设置 {len(writable)} 项中断与调度参数")
+        if self.latency_request is not None:
+            print(f"已通过 PM QoS 把 CPU 唤醒延迟限制为 {self.latency_request} us")
+
+    def _request_latency(self, latency_us):
+        """向 /dev/cpu_dma_latency 写入 32 位延迟上限；请求在文件打开期间一直有效"""
+        fd = os.open(os.path.join(self.dev_root, "cpu_dma_latency"), os.O_WRONLY)
+        try:
+            os.write(fd, struct.pack("i", latency_us))
+        except OSError:
+            os.close(fd)
+            raise
+        self.latency_fd = fd
+        self.latency_request = latency_us
+
+    def reset(self):
+        """撤销 PM QoS 请求，逆序恢复原始值，最后重新启动 irqbalance"""
+        errors = []
+        if self.latency_fd is not None:
+            os.close(self.latency_fd)
+            self.latency_fd = None
+            self.latency_request = None
+        for path, value in reversed(list(self.original_values.items())):
+            if value is None:
+                continue
+            try:
+                if _read(path) != value:
+                    _write(path, value)
+            except OSError as e:
+                errors.append(f"{path}: {e.strerror or e}")
+        error = self._start_irqbalance()
+        if error:
+            errors.append(error)
+        if errors:
+            print(f"恢复中断与调度参数失败: {'; '.join(errors)}")
+            raise TuningError(f"恢复中断与调度参数失败: {'; '.join(errors)}")
+        if self.original_values:
+            print("已恢复中断与调度参数")
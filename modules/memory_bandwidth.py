@@ -0,0 +1,285 @@
+import ctypes
+import hashlib
+import os
+import subprocess
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from modules.base import Benchmark
+
+# STREAM 各内核每个元素读写的字节数（按 8 字节双精度计算）
+STREAM_KERNELS = {
+    "copy": 2 * 8,
+    "scale": 2 * 8,
+    "add": 3 * 8,
+    "triad": 3 * 8
+}
+SCALAR = 3.0
+CACHE_LINE = 64
+# 三元组运算分块处理，使中间结果留在缓存中，内存流量与 STREAM 的计数一致
+TRIAD_BLOCK = 32768
+DEFAULT_LATENCY_SIZES_KB = [16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768, 65536]
+# 指针追逐每次循环展开的访问次数，用于摊薄解释器开销（仅用于 Python 实现）
+CHASE_UNROLL = 16
+CHASE_REPEATS = 3
+CHASE_SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "memory_bandwidth_src", "chase.c")
+CHASE_CFLAGS = ["-O2", "-shared", "-fPIC"]
+
+
+def build_chase_library(cache_dir, compiler="cc"):
+    """编译（或从缓存取得）指针追逐内核的共享库，按源码、编译器和编译选项的哈希寻址"""
+    with open(CHASE_SOURCE, "rb") as f:
+        source_hash = hashlib.sha256(f.read()).hexdigest()
+    key = hashlib.sha256(f"{source_hash}/{compiler}/{' '.join(CHASE_CFLAGS)}".encode()).hexdigest()[:16]
+    cache_dir = os.path.expanduser(cache_dir)
+    library_path = os.path.join(cache_dir, f"chase-{key}.so")
+    if not os.path.exists(library_path):
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{library_path}.{os.getpid()}.tmp"
+        try:
+            subprocess.run([compiler] + CHASE_CFLAGS + ["-o", tmp_path, CHASE_SOURCE],
+                           check=True, capture_output=True, text=True, timeout=60)
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError(f"指针追逐内核编译失败: {e.stderr.strip()}") from e
+        os.replace(tmp_path, library_path)
+    library = ctypes.CDLL(library_path)
+    library.chase.restype = ctypes.c_int64
+    library.chase.argtypes = [ctypes.c_void_p, ctypes.c_int64, ctypes.c_int64]
+    return library
+
+
+def _chase(chain, start, loops):
+    """沿链表做 loops * CHASE_UNROLL 次相互依赖的加载，返回最后的位置"""
+    i = start
+    c = chain
+    for _ in range(loops):
+        i = c[c[c[c[c[c[c[c[c[c[c[c[c[c[c[c[i]]]]]]]]]]]]]]]]
+    return i
+
+
+class MemoryBandwidth(Benchmark):
+    """STREAM 风格的内存带宽测试与随机指针追逐延迟曲线"""
+
+    name = "memory_bandwidth"
+    description = "STREAM Copy/Scale/Add/Triad 带宽与指针追逐访存延迟"
+    exclusive = True
+    estimated_duration = 30
+
+    def __init__(self, config):
+        super().__init__(config)
+        if np is None:
+            raise RuntimeError("memory_bandwidth 需要安装 NumPy")
+
+        options = config.get("memory_bandwidth", {})
+        # 每个数组的元素个数；STREAM 要求每个数组至少是末级缓存的 4 倍
+        self.array_size = int(options.get("array_size", 20000000))
+        self.ntimes = max(2, int(options.get("ntimes", 10)))
+        self.threads = max(1, int(options.get("threads", 1)))
+        self.score_kernel = options.get("score_kernel", "triad")
+        if self.score_kernel not in STREAM_KERNELS:
+            raise ValueError(f"未知的 STREAM 内核: {self.score_kernel}")
+
+        latency = options.get("latency", {})
+        self.latency_enabled = latency.get("enable", True)
+        self.latency_sizes_kb = latency.get("sizes_kb") or DEFAULT_LATENCY_SIZES_KB
+        self.latency_accesses = int(latency.get("accesses", 1000000))
+        self.seed = latency.get("seed")
+        self.latency_compiler = latency.get("compiler", "cc")
+        self.latency_build_dir = latency.get("build_cache_dir", "~/.cache/performance_tuning/memory_bandwidth")
+        self.library = None
+
+    def _chunks(self):
+        """把数组均分给各个线程"""
+        count = min(self.threads, self.array_size)
+        bounds = [self.array_size * n // count for n in range(count + 1)]
+        return [slice(start, end) for start, end in zip(bounds[:-1], bounds[1:])]
+
+    @staticmethod
+    def _kernel(name, a, b, c, part, scratch):
+        if name == "copy":
+            np.copyto(c[part], a[part])
+        elif name == "scale":
+            np.multiply(c[part], SCALAR, out=b[part])
+        elif name == "add":
+            np.add(a[part], b[part], out=c[part])
+        else:
+            for start in range(part.start, part.stop, TRIAD_BLOCK):
+                block = slice(start, min(start + TRIAD_BLOCK, part.stop))
+                tmp = scratch[:block.stop - block.start]
+                np.multiply(c[block], SCALAR, out=tmp)
+                np.add(b[block], tmp, out=a[block])
+
+    @staticmethod
+    def _first_touch(a, b, c, part, scratch):
+        """由负责该分块的线程首次写入，使页面分配在线程所在的 NUMA 节点"""
+        a[part] = 1.0
+        b[part] = 2.0
+        c[part] = 0.0
+
+    def _stream(self):
+        """按 STREAM 的方式运行 ntimes 轮四个内核，返回各内核的带宽统计"""
+        chunks = self._chunks()
+        a = np.empty(self.array_size, dtype=np.float64)
+        b = np.empty(self.array_size, dtype=np.float64)
+        c = np.empty(self.array_size, dtype=np.float64)
+        scratches = [np.empty(TRIAD_BLOCK, dtype=np.float64) for _ in chunks]
+        times = {name: [] for name in STREAM_KERNELS}
+
+        pool = ThreadPoolExecutor(max_workers=len(chunks)) if len(chunks) > 1 else None
+        try:
+            def parallel(function, *args):
+                # NumPy 的逐元素运算会释放 GIL，各线程处理互不重叠的分块
+                if pool is None:
+                    function(*args, chunks[0], scratches[0])
+                    return
+                futures = [pool.submit(function, *args, part, scratch) for part, scratch in zip(chunks, scratches)]
+                for future in futures:
+                    future.result()
+
+            parallel(self._first_touch, a, b, c)
+            a *= 2.0
+            for _ in range(self.ntimes):
+                for name in STREAM_KERNELS:
+                    start = time.perf_counter()
+                    parallel(self._kernel, name, a, b, c)
+                    times[name].append(time.perf_counter() - start)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        error = self._validate(a, b, c)
+        results = {}
+        for name, bytes_per_element in STREAM_KERNELS.items():
+            # 与 STREAM 一样忽略第一轮
+            measured = times[name][1:]
+            best = min(measured)
+            results[name] = {
+                "best_mbps": bytes_per_element * self.array_size / best / 1e6,
+                "min_time": best,
+                "avg_time": sum(measured) / len(measured),
+                "max_time": max(measured)
+            }
+        return results, error
+
+    def _validate(self, a, b, c):
+        """用标量重放同样的运算，返回三个数组的最大相对误差"""
+        aj, bj, cj = 2.0, 2.0, 0.0
+        for _ in range(self.ntimes):
+            cj = aj
+            bj = SCALAR * cj
+            cj = aj + bj
+            aj = bj + SCALAR * cj
+        return max(
+            float(np.max(np.abs(array - expected))) / abs(expected)
+            for array, expected in ((a, aj), (b, bj), (c, cj))
+        )
+
+    def _chain(self, size_kb, rng):
+        """构造覆盖 size_kb 工作集的随机单环链表，每个缓存行只访问一个元素"""
+        stride = CACHE_LINE // 8
+        lines = max(2, size_kb * 1024 // CACHE_LINE)
+        order = rng.permutation(lines) * stride
+        chain = np.zeros(lines * stride, dtype=np.int64)
+        chain[order] = np.roll(order, -1)
+        return chain, int(order[0])
+
+    def _time_compiled(self, chain, start):
+        """用编译的内核计时，取 CHASE_REPEATS 次中的最小值，返回 (每次访问的耗时, 最后的位置)"""
+        best = None
+        for _ in range(CHASE_REPEATS):
+            begin = time.perf_counter()
+            start = self.library.chase(chain.ctypes.data, start, self.latency_accesses)
+            elapsed = time.perf_counter() - begin
+            best = elapsed if best is None else min(best, elapsed)
+        return best / self.latency_accesses, start
+
+    def _loop_overhead(self):
+        """在只含一个自环元素的链表上计时，得到每次访问的解释器开销
+
+        自环元素位于较大的下标，使返回值与真实链表一样不是小整数缓存中的对象。
+        """
+        chain = array("q", bytes(8 * 4096))
+        chain[-1] = len(chain) - 1
+        return self._time_chase(chain, len(chain) - 1)
+
+    def _time_chase(self, chain, start):
+        """取 CHASE_REPEATS 次计时中的最小值，返回每次访问的耗时（秒）"""
+        loops = max(1, self.latency_accesses // CHASE_UNROLL)
+        best = None
+        for _ in range(CHASE_REPEATS):
+            begin = time.perf_counter()
+            start = _chase(chain, start, loops)
+            elapsed = time.perf_counter() - begin
+            best = elapsed if best is None else min(best, elapsed)
+        return best / (loops * CHASE_UNROLL)
+
+    def _latency_curve(self):
+        """测量各工作集大小下相互依赖加载的平均延迟
+
+        优先使用编译的 C 内核（每次访问只有一条加载指令的开销，可分辨 L1/L2）；没有编译器时
+        退回 Python 实现，扣除自环链表上测得的解释器开销，延迟不超过该开销的点标记为不可靠。
+        """
+        try:
+            if self.library is None:
+                self.library = build_chase_library(self.latency_build_dir, self.latency_compiler)
+        except (RuntimeError, OSError, subprocess.TimeoutExpired) as e:
+            print(f"无法使用编译的指针追逐内核，退回 Python 实现: {e}")
+        rng = np.random.default_rng(self.seed)
+        overhead = 0.0 if self.library is not None else self._loop_overhead()
+        curve = []
+        for size_kb in self.latency_sizes_kb:
+            chain, start = self._chain(int(size_kb), rng)
+            lines = max(1, len(chain) // (CACHE_LINE // 8))
+            # 先完整遍历一遍，预热缓存和 TLB
+            if self.library is not None:
+                position = self.library.chase(chain.ctypes.data, start, lines)
+                per_access, _ = self._time_compiled(chain, position)
+            else:
+                chain = array("q", chain.tobytes())
+                position = _chase(chain, start, max(1, lines // CHASE_UNROLL))
+                per_access = self._time_chase(chain, position)
+            latency = per_access - overhead
+            curve.append({
+                "size_kb": int(size_kb),
+                "latency_ns": max(0.0, latency) * 1e9,
+                "raw_ns": per_access * 1e9,
+                "reliable": self.library is not None or latency > overhead
+            })
+        backend = "compiled" if self.library is not None else "python"
+        return curve, overhead * 1e9, backend
+
+    def run(self):
+        """运行 STREAM 带宽测试和指针追逐延迟测试"""
+        try:
+            start = time.perf_counter()
+            stream, error = self._stream()
+            if error > 1e-13:
+                raise RuntimeError(f"STREAM 结果校验失败，相对误差 {error:.3e}")
+
+            result = {
+                "score": stream[self.score_kernel]["best_mbps"],
+                "score_kernel": self.score_kernel,
+                "stream": stream,
+                "array_size": self.array_size,
+                "array_mb": self.array_size * 8 / 1e6,
+                "threads": len(self._chunks()),
+                "ntimes": self.ntimes
+            }
+            if self.latency_enabled:
+                result["latency_curve"], result["loop_overhead_ns"], result["latency_backend"] = self._latency_curve()
+            result["time_seconds"] = time.perf_counter() - start
+            result["success"] = True
+            return result
+        except Exception as e:
+            return {
+                "score": 0,
+                "time_seconds": 0,
+                "error": str(e),
+                "success": False
+            }
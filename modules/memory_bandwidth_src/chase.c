@@ -0,0 +1,16 @@
+/* 随机指针追逐内核：每次加载的地址取决于上一次加载的结果，无法被乱序执行或预取隐藏 */
+#include <stdint.h>
+
+int64_t chase(const int64_t *chain, int64_t start, int64_t count)
+{
+    int64_t i = start;
+    while (count >= 8) {
+        i = chain[i]; i = chain[i]; i = chain[i]; i = chain[i];
+        i = chain[i]; i = chain[i]; i = chain[i]; i = chain[i];
+        count -= 8;
+    }
+    while (count-- > 0) {
+        i = chain[i];
+    }
+    return i;
+}
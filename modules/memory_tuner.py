@@ -1,69 +1,315 @@
-import subprocess
+import glob
 import os
+import re
+
+from modules.base import Tuner, TuningError
+
+KHUGEPAGED_KNOBS = ("defrag", "pages_to_scan", "scan_sleep_millisecs", "alloc_sleep_millisecs", "max_ptes_none")
+# 原配置中的 hugepages.count 指默认大小（2M）的大页面
+DEFAULT_HUGEPAGE_SIZE = "2M"
+SIZE_UNITS = {"k": 1, "m": 1024, "g": 1024 * 1024}
+
+
+def _read(path):
+    try:
+        with open(path, "r") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _write(path, value):
+    with open(path, "w") as f:
+        f.write(str(value))
+
+
+def _selected(content):
+    """THP 设置文件形如 "always [madvise] never"，方括号中是当前值"""
+    if content is not None and "[" in content:
+        return content[content.find("[") + 1:content.find("]")]
+    return content
+
+
+def _choices(content):
+    return [value.strip("[]") for value in content.split()] if content else []
+
+
+def hugepage_size_kb(size):
+    """把 "2M"、"1G"、"2048kB" 等大页面尺寸转换为 kB"""
+    match = re.fullmatch(r"(\d+)\s*([kmg])?b?", str(size).strip().lower())
+    if not match:
+        raise ValueError(f"无法识别的大页面尺寸: {size}")
+    return int(match.group(1)) * SIZE_UNITS[match.group(2) or "k"]
+
+
+class MemoryTuner(Tuner):
+    """透明大页面、khugepaged、按 NUMA 节点分配的大页面与 NUMA 自动均衡"""
+
+    name = "memory_tuner"
+    description = "透明大页面、khugepaged、NUMA 节点大页面与 NUMA 均衡设置"
 
-class MemoryTuner:
     def __init__(self, config):
-        self.name = "memory_tuner"
-        self.config = config
+        super().__init__(config)
         self.original_values = {}
         self.tunable_params = config.get("memory_tuning", {})
+        self.sysfs_root = self.tunable_params.get("sysfs_root", "/sys")
+        self.procfs_root = self.tunable_params.get("procfs_root", "/proc")
+        self.thp_root = os.path.join(self.sysfs_root, "kernel", "mm", "transparent_hugepage")
+        self.node_root = os.path.join(self.sysfs_root, "devices", "system", "node")
+        self.allocations = {}
 
-    def apply(self):
-        """应用内存调优设置"""
-        # 设置透明大页面
-        if self.tunable_params.get("transparent_hugepages", {}).get("enable", True):
-            try:
-                with open("/sys/kernel/mm/transparent_hugepage/enabled", "r") as f:
-                    self.original_values["thp_enabled"] = f.read().strip()
+    # ---- 路径 ----
+
+    def _thp_file(self, name):
+        return os.path.join(self.thp_root, name)
+
+    def _numa_balancing_file(self):
+        return os.path.join(self.procfs_root, "sys", "kernel", "numa_balancing")
+
+    def _hugepage_file(self, size_kb, node=None):
+        """全局或指定节点的 nr_hugepages 文件"""
+        if node is None:
+            base = os.path.join(self.sysfs_root, "kernel", "mm", "hugepages")
+        else:
+            base = os.path.join(self.node_root, f"node{node}", "hugepages")
+        return os.path.join(base, f"hugepages-{size_kb}kB", "nr_hugepages")
+
+    def nodes(self):
+        """系统中的 NUMA 节点编号"""
+        return sorted(
+            int(re.search(r"node(\d+)$", path).group(1))
+            for path in glob.glob(os.path.join(self.node_root, "node[0-9]*"))
+        )
+
+    def hugepage_sizes(self):
+        """内核支持的大页面尺寸（kB）"""
+        return sorted(
+            int(re.search(r"hugepages-(\d+)kB$", path).group(1))
+            for path in glob.glob(os.path.join(self.sysfs_root, "kernel", "mm", "hugepages", "hugepages-*kB"))
+        )
+
+    def node_hugepages(self, size_kb):
+        """各节点实际分配到的大页面数量"""
+        counts = {}
+        for node in self.nodes():
+            value = _read(self._hugepage_file(size_kb, node))
+            if value is not None:
+                counts[node] = int(value)
+        return counts
 
-                with open("/sys/kernel/mm/transparent_hugepage/enabled", "w") as f:
-                    f.write("always")
-                print("已启用透明大页面")
-            except Exception as e:
-                print(f"设置透明大页面失败: {e}")
+    def node_hugepages_total(self):
+        """各节点 meminfo 中的 HugePages_Total（仅统计默认尺寸的大页面）"""
+        totals = {}
+        for node in self.nodes():
+            content = _read(os.path.join(self.node_root, f"node{node}", "meminfo")) or ""
+            match = re.search(r"HugePages_Total:\s*(\d+)", content)
+            if match:
+                totals[node] = int(match.group(1))
+        return totals
 
-        # 设置大页面
+    def _default_hugepage_size(self):
+        content = _read(os.path.join(self.procfs_root, "meminfo")) or ""
+        match = re.search(r"Hugepagesize:\s*(\d+)\s*kB", content)
+        return int(match.group(1)) if match else hugepage_size_kb(DEFAULT_HUGEPAGE_SIZE)
+
+    # ---- 配置解析 ----
+
+    def _hugepage_requests(self):
+        """返回 [(尺寸 kB, 节点或 None, 目标数量)]
+
+        hugepages.sizes 形如 {"2M": {"count": 1024}, "1G": {"nodes": {"0": 4, "1": 4}}}，
+        count 由内核在各节点间交错分配，nodes 则逐节点指定数量。
+        """
+        options = self.tunable_params.get("hugepages", {})
+        if not options.get("enable", False):
+            return []
+        sizes = dict(options.get("sizes") or {})
+        if "count" in options and not sizes:
+            sizes[DEFAULT_HUGEPAGE_SIZE] = {"count": options["count"]}
+
+        requests = []
+        for size, pool in sizes.items():
+            size_kb = hugepage_size_kb(size)
+            if size_kb not in self.hugepage_sizes():
+                raise TuningError(f"内核不支持 {size} 大页面")
+            if pool.get("nodes"):
+                for node, count in pool["nodes"].items():
+                    if not os.path.exists(self._hugepage_file(size_kb, int(node))):
+                        raise TuningError(f"NUMA 节点 {node} 不支持 {size} 大页面")
+                    requests.append((size_kb, int(node), int(count)))
+            elif pool.get("count") is not None:
+                requests.append((size_kb, None, int(pool["count"])))
+        return requests
+
+    def _targets(self):
+        """返回 [(文件, 目标值)]，按写入顺序排列；大页面单独处理"""
+        targets = []
+        thp = self.tunable_params.get("transparent_hugepages", {})
+        if thp.get("enable", True):
+            if thp.get("mode", "always") is not None:
+                targets.append((self._thp_file("enabled"), thp.get("mode", "always")))
+            if thp.get("defrag") is not None:
+                targets.append((self._thp_file("defrag"), thp["defrag"]))
+            khugepaged = thp.get("khugepaged") or {}
+            for knob in KHUGEPAGED_KNOBS:
+                if khugepaged.get(knob) is not None:
+                    value = khugepaged[knob]
+                    if isinstance(value, bool):
+                        value = int(value)
+                    targets.append((self._thp_file(os.path.join("khugepaged", knob)), value))
+
+        numa_balancing = self.tunable_params.get("numa_balancing")
+        if numa_balancing is not None:
+            targets.append((self._numa_balancing_file(), int(numa_balancing)))
+        return [(path, str(value)) for path, value in targets]
+
+    # ---- 调优接口 ----
+
+    def current_state(self):
+        """读取所有受管参数的当前值"""
+        state = {
+            "thp_enabled": _selected(_read(self._thp_file("enabled"))),
+            "thp_defrag": _selected(_read(self._thp_file("defrag"))),
+            "khugepaged": {
+                knob: _read(self._thp_file(os.path.join("khugepaged", knob)))
+                for knob in KHUGEPAGED_KNOBS
+            },
+            "numa_balancing": _read(self._numa_balancing_file()),
+            "hugepages": {}
+        }
+        for size_kb in self.hugepage_sizes():
+            state["hugepages"][f"{size_kb}kB"] = {
+                "total": _read(self._hugepage_file(size_kb)),
+                "nodes": self.node_hugepages(size_kb)
+            }
+        return state
+
+    def knobs(self):
+        """THP 模式、defrag、各 khugepaged 参数、大页面与 NUMA 均衡分别作为调优项"""
+        knobs = []
+        thp = self.tunable_params.get("transparent_hugepages", {})
+        if thp.get("enable", True):
+            if thp.get("mode", "always") is not None:
+                knobs.append(("thp.mode", ("memory_tuning", "transparent_hugepages", "mode"), None))
+            if thp.get("defrag") is not None:
+                knobs.append(("thp.defrag", ("memory_tuning", "transparent_hugepages", "defrag"), None))
+            for knob in KHUGEPAGED_KNOBS:
+                if (thp.get("khugepaged") or {}).get(knob) is not None:
+                    knobs.append((f"khugepaged.{knob}", ("memory_tuning", "transparent_hugepages", "khugepaged", knob), None))
         if self.tunable_params.get("hugepages", {}).get("enable", False):
+            knobs.append(("hugepages", ("memory_tuning", "hugepages", "enable"), False))
+        if self.tunable_params.get("numa_balancing") is not None:
+            knobs.append(("numa_balancing", ("memory_tuning", "numa_balancing"), None))
+        return knobs
+
+    def tunable_space(self):
+        """根据内核提供的候选值生成搜索空间"""
+        thp = {}
+        for knob, name in (("mode", "enabled"), ("defrag", "defrag")):
+            choices = _choices(_read(self._thp_file(name)))
+            if choices:
+                thp[knob] = choices
+        if _read(self._thp_file(os.path.join("khugepaged", "defrag"))) is not None:
+            thp["khugepaged"] = {"defrag": [0, 1]}
+
+        space = {}
+        if thp:
+            space["transparent_hugepages"] = thp
+        if _read(self._numa_balancing_file()) is not None:
+            space["numa_balancing"] = [0, 1]
+        return {"memory_tuning": space} if space else {}
+
+    def apply(self):
+        """应用内存调优设置，并校验大页面是否真正分配成功"""
+        try:
+            targets = self._targets()
+            hugepages = self._hugepage_requests()
+        except (ValueError, TypeError) as e:
+            raise TuningError(f"解析内存调优配置失败: {e}") from e
+        targets = [(path, value) for path, value in targets if os.path.exists(path)]
+        hugepage_targets = [(self._hugepage_file(size_kb, node), str(count)) for size_kb, node, count in hugepages]
+        if not targets and not hugepage_targets:
+            print("没有可应用的内存调优设置，跳过")
+            return
+
+        self.original_values = {}
+        for path, _ in targets + hugepage_targets:
+            self.original_values[path] = _selected(_read(path))
+        self._journal([("file", path, self.original_values[path]) for path, _ in targets + hugepage_targets])
+
+        errors = []
+        for path, value in targets:
             try:
-                # 获取当前大页面设置
-                result = subprocess.run(
-                    ["sysctl", "-n", "vm.nr_hugepages"],
-                    capture_output=True,
-                    text=True,
-                    check=True
-                )
-                self.original_values["nr_hugepages"] = result.stdout.strip()
-
-                # 设置新的大页面数量
-                hugepages_count = self.tunable_params["hugepages"].get("count", 1024)
-                subprocess.run(
-                    ["sysctl", "-w", f"vm.nr_hugepages={hugepages_count}"],
-                    check=True,
-                    capture_output=True
-                )
-                print(f"已设置大页面数量: {hugepages_count}")
-            except Exception as e:
-                print(f"设置大页面失败: {e}")
+                _write(path, value)
+            except OSError as e:
+                errors.append(f"{path}: {e.strerror or e}")
+                continue
+            if _selected(_read(path)) != value:
+                errors.append(f"{path}: 写入 {value} 后读回 {_selected(_read(path))}")
+
+        if hugepage_targets:
+            if self.tunable_params.get("hugepages", {}).get("compact_before_alloc", True):
+                # 先整理内存碎片，提高大页面（尤其是 1G 页面）的分配成功率
+                try:
+                    _write(os.path.join(self.procfs_root, "sys", "vm", "compact_memory"), 1)
+                except OSError:
+                    pass
+            for path, value in hugepage_targets:
+                try:
+                    _write(path, value)
+                except OSError as e:
+                    errors.append(f"{path}: {e.strerror or e}")
+            errors.extend(self._verify_hugepages(hugepages))
+
+        if errors:
+            print(f"设置内存参数失败: {'; '.join(errors)}")
+            raise TuningError(f"设置内存参数失败: {'; '.join(errors)}")
+
+        for path, value in targets:
+            print(f"已设置 {path} = {value}")
+        for size_kb, nodes in self.allocations.items():
+            print(f"已分配 {size_kb}kB 大页面: " + ", ".join(f"节点 {node}: {count}" for node, count in nodes.items()))
+
+    def _verify_hugepages(self, requests):
+        """回读各节点的实际分配数量；内存不足时内核只会分配一部分"""
+        errors = []
+        self.allocations = {}
+        default_size = self._default_hugepage_size()
+        for size_kb in dict.fromkeys(size_kb for size_kb, _, _ in requests):
+            self.allocations[size_kb] = self.node_hugepages(size_kb)
+            if size_kb == default_size:
+                # 默认尺寸的页面同时以节点 meminfo 的 HugePages_Total 为准
+                self.allocations[size_kb].update(self.node_hugepages_total())
+
+        for size_kb, node, count in requests:
+            if node is None:
+                allocated = int(_read(self._hugepage_file(size_kb)) or 0)
+            else:
+                allocated = self.allocations[size_kb].get(node, 0)
+            if allocated < count:
+                where = "全局" if node is None else f"节点 {node}"
+                errors.append(f"{where} {size_kb}kB 大页面只分配到 {allocated}/{count}")
+
+        if errors and self.tunable_params.get("hugepages", {}).get("allow_partial", False):
+            for error in errors:
+                print(f"警告: {error}")
+            return []
+        return errors
 
     def reset(self):
-        """恢复原始内存设置"""
-        # 恢复透明大页面设置
-        if "thp_enabled" in self.original_values:
-            try:
-                with open("/sys/kernel/mm/transparent_hugepage/enabled", "w") as f:
-                    f.write(self.original_values["thp_enabled"])
-                print("已恢复透明大页面设置")
-            except Exception as e:
-                print(f"恢复透明大页面设置失败: {e}")
-
-        # 恢复大页面设置
-        if "nr_hugepages" in self.original_values:
+        """恢复原始内存设置（先恢复大页面以外的参数，最后释放大页面）"""
+        errors = []
+        for path, value in self.original_values.items():
+            if value is None:
+                continue
             try:
-                subprocess.run(
-                    ["sysctl", "-w", f"vm.nr_hugepages={self.original_values['nr_hugepages']}"],
-                    check=True,
-                    capture_output=True
-                )
-                print("已恢复大页面设置")
-            except Exception as e:
-                print(f"恢复大页面设置失败: {e}")
+                if _selected(_read(path)) != value:
+                    _write(path, value)
+            except OSError as e:
+                errors.append(f"{path}: {e.strerror or e}")
+        self.allocations = {}
+        if errors:
+            print(f"恢复内存设置失败: {'; '.join(errors)}")
+            raise TuningError(f"恢复内存设置失败: {'; '.join(errors)}")
+        if self.original_values:
+            print("已恢复内存调优设置")
@@ -0,0 +1,377 @@
+import asyncio
+import ctypes
+import math
+import multiprocessing
+import os
+import socket
+import struct
+import time
+
+from modules.base import Benchmark
+from utils.histogram import LatencyHistogram
+
+TESTS = ("tcp_throughput", "tcp_rr", "tcp_connect", "udp_rr")
+CLONE_NEWNET = 0x40000000
+# UDP 负载上限（IPv4 的 65535 减去 IP 与 UDP 头）
+MAX_UDP_PAYLOAD = 65507
+UDP_TIMEOUT = 1.0
+# UDP 请求负载开头的序号，用于匹配回显（消息小于 8 字节时负载只有序号）
+UDP_SEQUENCE = struct.Struct("!Q")
+
+
+def _enter_netns(name):
+    """把当前进程切换到 ip netns 创建的网络命名空间"""
+    fd = os.open(os.path.join("/var/run/netns", name), os.O_RDONLY)
+    try:
+        if hasattr(os, "setns"):  # Python 3.12+
+            os.setns(fd, CLONE_NEWNET)
+        else:
+            libc = ctypes.CDLL(None, use_errno=True)
+            if libc.setns(fd, CLONE_NEWNET) != 0:
+                error = ctypes.get_errno()
+                raise OSError(error, os.strerror(error))
+    finally:
+        os.close(fd)
+
+
+# ---- 服务端 ----
+
+async def _handle_sink(reader, writer):
+    """丢弃收到的数据，对端关闭写方向后回复收到的总字节数"""
+    received = 0
+    while True:
+        data = await reader.read(1 << 20)
+        if not data:
+            break
+        received += len(data)
+    writer.write(struct.pack("!Q", received))
+    await writer.drain()
+    writer.close()
+
+
+async def _handle_echo(reader, writer):
+    while True:
+        data = await reader.read(1 << 16)
+        if not data:
+            break
+        writer.write(data)
+        await writer.drain()
+    writer.close()
+
+
+async def _handle_accept(reader, writer):
+    writer.close()
+
+
+class _UdpEcho(asyncio.DatagramProtocol):
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, address):
+        self.transport.sendto(data, address)
+
+
+async def _serve(sockets, stop_event):
+    loop = asyncio.get_running_loop()
+    servers = [
+        await asyncio.start_server(_handle_sink, sock=sockets["sink"]),
+        await asyncio.start_server(_handle_echo, sock=sockets["echo"]),
+        await asyncio.start_server(_handle_accept, sock=sockets["accept"], backlog=4096)
+    ]
+    transport, _ = await loop.create_datagram_endpoint(_UdpEcho, sock=sockets["udp"])
+    try:
+        await loop.run_in_executor(None, stop_event.wait)
+    finally:
+        transport.close()
+        for server in servers:
+            server.close()
+
+
+def _server_worker(sockets, stop_event):
+    asyncio.run(_serve(sockets, stop_event))
+
+
+def _server_main(host, netns, workers, ready, stop_event):
+    """创建监听套接字后派生 workers 个服务进程，各进程共享同一组套接字，由内核分发连接"""
+    try:
+        if netns:
+            _enter_netns(netns)
+        family = socket.AF_INET6 if ":" in host else socket.AF_INET
+        sockets = {}
+        for name in ("sink", "echo", "accept"):
+            sock = socket.socket(family, socket.SOCK_STREAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind((host, 0))
+            sock.listen(4096)
+            sock.setblocking(False)
+            sockets[name] = sock
+        sockets["udp"] = socket.socket(family, socket.SOCK_DGRAM)
+        sockets["udp"].bind((host, 0))
+        sockets["udp"].setblocking(False)
+    except Exception as e:
+        ready.put({"error": str(e)})
+        return
+
+    context = multiprocessing.get_context("fork")
+    children = [
+        context.Process(target=_server_worker, args=(sockets, stop_event), daemon=True)
+        for _ in range(workers - 1)
+    ]
+    for child in children:
+        child.start()
+    ready.put({name: sock.getsockname()[1] for name, sock in sockets.items()})
+    try:
+        _server_worker(sockets, stop_event)
+    finally:
+        for child in children:
+            child.join(timeout=5)
+            if child.is_alive():
+                child.terminate()
+
+
+# ---- 客户端 ----
+
+async def _tcp_throughput(host, port, size, deadline, histogram):
+    """单连接批量发送，以服务端确认收到的字节数为准（不计入仍在套接字缓冲区中的数据）"""
+    reader, writer = await asyncio.open_connection(host, port)
+    payload = b"\0" * size
+    while time.perf_counter() < deadline:
+        start = time.perf_counter_ns()
+        writer.write(payload)
+        await writer.drain()
+        histogram.record(time.perf_counter_ns() - start)
+    writer.write_eof()
+    received = struct.unpack("!Q", await reader.readexactly(8))[0]
+    writer.close()
+    return received // size, received
+
+
+async def _tcp_rr(host, port, size, deadline, histogram):
+    """请求/响应：发送 size 字节并等待完整回显"""
+    reader, writer = await asyncio.open_connection(host, port)
+    payload = b"\0" * size
+    transactions = 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter_ns()
+        writer.write(payload)
+        await reader.readexactly(size)
+        histogram.record(time.perf_counter_ns() - start)
+        transactions += 1
+    writer.close()
+    return transactions, transactions * size * 2
+
+
+async def _tcp_connect(host, port, size, deadline, histogram):
+    """反复建立并关闭连接，延迟为三次握手完成所需时间"""
+    connections = 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter_ns()
+        _, writer = await asyncio.open_connection(host, port)
+        histogram.record(time.perf_counter_ns() - start)
+        writer.close()
+        await writer.wait_closed()
+        connections += 1
+    return connections, 0
+
+
+class _UdpClient(asyncio.DatagramProtocol):
+    """按负载开头的序号把回显交给对应的请求；超时后迟到的回显没有等待者，直接丢弃"""
+
+    def __init__(self):
+        self.pending = {}
+
+    def datagram_received(self, data, address):
+        if len(data) < UDP_SEQUENCE.size:
+            return
+        response = self.pending.pop(UDP_SEQUENCE.unpack_from(data)[0], None)
+        if response is not None and not response.done():
+            response.set_result(data)
+
+
+async def _udp_rr(host, port, size, deadline, histogram):
+    """UDP 请求/响应，超时未收到回显的请求计为丢包"""
+    loop = asyncio.get_running_loop()
+    transport, protocol = await loop.create_datagram_endpoint(_UdpClient, remote_addr=(host, port))
+    padding = b"\0" * max(size - UDP_SEQUENCE.size, 0)
+    transactions = lost = sent_bytes = 0
+    sequence = 0
+    try:
+        while time.perf_counter() < deadline:
+            sequence += 1
+            payload = UDP_SEQUENCE.pack(sequence) + padding
+            response = protocol.pending[sequence] = loop.create_future()
+            start = time.perf_counter_ns()
+            transport.sendto(payload)
+            try:
+                await asyncio.wait_for(response, UDP_TIMEOUT)
+            except asyncio.TimeoutError:
+                protocol.pending.pop(sequence, None)
+                lost += 1
+                continue
+            histogram.record(time.perf_counter_ns() - start)
+            transactions += 1
+            sent_bytes += len(payload)
+    finally:
+        transport.close()
+    return transactions, sent_bytes * 2, lost
+
+
+CLIENTS = {
+    "tcp_throughput": (_tcp_throughput, "sink"),
+    "tcp_rr": (_tcp_rr, "echo"),
+    "tcp_connect": (_tcp_connect, "accept"),
+    "udp_rr": (_udp_rr, "udp")
+}
+
+
+async def _client(test, host, port, size, duration, connections):
+    histogram = LatencyHistogram()
+    deadline = time.perf_counter() + duration
+    function = CLIENTS[test][0]
+    outcomes = await asyncio.gather(*[
+        function(host, port, size, deadline, histogram) for _ in range(connections)
+    ])
+    ops = sum(outcome[0] for outcome in outcomes)
+    total_bytes = sum(outcome[1] for outcome in outcomes)
+    lost = sum(outcome[2] for outcome in outcomes if len(outcome) > 2)
+    return ops, total_bytes, lost, histogram
+
+
+def _client_worker(args):
+    return asyncio.run(_client(*args))
+
+
+class NetBenchmark(Benchmark):
+    """本机 TCP/UDP 吞吐量、请求/响应延迟与建连速率测试，用于评估 net.* 参数"""
+
+    name = "net_benchmark"
+    description = "回环或网络命名空间上的 TCP/UDP 吞吐量、延迟与建连速率"
+    exclusive = True
+    estimated_duration = 60
+
+    def __init__(self, config):
+        super().__init__(config)
+        options = config.get("net_benchmark", {})
+        self.host = options.get("host", "127.0.0.1")
+        self.netns = options.get("server_netns")
+        self.tests = options.get("tests", list(TESTS))
+        self.message_sizes = options.get("message_sizes", [64, 1024, 16384])
+        self.bulk_sizes = options.get("bulk_sizes", [16384, 131072])
+        self.duration = options.get("duration", 3)
+        cpus = os.cpu_count() or 1
+        self.clients = max(1, int(options.get("clients") or max(1, cpus // 2)))
+        self.server_workers = max(1, int(options.get("server_workers") or max(1, cpus // 2)))
+        self.connections = max(1, int(options.get("connections", 4)))
+        self.score_test = options.get("score_test")
+
+        unknown = [test for test in self.tests if test not in TESTS]
+        if unknown:
+            raise ValueError(f"未知的网络测试: {', '.join(unknown)}")
+
+    def _cases(self):
+        """展开为 [(测试名, 测试类型, 消息大小)]"""
+        cases = []
+        for test in self.tests:
+            if test == "tcp_connect":
+                cases.append((test, test, 0))
+                continue
+            sizes = self.bulk_sizes if test == "tcp_throughput" else self.message_sizes
+            for size in sizes:
+                if test == "udp_rr" and size > MAX_UDP_PAYLOAD:
+                    continue
+                cases.append((f"{test}/{size}", test, int(size)))
+        return cases
+
+    def _start_server(self):
+        context = multiprocessing.get_context("fork")
+        ready = context.Queue()
+        stop_event = context.Event()
+        server = context.Process(
+            target=_server_main,
+            args=(self.host, self.netns, self.server_workers, ready, stop_event)
+        )
+        server.start()
+        ports = ready.get(timeout=30)
+        if "error" in ports:
+            server.join()
+            raise RuntimeError(f"启动测试服务端失败: {ports['error']}")
+        return server, stop_event, ports
+
+    def _run_case(self, pool, test, size, port):
+        args = [(test, self.host, port, size, self.duration, self.connections)] * self.clients
+        start = time.perf_counter()
+        outcomes = pool.map(_client_worker, args)
+        elapsed = time.perf_counter() - start
+
+        histogram = LatencyHistogram()
+        for *_, worker_histogram in outcomes:
+            histogram.merge(worker_histogram)
+        ops = sum(outcome[0] for outcome in outcomes)
+        total_bytes = sum(outcome[1] for outcome in outcomes)
+        result = {
+            "size": size,
+            "ops": ops,
+            "ops_per_second": ops / elapsed,
+            "latency_us": histogram.summary(scale=1000)
+        }
+        if test == "tcp_throughput":
+            result["throughput_mbps"] = total_bytes / elapsed / 1e6
+        if test == "udp_rr":
+            result["lost"] = sum(outcome[2] for outcome in outcomes)
+        return result
+
+    @staticmethod
+    def _metric(test, result):
+        """各类测试用于计算得分的主要指标"""
+        return result["throughput_mbps"] if test == "tcp_throughput" else result["ops_per_second"]
+
+    def run(self):
+        """启动服务端，依次运行各项测试，最后停止服务端"""
+        try:
+            start = time.perf_counter()
+            server, stop_event, ports = self._start_server()
+            results = {}
+            metrics = {}
+            try:
+                with multiprocessing.get_context("fork").Pool(self.clients) as pool:
+                    for name, test, size in self._cases():
+                        try:
+                            results[name] = self._run_case(pool, test, size, ports[CLIENTS[test][1]])
+                            metrics[name] = self._metric(test, results[name])
+                        except OSError as e:
+                            results[name] = {"size": size, "error": e.strerror or str(e)}
+            finally:
+                stop_event.set()
+                server.join(timeout=10)
+                if server.is_alive():
+                    server.terminate()
+
+            if not metrics:
+                raise RuntimeError("所有网络测试均失败")
+            if self.score_test:
+                if self.score_test not in metrics:
+                    raise RuntimeError(f"得分测试 {self.score_test} 未成功运行")
+                score = metrics[self.score_test]
+            else:
+                # 默认以各项主要指标的几何平均值作为得分
+                score = math.exp(sum(math.log(max(value, 1e-9)) for value in metrics.values()) / len(metrics))
+
+            return {
+                "score": score,
+                "score_test": self.score_test or "geomean",
+                "tests": results,
+                "host": self.host,
+                "server_netns": self.netns,
+                "clients": self.clients,
+                "connections": self.connections,
+                "server_workers": self.server_workers,
+                "time_seconds": time.perf_counter() - start,
+                "success": True
+            }
+        except Exception as e:
+            return {
+                "score": 0,
+                "time_seconds": 0,
+                "error": str(e),
+                "success": False
+            }
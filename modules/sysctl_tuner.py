@@ -1,78 +1,219 @@
 import subprocess
 import os
 
-class SysctlTuner:
-    def __init__(self, config):
-        self.name = "sysctl_tuner"
-        self.config = config
-        self.original_values = {}
-        self.tunable_params = config.get("sysctl_tuning", {})
+from modules.base import Tuner, TuningError
+
+
+def _normalize(value):
+    """规范化 sysctl 值（多值参数在 /proc/sys 中以制表符分隔）"""
+    return " ".join(str(value).split())
+
+
+class ProcSysBackend:
+    """直接读写 /proc/sys 的 sysctl 后端，无需 fork 子进程"""
+
+    name = "proc"
+
+    def __init__(self, proc_root="/proc/sys"):
+        self.proc_root = proc_root
+
+    def _path(self, param):
+        """将 vm.swappiness 形式的参数名映射为 /proc/sys 下的文件路径"""
+        parts = param.split("/") if "/" in param else param.split(".")
+        return os.path.join(self.proc_root, *parts)
+
+    def exists(self, param):
+        return os.path.isfile(self._path(param))
+
+    def journal_key(self, param):
+        """预写日志中用于恢复该参数的 (类型, 键)"""
+        return "file", self._path(param)
+
+    def read(self, param):
+        """读取单个参数，不存在或不可读时返回 None"""
+        try:
+            with open(self._path(param), "r") as f:
+                return _normalize(f.read())
+        except OSError:
+            return None
+
+    def snapshot(self, params):
+        """一次性读取所有参数的当前值，跳过不存在的参数"""
+        values = {}
+        for param in params:
+            value = self.read(param)
+            if value is not None:
+                values[param] = value
+        return values
+
+    def apply(self, values):
+        """批量写入参数，返回 {参数: 错误信息}"""
+        errors = {}
+        for param, value in values.items():
+            try:
+                with open(self._path(param), "w") as f:
+                    f.write(str(value))
+            except OSError as e:
+                errors[param] = e.strerror or str(e)
+        return errors
+
+    def verify(self, values):
+        """回读校验，返回 {参数: 实际值} 形式的不一致项"""
+        actual = self.snapshot(values)
+        return {
+            param: actual.get(param)
+            for param, value in values.items()
+            if actual.get(param) != _normalize(value)
+        }
+
+
+class SysctlCliBackend:
+    """基于 sysctl 命令的后备后端，每个批次只 fork 一次"""
+
+    name = "cli"
+
+    def journal_key(self, param):
+        return "sysctl", param
 
-    def _parameter_exists(self, param):
-        """检查sysctl参数是否存在"""
+    def snapshot(self, params):
         try:
-            subprocess.run(
-                ["sysctl", "-n", param],
-                check=True,
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-                timeout=5
+            output = subprocess.run(
+                ["sysctl", "-a"],
+                capture_output=True,
+                text=True,
+                timeout=30
+            ).stdout
+        except (subprocess.TimeoutExpired, FileNotFoundError):
+            return {}
+
+        wanted = set(params)
+        values = {}
+        for line in output.splitlines():
+            key, sep, value = line.partition(" = ")
+            if sep and key in wanted:
+                values[key] = _normalize(value)
+        return values
+
+    def apply(self, values):
+        if not values:
+            return {}
+        try:
+            result = subprocess.run(
+                ["sysctl", "-w"] + [f"{param}={value}" for param, value in values.items()],
+                capture_output=True,
+                text=True,
+                timeout=30
             )
-            return True
-        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError):
-            return False
+        except (subprocess.TimeoutExpired, FileNotFoundError) as e:
+            return {param: str(e) for param in values}
+
+        # sysctl 会继续处理后续参数，只能从 stderr 中找出失败项
+        errors = {}
+        for line in result.stderr.splitlines():
+            for param in values:
+                if param in line or param.replace(".", "/") in line:
+                    errors[param] = line.strip()
+        return errors
+
+    def verify(self, values):
+        actual = self.snapshot(values)
+        return {
+            param: actual.get(param)
+            for param, value in values.items()
+            if actual.get(param) != _normalize(value)
+        }
+
+
+def create_backend(config):
+    """根据配置选择 sysctl 后端，/proc/sys 不可用时退回 sysctl 命令"""
+    options = config.get("sysctl_backend", {})
+    backend_type = options.get("type", "auto")
+    proc_root = options.get("proc_root", "/proc/sys")
+
+    if backend_type == "cli":
+        return SysctlCliBackend()
+    if backend_type == "proc" or os.path.isdir(proc_root):
+        return ProcSysBackend(proc_root)
+    return SysctlCliBackend()
+
+
+class SysctlTuner(Tuner):
+    name = "sysctl_tuner"
+    description = "通过 /proc/sys 或 sysctl 命令调整内核参数"
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.original_values = {}
+        # 值为 null 的参数保持系统原值
+        self.tunable_params = {
+            param: value
+            for param, value in config.get("sysctl_tuning", {}).items()
+            if value is not None
+        }
+        self.backend = create_backend(config)
+
+    def current_state(self):
+        """读取受管参数的当前值"""
+        return self.backend.snapshot(self.tunable_params)
+
+    def knobs(self):
+        """每个 sysctl 参数都是一个调优项"""
+        return [(param, ("sysctl_tuning", param), None) for param in self.tunable_params]
 
     def apply(self):
-        """应用 sysctl 调优设置"""
-        for param, value in self.tunable_params.items():
-            # 检查参数是否存在
-            if not self._parameter_exists(param):
+        """应用 sysctl 调优设置：一次快照、一次写入、一次校验"""
+        targets = {param: str(value) for param, value in self.tunable_params.items()}
+
+        # 保存原始值
+        current = self.backend.snapshot(targets)
+        for param in targets:
+            if param not in current:
                 print(f"参数 {param} 不存在，跳过设置")
-                continue
+        targets = {param: value for param, value in targets.items() if param in current}
+        self.original_values.update(
+            {param: value for param, value in current.items() if param not in self.original_values}
+        )
 
-            # 保存原始值
-            try:
-                current_value = subprocess.check_output(
-                    ["sysctl", "-n", param],
-                    text=True,
-                    timeout=5
-                ).strip()
-                self.original_values[param] = current_value
-            except Exception as e:
-                self.original_values[param] = "unknown"
-                print(f"无法获取参数 {param} 的当前值: {e}")
-                continue
-
-            # 设置新值
-            try:
-                result = subprocess.run(
-                    ["sysctl", "-w", f"{param}={value}"],
-                    check=True,
-                    capture_output=True,
-                    text=True,
-                    timeout=5
-                )
+        self._journal([self.backend.journal_key(param) + (current[param],) for param in targets])
+
+        # 设置新值
+        errors = self.backend.apply(targets)
+        mismatched = self.backend.verify(
+            {param: value for param, value in targets.items() if param not in errors}
+        )
+        for param, value in targets.items():
+            if param in errors:
+                print(f"设置 {param} 失败: {errors[param]}")
+            elif param in mismatched:
+                print(f"设置 {param} 失败: 期望 {value}，实际 {mismatched[param]}")
+            else:
                 print(f"已设置 {param} = {value}")
-            except subprocess.CalledProcessError as e:
-                print(f"设置 {param} 失败: {e.stderr}")
+        if errors or mismatched:
+            raise TuningError(f"{len(errors) + len(mismatched)} 个 sysctl 参数设置失败")
 
     def reset(self):
         """恢复原始 sysctl 设置"""
-        for param, original_value in self.original_values.items():
-            if original_value != "unknown":
-                try:
-                    # 检查参数是否仍然存在
-                    if not self._parameter_exists(param):
-                        print(f"参数 {param} 不存在，跳过恢复")
-                        continue
-
-                    subprocess.run(
-                        ["sysctl", "-w", f"{param}={original_value}"],
-                        check=True,
-                        capture_output=True,
-                        text=True,
-                        timeout=5
-                    )
-                    print(f"已恢复 {param} = {original_value}")
-                except subprocess.CalledProcessError as e:
-                    print(f"恢复 {param} 失败: {e.stderr}")
+        existing = self.backend.snapshot(self.original_values)
+        for param in self.original_values:
+            if param not in existing:
+                print(f"参数 {param} 不存在，跳过恢复")
+        targets = {
+            param: value
+            for param, value in self.original_values.items()
+            if param in existing and existing[param] != value
+        }
+
+        errors = self.backend.apply(targets)
+        mismatched = self.backend.verify(
+            {param: value for param, value in targets.items() if param not in errors}
+        )
+        for param, value in targets.items():
+            if param in errors:
+                print(f"恢复 {param} 失败: {errors[param]}")
+            elif param in mismatched:
+                print(f"恢复 {param} 失败: 期望 {value}，实际 {mismatched[param]}")
+            else:
+                print(f"已恢复 {param} = {value}")
+        if errors or mismatched:
+            # 抛出异常使框架保留日志中的记录，之后可用 --recover 恢复
+            raise TuningError(f"{len(errors) + len(mismatched)} 个 sysctl 参数恢复失败")
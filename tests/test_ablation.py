@@ -0,0 +1,132 @@
+import itertools
+
+import pytest
+
+from utils.ablation import AblationStudy, Knob, contrast, fractional_factorial, verdict
+
+# 模拟的调优效果：a 有益，b 有害，c 无作用，a 与 d 同时开启时额外提升
+EFFECTS = {"a": 10.0, "b": -5.0, "c": 0.0, "d": 2.0}
+INTERACTION = 6.0
+NOISE = (-0.2, 0.0, 0.2)
+
+
+def _knobs():
+    return [
+        Knob("a", "sysctl_tuning", ("sysctl_tuning", "vm.swappiness"), None),
+        Knob("b", "sysctl_tuning", ("sysctl_tuning", "vm.dirty_ratio"), None),
+        Knob("c", "cpu_governor"),
+        Knob("d", "memory_tuning", ("memory_tuning", "numa_balancing"), None)
+    ]
+
+
+def _config(**ablation):
+    return {
+        "sysctl_tuning": {"vm.swappiness": 10, "vm.dirty_ratio": 5},
+        "cpu_governor": {"governor": "performance"},
+        "memory_tuning": {"numa_balancing": False},
+        "ablation": dict(ablation, seed=1)
+    }
+
+
+def _evaluate(calls):
+    def evaluate(config, disabled):
+        active = set()
+        if config["sysctl_tuning"]["vm.swappiness"] is not None:
+            active.add("a")
+        if config["sysctl_tuning"]["vm.dirty_ratio"] is not None:
+            active.add("b")
+        if "cpu_governor" not in disabled:
+            active.add("c")
+        if config["memory_tuning"]["numa_balancing"] is not None:
+            active.add("d")
+        calls.append(frozenset(active))
+        score = 100 + sum(EFFECTS[name] for name in active) + (INTERACTION if {"a", "d"} <= active else 0)
+        return {"himeno": {"success": True, "scores": [score + noise for noise in NOISE]}}
+    return evaluate
+
+
+def _by_name(rows):
+    return {row["name"]: row for row in rows}
+
+
+def test_fractional_factorial_is_resolution_iv():
+    for count in range(1, 9):
+        rows, masks = fractional_factorial(count)
+        assert len(masks) == count and len(set(masks)) == count
+        columns = list(zip(*rows))
+        # 各列平衡且两两正交
+        for column in columns:
+            assert sum(column) * 2 == len(rows)
+        for first, second in itertools.combinations(columns, 2):
+            assert sum(x == y for x, y in zip(first, second)) * 2 == len(rows)
+        # 主效应不与任何二阶交互混杂
+        interactions = {a ^ b for a, b in itertools.combinations(masks, 2)}
+        assert not interactions & set(masks)
+    # m 个基本因子最多容纳 2^(m-1) 个因子
+    assert [len(fractional_factorial(count)[0]) for count in (2, 3, 4, 5, 8)] == [4, 8, 8, 16, 16]
+
+
+def test_contrast_and_verdict():
+    cells = [{"mean": 12.0, "var_mean": 1.0, "n": 5}, {"mean": 10.0, "var_mean": 1.0, "n": 5}]
+    estimate, low, high = contrast(cells, [1, -1])
+    assert estimate == 2.0 and low < 0 < high
+    assert verdict(low, high) == "neutral"
+    assert contrast([dict(cells[0], n=1), cells[1]], [1, -1]) == (2.0, None, None)
+    assert verdict(None, None) == "unknown"
+    assert verdict(0.5, 1.0) == "helps" and verdict(-1.0, -0.5) == "hurts"
+
+
+def test_profile_turns_knobs_off():
+    study = AblationStudy(_config(), _knobs(), None, "himeno")
+    config, disabled = study.profile({"a"})
+    assert config["sysctl_tuning"] == {"vm.swappiness": 10, "vm.dirty_ratio": None}
+    assert config["memory_tuning"]["numa_balancing"] is None
+    assert disabled == {"cpu_governor"}
+    assert study.config["sysctl_tuning"]["vm.dirty_ratio"] == 5
+
+
+def test_one_at_a_time():
+    calls = []
+    report, minimal_config = AblationStudy(_config(interaction_top=4), _knobs(), _evaluate(calls), "himeno").run()
+    # 2k+2 个配置加上前 4 项的 6 个两两组合，其中 {a, d} 以外的组合与单项配置不重复
+    assert len(calls) == len(set(calls)) == report["profiles_measured"] == 16
+    knobs = _by_name(report["knobs"])
+    assert knobs["a"]["verdict"] == "helps" and knobs["b"]["verdict"] == "hurts"
+    assert knobs["c"]["verdict"] == "neutral"
+    assert knobs["a"]["leave_one_out"]["effect"] == pytest.approx(EFFECTS["a"] + INTERACTION)
+    assert knobs["a"]["add_one_in"]["effect"] == pytest.approx(EFFECTS["a"])
+    assert knobs["a"]["non_additive"] and not knobs["b"]["non_additive"]
+    assert report["interactions"][0]["pair"] == ["a", "d"]
+    assert report["interactions"][0]["effect"] == pytest.approx(INTERACTION)
+    assert report["interacting_pairs"] == [["a", "d"]]
+    assert report["reference"] == pytest.approx(100)
+    assert set(report["minimal_profile"]) == {"a", "d"}
+    assert report["minimal_profile_disabled_tuners"] == ["cpu_governor"]
+    assert minimal_config["sysctl_tuning"]["vm.dirty_ratio"] is None
+
+
+def test_fractional_factorial_design():
+    calls = []
+    report, _ = AblationStudy(_config(design="fractional_factorial"), _knobs(), _evaluate(calls), "himeno").run()
+    assert len(calls) == 8
+    knobs = _by_name(report["knobs"])
+    # 主效应为两水平的平均差：a 的交互作用在 d 开启的一半运行中出现
+    assert knobs["a"]["effect"] == pytest.approx(EFFECTS["a"] + INTERACTION / 2)
+    assert knobs["b"]["effect"] == pytest.approx(EFFECTS["b"])
+    assert knobs["c"]["verdict"] == "neutral"
+    pair = next(row for row in report["interactions"] if row["pair"] == ["a", "d"])
+    assert pair["effect"] == pytest.approx(INTERACTION)
+    # 4 个因子用 8 次运行时，a×d 与 b×c 混杂
+    assert pair["aliases"] == [["b", "c"]]
+
+
+def test_failed_measurement_and_unknown_design():
+    def evaluate(config, disabled):
+        return {"himeno": {"success": False, "error": "编译失败"}}
+
+    with pytest.raises(RuntimeError, match="编译失败"):
+        AblationStudy(_config(), _knobs(), evaluate, "himeno").run()
+    with pytest.raises(ValueError):
+        AblationStudy(_config(design="plackett_burman"), _knobs(), evaluate, "himeno")
+    with pytest.raises(ValueError):
+        AblationStudy(_config(), [], evaluate, "himeno").run()
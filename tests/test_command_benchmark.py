@@ -0,0 +1,177 @@
+import json
+import shutil
+from pathlib import Path
+
+import pytest
+
+from modules.command_benchmark import CgroupSlice, CommandBenchmark
+from utils.registry import PluginRegistry
+
+SCRIPT = """echo 'warmup: 5.0 ops/s'
+echo 'result: 12.5 ops/s'
+echo '{"summary": {"latency": [{"p99": 3.0}]}}'
+echo 'elapsed 2.0' >&2
+"""
+
+
+def _config(**options):
+    return {"command_benchmark": {"bench": dict({"command": SCRIPT}, **options)}}
+
+
+def test_extract_metrics_and_keep_config_serializable():
+    config = _config(metrics={
+        "ops": {"regex": r"^\w+: ([\d.]+) ops/s"},
+        "warmup_ops": {"regex": r"^\w+: ([\d.]+) ops/s", "match": "first"},
+        "p99_ms": {"json": "summary.latency.0.p99", "scale": 1000},
+        "elapsed": {"regex": r"elapsed ([\d.]+)", "source": "stderr"}
+    })
+    benchmark = CommandBenchmark(config)
+    assert benchmark.name == "command_benchmark:bench"
+    json.dumps(config)
+
+    result = benchmark.run()
+    assert result["success"], result["error"]
+    assert result["score"] == 12.5 and result["score_metric"] == "ops"
+    assert result["metrics"]["warmup_ops"] == 5.0
+    assert result["metrics"]["p99_ms"] == 3000.0
+    assert result["metrics"]["elapsed"] == 2.0
+    assert result["metrics"]["elapsed_seconds"] > 0
+    json.dumps(result)
+
+
+def test_lower_is_better_score():
+    benchmark = CommandBenchmark(_config(metrics={"elapsed": {"regex": r"elapsed ([\d.]+)", "source": "stderr"}},
+                                         direction="lower"))
+    result = benchmark.run()
+    assert result["score"] == 0.5 and result["metric_value"] == 2.0
+
+    result = CommandBenchmark(_config(command="echo 'elapsed 0'", direction="lower",
+                                      metrics={"elapsed": {"regex": r"elapsed ([\d.]+)"}})).run()
+    assert not result["success"] and "无法取倒数" in result["error"]
+
+
+def test_failures():
+    result = CommandBenchmark(_config(command="echo broken >&2; exit 3")).run()
+    assert not result["success"] and result["returncode"] == 3
+    assert "命令退出码 3" in result["error"] and "broken" in result["error"]
+    assert CommandBenchmark(_config(command="exit 3", success_codes=[0, 3])).run()["success"]
+
+    result = CommandBenchmark(_config(command="echo nothing", metrics={"ops": {"regex": r"ops ([\d.]+)"}})).run()
+    assert not result["success"] and "提取 ops 失败" in result["error"]
+
+    result = CommandBenchmark(_config(command="sleep 5", timeout=0.2)).run()
+    assert not result["success"] and result["time_seconds"] < 5
+
+
+def test_cwd_env_setup_and_teardown(tmp_path):
+    benchmark = CommandBenchmark(_config(
+        command=["sh", "-c", 'echo "{\\"rate\\": $RATE}" > out.json'],
+        cwd=str(tmp_path),
+        env={"RATE": 7},
+        setup=["touch prepared"],
+        teardown=["rm prepared"],
+        metrics={"rate": {"json": "rate", "source": "out.json"}}
+    ))
+    result = benchmark.run()
+    assert result["success"], result["error"]
+    assert result["score"] == 7.0
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["out.json"]
+
+    benchmark.setup = [["false"]]
+    result = benchmark.run()
+    assert not result["success"] and "准备步骤" in result["error"]
+
+
+@pytest.mark.parametrize("config,message", [
+    ({"command_benchmark": {"a": {"command": "true"}, "b": {"command": "true"}}}, "请用"),
+    (_config(command=""), "没有定义 command"),
+    (_config(metrics={"x": {"regex": "(1)", "json": "x"}}), "只能指定"),
+    (_config(score_metric="ops"), "没有对应的指标定义"),
+    (_config(direction="down"), "direction"),
+])
+def test_invalid_config(config, message):
+    with pytest.raises(ValueError, match=message):
+        CommandBenchmark(config)
+
+
+def test_registry_selects_instance():
+    config = {"command_benchmark": {"fast": {"command": "echo 1"}, "slow": {"command": "echo 2"}}}
+    benchmark = PluginRegistry().create("benchmark", "command_benchmark:slow", config)
+    assert isinstance(benchmark, CommandBenchmark)
+    assert benchmark.name == "command_benchmark:slow" and benchmark.command[-1] == "echo 2"
+
+
+@pytest.fixture
+def cgroup_root(tmp_path, monkeypatch):
+    # 父组自己的 cgroup.controllers 决定它能在 subtree_control 中启用哪些控制器
+    for parent in ("performance_tuning.slice", "bench.slice"):
+        (tmp_path / parent).mkdir()
+        (tmp_path / parent / "cgroup.controllers").write_text("cpuset cpu io memory pids\n")
+    removed = {}
+
+    def remove(self):
+        # 普通目录中的接口文件无法像 cgroupfs 那样随 rmdir 一起删除
+        removed[self.path] = {path.name: path.read_text() for path in Path(self.path).iterdir()}
+        shutil.rmtree(self.path)
+
+    monkeypatch.setattr(CgroupSlice, "remove", remove)
+    return tmp_path, removed
+
+
+def test_run_in_cgroup(cgroup_root, monkeypatch):
+    root, removed = cgroup_root
+    created = []
+    create = CgroupSlice.create
+
+    def create_with_stats(self):
+        create(self)
+        created.append(self.path)
+        with open(f"{self.path}/cpu.stat", "w") as f:
+            f.write("usage_usec 1500\nuser_usec 1000\n")
+        with open(f"{self.path}/memory.peak", "w") as f:
+            f.write("4096\n")
+        with open(f"{self.path}/io.stat", "w") as f:
+            f.write("8:0 rbytes=10 wbytes=20\n8:16 rbytes=5 wbytes=0\n")
+
+    monkeypatch.setattr(CgroupSlice, "create", create_with_stats)
+    benchmark = CommandBenchmark(_config(command="echo $$", cgroup={
+        "enable": True, "root": str(root), "cpu_max": 1.5, "memory_max": "512M", "cpuset": "0-1"
+    }))
+    result = benchmark.run()
+    assert result["success"], result["error"]
+    assert result["cgroup"] == {"cpu": {"usage_usec": 1500, "user_usec": 1000}, "memory_peak": 4096,
+                                "io": {"rbytes": 15, "wbytes": 20}}
+    (path,) = created
+    files = removed[path]
+    assert files["cpu.max"] == "150000 100000" and files["memory.max"] == "512M" and files["cpuset.cpus"] == "0-1"
+    # 命令在子组内运行：cgroup.procs 中的 PID 即命令输出的 $$
+    assert files["cgroup.procs"].strip() == result["output_tail"][-1].strip()
+    assert (root / "performance_tuning.slice" / "cgroup.subtree_control").read_text() == "+cpuset"
+
+
+def test_cgroup_limits_and_wrap(cgroup_root):
+    root, _ = cgroup_root
+    cgroup = CgroupSlice(str(root), "bench.slice", "run-1", {"cpu.max": "150000 100000", "memory.max": "512M"})
+    cgroup.create()
+    assert (root / "bench.slice" / "run-1" / "cpu.max").read_text() == "150000 100000"
+    assert cgroup.wrap(["echo", "hi"])[-2:] == ["echo", "hi"]
+    assert cgroup.wrap(["echo"])[3] == str(root / "bench.slice" / "run-1" / "cgroup.procs")
+
+
+def test_cgroup_missing_controller(cgroup_root):
+    root, _ = cgroup_root
+    (root / "bench.slice" / "cgroup.controllers").write_text("cpuset cpu\n")
+    cgroup = CgroupSlice(str(root), "bench.slice", "run-1", {"cpu.max": "max 100000", "memory.max": "512M"})
+    with pytest.raises(OSError, match="没有可用的 memory 控制器"):
+        cgroup.create()
+    assert not (root / "bench.slice" / "run-1").exists()
+
+
+def test_cgroup_failure(tmp_path):
+    (tmp_path / "file").write_text("")
+    options = {"enable": True, "root": str(tmp_path / "file")}
+    result = CommandBenchmark(_config(command="echo 1", cgroup=options)).run()
+    assert result["success"] and "创建 cgroup" in result["cgroup"]["error"]
+
+    result = CommandBenchmark(_config(command="echo 1", cgroup=dict(options, required=True))).run()
+    assert not result["success"] and "创建 cgroup" in result["error"]
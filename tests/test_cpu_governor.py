@@ -0,0 +1,116 @@
+import os
+
+import pytest
+
+from modules import cpu_governor
+from modules.base import TuningError
+from modules.cpu_governor import CpuGovernor, discover_policies
+
+
+def _policy(root, name, cpus, governors="performance powersave", preferences="default performance power"):
+    path = root / "cpufreq" / name
+    path.mkdir(parents=True)
+    files = {
+        "affected_cpus": cpus,
+        "scaling_governor": "powersave",
+        "scaling_available_governors": governors,
+        "energy_performance_preference": "default",
+        "energy_performance_available_preferences": preferences,
+        "scaling_min_freq": "800000",
+        "scaling_max_freq": "3000000",
+        "cpuinfo_min_freq": "800000",
+        "cpuinfo_max_freq": "4000000"
+    }
+    for filename, value in files.items():
+        (path / filename).write_text(value + "\n")
+    return path
+
+
+@pytest.fixture
+def sysfs(tmp_path):
+    _policy(tmp_path, "policy0", "0 1")
+    _policy(tmp_path, "policy2", "2 3", governors="performance powersave schedutil", preferences="default performance")
+    (tmp_path / "intel_pstate").mkdir()
+    (tmp_path / "intel_pstate" / "no_turbo").write_text("0\n")
+    return tmp_path
+
+
+def _governor(sysfs, **options):
+    return CpuGovernor({"cpu_governor": dict(options, sysfs_root=str(sysfs))})
+
+
+def _read(path):
+    return path.read_text().strip()
+
+
+def test_discover_policies(sysfs):
+    policies = discover_policies(str(sysfs))
+    assert [(policy.name, policy.cpus) for policy in policies] == [("policy0", [0, 1]), ("policy2", [2, 3])]
+
+
+def test_discover_legacy_per_cpu_directories(tmp_path):
+    shared = tmp_path / "shared_cpufreq"
+    shared.mkdir()
+    for cpu in (0, 1):
+        (tmp_path / f"cpu{cpu}").mkdir()
+        os.symlink(shared, tmp_path / f"cpu{cpu}" / "cpufreq")
+    (tmp_path / "cpu2" / "cpufreq").mkdir(parents=True)
+    assert [policy.cpus for policy in discover_policies(str(tmp_path))] == [[0, 1], [2]]
+
+
+def test_apply_and_reset(sysfs):
+    tuner = _governor(sysfs, governor="performance", energy_performance_preference="performance",
+                      scaling_max_freq="max", no_turbo=True)
+    tuner.apply()
+    for policy in ("policy0", "policy2"):
+        path = sysfs / "cpufreq" / policy
+        assert _read(path / "scaling_governor") == "performance"
+        assert _read(path / "energy_performance_preference") == "performance"
+        assert _read(path / "scaling_max_freq") == "4000000"
+    assert _read(sysfs / "intel_pstate" / "no_turbo") == "1"
+    assert tuner.current_state()["policy0"]["governor"] == "performance"
+
+    tuner.reset()
+    assert _read(sysfs / "cpufreq" / "policy0" / "scaling_governor") == "powersave"
+    assert _read(sysfs / "cpufreq" / "policy2" / "scaling_max_freq") == "3000000"
+    assert _read(sysfs / "intel_pstate" / "no_turbo") == "0"
+
+
+def test_cpu_selection_and_legacy_config(sysfs):
+    tuner = _governor(sysfs, governor="performance", cpus="3")
+    assert [policy.name for policy in tuner.policies] == ["policy2"]
+    tuner.apply()
+    assert _read(sysfs / "cpufreq" / "policy0" / "scaling_governor") == "powersave"
+
+    legacy = CpuGovernor({"cpu_governor": "performance"})
+    assert legacy.settings == {"governor": "performance"}
+    assert legacy.knobs() == [("cpu_governor.governor", ("cpu_governor",), None)]
+
+
+def test_raising_min_above_current_max_writes_max_first(sysfs, monkeypatch):
+    writes = []
+    write = cpu_governor._write
+
+    def logged_write(path, value):
+        writes.append(os.path.basename(path))
+        write(path, value)
+
+    monkeypatch.setattr(cpu_governor, "_write", logged_write)
+    _governor(sysfs, scaling_min_freq=3500000, scaling_max_freq="max", cpus="0").apply()
+    assert writes == ["scaling_max_freq", "scaling_min_freq"]
+
+
+def test_rejected_write_raises(sysfs, monkeypatch):
+    tuner = _governor(sysfs, governor="performance")
+    # 内核拒绝的值不会生效，回读结果不一致
+    monkeypatch.setattr(cpu_governor, "_write", lambda path, value: None)
+    with pytest.raises(TuningError, match="读回 powersave"):
+        tuner.apply()
+
+
+def test_tunable_space_is_intersection(sysfs):
+    space = _governor(sysfs).tunable_space()["cpu_governor"]
+    assert space["governor"] == ["performance", "powersave"]
+    assert space["energy_performance_preference"] == ["default", "performance"]
+    assert space["no_turbo"] == [True, False]
+    assert "boost" not in space
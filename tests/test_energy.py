@@ -0,0 +1,111 @@
+import time
+
+import pytest
+
+from utils.benchmark_runner import BenchmarkRunner
+from utils.energy import EnergyMeter, RaplDomain, discover_domains
+
+MAX_RANGE = 262143328850
+
+
+def _domain(root, directory, name, energy=0):
+    path = root / directory
+    path.mkdir(parents=True)
+    (path / "name").write_text(name + "\n")
+    (path / "energy_uj").write_text(f"{energy}\n")
+    (path / "max_energy_range_uj").write_text(f"{MAX_RANGE}\n")
+    return path
+
+
+@pytest.fixture
+def powercap(tmp_path):
+    _domain(tmp_path, "intel-rapl:0", "package-0")
+    _domain(tmp_path, "intel-rapl:0/intel-rapl:0:0", "core")
+    _domain(tmp_path, "intel-rapl:0:0", "core")
+    _domain(tmp_path, "intel-rapl:0:1", "dram")
+    _domain(tmp_path, "intel-rapl:1", "package-1")
+    return tmp_path
+
+
+def test_discover_domains(powercap):
+    domains = discover_domains(str(powercap))
+    assert [domain.name for domain in domains] == ["package-0", "dram-0", "package-1"]
+    assert domains[0].path.endswith("intel-rapl:0") and domains[0].max_range == MAX_RANGE
+    # 同一插槽的 MMIO 接口与 MSR 接口只计一次
+    _domain(powercap, "intel-rapl-mmio:0", "package-0")
+    assert [domain.name for domain in discover_domains(str(powercap))] == ["package-0", "dram-0", "package-1"]
+    assert [domain.name for domain in discover_domains(str(powercap), ("package",))] == ["package-0", "package-1"]
+
+
+def test_counter_wrap(tmp_path):
+    path = _domain(tmp_path, "intel-rapl:0", "package-0", MAX_RANGE - 100)
+    domain = RaplDomain("package-0", str(path))
+    domain.open()
+    (path / "energy_uj").write_text("50\n")
+    domain.sample()
+    (path / "energy_uj").write_text("1050\n")
+    domain.sample()
+    domain.close()
+    assert domain.total == 1150
+
+
+def test_meter_reports_joules_and_efficiency(powercap):
+    meter = EnergyMeter({"energy": {"powercap_root": str(powercap), "interval": 0.01}})
+    meter.start()
+    (powercap / "intel-rapl:0" / "energy_uj").write_text("2000000\n")
+    (powercap / "intel-rapl:0:1" / "energy_uj").write_text("500000\n")
+    time.sleep(0.05)
+    report = meter.stop(score=10.0)
+    assert report["available"]
+    assert report["domains"] == {"package-0": 2.0, "dram-0": 0.5, "package-1": 0.0}
+    assert report["joules"] == 2.5
+    assert report["watts"] == pytest.approx(2.5 / report["seconds"])
+    assert report["score_per_watt"] == pytest.approx(10.0 / report["watts"])
+
+
+def test_meter_without_domains(tmp_path):
+    meter = EnergyMeter({"energy": {"powercap_root": str(tmp_path)}})
+    meter.start()
+    report = meter.stop(score=1.0)
+    assert not report["available"] and "没有可用的 RAPL 计量域" in report["error"]
+
+
+class HeatingBenchmark:
+    """每次运行消耗 1 焦耳"""
+
+    def __init__(self, counter):
+        self.counter = counter
+        self.energy = 0
+
+    def run(self):
+        self.energy += 1000000
+        self.counter.write_text(f"{self.energy}\n")
+        time.sleep(0.02)
+        return {"score": 5.0, "success": True}
+
+
+def _runner(**energy):
+    return BenchmarkRunner({"run_engine": {"warmup_runs": 0, "min_runs": 2, "max_runs": 2},
+                            "energy": dict({"interval": 0.01}, **energy)})
+
+
+def test_runner_energy_default_off(powercap):
+    result = BenchmarkRunner({"run_engine": {"warmup_runs": 0, "min_runs": 1, "max_runs": 1}}).run(
+        HeatingBenchmark(powercap / "intel-rapl:0" / "energy_uj"))
+    assert "energy" not in result and "energy" not in result["runs"][0]
+
+
+def test_score_per_watt_objective(powercap, tmp_path):
+    benchmark = HeatingBenchmark(powercap / "intel-rapl:0" / "energy_uj")
+    result = _runner(powercap_root=str(powercap), objective="score_per_watt").run(benchmark)
+    assert result["success"] and result["metric"] == "score_per_watt"
+    assert result["throughput_scores"] == [5.0, 5.0]
+    assert result["scores"] == [run["energy"]["score_per_watt"] for run in result["runs"]]
+    assert all(run["energy"]["joules"] == 1.0 for run in result["runs"])
+
+    # 能耗数据不可用时无法计算能效，测量失败
+    result = _runner(powercap_root=str(tmp_path / "missing"), objective="score_per_watt").run(benchmark)
+    assert not result["success"] and "能耗数据不可用" in result["runs"][0]["error"]
+
+    with pytest.raises(ValueError):
+        _runner(objective="joules")
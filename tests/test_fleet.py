@@ -0,0 +1,140 @@
+import threading
+
+from utils.fleet import FleetAgent, FleetCoordinator
+from utils.result_store import ResultStore
+
+SYSTEM_INFO = {
+    "cpu": {"model_name": "Test CPU", "logical_cores": 4},
+    "memory": {"total": 8 * 2 ** 30},
+    "os": {"hostname": "node", "machine": "x86_64", "release": "6.1.0"}
+}
+SPACE = {"sysctl_tuning": {"parameters": {"vm.swappiness": [10, 30, 60]}}}
+
+
+def _config(tmp_path, **fleet):
+    return {
+        "search": {"strategy": "grid", "space": {"sysctl_tuning": "auto"}, "max_runs": 1},
+        "fleet": dict({"port": 0, "poll_interval": 0.05, "output_dir": str(tmp_path / "fleet")}, **fleet),
+        "result_store": {"path": str(tmp_path / "results.db")}
+    }
+
+
+def _results(score):
+    stats = {"n": 1, "mean": score, "ci_low": score, "ci_high": score}
+    return {"bench": {"score": score, "success": True, "stats": stats}}
+
+
+def _evaluate(config, max_runs, prune):
+    return _results(100 - config["sysctl_tuning"]["parameters"]["vm.swappiness"])
+
+
+def _rows(tmp_path):
+    store = ResultStore(str(tmp_path / "results.db"))
+    try:
+        return store.query(success_only=False)
+    finally:
+        store.close()
+
+
+def test_localhost_coordinator_and_agents(tmp_path):
+    coordinator = FleetCoordinator(_config(tmp_path, expected_agents=2), ["sysctl_tuner"], ["bench"])
+    port = coordinator.start()
+    agents = [
+        FleetAgent(f"http://127.0.0.1:{port}", _config(tmp_path),
+                   dict(SYSTEM_INFO, os=dict(SYSTEM_INFO["os"], hostname=host)),
+                   lambda tuners, benchmarks: SPACE, _evaluate)
+        for host in ("a", "b")
+    ]
+    threads = [threading.Thread(target=agent.run, daemon=True) for agent in agents]
+    for thread in threads:
+        thread.start()
+    summary = coordinator.serve(timeout=30)
+    for thread in threads:
+        thread.join(timeout=10)
+
+    (hardware, campaign), = summary.items()
+    assert sorted(campaign["hosts"]) == ["a", "b"]
+    assert campaign["trials"] == 3
+    assert campaign["best"]["candidate"] == {"sysctl_tuning/parameters/vm.swappiness": 10}
+    assert sum(agent.trials for agent in agents) == 3
+    assert (tmp_path / "fleet" / hardware / "best_profile.conf").exists()
+    assert len(_rows(tmp_path)) == 3
+
+
+def _lease(coordinator, agent_id):
+    status, response = coordinator.handle("lease", {"agent_id": agent_id})
+    assert status == 200
+    return response["task"]
+
+
+def _start(tmp_path, agents=1):
+    coordinator = FleetCoordinator(_config(tmp_path), ["sysctl_tuner"], ["bench"])
+    ids = []
+    for _ in range(agents):
+        status, response = coordinator.handle("register", {"system_info": SYSTEM_INFO})
+        assert status == 200
+        ids.append(response["agent_id"])
+        coordinator.handle("ready", {"agent_id": ids[-1], "tunable_space": SPACE})
+    return coordinator, ids
+
+
+def test_retried_result_is_recorded_once(tmp_path):
+    coordinator, (agent,) = _start(tmp_path)
+    task = _lease(coordinator, agent)
+    payload = {"agent_id": agent, "task_id": task["task_id"], "results": _results(50)}
+    assert coordinator.handle("result", payload) == (200, {})
+    assert coordinator.handle("result", payload) == (200, {"ignored": "duplicate"})
+
+    campaign, = coordinator.campaigns.values()
+    assert len(campaign.search.history.trials) == 1
+    assert task["task_id"] not in coordinator.tasks
+    assert len(_rows(tmp_path)) == 1
+    assert coordinator.handle("result", dict(payload, task_id="unknown"))[0] == 400
+
+
+def test_late_result_after_lease_expiry(tmp_path):
+    coordinator, (first, second) = _start(tmp_path, agents=2)
+    campaign, = coordinator.campaigns.values()
+    stale = _lease(coordinator, first)
+    campaign.leases[stale["task_id"]]["deadline"] = 0
+
+    # 超时的候选重新分派给第二个代理，第一个代理的迟到结果不再记录
+    fresh = _lease(coordinator, second)
+    assert fresh["candidate"] == stale["candidate"]
+    late = {"agent_id": first, "task_id": stale["task_id"], "results": _results(10)}
+    assert coordinator.handle("result", late) == (200, {"ignored": "re-leased"})
+    assert coordinator.handle("result", {"agent_id": second, "task_id": fresh["task_id"],
+                                         "results": _results(20)}) == (200, {})
+    trials = campaign.search.history.trials
+    assert [trial["score"] for trial in trials] == [20]
+    assert trials[0]["agent_id"] == second
+
+
+def test_late_result_after_candidate_recorded(tmp_path):
+    coordinator, (first, second) = _start(tmp_path, agents=2)
+    campaign, = coordinator.campaigns.values()
+    stale = _lease(coordinator, first)
+    campaign.leases[stale["task_id"]]["deadline"] = 0
+    fresh = _lease(coordinator, second)
+    assert coordinator.handle("result", {"agent_id": second, "task_id": fresh["task_id"],
+                                         "results": _results(20)}) == (200, {})
+    late = {"agent_id": first, "task_id": stale["task_id"], "results": _results(10)}
+    assert coordinator.handle("result", late) == (200, {"ignored": "recorded"})
+    assert len(campaign.search.history.trials) == 1
+    assert not coordinator.tasks
+
+
+def test_late_result_while_requeued(tmp_path):
+    coordinator, (first, second) = _start(tmp_path, agents=2)
+    campaign, = coordinator.campaigns.values()
+    stale = _lease(coordinator, first)
+    campaign.leases[stale["task_id"]]["deadline"] = 0
+    coordinator._expire_leases()
+    assert campaign.pending[0] == stale["candidate"]
+
+    # 候选重新排队但尚未分派：迟到结果有效，候选移出队列
+    assert coordinator.handle("result", {"agent_id": first, "task_id": stale["task_id"],
+                                         "results": _results(10)}) == (200, {})
+    assert stale["candidate"] not in campaign.pending
+    assert _lease(coordinator, second)["candidate"] != stale["candidate"]
+    assert len(campaign.search.history.trials) == 1
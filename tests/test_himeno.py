@@ -1 +1,157 @@
+import os
+import stat
 
+import pytest
+
+from modules.himeno import Himeno, HimenoBuildCache
+
+# 模拟 Himeno 程序的输出格式
+FAKE_HIMENO = """#!/bin/sh
+echo "mimax = 33 mjmax = 33 mkmax = 65"
+echo "Start rehearsal measurement process."
+echo "Measure the performance in 3 times."
+echo ""
+echo " MFLOPS: ${REHEARSAL_MFLOPS:-1500.0} time(s): 0.30 3.1e-03"
+echo ""
+echo " Now, start the actual measurement process."
+echo " The loop will be excuted in ${ITERATIONS:-600} times"
+echo " This will take about one minute."
+echo " Wait for a while"
+sleep ${SLEEP:-0}
+echo ""
+echo " Loop executed for 600 times"
+echo " Gosa : 1.6e-04"
+echo " MFLOPS measured : 1523.4	cpu : 60.0"
+echo " Score based on Pentium III 600MHz : 18.39"
+exit ${EXIT:-0}
+"""
+
+# 模拟编译器：cflags 中含 -bad 时失败，否则把模拟程序写到 -o 指定的路径并记录调用次数
+FAKE_COMPILER = """#!/bin/sh
+[ "$1" = "--version" ] && {{ echo "fakecc 1.0"; exit 0; }}
+echo "$@" >> "{log}"
+out=""
+while [ $# -gt 0 ]; do
+    case "$1" in
+        -bad) echo "error: unrecognized option '-bad'" >&2; exit 1 ;;
+        -o) out="$2"; shift ;;
+    esac
+    shift
+done
+cp "{program}" "$out"
+"""
+
+
+def _executable(path, content):
+    path.write_text(content)
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    return str(path)
+
+
+@pytest.fixture
+def toolchain(tmp_path, monkeypatch):
+    monkeypatch.setattr(HimenoBuildCache, "_cpu_model", lambda self: "Test CPU")
+    program = _executable(tmp_path / "himeno.sh", FAKE_HIMENO)
+    log = tmp_path / "compiler.log"
+    compiler = _executable(tmp_path / "fakecc", FAKE_COMPILER.format(log=log, program=program))
+    return {"compiler": compiler, "log": log, "program": program, "cache_dir": str(tmp_path / "cache")}
+
+
+def _config(toolchain, variants=None, **options):
+    himeno = {
+        "problem_size": "XS",
+        "build_cache_dir": toolchain["cache_dir"],
+        "variants": variants or {"O2": {"compiler": toolchain["compiler"], "cflags": ["-O2"]}}
+    }
+    himeno.update(options)
+    return {"himeno": himeno}
+
+
+def test_build_cache_reuses_binaries(toolchain):
+    cache = HimenoBuildCache(toolchain["cache_dir"])
+    first = cache.get_or_build("XS", toolchain["compiler"], ["-O2"])
+    assert cache.get_or_build("XS", toolchain["compiler"], ["-O2"]) == first
+    assert os.path.exists(f"{first}.json")
+    calls = toolchain["log"].read_text().splitlines()
+    assert len(calls) == 1 and "-DXSMALL" in calls[0]
+
+    # 网格尺寸或编译选项不同时重新编译
+    assert cache.get_or_build("S", toolchain["compiler"], ["-O2"]) != first
+    assert cache.get_or_build("XS", toolchain["compiler"], ["-O3"]) != first
+    assert len(toolchain["log"].read_text().splitlines()) == 3
+
+
+def test_build_key_tracks_source(toolchain, tmp_path):
+    source = tmp_path / "himeno.c"
+    source.write_text("int main() { return 0; }\n")
+    cache = HimenoBuildCache(toolchain["cache_dir"], str(source))
+    key = cache.key("XS", toolchain["compiler"], ["-O2"])
+    source.write_text("int main() { return 1; }\n")
+    assert cache.key("XS", toolchain["compiler"], ["-O2"]) != key
+
+
+def test_build_failure_is_a_clear_error(toolchain):
+    variants = {"bad": {"compiler": toolchain["compiler"], "cflags": ["-bad"]}}
+    with pytest.raises(RuntimeError, match="无法构建 Himeno 编译变体 bad.*unrecognized option"):
+        Himeno(_config(toolchain, variants))
+
+
+def test_failed_extra_variants_are_recorded(toolchain):
+    variants = {
+        "O2": {"compiler": toolchain["compiler"], "cflags": ["-O2"]},
+        "bad": {"compiler": toolchain["compiler"], "cflags": ["-bad"]},
+        "missing": {"compiler": os.path.join(toolchain["cache_dir"], "no-such-cc"), "cflags": []}
+    }
+    benchmark = Himeno(_config(toolchain, variants, build_all_variants=True))
+    assert sorted(benchmark.build_errors) == ["bad", "missing"]
+    assert benchmark.binary_path.startswith(toolchain["cache_dir"])
+
+
+def test_run_parses_output(toolchain):
+    result = Himeno(_config(toolchain)).run()
+    assert result["success"], result["error"]
+    assert result["score"] == 1523.4
+    assert result["rehearsal_mflops"] == 1500.0
+    assert result["iterations"] == 600
+    assert result["gosa"] == 1.6e-04
+    assert result["variant"] == "O2"
+    assert [event["event"] for event in result["progress"]] == ["rehearsal", "planned", "measured"]
+
+
+def test_prebuilt_binary_and_missing_binary(toolchain, tmp_path):
+    result = Himeno({"himeno": {"compile_source": False, "binary_path": toolchain["program"]}}).run()
+    assert result["success"] and result["variant"] is None
+    result = Himeno({"himeno": {"compile_source": False, "binary_path": str(tmp_path / "missing")}}).run()
+    assert not result["success"] and "不存在" in result["error"]
+
+
+def test_existing_binary_path_skips_compilation(toolchain, tmp_path):
+    # 已有二进制时即使 compile_source 为 true 也不调用编译器
+    variants = {"O2": {"compiler": str(tmp_path / "no-such-cc"), "cflags": ["-O2"]}}
+    benchmark = Himeno(_config(toolchain, variants, binary_path=toolchain["program"]))
+    assert benchmark.binary_path == toolchain["program"] and not benchmark.compile_source
+    assert Himeno(_config(toolchain, binary_path=str(tmp_path / "missing"))).binary_path.startswith(
+        toolchain["cache_dir"])
+
+
+def test_low_rehearsal_throughput_aborts(toolchain, monkeypatch):
+    monkeypatch.setenv("REHEARSAL_MFLOPS", "10.0")
+    monkeypatch.setenv("SLEEP", "30")
+    result = Himeno(_config(toolchain, min_mflops=100)).run()
+    assert not result["success"] and result["aborted"]
+    assert "低于下限 100" in result["error"]
+    assert result["run_time"] < 10
+
+
+def test_time_budget_aborts_after_planning(toolchain, monkeypatch):
+    monkeypatch.setenv("SLEEP", "30")
+    # 试跑 3 次耗时 0.3 秒，600 次迭代预计 60 秒
+    result = Himeno(_config(toolchain, time_budget=20)).run()
+    assert not result["success"] and "超过时间预算 20" in result["error"]
+    assert [event["event"] for event in result["progress"]] == ["rehearsal", "planned"]
+
+
+def test_nonzero_exit_fails(toolchain, monkeypatch):
+    monkeypatch.setenv("EXIT", "1")
+    result = Himeno(_config(toolchain)).run()
+    assert not result["success"] and result["score"] == 0
@@ -0,0 +1,53 @@
+import pytest
+
+from modules.himeno import resolve_grid_size
+from modules.himeno_numpy import OMEGA, HimenoNumpy
+
+np = pytest.importorskip("numpy")
+
+
+def _reference_gosa(p, iterations):
+    """按原程序的公式（b=0、其余系数为 1）逐次迭代，返回最后一次的残差"""
+    p = p.astype(np.float64)
+    imax, jmax, kmax = (n - 1 for n in p.shape)
+    interior = (slice(1, imax - 1), slice(1, jmax - 1), slice(1, kmax - 1))
+    for _ in range(iterations):
+        s0 = (p[2:imax, 1:jmax - 1, 1:kmax - 1] + p[1:imax - 1, 2:jmax, 1:kmax - 1]
+              + p[1:imax - 1, 1:jmax - 1, 2:kmax] + p[0:imax - 2, 1:jmax - 1, 1:kmax - 1]
+              + p[1:imax - 1, 0:jmax - 2, 1:kmax - 1] + p[1:imax - 1, 1:jmax - 1, 0:kmax - 2])
+        ss = s0 / 6.0 - p[interior]
+        gosa = float((ss * ss).sum())
+        p[interior] = p[interior] + OMEGA * ss
+    return gosa
+
+
+def test_resolve_grid_size():
+    assert resolve_grid_size("large") == "L"
+    assert resolve_grid_size("xs") == "XS"
+    assert resolve_grid_size("middle") == "M"
+    with pytest.raises(ValueError):
+        resolve_grid_size("huge")
+
+
+def test_initial_matrix():
+    p, dims = HimenoNumpy({"himeno_numpy": {"problem_size": "XS"}})._init_matrix()
+    assert p.shape == (33, 33, 65) and dims == (32, 32, 64)
+    assert p[0, 5, 5] == 0 and p[31, 5, 5] == 1 and p[32, 5, 5] == 0
+
+
+@pytest.mark.parametrize("threads", [1, 3])
+def test_jacobi_matches_reference(threads):
+    benchmark = HimenoNumpy({"himeno_numpy": {"problem_size": "XS", "iterations": 3, "threads": threads}})
+    result = benchmark.run()
+    assert result["success"], result.get("error")
+    assert result["threads"] == threads and result["grid"] == [32, 32, 64]
+    assert result["score"] > 0 and result["score"] == result["mflops"]
+    expected = _reference_gosa(benchmark._init_matrix()[0], 3)
+    assert result["gosa"] == pytest.approx(expected, rel=1e-4)
+
+
+def test_threads_are_capped_by_planes():
+    benchmark = HimenoNumpy({"himeno_numpy": {"problem_size": "XS", "threads": 100}})
+    chunks = benchmark._chunks(32)
+    assert len(chunks) == 30
+    assert chunks[0][0] == 1 and chunks[-1][1] == 31
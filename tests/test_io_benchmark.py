@@ -0,0 +1,81 @@
+import random
+
+import pytest
+
+from modules.io_benchmark import IoBenchmark, parse_size
+from utils.histogram import LatencyHistogram
+
+
+def test_exact_buckets_below_precision():
+    histogram = LatencyHistogram(precision_bits=7)
+    for value in range(128):
+        assert histogram._bucket_range(histogram._index(value)) == (value, value)
+
+
+@pytest.mark.parametrize("precision_bits", [4, 7])
+def test_bucket_ranges_contain_values_within_relative_error(precision_bits):
+    histogram = LatencyHistogram(precision_bits=precision_bits)
+    rng = random.Random(1)
+    values = [rng.randrange(1 << bits) for bits in range(1, 60) for _ in range(20)]
+    for value in values + [(1 << 40) - 1, 1 << 40]:
+        lower, upper = histogram._bucket_range(histogram._index(value))
+        assert lower <= value <= upper
+        assert upper - lower <= max(1, value) / 2 ** (precision_bits - 1)
+
+
+def test_buckets_are_contiguous():
+    histogram = LatencyHistogram(precision_bits=4)
+    previous_upper = -1
+    for index in range(len(histogram.counts) - 1):
+        lower, upper = histogram._bucket_range(index)
+        assert lower == previous_upper + 1
+        previous_upper = upper
+
+
+def test_percentiles_and_merge():
+    first, second = LatencyHistogram(), LatencyHistogram()
+    for value in range(1, 101):
+        (first if value % 2 else second).record(value * 1000)
+    assert first.merge(second) is first
+    summary = first.summary(scale=1000)
+    assert summary["count"] == 100 and summary["min"] == 1 and summary["max"] == 100
+    assert summary["mean"] == pytest.approx(50.5)
+    # 百分位数返回桶的上界，误差不超过 1/64
+    assert 50 <= summary["p50"] <= 50 * (1 + 1 / 64)
+    assert summary["p99.9"] == 100
+    assert LatencyHistogram().summary()["p50"] is None
+    with pytest.raises(ValueError):
+        first.merge(LatencyHistogram(precision_bits=5))
+
+
+def test_parse_size():
+    assert parse_size(4096) == 4096
+    assert parse_size("4k") == 4096
+    assert parse_size("1MB") == 1024 ** 2
+    assert parse_size("0.5g") == 1024 ** 3 // 2
+
+
+def test_invalid_options(tmp_path):
+    with pytest.raises(ValueError, match="未知"):
+        IoBenchmark({"io_benchmark": {"directory": str(tmp_path), "modes": ["async"]}})
+    with pytest.raises(ValueError, match="页大小"):
+        IoBenchmark({"io_benchmark": {"directory": str(tmp_path), "block_size": 1000}})
+
+
+def test_run_small_file(tmp_path):
+    benchmark = IoBenchmark({"io_benchmark": {
+        "directory": str(tmp_path), "file_size": "1M", "block_size": "4k", "queue_depth": 2,
+        "runtime": 0.05, "modes": ["buffered", "mmap", "direct"], "workloads": ["seq_read", "rand_write", "fsync_write"],
+        "seed": 1
+    }})
+    result = benchmark.run()
+    assert result["success"], result.get("error")
+    assert result["score_test"] == "geomean" and result["score"] > 0
+    for test in ("buffered/seq_read", "mmap/rand_write", "buffered/fsync_write"):
+        latency = result["tests"][test]["latency_us"]
+        assert result["tests"][test]["ops"] == latency["count"] > 0
+        assert latency["min"] <= latency["p50"] <= latency["max"]
+    # tmpfs 等文件系统不支持 O_DIRECT 时记录错误，不影响其他测试
+    assert set(result["tests"]) == {f"{mode}/{workload}" for mode in ("buffered", "mmap", "direct")
+                                    for workload in ("seq_read", "rand_write", "fsync_write")}
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,185 @@
+import errno
+import struct
+
+import pytest
+
+from modules import irq_tuner
+from modules.base import TuningError
+from modules.irq_tuner import IrqTuner, cpu_mask, mask_value
+from utils.journal import TuningJournal
+
+INTERRUPTS = """           CPU0       CPU1       CPU2       CPU3
+  0:         10          0          0          0   IO-APIC    2-edge      timer
+ 24:       1000          0          0          0   PCI-MSI 524288-edge      eth0-rx-0
+ 25:        500          0          0          0   PCI-MSI 524289-edge      nvme0q1
+"""
+IDLE_STATES = (("POLL", 0), ("C1", 2), ("C6", 100))
+
+
+@pytest.fixture
+def roots(tmp_path):
+    sysfs, procfs, dev = tmp_path / "sys", tmp_path / "proc", tmp_path / "dev"
+    cpu_root = sysfs / "devices" / "system" / "cpu"
+    cpu_root.mkdir(parents=True)
+    (cpu_root / "online").write_text("0-3\n")
+    for cpu in range(4):
+        for index, (name, latency) in enumerate(IDLE_STATES):
+            state = cpu_root / f"cpu{cpu}" / "cpuidle" / f"state{index}"
+            state.mkdir(parents=True)
+            (state / "name").write_text(name + "\n")
+            (state / "latency").write_text(f"{latency}\n")
+            (state / "disable").write_text("0\n")
+    for device in ("eth0", "lo"):
+        for queue, filename in (("rx-0", "rps_cpus"), ("rx-1", "rps_cpus"), ("tx-0", "xps_cpus")):
+            (sysfs / "class" / "net" / device / "queues" / queue).mkdir(parents=True)
+            (sysfs / "class" / "net" / device / "queues" / queue / filename).write_text("0\n")
+    (sysfs / "kernel" / "debug" / "sched").mkdir(parents=True)
+    (sysfs / "kernel" / "debug" / "sched" / "migration_cost_ns").write_text("500000\n")
+    (procfs / "sys" / "kernel").mkdir(parents=True)
+    (procfs / "sys" / "kernel" / "sched_nr_migrate").write_text("32\n")
+    (procfs / "interrupts").write_text(INTERRUPTS)
+    for irq in (0, 24, 25):
+        (procfs / "irq" / str(irq)).mkdir(parents=True)
+        (procfs / "irq" / str(irq) / "smp_affinity_list").write_text("0-3\n")
+    (procfs / "irq" / "default_smp_affinity").write_text("f\n")
+    dev.mkdir()
+    (dev / "cpu_dma_latency").write_bytes(b"")
+    return sysfs, procfs, dev
+
+
+@pytest.fixture(autouse=True)
+def managed_irq(monkeypatch):
+    """中断 0 模拟内核托管的中断：写入亲和性时返回 EIO"""
+    write = irq_tuner._write
+
+    def guarded_write(path, value):
+        if path.endswith("/irq/0/smp_affinity_list"):
+            raise OSError(errno.EIO, "Input/output error")
+        write(path, value)
+
+    monkeypatch.setattr(irq_tuner, "_write", guarded_write)
+
+
+def _tuner(roots, **options):
+    sysfs, procfs, dev = roots
+    return IrqTuner({"irq_tuning": dict(options, sysfs_root=str(sysfs), procfs_root=str(procfs), dev_root=str(dev))})
+
+
+def _read(path):
+    return path.read_text().strip()
+
+
+def test_masks():
+    assert cpu_mask([0, 1, 2, 3]) == "f"
+    assert cpu_mask([0, 40]) == "100,00000001"
+    assert mask_value("100,00000001") == (1 << 40) | 1
+    assert mask_value("") == 0
+
+
+def test_irq_affinity_and_queues(roots):
+    sysfs, procfs, _ = roots
+    tuner = _tuner(roots, isolate_cpus="2-3", irq_affinity={"enable": True},
+                   rps={"enable": True}, xps={"enable": True, "cpus": "none"})
+    tuner.apply()
+    assert tuner.skipped_irqs == [0]
+    assert _read(procfs / "irq" / "24" / "smp_affinity_list") == "0-1"
+    assert _read(procfs / "irq" / "25" / "smp_affinity_list") == "0-1"
+    assert _read(procfs / "irq" / "default_smp_affinity") == "3"
+    queues = sysfs / "class" / "net"
+    assert _read(queues / "eth0" / "queues" / "rx-1" / "rps_cpus") == "3"
+    assert _read(queues / "lo" / "queues" / "rx-0" / "rps_cpus") == "0"
+    assert tuner.current_state()["irq_affinity"][24] == "0-1"
+
+    tuner.reset()
+    assert _read(procfs / "irq" / "24" / "smp_affinity_list") == "0-3"
+    assert _read(procfs / "irq" / "default_smp_affinity") == "f"
+    assert _read(queues / "eth0" / "queues" / "rx-1" / "rps_cpus") == "0"
+
+
+def test_select_irqs_by_pattern(roots):
+    _, procfs, _ = roots
+    tuner = _tuner(roots, housekeeping_cpus="0", irq_affinity={"enable": True, "irqs": ["eth0-rx", 25],
+                                                               "default_affinity": False})
+    assert tuner._selected_irqs() == [24, 25]
+    tuner.apply()
+    assert _read(procfs / "irq" / "24" / "smp_affinity_list") == "0"
+    assert _read(procfs / "irq" / "default_smp_affinity") == "f"
+
+    with pytest.raises(TuningError, match="isolate_cpus"):
+        _tuner(roots, irq_affinity={"enable": True}).apply()
+
+
+def test_sched_and_cpuidle(roots):
+    sysfs, procfs, _ = roots
+    tuner = _tuner(roots, isolate_cpus="3", sched={"migration_cost_ns": 250000, "nr_migrate": 8, "latency_ns": 1},
+                   cstates={"max_latency_us": 10, "method": "cpuidle"})
+    tuner.apply()
+    assert _read(sysfs / "kernel" / "debug" / "sched" / "migration_cost_ns") == "250000"
+    # 旧内核的调度器参数位于 /proc/sys/kernel/sched_*
+    assert _read(procfs / "sys" / "kernel" / "sched_nr_migrate") == "8"
+    assert tuner.current_state()["cpuidle_disabled"] == {3: ["C6"]}
+    tuner.reset()
+    assert _read(procfs / "sys" / "kernel" / "sched_nr_migrate") == "32"
+    assert tuner.current_state()["cpuidle_disabled"] == {}
+
+
+def test_pm_qos_request(roots):
+    _, _, dev = roots
+    tuner = _tuner(roots, cstates={"max_latency_us": 2})
+    tuner.apply()
+    assert struct.unpack("i", (dev / "cpu_dma_latency").read_bytes()) == (2,)
+    assert tuner.current_state()["cpu_dma_latency"] == 2
+    tuner.reset()
+    assert tuner.latency_fd is None and tuner.current_state()["cpu_dma_latency"] is None
+
+
+def test_irqbalance(roots, tmp_path, monkeypatch):
+    _, procfs, _ = roots
+    (procfs / "812").mkdir()
+    (procfs / "812" / "comm").write_text("irqbalance\n")
+    log = tmp_path / "systemctl.log"
+    systemctl = tmp_path / "bin" / "systemctl"
+    systemctl.parent.mkdir()
+    systemctl.write_text(f'#!/bin/sh\necho "$@" >> {log}\n')
+    systemctl.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{systemctl.parent}:/usr/bin:/bin")
+
+    tuner = _tuner(roots, isolate_cpus="3", irq_affinity={"enable": True})
+    tuner.apply()
+    tuner.reset()
+    assert log.read_text().splitlines() == ["stop irqbalance", "start irqbalance"]
+
+    with pytest.raises(TuningError, match="未知的 irqbalance"):
+        _tuner(roots, isolate_cpus="3", irq_affinity={"enable": True, "irqbalance": "kill"}).apply()
+
+
+def test_journal_rollback(roots, tmp_path):
+    sysfs, procfs, _ = roots
+    journal = TuningJournal(str(tmp_path / "tuning.journal"))
+    tuner = _tuner(roots, isolate_cpus="2-3", irq_affinity={"enable": True}, rps={"enable": True},
+                   sched={"migration_cost_ns": 1000})
+    tuner.journal, tuner.txn = journal, journal.begin()
+    tuner.apply()
+    assert _read(procfs / "irq" / "24" / "smp_affinity_list") == "0-1"
+
+    # 进程在 reset 之前退出：由日志恢复全部原始值
+    restored, failed = TuningJournal(str(tmp_path / "tuning.journal")).rollback()
+    assert failed == [] and len(restored) == 6
+    assert _read(procfs / "irq" / "24" / "smp_affinity_list") == "0-3"
+    assert _read(procfs / "irq" / "default_smp_affinity") == "f"
+    assert _read(sysfs / "class" / "net" / "eth0" / "queues" / "rx-0" / "rps_cpus") == "0"
+    assert _read(sysfs / "kernel" / "debug" / "sched" / "migration_cost_ns") == "500000"
+
+
+def test_rejected_write(roots, monkeypatch):
+    monkeypatch.setattr(irq_tuner, "_write", lambda path, value: None)
+    with pytest.raises(TuningError, match="读回"):
+        _tuner(roots, sched={"migration_cost_ns": 1000}).apply()
+
+
+def test_tunable_space(roots):
+    space = _tuner(roots, isolate_cpus="3").tunable_space()["irq_tuning"]
+    assert space["irq_affinity"] == {"enable": [False, True]} and space["rps"] == {"enable": [False, True]}
+    assert space["sched"] == {"migration_cost_ns": [250000, 500000, 1000000], "nr_migrate": [16, 32, 64]}
+    assert space["cstates"] == {"max_latency_us": [None, 0, 2, 100]}
+    assert "irq_affinity" not in _tuner(roots).tunable_space()["irq_tuning"]
@@ -0,0 +1,140 @@
+import json
+
+import pytest
+
+from main import PerformanceTuningFramework
+from modules.base import TuningError
+from modules.sysctl_tuner import SysctlTuner
+from utils.journal import TuningJournal, restore_entry
+
+
+@pytest.fixture
+def knobs(tmp_path):
+    root = tmp_path / "sys" / "vm"
+    root.mkdir(parents=True)
+    for name, value in (("swappiness", "60"), ("dirty_ratio", "20")):
+        (root / name).write_text(value)
+    return root
+
+
+def test_rollback_restores_in_reverse_order(tmp_path, knobs):
+    journal = TuningJournal(str(tmp_path / "journal" / "tuning.journal"))
+    txn = journal.begin()
+    path = str(knobs / "swappiness")
+    journal.record(txn, "a", [("file", path, "60"), ("file", str(knobs / "dirty_ratio"), None)])
+    (knobs / "swappiness").write_text("10")
+    # 同一个键再次修改时记录的是中间值，逆序恢复后留下最早的原始值
+    journal.record(txn, "b", [("file", path, "10")])
+    (knobs / "swappiness").write_text("1")
+
+    assert len(journal.pending()) == 2
+    restored, failed = journal.rollback(txn)
+    assert [entry["prior"] for entry in restored] == ["10", "60"] and failed == []
+    assert (knobs / "swappiness").read_text() == "60"
+    assert journal.pending() == []
+    assert (tmp_path / "journal" / "tuning.journal").read_text() == ""
+
+
+def test_end_truncates_only_when_all_transactions_closed(tmp_path, knobs):
+    journal = TuningJournal(str(tmp_path / "tuning.journal"))
+    first, second = journal.begin(), journal.begin()
+    journal.record(first, "a", [("file", str(knobs / "swappiness"), "60")])
+    journal.record(second, "b", [("file", str(knobs / "dirty_ratio"), "20")])
+    journal.end(first)
+    assert [entry["txn"] for entry in journal.pending()] == [second]
+    journal.end(second)
+    assert journal.pending() == [] and (tmp_path / "tuning.journal").read_text() == ""
+
+
+def test_recovery_ignores_torn_last_record(tmp_path, knobs):
+    path = tmp_path / "tuning.journal"
+    journal = TuningJournal(str(path))
+    txn = journal.begin()
+    journal.record(txn, "a", [("file", str(knobs / "swappiness"), "60")])
+    (knobs / "swappiness").write_text("10")
+    # 崩溃时最后一条记录只写了一半
+    with open(path, "a") as f:
+        f.write('{"type": "change", "txn": "')
+
+    restored, failed = TuningJournal(str(path)).rollback()
+    assert len(restored) == 1 and failed == []
+    assert (knobs / "swappiness").read_text() == "60"
+
+
+def test_failed_restore_keeps_transaction_open(tmp_path, knobs):
+    journal = TuningJournal(str(tmp_path / "tuning.journal"))
+    txn = journal.begin()
+    journal.record(txn, "a", [("file", str(tmp_path / "missing" / "knob"), "1"),
+                              ("file", str(knobs / "swappiness"), "60")])
+    restored, failed = journal.rollback()
+    assert len(restored) == 1 and len(failed) == 1 and "error" in failed[0]
+    assert len(journal.pending()) == 2
+
+
+def test_unknown_kind():
+    with pytest.raises(ValueError):
+        restore_entry({"kind": "registry", "key": "x", "prior": 1})
+
+
+class FailingTuner:
+    name = "failing"
+
+    def __init__(self, knob):
+        self.knob = knob
+        self.journal = None
+        self.txn = None
+
+    def apply(self):
+        self.journal.record(self.txn, self.name, [("file", str(self.knob), self.knob.read_text())])
+        self.knob.write_text("0")
+        raise TuningError("写入失败")
+
+    def reset(self):
+        pass
+
+
+@pytest.fixture
+def framework(tmp_path, knobs, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    config = {
+        "sysctl_tuning": {"vm.swappiness": 10},
+        "sysctl_backend": {"type": "proc", "proc_root": str(tmp_path / "sys")},
+        "journal": {"path": str(tmp_path / "tuning.journal")}
+    }
+    (tmp_path / "config.json").write_text(json.dumps(config))
+    return PerformanceTuningFramework(str(tmp_path / "config.json"))
+
+
+def test_failed_apply_rolls_back_batch(framework, knobs):
+    framework.tuners = [SysctlTuner(framework.config), FailingTuner(knobs / "dirty_ratio")]
+    with pytest.raises(TuningError, match="已回滚"):
+        framework.apply_tunings()
+    assert (knobs / "swappiness").read_text() == "60"
+    assert (knobs / "dirty_ratio").read_text() == "20"
+    assert framework.journal.pending() == []
+
+
+def test_recover_after_crash(framework, knobs, tmp_path):
+    framework.tuners = [SysctlTuner(framework.config)]
+    framework.apply_tunings()
+    assert (knobs / "swappiness").read_text() == "10"
+
+    # 进程在 reset 之前退出：新进程根据日志恢复
+    recovered = PerformanceTuningFramework(str(tmp_path / "config.json"))
+    assert recovered.journal.pending()
+    assert recovered.recover()
+    assert (knobs / "swappiness").read_text() == "60"
+    assert recovered.journal.pending() == []
+
+
+def test_reset_failure_keeps_journal(framework, knobs, monkeypatch):
+    tuner = SysctlTuner(framework.config)
+    framework.tuners = [tuner]
+    framework.apply_tunings()
+    apply = tuner.backend.apply
+    monkeypatch.setattr(tuner.backend, "apply", lambda values: {param: "Permission denied" for param in values})
+    framework.reset_tunings()
+    assert framework.journal.pending() and framework.txn is not None
+    monkeypatch.setattr(tuner.backend, "apply", apply)
+    assert framework.recover()
+    assert (knobs / "swappiness").read_text() == "60"
@@ -0,0 +1,71 @@
+import shutil
+from array import array
+
+import pytest
+
+from modules.memory_bandwidth import CACHE_LINE, CHASE_UNROLL, MemoryBandwidth, _chase, build_chase_library
+
+np = pytest.importorskip("numpy")
+needs_compiler = pytest.mark.skipif(shutil.which("cc") is None, reason="需要 C 编译器")
+
+
+def _benchmark(tmp_path, compiler="cc", **latency):
+    latency = dict({"sizes_kb": [16, 64], "accesses": 20000, "seed": 1, "compiler": compiler,
+                    "build_cache_dir": str(tmp_path / "build")}, **latency)
+    return MemoryBandwidth({"memory_bandwidth": {"array_size": 100000, "ntimes": 3, "threads": 2,
+                                                 "latency": latency}})
+
+
+def test_chain_is_a_single_cycle_over_cache_lines(tmp_path):
+    chain, start = _benchmark(tmp_path)._chain(64, np.random.default_rng(1))
+    lines = 64 * 1024 // CACHE_LINE
+    visited = set()
+    position = start
+    for _ in range(lines):
+        assert position % (CACHE_LINE // 8) == 0
+        visited.add(position)
+        position = int(chain[position])
+    assert position == start and len(visited) == lines
+
+
+@needs_compiler
+def test_compiled_kernel_matches_python(tmp_path):
+    library = build_chase_library(str(tmp_path / "build"))
+    # 再次调用直接使用缓存中的共享库
+    assert build_chase_library(str(tmp_path / "build")) is not None
+    assert len(list((tmp_path / "build").iterdir())) == 1
+
+    chain, start = _benchmark(tmp_path)._chain(16, np.random.default_rng(2))
+    expected = _chase(array("q", chain.tobytes()), start, 5)
+    assert library.chase(chain.ctypes.data, start, 5 * CHASE_UNROLL) == expected
+
+
+def test_build_failure_is_reported(tmp_path):
+    with pytest.raises((RuntimeError, OSError)):
+        build_chase_library(str(tmp_path / "build"), str(tmp_path / "no-such-cc"))
+
+
+@needs_compiler
+def test_run_with_compiled_latency(tmp_path):
+    result = _benchmark(tmp_path).run()
+    assert result["success"], result.get("error")
+    assert result["score"] == result["stream"]["triad"]["best_mbps"] > 0
+    assert set(result["stream"]) == {"copy", "scale", "add", "triad"}
+    assert result["threads"] == 2
+    assert result["latency_backend"] == "compiled" and result["loop_overhead_ns"] == 0
+    assert [point["size_kb"] for point in result["latency_curve"]] == [16, 64]
+    assert all(point["reliable"] and point["latency_ns"] > 0 for point in result["latency_curve"])
+
+
+def test_python_fallback_subtracts_overhead(tmp_path):
+    result = _benchmark(tmp_path, compiler=str(tmp_path / "no-such-cc")).run()
+    assert result["success"], result.get("error")
+    assert result["latency_backend"] == "python" and result["loop_overhead_ns"] > 0
+    for point in result["latency_curve"]:
+        assert point["latency_ns"] == pytest.approx(max(0.0, point["raw_ns"] - result["loop_overhead_ns"]))
+        assert point["reliable"] == (point["latency_ns"] > result["loop_overhead_ns"])
+
+
+def test_unknown_score_kernel():
+    with pytest.raises(ValueError):
+        MemoryBandwidth({"memory_bandwidth": {"score_kernel": "fma"}})
@@ -0,0 +1,111 @@
+import pytest
+
+from modules import memory_tuner
+from modules.base import TuningError
+from modules.memory_tuner import MemoryTuner, hugepage_size_kb
+
+SIZES_KB = (2048, 1048576)
+
+
+@pytest.fixture
+def trees(tmp_path):
+    sysfs, procfs = tmp_path / "sys", tmp_path / "proc"
+    thp = sysfs / "kernel" / "mm" / "transparent_hugepage"
+    (thp / "khugepaged").mkdir(parents=True)
+    (thp / "enabled").write_text("always [madvise] never\n")
+    (thp / "defrag").write_text("always defer defer+madvise [madvise] never\n")
+    (thp / "khugepaged" / "defrag").write_text("1\n")
+    (thp / "khugepaged" / "pages_to_scan").write_text("4096\n")
+    for size_kb in SIZES_KB:
+        pool = sysfs / "kernel" / "mm" / "hugepages" / f"hugepages-{size_kb}kB"
+        pool.mkdir(parents=True)
+        (pool / "nr_hugepages").write_text("0\n")
+        for node in (0, 1):
+            pool = sysfs / "devices" / "system" / "node" / f"node{node}" / "hugepages" / f"hugepages-{size_kb}kB"
+            pool.mkdir(parents=True)
+            (pool / "nr_hugepages").write_text("0\n")
+    (procfs / "sys" / "kernel").mkdir(parents=True)
+    (procfs / "sys" / "vm").mkdir(parents=True)
+    (procfs / "sys" / "kernel" / "numa_balancing").write_text("1\n")
+    (procfs / "meminfo").write_text("Hugepagesize:       2048 kB\n")
+    return sysfs, procfs
+
+
+def _tuner(trees, **options):
+    sysfs, procfs = trees
+    return MemoryTuner({"memory_tuning": dict(options, sysfs_root=str(sysfs), procfs_root=str(procfs))})
+
+
+def _node_pool(sysfs, node, size_kb):
+    return sysfs / "devices" / "system" / "node" / f"node{node}" / "hugepages" / f"hugepages-{size_kb}kB" / "nr_hugepages"
+
+
+def test_hugepage_size_kb():
+    assert hugepage_size_kb("2M") == 2048
+    assert hugepage_size_kb("1G") == 1048576
+    assert hugepage_size_kb("2048kB") == 2048
+    with pytest.raises(ValueError):
+        hugepage_size_kb("huge")
+
+
+def test_thp_khugepaged_and_numa_balancing(trees):
+    sysfs, procfs = trees
+    tuner = _tuner(trees, transparent_hugepages={"mode": "always", "defrag": "defer",
+                                                 "khugepaged": {"defrag": False, "pages_to_scan": 8192}},
+                   numa_balancing=False)
+    tuner.apply()
+    state = tuner.current_state()
+    assert state["thp_enabled"] == "always" and state["thp_defrag"] == "defer"
+    assert state["khugepaged"]["defrag"] == "0" and state["khugepaged"]["pages_to_scan"] == "8192"
+    assert state["numa_balancing"] == "0"
+
+    tuner.reset()
+    state = tuner.current_state()
+    assert state["thp_enabled"] == "madvise" and state["thp_defrag"] == "madvise"
+    assert state["khugepaged"]["pages_to_scan"] == "4096" and state["numa_balancing"] == "1"
+
+
+def test_per_node_hugepages(trees):
+    sysfs, procfs = trees
+    tuner = _tuner(trees, transparent_hugepages={"enable": False},
+                   hugepages={"enable": True, "sizes": {"1G": {"nodes": {"0": 2, "1": 4}}, "2M": {"count": 512}}})
+    tuner.apply()
+    assert _node_pool(sysfs, 1, 1048576).read_text() == "4"
+    assert (sysfs / "kernel" / "mm" / "hugepages" / "hugepages-2048kB" / "nr_hugepages").read_text() == "512"
+    assert (procfs / "sys" / "vm" / "compact_memory").read_text() == "1"
+    assert tuner.allocations[1048576] == {0: 2, 1: 4}
+    tuner.reset()
+    assert _node_pool(sysfs, 1, 1048576).read_text() == "0"
+
+
+def test_partial_hugepage_allocation(trees, monkeypatch):
+    sysfs, _ = trees
+    write = memory_tuner._write
+
+    def short_write(path, value):
+        # 模拟内存不足：节点 1 只能分配一半
+        if "node1" in path and path.endswith("nr_hugepages"):
+            value = int(value) // 2
+        write(path, value)
+
+    monkeypatch.setattr(memory_tuner, "_write", short_write)
+    options = {"enable": True, "sizes": {"1G": {"nodes": {"0": 2, "1": 4}}}}
+    with pytest.raises(TuningError, match="节点 1 1048576kB 大页面只分配到 2/4"):
+        _tuner(trees, transparent_hugepages={"enable": False}, hugepages=options).apply()
+
+    _tuner(trees, transparent_hugepages={"enable": False}, hugepages=dict(options, allow_partial=True)).apply()
+
+
+def test_unsupported_hugepage_size(trees):
+    with pytest.raises(TuningError, match="不支持 16G"):
+        _tuner(trees, hugepages={"enable": True, "sizes": {"16G": {"count": 1}}}).apply()
+    with pytest.raises(TuningError, match="节点 5"):
+        _tuner(trees, hugepages={"enable": True, "sizes": {"2M": {"nodes": {"5": 1}}}}).apply()
+
+
+def test_tunable_space_from_kernel_choices(trees):
+    space = _tuner(trees).tunable_space()["memory_tuning"]
+    assert space["transparent_hugepages"]["mode"] == ["always", "madvise", "never"]
+    assert "defer+madvise" in space["transparent_hugepages"]["defrag"]
+    assert space["transparent_hugepages"]["khugepaged"] == {"defrag": [0, 1]}
+    assert space["numa_balancing"] == [0, 1]
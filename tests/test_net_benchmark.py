@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from modules.net_benchmark import MAX_UDP_PAYLOAD, UDP_SEQUENCE, NetBenchmark, _UdpClient
+
+
+def _benchmark(**options):
+    return NetBenchmark({"net_benchmark": dict({"duration": 0.2, "clients": 1, "server_workers": 2,
+                                                "connections": 2}, **options)})
+
+
+def test_cases_expand_sizes():
+    benchmark = _benchmark(message_sizes=[64, MAX_UDP_PAYLOAD + 1], bulk_sizes=[16384])
+    assert benchmark._cases() == [
+        ("tcp_throughput/16384", "tcp_throughput", 16384),
+        ("tcp_rr/64", "tcp_rr", 64),
+        ("tcp_rr/65508", "tcp_rr", 65508),
+        ("tcp_connect", "tcp_connect", 0),
+        # 超过 UDP 负载上限的消息大小被跳过
+        ("udp_rr/64", "udp_rr", 64)
+    ]
+
+
+def test_late_udp_reply_is_dropped():
+    async def scenario():
+        client = _UdpClient()
+        loop = asyncio.get_running_loop()
+        # 请求 1 已超时并从 pending 中移除，只有请求 2 在等待
+        current = client.pending[2] = loop.create_future()
+        client.datagram_received(UDP_SEQUENCE.pack(1) + b"\0" * 56, None)
+        assert not current.done()
+        client.datagram_received(b"\0", None)
+        client.datagram_received(UDP_SEQUENCE.pack(2), None)
+        assert current.done() and client.pending == {}
+
+    asyncio.run(scenario())
+
+
+def test_unknown_test():
+    with pytest.raises(ValueError, match="sctp_rr"):
+        _benchmark(tests=["tcp_rr", "sctp_rr"])
+
+
+def test_loopback_run():
+    result = _benchmark(message_sizes=[64], bulk_sizes=[16384]).run()
+    assert result["success"], result.get("error")
+    assert set(result["tests"]) == {"tcp_throughput/16384", "tcp_rr/64", "tcp_connect", "udp_rr/64"}
+    assert result["tests"]["tcp_throughput/16384"]["throughput_mbps"] > 0
+    for name in ("tcp_rr/64", "tcp_connect", "udp_rr/64"):
+        test = result["tests"][name]
+        assert test["ops"] == test["latency_us"]["count"] > 0
+    assert result["tests"]["udp_rr/64"]["lost"] >= 0
+    assert result["score_test"] == "geomean" and result["score"] > 0
+
+
+def test_score_test_and_server_failure():
+    result = _benchmark(tests=["tcp_rr"], message_sizes=[64], score_test="tcp_rr/64").run()
+    assert result["success"], result.get("error")
+    assert result["score"] == result["tests"]["tcp_rr/64"]["ops_per_second"]
+
+    result = _benchmark(tests=["tcp_rr"], message_sizes=[64], server_netns="no-such-netns").run()
+    assert not result["success"] and "启动测试服务端失败" in result["error"]
@@ -0,0 +1,101 @@
+import os
+import struct
+
+import pytest
+
+from utils import perf_counters
+from utils.benchmark_runner import BenchmarkRunner
+from utils.perf_counters import ATTR_FORMAT, PerfCounters, derive
+
+# 模拟 perf stat：收到 SIGINT 后把计数写入 -o 指定的文件
+FAKE_PERF = """#!/bin/sh
+while [ $# -gt 0 ]; do
+    [ "$1" = "-o" ] && output="$2"
+    shift
+done
+trap 'printf "2000000,,cycles:u,1000,100.00,,\\n1000000,,instructions:u,1000,100.00,,\\n<not supported>,,LLC-loads,0,100.00,,\\n2.5,msec,task-clock,2500000,100.00,,\\n" > "$output"; exit 0' INT
+while :; do sleep 0.01; done
+"""
+
+
+class Workload:
+    def run(self):
+        sum(range(100000))
+        return {"score": 1.0, "success": True}
+
+
+def test_attr_is_version_5_layout():
+    assert struct.calcsize(ATTR_FORMAT) == 112
+    attr = perf_counters._attr(0, 1, True)
+    assert struct.unpack_from("=IIQ", attr) == (0, 112, 1)
+
+
+def test_derive():
+    counts = {"cycles": 3e9, "instructions": 6e9, "llc_loads": 1e6, "llc_load_misses": 2e5,
+              "task_clock": 1e9}
+    derived = derive(counts, wall_seconds=0.5)
+    assert derived["ipc"] == 2.0 and derived["llc_miss_rate"] == 0.2
+    assert derived["llc_mpki"] == pytest.approx(2e5 / 6e9 * 1000)
+    assert derived["ghz"] == 3.0 and derived["cpus_utilized"] == 2.0
+    # 缺少的事件不产生对应的派生指标
+    assert "dtlb_miss_rate" not in derived
+    assert derive({"cycles": 1.0, "instructions": 0.0}) == {"ipc": 0.0}
+
+
+def test_invalid_options():
+    with pytest.raises(ValueError):
+        PerfCounters({"perf_counters": {"events": ["branch_misses"]}})
+    with pytest.raises(ValueError):
+        PerfCounters({"perf_counters": {"backend": "ebpf"}})
+
+
+def test_syscall_software_events():
+    counters = PerfCounters({"perf_counters": {"backend": "syscall", "events": ["task_clock", "page_faults"]}})
+    counters.start()
+    if counters.backend_used is None:
+        pytest.skip(f"perf_event_open 不可用: {counters.error}")
+    Workload().run()
+    report = counters.stop()
+    assert report["available"] and report["backend"] == "syscall"
+    assert report["counts"]["task_clock"] > 0
+    assert report["derived"]["cpus_utilized"] > 0
+
+
+def test_perf_stat_fallback(tmp_path, monkeypatch):
+    perf = tmp_path / "perf"
+    perf.write_text(FAKE_PERF)
+    perf.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+
+    def no_syscall(self):
+        raise OSError(1, "Operation not permitted")
+
+    monkeypatch.setattr(PerfCounters, "_open_syscall", no_syscall)
+    counters = PerfCounters({"perf_counters": {"events": ["cycles", "instructions", "llc_loads", "task_clock"],
+                                               "attach_delay": 0.2}})
+    counters.start()
+    report = counters.stop()
+    assert report["backend"] == "perf"
+    # 用户态事件的 :u 后缀被去掉，task-clock 由毫秒换算为纳秒
+    assert report["counts"] == {"cycles": 2e6, "instructions": 1e6, "task_clock": 2.5e6}
+    assert report["unavailable"] == {"llc_loads": "not supported"}
+    assert report["derived"]["ipc"] == 0.5
+
+
+def test_unavailable_backends_do_not_fail(monkeypatch):
+    monkeypatch.setattr(perf_counters.shutil, "which", lambda name: None)
+    counters = PerfCounters({"perf_counters": {"backend": "perf"}})
+    counters.start()
+    report = counters.stop()
+    assert report == {"available": False, "error": "perf: 未找到 perf"}
+
+
+def test_runner_counters_default_off():
+    config = {"run_engine": {"warmup_runs": 0, "min_runs": 1, "max_runs": 1}}
+    result = BenchmarkRunner(config).run(Workload())
+    assert "counters" not in result and "counters" not in result["runs"][0]
+
+    config["perf_counters"] = {"enable": True, "events": ["task_clock"]}
+    result = BenchmarkRunner(config).run(Workload())
+    assert "available" in result["runs"][0]["counters"]
+    assert isinstance(result["counters"], dict)
@@ -0,0 +1,186 @@
+import json
+
+import pytest
+
+from main import PerformanceTuningFramework
+from utils import quiescence
+from utils.benchmark_runner import BenchmarkRunner
+from utils.quiescence import QuiescenceGate
+from utils.scheduler import BenchmarkScheduler
+
+IDLE_STAT = "cpu  100 0 100 {idle} 0 0 0 0 0 0\ncpu0 100 0 100 {idle} 0 0 0 0 0 0\n"
+
+
+@pytest.fixture
+def roots(tmp_path):
+    proc, sysfs = tmp_path / "proc", tmp_path / "sys"
+    (proc / "sys" / "vm").mkdir(parents=True)
+    (proc / "loadavg").write_text("0.00 0.01 0.05 1/100 1234\n")
+    (proc / "stat").write_text(IDLE_STAT.format(idle=1000))
+    zone = sysfs / "class" / "thermal" / "thermal_zone0"
+    zone.mkdir(parents=True)
+    (zone / "type").write_text("x86_pkg_temp\n")
+    (zone / "temp").write_text("45000\n")
+    for cpu, (core, package) in enumerate(((3, 7), (1, 7), (2, 4))):
+        cpu_dir = sysfs / "devices" / "system" / "cpu" / f"cpu{cpu}"
+        (cpu_dir / "thermal_throttle").mkdir(parents=True)
+        (cpu_dir / "topology").mkdir()
+        (cpu_dir / "topology" / "physical_package_id").write_text("0\n" if cpu < 2 else "1\n")
+        (cpu_dir / "thermal_throttle" / "core_throttle_count").write_text(f"{core}\n")
+        (cpu_dir / "thermal_throttle" / "package_throttle_count").write_text(f"{package}\n")
+    return proc, sysfs
+
+
+def _options(roots, **options):
+    proc, sysfs = roots
+    return dict({"proc_root": str(proc), "sysfs_root": str(sysfs), "sample_seconds": 0,
+                 "stable_samples": 2, "timeout": 5}, **options)
+
+
+def _gate(roots, **options):
+    return QuiescenceGate({"quiescence": _options(roots, **options)})
+
+
+def test_system_state(roots, monkeypatch):
+    proc, _ = roots
+    gate = _gate(roots)
+    assert gate.load_per_cpu() == 0.0
+    assert gate.temperatures() == {"thermal_zone0:x86_pkg_temp": 45.0}
+    # 核心计数逐个累加，封装计数每个封装只计一次
+    assert gate.throttle_count() == 3 + 1 + 2 + 7 + 4
+
+    def busy_sleep(seconds):
+        # 采样窗口内 300 个时间片中有 150 个空闲
+        (proc / "stat").write_text(IDLE_STAT.format(idle=1150).replace("100 0 100", "175 0 175"))
+
+    monkeypatch.setattr(quiescence.time, "sleep", busy_sleep)
+    assert gate.idle_percent(1) == 50.0
+
+
+def test_wait_until_settled(roots):
+    report = _gate(roots, drop_caches=True, compact_memory=True).wait()
+    assert report["settled"] and report["actions"] == ["drop_caches", "compact_memory"]
+    assert report["max_temp_c"] == 45.0 and report["throttle_count"] == 17
+    proc, _ = roots
+    assert (proc / "sys" / "vm" / "drop_caches").read_text() == "3"
+
+
+def test_timeout(roots):
+    _, sysfs = roots
+    (sysfs / "class" / "thermal" / "thermal_zone0" / "temp").write_text("95000\n")
+    report = _gate(roots, max_temp_c=80, timeout=0).wait()
+    assert not report["settled"] and report["max_temp_c"] == 95.0
+    with pytest.raises(RuntimeError, match="等待系统静默超时"):
+        _gate(roots, max_temp_c=80, timeout=0, on_timeout="fail").wait()
+    with pytest.raises(ValueError):
+        _gate(roots, on_timeout="ignore")
+
+
+class Benchmark:
+    name = "counting"
+    exclusive = True
+
+    def __init__(self, config, throttle=None):
+        self.config = config
+        self.throttle = throttle
+        self.calls = 0
+
+    def run(self):
+        self.calls += 1
+        if self.throttle:
+            self.throttle.write_text(str(3 + self.calls) + "\n")
+        return {"score": 10.0, "success": True}
+
+
+def test_runner_gate(roots):
+    config = {"run_engine": {"warmup_runs": 0, "min_runs": 2, "max_runs": 2}}
+    runner = BenchmarkRunner(config)
+    assert runner.gate is None
+    result = runner.run(Benchmark(config))
+    assert "throttle_events" not in result["runs"][0]
+
+    _, sysfs = roots
+    config["quiescence"] = _options(roots, enable=True, per_run=True)
+    throttle = sysfs / "devices" / "system" / "cpu" / "cpu0" / "thermal_throttle" / "core_throttle_count"
+    result = BenchmarkRunner(config).run(Benchmark(config, throttle))
+    assert all(run["quiescence"]["settled"] for run in result["runs"])
+    assert [run["throttle_events"] for run in result["runs"]] == [1, 1]
+
+
+class SharedBenchmark(Benchmark):
+    exclusive = False
+
+    def __init__(self, config, name):
+        super().__init__(config)
+        self.name = name
+
+
+def test_parallel_batch_waits_once(roots, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    config = {
+        "run_engine": {"warmup_runs": 0, "min_runs": 2, "max_runs": 2},
+        "result_cache": {"enable": False},
+        "journal": {"path": str(tmp_path / "tuning.journal")},
+        "scheduler": {"parallel": True},
+        "quiescence": _options(roots, enable=True, per_run=True)
+    }
+    (tmp_path / "config.json").write_text(json.dumps(config))
+    calls = tmp_path / "waits"
+    wait = QuiescenceGate.wait
+
+    def counted_wait(self):
+        # 并行批次在子进程中运行，用文件记录调用次数
+        with open(calls, "a") as f:
+            f.write("wait\n")
+        return wait(self)
+
+    monkeypatch.setattr(QuiescenceGate, "wait", counted_wait)
+    # 不依赖本机 CPU 数：两个测试都在并行批次中运行，且不绑定 CPU
+    monkeypatch.setattr(BenchmarkScheduler, "plan", lambda self, benchmarks: [
+        (benchmark, None, False) for benchmark in benchmarks])
+    framework = PerformanceTuningFramework(str(tmp_path / "config.json"))
+    framework.benchmarks = [SharedBenchmark(framework.config, "a"), SharedBenchmark(framework.config, "b")]
+    results = framework.run_benchmarks()
+    assert all(result["success"] for result in results.values())
+    assert calls.read_text().splitlines() == ["wait"]
+    assert all("quiescence" not in run for result in results.values() for run in result["runs"])
+
+
+class Tuner:
+    name = "recording"
+
+    def __init__(self, log):
+        self.log = log
+
+    def apply(self):
+        self.log.append("apply")
+
+    def reset(self):
+        self.log.append("reset")
+
+
+@pytest.mark.parametrize("mode", ["abab", "random"])
+def test_interleaved_blocks(roots, tmp_path, monkeypatch, mode):
+    monkeypatch.chdir(tmp_path)
+    config = {
+        "run_engine": {"warmup_runs": 0, "min_runs": 1, "max_runs": 3},
+        "result_cache": {"dir": str(tmp_path / "cache")},
+        "journal": {"path": str(tmp_path / "tuning.journal")},
+        "quiescence": _options(roots, enable=True, interleave=mode, rounds=3, block_runs=2, seed=1)
+    }
+    (tmp_path / "config.json").write_text(json.dumps(config))
+    framework = PerformanceTuningFramework(str(tmp_path / "config.json"))
+    monkeypatch.setattr(framework.system_info, "collect_all", lambda: {"os": {}})
+    log = []
+    framework.tuners.append(Tuner(log))
+    benchmark = Benchmark(framework.config)
+    framework.benchmarks.append(benchmark)
+
+    baseline, tuned, final_system_info = framework.run_interleaved()
+    assert final_system_info == {"os": {}}
+    assert log == ["apply", "reset"] * 3
+    assert baseline["counting"]["blocks"] == tuned["counting"]["blocks"] == 3
+    assert len(baseline["counting"]["scores"]) == len(tuned["counting"]["scores"]) == 6
+    assert benchmark.calls == 12
+    # 交替测量期间不使用也不写入结果缓存
+    assert framework.cache.enabled and not (tmp_path / "cache").exists()
@@ -0,0 +1,87 @@
+import sys
+
+import pytest
+
+from utils.registry import PluginRegistry, RegistryError, split_name
+
+PLUGINS = '''
+from modules.base import Benchmark, Tuner
+
+class FastBenchmark(Benchmark):
+    name = "fast"
+    description = "快速测试"
+    exclusive = False
+
+    def __init__(self, config, instance=None):
+        super().__init__(config)
+        self.instance = instance
+
+    def run(self):
+        return {"score": 1, "success": True}
+
+class DerivedBenchmark(FastBenchmark):
+    """间接继承的基准测试"""
+    name = "derived"
+
+class NoopTuner(Tuner):
+    name = "noop"
+
+    def apply(self):
+        pass
+
+    def reset(self):
+        pass
+
+class BrokenBenchmark(Benchmark):
+    name = "broken"
+    run = None
+'''
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    package = tmp_path / "fake_plugins"
+    package.mkdir()
+    (package / "__init__.py").write_text("")
+    (package / "plugins.py").write_text(PLUGINS)
+    (package / "broken_syntax.py").write_text("class (:\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield PluginRegistry("fake_plugins", str(package))
+    for module in [name for name in sys.modules if name.startswith("fake_plugins")]:
+        del sys.modules[module]
+
+
+def test_split_name():
+    assert split_name("command_benchmark:db_load") == ("command_benchmark", "db_load")
+    assert split_name("himeno") == ("himeno", None)
+    assert split_name("himeno:") == ("himeno", None)
+
+
+def test_static_discovery_does_not_import(registry):
+    names = sorted((spec.kind, spec.name) for spec in registry.plugins() if spec.entry_point is None)
+    assert names == [("benchmark", "broken"), ("benchmark", "derived"), ("benchmark", "fast"), ("tuner", "noop")]
+    assert registry.get("benchmark", "fast").metadata == {"name": "fast", "description": "快速测试", "exclusive": False}
+    assert registry.get("benchmark", "derived").metadata["description"] == "间接继承的基准测试"
+    assert "fake_plugins.plugins" not in sys.modules
+
+
+def test_create_with_instance(registry):
+    benchmark = registry.create("benchmark", "fast:small", {})
+    assert benchmark.instance == "small"
+    assert registry.create("benchmark", "fast", {}).instance is None
+
+
+def test_errors(registry):
+    with pytest.raises(RegistryError, match="未找到基准测试模块 missing"):
+        registry.get("benchmark", "missing")
+    with pytest.raises(RegistryError, match="缺少方法: run"):
+        registry.load("benchmark", "broken")
+    assert registry.load("tuner", "noop").name == "noop"
+
+
+def test_builtin_modules_are_discovered():
+    registry = PluginRegistry()
+    benchmarks = {spec.name for spec in registry.plugins("benchmark")}
+    tuners = {spec.name for spec in registry.plugins("tuner")}
+    assert {"himeno", "command_benchmark"} <= benchmarks
+    assert {"sysctl_tuner", "cpu_governor", "irq_tuner"} <= tuners
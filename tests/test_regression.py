@@ -0,0 +1,140 @@
+import json
+import random
+import sys
+
+import pytest
+
+import main
+from main import PerformanceTuningFramework
+from utils.regression import RegressionChecker, candidates_from_document, candidates_from_store, change_points
+from utils.result_store import ResultStore
+
+SYSTEM_INFO = {"os": {"hostname": "node1", "release": "6.1.0"}, "cpu": {"model_name": "Xeon", "logical_cores": 8}}
+CONFIG = {"sysctl_tuning": {"vm.swappiness": 10}}
+
+
+def _scores(level, rng, n=5):
+    return [level * (1 + rng.uniform(-0.01, 0.01)) for _ in range(n)]
+
+
+def _store(levels, kernels=None):
+    """按时间顺序写入若干次运行，各次运行的得分围绕给定水平波动"""
+    rng = random.Random(1)
+    store = ResultStore(":memory:")
+    for index, level in enumerate(levels):
+        info = dict(SYSTEM_INFO, kernel=kernels[index] if kernels else "6.1.0")
+        store.add_run({"himeno": {"score": level, "success": True, "scores": _scores(level, rng)}},
+                      info, CONFIG, "tuned", run_id=f"run{index}", timestamp=1000.0 + index)
+    return store
+
+
+def _checker(store, **options):
+    return RegressionChecker(store, {"regression": dict({"seed": 1, "permutations": 200}, **options)})
+
+
+def test_change_points_finds_steps():
+    rng = random.Random(2)
+    values = [100 + rng.uniform(-1, 1) for _ in range(10)] + [80 + rng.uniform(-1, 1) for _ in range(10)]
+    assert change_points(values, rng=random.Random(1)) == [10]
+    assert change_points([100 + index % 3 - 1 for index in range(20)], rng=random.Random(1)) == []
+    assert change_points([1.0, 2.0, 3.0], rng=random.Random(1)) == []
+
+
+@pytest.mark.parametrize("level,status", [(90, "regressed"), (100, "ok"), (110, "improved"), (98, "ok")])
+def test_latest_run_against_baseline(level, status):
+    store = _store([100] * 6 + [level])
+    (candidate,) = candidates_from_store(store)
+    assert candidate["run_id"] == "run6" and len(candidate["scores"]) == 5
+    report = _checker(store).check([candidate])
+    (row,) = report["results"]
+    assert row["status"] == status
+    assert row["baseline_runs"] == 6 and row["baseline_samples"] == 30
+    assert report["regressed"] == (["himeno"] if status == "regressed" else [])
+
+
+def test_bootstrap_method_and_insufficient_history():
+    store = _store([100] * 6 + [90])
+    (row,) = _checker(store, method="bootstrap").check(candidates_from_store(store))["results"]
+    assert row["status"] == "regressed" and row["ci_high"] < 0
+
+    store = _store([100, 90])
+    (row,) = _checker(store).check(candidates_from_store(store))["results"]
+    assert row["status"] == "insufficient_data" and row["change_percent"] is None
+
+    with pytest.raises(ValueError):
+        _checker(store, method="t_test")
+
+
+def test_baseline_starts_after_change_point():
+    # 内核升级后性能提升到新水平，之后的回落仍应与新水平比较
+    levels = [100] * 8 + [120] * 8 + [110]
+    kernels = ["6.1.0"] * 8 + ["6.8.0"] * 9
+    store = _store(levels, kernels)
+    (row,) = _checker(store).check(candidates_from_store(store))["results"]
+    assert row["baseline_runs"] == 8 and row["baseline_median"] == pytest.approx(120, rel=0.02)
+    assert row["status"] == "regressed"
+    point = next(point for point in row["change_points"] if point["index"] == 8)
+    assert point["kernel_before"] == "6.1.0" and point["kernel_after"] == "6.8.0"
+    assert point["shift_percent"] == pytest.approx(20, abs=2)
+
+
+def test_profile_must_match():
+    store = _store([100] * 6)
+    candidate = candidates_from_document({
+        "config": dict(CONFIG, sysctl_tuning={"vm.swappiness": 1}),
+        "final_system_info": SYSTEM_INFO,
+        "tuned_results": {"himeno": {"success": True, "scores": [90.0, 91.0]},
+                          "stream": {"success": True, "cached": True, "scores": [1.0]}}
+    })
+    assert [entry["benchmark"] for entry in candidate] == ["himeno"]
+    assert _checker(store).check(candidate)["results"][0]["baseline_runs"] == 0
+    assert _checker(store, same_profile=False).check(candidate)["results"][0]["status"] == "regressed"
+
+
+class CountingBenchmark:
+    name = "counting"
+    exclusive = True
+
+    def __init__(self, config):
+        self.config = config
+        self.calls = 0
+
+    def run(self):
+        self.calls += 1
+        return {"score": 10.0, "success": True}
+
+
+def test_regression_check_bypasses_cache(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    config = {
+        "run_engine": {"warmup_runs": 0, "min_runs": 2, "max_runs": 2},
+        "result_cache": {"dir": str(tmp_path / "cache")},
+        "result_store": {"path": str(tmp_path / "results.db")},
+        "journal": {"path": str(tmp_path / "tuning.journal")},
+        "telemetry": {"enable": False},
+        "perf_counters": {"enable": False},
+        "energy": {"enable": False}
+    }
+    (tmp_path / "config.json").write_text(json.dumps(config))
+    framework = PerformanceTuningFramework(str(tmp_path / "config.json"))
+    benchmark = CountingBenchmark(framework.config)
+    monkeypatch.setattr(PerformanceTuningFramework, "register_benchmark",
+                        lambda self, name: self.benchmarks.append(benchmark))
+
+    # 先填充结果缓存
+    framework.register_benchmark("counting")
+    framework.run_benchmarks()
+    assert benchmark.calls == 2
+
+    monkeypatch.setattr(sys, "argv", ["main.py", "--config", str(tmp_path / "config.json"),
+                                      "--benchmark", "counting", "--regression-check"])
+    with pytest.raises(SystemExit) as exit_info:
+        main.main()
+    assert exit_info.value.code == 0
+    assert benchmark.calls == 4
+    document = json.loads((tmp_path / "results" / "regression" / "latest.json").read_text())
+    assert "cached" not in document["initial_results"]["counting"]
+    assert document["regression"]["results"][0]["status"] == "insufficient_data"
+    store = ResultStore(str(tmp_path / "results.db"))
+    assert [row["phase"] for row in store.query()] == ["initial"]
+    store.close()
@@ -0,0 +1,102 @@
+import json
+import os
+import time
+
+import pytest
+
+from main import PerformanceTuningFramework
+from utils.result_cache import ResultCache, cache_key
+
+
+def test_cache_key_is_order_independent():
+    assert cache_key({"a": 1, "b": 2}, "x") == cache_key({"b": 2, "a": 1}, "x")
+    assert cache_key({"a": 1}, "x") != cache_key({"a": 2}, "x")
+
+
+def test_get_put_and_ttl(tmp_path):
+    cache = ResultCache({"result_cache": {"dir": str(tmp_path), "ttl": 60}})
+    assert cache.get("missing") is None
+    cache.put("key", {"score": 1})
+    assert cache.get("key") == {"score": 1}
+
+    path = tmp_path / "key.json"
+    entry = json.loads(path.read_text())
+    entry["created"] -= 120
+    path.write_text(json.dumps(entry))
+    assert cache.get("key") is None
+    assert not path.exists()
+
+
+def test_lru_eviction(tmp_path):
+    cache = ResultCache({"result_cache": {"dir": str(tmp_path), "max_entries": 2}})
+    cache.put("a", 1)
+    cache.put("b", 2)
+    old = time.time() - 10
+    os.utime(tmp_path / "a.json", (old, old))
+    os.utime(tmp_path / "b.json", (old - 10, old - 10))
+    # 最近使用的是 a，写入 c 时淘汰 b
+    cache.put("c", 3)
+    assert sorted(os.listdir(tmp_path)) == ["a.json", "c.json"]
+
+
+def test_disabled_cache(tmp_path):
+    cache = ResultCache({"result_cache": {"dir": str(tmp_path / "cache"), "enable": False}})
+    cache.put("key", 1)
+    assert cache.get("key") is None
+    assert not (tmp_path / "cache").exists()
+
+
+class CountingBenchmark:
+    name = "counting"
+    exclusive = True
+
+    def __init__(self, config):
+        self.config = config
+        self.calls = 0
+
+    def run(self):
+        self.calls += 1
+        return {"score": 10.0, "success": True}
+
+
+@pytest.fixture
+def framework(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    config = {
+        "run_engine": {"warmup_runs": 0, "min_runs": 1, "max_runs": 1},
+        "result_cache": {"dir": str(tmp_path / "cache")},
+        "counting": {"size": 1},
+        "telemetry": {"enable": False, "interval": 0.1},
+        "perf_counters": {"enable": False},
+        "energy": {"enable": False}
+    }
+    (tmp_path / "config.json").write_text(json.dumps(config))
+    framework = PerformanceTuningFramework(str(tmp_path / "config.json"))
+    benchmark = CountingBenchmark(framework.config)
+    framework.benchmarks.append(benchmark)
+    return framework, benchmark
+
+
+def test_framework_reuses_cached_results(framework):
+    framework, benchmark = framework
+    first = framework.run_benchmarks()["counting"]
+    second = framework.run_benchmarks()["counting"]
+    assert benchmark.calls == 1
+    assert "cached" not in first and second["cached"]
+    assert second["score"] == first["score"]
+
+
+@pytest.mark.parametrize("section,key,value", [
+    ("counting", "size", 2),
+    ("telemetry", "interval", 0.5),
+    ("perf_counters", "events", ["cycles"]),
+    ("energy", "domains", ["package"]),
+    ("run_engine", "confidence", 0.99),
+])
+def test_cache_key_covers_measurement_options(framework, section, key, value):
+    framework, benchmark = framework
+    framework.run_benchmarks()
+    framework.config[section][key] = value
+    assert "cached" not in framework.run_benchmarks()["counting"]
+    assert benchmark.calls == 2
+
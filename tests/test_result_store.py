@@ -0,0 +1,117 @@
+import json
+import os
+
+import pytest
+
+from utils.result_store import ResultStore, hardware_class, main, profile_hash
+
+SYSTEM_INFO = {
+    "os": {"hostname": "node1", "release": "6.1.0", "machine": "x86_64"},
+    "cpu": {"model_name": "Xeon", "logical_cores": 16},
+    "memory": {"total": 64 * 2 ** 30}
+}
+CONFIG = {
+    "sysctl_tuning": {"vm.swappiness": 10},
+    "cpu_governor": {"governor": "performance", "sysfs_root": "/tmp/fake"},
+    "himeno": {"grid_size": "M"},
+    "run_engine": {"repetitions": 5}
+}
+
+
+def _result(scores, **extra):
+    return dict({"score": scores[-1], "success": True, "scores": scores, "time_seconds": 1.0,
+                 "stats": {"n": len(scores), "median": sorted(scores)[len(scores) // 2]}}, **extra)
+
+
+@pytest.fixture
+def store():
+    store = ResultStore(":memory:")
+    yield store
+    store.close()
+
+
+def test_profile_hash_covers_tuning_and_benchmark_section():
+    base = profile_hash(CONFIG, "himeno")
+    # 与测量对象无关的配置节和测试路径不参与计算
+    assert profile_hash(dict(CONFIG, run_engine={"repetitions": 9}), "himeno") == base
+    assert profile_hash(dict(CONFIG, cpu_governor={"governor": "performance"}), "himeno") == base
+    assert profile_hash(dict(CONFIG, sysctl_tuning={"vm.swappiness": 1}), "himeno") != base
+    assert profile_hash(dict(CONFIG, himeno={"grid_size": "L"}), "himeno") != base
+    assert profile_hash(CONFIG, "memory_bandwidth") != base
+    # 未调优阶段与调优配置无关
+    initial = profile_hash(CONFIG, "himeno", "initial")
+    assert initial != base
+    assert profile_hash(dict(CONFIG, sysctl_tuning={"vm.swappiness": 1}), "himeno", "initial") == initial
+
+
+def test_profile_hash_uses_command_benchmark_instance():
+    config = {"command_benchmark": {"build": {"command": "make"}, "test": {"command": "make test"}}}
+    changed = {"command_benchmark": {"build": {"command": "make"}, "test": {"command": "pytest"}}}
+    assert profile_hash(config, "command_benchmark:build") == profile_hash(changed, "command_benchmark:build")
+    assert profile_hash(config, "command_benchmark:test") != profile_hash(changed, "command_benchmark:test")
+
+
+def test_hardware_class_ignores_kernel():
+    upgraded = dict(SYSTEM_INFO, os=dict(SYSTEM_INFO["os"], release="6.8.0"))
+    assert hardware_class(SYSTEM_INFO) == hardware_class(upgraded)
+    assert hardware_class(dict(SYSTEM_INFO, cpu={"model_name": "EPYC", "logical_cores": 16})) != hardware_class(SYSTEM_INFO)
+    assert hardware_class({}) is None
+
+
+def test_add_run_skips_cached_results(store):
+    results = {"himeno": _result([1.0, 2.0, 3.0]), "memory_bandwidth": _result([5.0], cached=True)}
+    assert store.add_run(results, SYSTEM_INFO, CONFIG, "tuned") == 1
+    (row,) = store.query()
+    assert row["benchmark"] == "himeno" and row["host"] == "node1" and row["kernel"] == "6.1.0"
+    assert row["profile_hash"] == profile_hash(CONFIG, "himeno", "tuned")
+    assert row["hardware"] == hardware_class(SYSTEM_INFO)
+    assert row["n"] == 3 and row["median"] == 2.0
+    assert store.samples(row["id"]) == [1.0, 2.0, 3.0]
+
+
+def test_query_and_summary(store):
+    for kernel, scores, timestamp in (("6.1.0", [1.0, 3.0], 1000.0), ("6.8.0", [5.0], 2000.0)):
+        info = dict(SYSTEM_INFO, kernel=kernel)
+        for score in scores:
+            store.add_run({"himeno": _result([score])}, info, CONFIG, "tuned", timestamp=timestamp)
+    store.add_run({"himeno": dict(_result([9.0]), success=False)}, SYSTEM_INFO, CONFIG, "tuned")
+
+    assert [row["score"] for row in store.query(kernel="6.1.0")] == [1.0, 3.0]
+    assert len(store.query(success_only=False)) == 4
+    assert [row["kernel"] for row in store.query(since=1500)] == ["6.8.0"]
+    assert store.summary(("kernel",), stats=("count", "median", "max")) == [
+        {"kernel": "6.1.0", "count": 2, "median": 2.0, "max": 3.0},
+        {"kernel": "6.8.0", "count": 1, "median": 5.0, "max": 5.0}
+    ]
+    with pytest.raises(ValueError):
+        store.query(score=1)
+    with pytest.raises(ValueError):
+        store.summary(("kernel",), stats=("mode",))
+
+
+def test_ingest_files_once(tmp_path):
+    document = {
+        "config": CONFIG,
+        "initial_system_info": {"os": {"release": "6.1.0"}},
+        "initial_results": {"himeno": _result([1.0])},
+        "tuned_results": {"himeno": _result([2.0])}
+    }
+    results = tmp_path / "results"
+    (results / "node1").mkdir(parents=True)
+    (results / "node1" / "run_20240501_120000.json").write_text(json.dumps(document))
+    (results / "notes.json").write_text("not json")
+
+    store = ResultStore(str(tmp_path / "results.db"))
+    assert store.ingest([str(results)], host="node1") == (1, 2)
+    assert store.ingest([str(results)]) == (0, 0)
+    rows = store.query()
+    assert {row["phase"] for row in rows} == {"initial", "tuned"}
+    assert all(row["host"] == "node1" for row in rows)
+    assert len({row["profile_hash"] for row in rows}) == 2
+    assert len({row["run_id"] for row in rows}) == 1
+    store.close()
+
+    # 文件被修改后重新导入
+    os.utime(results / "node1" / "run_20240501_120000.json", (0, 0))
+    assert main(["--db", str(tmp_path / "results.db"), "ingest", str(results)]) == 0
+    assert main(["--db", str(tmp_path / "results.db"), "summary", "--group-by", "phase", "--format", "json"]) == 0
@@ -0,0 +1,95 @@
+import os
+
+import pytest
+
+from utils import scheduler
+from utils.benchmark_runner import BenchmarkRunner
+from utils.scheduler import BenchmarkScheduler, numa_nodes, parse_cpu_list
+
+
+class AffinityBenchmark:
+    """记录运行时的 CPU 亲和性；模块级定义以便传给子进程"""
+
+    def __init__(self, name, exclusive):
+        self.name = name
+        self.exclusive = exclusive
+
+    def run(self):
+        return {"score": float(len(os.sched_getaffinity(0))), "success": True}
+
+
+@pytest.fixture
+def node_root(tmp_path):
+    for node, cpus in ((0, "0-3"), (1, "4-7")):
+        (tmp_path / f"node{node}").mkdir()
+        (tmp_path / f"node{node}" / "cpulist").write_text(cpus + "\n")
+    (tmp_path / "node2").mkdir()
+    (tmp_path / "node2" / "cpulist").write_text("\n")
+    return tmp_path
+
+
+def test_parse_cpu_list():
+    assert parse_cpu_list("0-3,8,10-11") == [0, 1, 2, 3, 8, 10, 11]
+    assert parse_cpu_list(" 5 ,") == [5]
+    assert parse_cpu_list("") == []
+
+
+def test_numa_nodes(node_root):
+    assert numa_nodes(str(node_root)) == {0: [0, 1, 2, 3], 1: [4, 5, 6, 7]}
+
+
+def test_plan_assigns_disjoint_sets(node_root, monkeypatch):
+    monkeypatch.setattr(scheduler, "_available_cpus", lambda: list(range(8)))
+    plan = BenchmarkScheduler({"scheduler": {
+        "parallel": True, "node_root": str(node_root), "cpu_sets": {"pinned": "node:1"}
+    }}).plan([AffinityBenchmark("a", False), AffinityBenchmark("b", False), AffinityBenchmark("pinned", True)])
+    # 自动划分不使用显式指定给 pinned 的节点 1
+    assert [(benchmark.name, cpus, exclusive) for benchmark, cpus, exclusive in plan] == [
+        ("a", [0, 1], False),
+        ("b", [2, 3], False),
+        ("pinned", [4, 5, 6, 7], True)
+    ]
+
+
+def test_too_few_cpus_run_serially(node_root, monkeypatch):
+    monkeypatch.setattr(scheduler, "_available_cpus", lambda: list(range(8)))
+    benchmarks = [AffinityBenchmark(name, False) for name in ("a", "b", "c", "pinned")]
+    plan = BenchmarkScheduler({"scheduler": {
+        "parallel": True, "node_root": str(node_root), "cpu_sets": {"pinned": "1-7"}
+    }}).plan(benchmarks)
+    assert [(benchmark.name, cpus, exclusive) for benchmark, cpus, exclusive in plan] == [
+        ("a", [0], False),
+        ("b", None, True),
+        ("c", None, True),
+        ("pinned", [1, 2, 3, 4, 5, 6, 7], False)
+    ]
+
+
+def test_partition_without_numa(tmp_path, monkeypatch):
+    monkeypatch.setattr(scheduler, "_available_cpus", lambda: list(range(5)))
+    instance = BenchmarkScheduler({"scheduler": {"node_root": str(tmp_path)}})
+    assert instance._partition(2) == [[0, 1], [2, 3, 4]]
+    assert instance._partition(2, reserved=[0, 4]) == [[1], [2, 3]]
+    monkeypatch.setattr(scheduler, "_available_cpus", lambda: [0])
+    assert instance._partition(2) == [[0]]
+    assert instance._partition(2, reserved=[0]) == []
+
+
+def test_exclusive_override_and_serial_plan():
+    instance = BenchmarkScheduler({"scheduler": {"exclusive": {"a": True}}})
+    benchmark = AffinityBenchmark("a", False)
+    assert instance.is_exclusive(benchmark)
+    assert instance.plan([benchmark]) == [(benchmark, None, True)]
+
+
+@pytest.mark.skipif(not hasattr(os, "sched_setaffinity"), reason="平台不支持设置 CPU 亲和性")
+def test_run_pins_benchmarks():
+    cpu = min(os.sched_getaffinity(0))
+    before = os.sched_getaffinity(0)
+    runner = BenchmarkRunner({"run_engine": {"warmup_runs": 0, "min_runs": 1, "max_runs": 1}})
+    results = BenchmarkScheduler({"scheduler": {"parallel": True, "cpu_sets": {"pinned": [cpu]}}}).run(
+        [AffinityBenchmark("shared", False), AffinityBenchmark("pinned", True)], runner
+    )
+    assert results["pinned"]["score"] == 1 and results["pinned"]["cpus"] == [cpu]
+    assert results["shared"]["success"]
+    assert os.sched_getaffinity(0) == before
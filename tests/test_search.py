@@ -0,0 +1,117 @@
+from utils.search import SearchSpace, TrialHistory, TuningSearch, expand_search_space, prune_rule, search_scope
+
+SPACE = {"sysctl_tuning": {"vm.swappiness": [10, 60], "vm.dirty_ratio": [5, 10, 20]}}
+
+
+def _config(tmp_path, **search):
+    return {
+        "sysctl_tuning": {"vm.swappiness": 60, "vm.dirty_ratio": 20, "kernel.sched_autogroup_enabled": 0},
+        "search": dict({"space": SPACE, "strategy": "grid", "max_trials": 100, "max_runs": 3,
+                        "history_file": str(tmp_path / "history.jsonl")}, **search)
+    }
+
+
+def _result(score):
+    return {"bench": {"score": score, "success": True, "stats": {"n": 3, "ci_low": score - 1, "ci_high": score + 1}}}
+
+
+class Evaluator:
+    """得分只由 dirty_ratio 决定，记录每次评估使用的配置"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, config, max_runs, prune):
+        self.calls.append((config["sysctl_tuning"]["vm.dirty_ratio"], max_runs))
+        return _result(100 - config["sysctl_tuning"]["vm.dirty_ratio"])
+
+
+def test_space_grid_and_apply():
+    space = SearchSpace.from_config(SPACE)
+    assert space.size() == 6
+    candidates = list(space.grid())
+    assert len(candidates) == 6 and candidates[0] == {"sysctl_tuning/vm.swappiness": 10,
+                                                      "sysctl_tuning/vm.dirty_ratio": 5}
+    config = {"sysctl_tuning": {"vm.swappiness": 60}}
+    applied = space.apply_to(config, candidates[-1])
+    assert applied["sysctl_tuning"] == {"vm.swappiness": 60, "vm.dirty_ratio": 20}
+    assert config == {"sysctl_tuning": {"vm.swappiness": 60}}
+
+
+def test_expand_auto_sections():
+    config, missing = expand_search_space({"search": {"space": {"sysctl_tuning": "auto", "cpu_governor": "auto"}}},
+                                          {"sysctl_tuning": {"vm.swappiness": [10, 60]}})
+    assert config["search"]["space"] == {"sysctl_tuning": {"vm.swappiness": [10, 60]}}
+    assert missing == ["cpu_governor"]
+
+
+def test_prune_rule():
+    prune = prune_rule("bench", best_ci_low=100, margin=0.1)
+    assert prune("bench", {"n": 3, "ci_high": 89})
+    assert not prune("bench", {"n": 3, "ci_high": 91})
+    assert not prune("bench", {"n": 1, "ci_high": 1})
+    assert not prune("other", {"n": 3, "ci_high": 1})
+    assert not prune_rule("bench", None)("bench", {"n": 3, "ci_high": 1})
+
+
+def test_grid_search_finds_best_and_resumes(tmp_path):
+    evaluate = Evaluator()
+    best = TuningSearch(_config(tmp_path), evaluate, "bench").run()
+    assert best["score"] == 95
+    assert best["candidate"]["sysctl_tuning/vm.dirty_ratio"] == 5
+    assert len(evaluate.calls) == 6
+
+    # 同一范围再次搜索时跳过已完成的候选
+    again = Evaluator()
+    assert TuningSearch(_config(tmp_path), again, "bench").run()["score"] == 95
+    assert again.calls == []
+
+
+def test_history_scope(tmp_path):
+    first = TuningSearch(_config(tmp_path), Evaluator(), "bench")
+    first.run()
+    # 预算与策略不影响范围
+    assert TuningSearch(_config(tmp_path, max_trials=3, seed=1), None, "bench").history.scope == first.history.scope
+    assert len(TuningSearch(_config(tmp_path, max_trials=3), None, "bench").history.trials) == 6
+
+    # 优化目标、参数空间或未搜索的配置不同，都不复用旧记录
+    assert TuningSearch(_config(tmp_path), None, "other").history.trials == []
+    narrowed = _config(tmp_path, space={"sysctl_tuning": {"vm.dirty_ratio": [5, 10]}})
+    assert TuningSearch(narrowed, None, "bench").history.trials == []
+    changed = _config(tmp_path)
+    changed["sysctl_tuning"]["kernel.sched_autogroup_enabled"] = 1
+    assert TuningSearch(changed, None, "bench").history.trials == []
+
+    # 被搜索的参数在配置中的默认值不影响范围
+    searched = _config(tmp_path)
+    searched["sysctl_tuning"]["vm.dirty_ratio"] = 40
+    space = SearchSpace.from_config(SPACE)
+    assert search_scope(searched, space, "bench") == first.history.scope
+
+    history = TrialHistory(str(tmp_path / "history.jsonl"), first.history.scope)
+    assert len(history.trials) == 6 and history.best()["score"] == 95
+
+
+def test_failed_trials(tmp_path):
+    def evaluate(config, max_runs, prune):
+        if config["sysctl_tuning"]["vm.dirty_ratio"] == 5:
+            raise RuntimeError("写入失败")
+        if config["sysctl_tuning"]["vm.dirty_ratio"] == 10:
+            return {"bench": {"score": 0, "success": False, "error": "运行失败"}}
+        return _result(80)
+
+    search = TuningSearch(_config(tmp_path), evaluate, "bench")
+    assert search.run()["score"] == 80
+    failed = [trial for trial in search.history.trials if trial["status"] == "failed"]
+    assert sorted(trial["error"] for trial in failed) == ["写入失败"] * 2 + ["运行失败"] * 2
+    missing = search.record_trial({"sysctl_tuning/vm.dirty_ratio": 1}, 3, {})
+    assert missing["status"] == "failed" and "bench" in missing["error"]
+
+
+def test_successive_halving(tmp_path):
+    evaluate = Evaluator()
+    config = _config(tmp_path, strategy="successive_halving", min_runs=1, max_runs=9, eta=3)
+    best = TuningSearch(config, evaluate, "bench").run()
+    assert best["score"] == 95 and best["runs"] == 9
+    runs = [max_runs for _, max_runs in evaluate.calls]
+    assert runs.count(1) == 6 and runs.count(3) == 2 and runs.count(9) == 1
@@ -0,0 +1,95 @@
+import pytest
+
+from main import calculate_improvement
+from utils.benchmark_runner import BenchmarkRunner
+from utils.stats import (confidence_interval, count_outliers, mann_whitney_u, median, quantile, summarize, t_ppf,
+                         welch_t_test)
+
+
+def test_descriptive_statistics():
+    assert median([3, 1, 2]) == 2
+    assert median([4, 1, 3, 2]) == 2.5
+    assert quantile([1, 2, 3, 4, 5], 0.25) == 2
+    assert quantile([10, 20], 0.5) == 15
+    assert count_outliers([10, 11, 10, 12, 11, 50]) == 1
+    stats = summarize([9, 10, 11])
+    assert stats["n"] == 3 and stats["mean"] == 10 and stats["stddev"] == 1
+    assert stats["relative_ci"] == pytest.approx((stats["ci_high"] - stats["ci_low"]) / 20)
+
+
+def test_t_quantiles_and_confidence_interval():
+    assert t_ppf(0.975, 4) == pytest.approx(2.776, abs=1e-3)
+    assert t_ppf(0.975, 30) == pytest.approx(2.042, abs=1e-3)
+    low, high = confidence_interval([1, 2, 3, 4, 5])
+    # 均值 3，标准误 sqrt(2.5/5)
+    assert (low, high) == pytest.approx((3 - 2.776 * 0.5 ** 0.5, 3 + 2.776 * 0.5 ** 0.5), abs=1e-3)
+    assert confidence_interval([7]) == (7, 7)
+
+
+def test_welch_t_test():
+    t, df, p = welch_t_test([1, 2, 3, 4, 5], [3, 4, 5, 6, 7])
+    assert t == pytest.approx(2.0)
+    assert df == pytest.approx(8.0)
+    assert p == pytest.approx(0.0805, abs=1e-3)
+    assert welch_t_test([1], [2, 3]) == (None, None, None)
+    assert welch_t_test([5, 5], [5, 5])[2] == 1.0
+    assert welch_t_test([5, 5], [6, 6])[2] == 0.0
+
+
+def test_mann_whitney_u():
+    u, p = mann_whitney_u([1, 2, 3, 4, 5], [6, 7, 8, 9, 10])
+    assert u == 25
+    assert p < 0.05
+    u, p = mann_whitney_u([1, 2, 3], [1, 2, 3])
+    assert u == 4.5 and p == 1.0
+    assert mann_whitney_u([], [1]) == (None, None)
+
+
+class SequenceBenchmark:
+    def __init__(self, scores):
+        self.scores = list(scores)
+        self.calls = 0
+
+    def run(self):
+        score = self.scores[min(self.calls, len(self.scores) - 1)]
+        self.calls += 1
+        return {"score": score, "success": True}
+
+
+def test_runner_stops_when_ci_is_narrow():
+    runner = BenchmarkRunner({"run_engine": {"warmup_runs": 1, "min_runs": 3, "max_runs": 10,
+                                             "target_relative_ci": 0.05}})
+    benchmark = SequenceBenchmark([1, 100, 100, 100, 100])
+    result = runner.run(benchmark)
+    # 预热的结果不参与统计
+    assert result["scores"] == [100, 100, 100]
+    assert result["converged"] and result["success"]
+    assert benchmark.calls == 4
+
+
+def test_runner_respects_max_runs_and_prune():
+    runner = BenchmarkRunner({"run_engine": {"warmup_runs": 0, "min_runs": 2, "max_runs": 4}})
+    result = runner.run(SequenceBenchmark([10, 50, 20, 80, 5]))
+    assert len(result["scores"]) == 4 and not result["converged"]
+
+    result = runner.run(SequenceBenchmark([10, 50, 20, 80]), prune=lambda stats: stats["ci_high"] < 1000)
+    assert result["pruned"] and len(result["scores"]) == 2
+
+
+def test_runner_stops_on_failure():
+    class Failing:
+        def run(self):
+            return {"score": 0, "success": False, "error": "boom"}
+
+    result = BenchmarkRunner({"run_engine": {"warmup_runs": 0}}).run(Failing())
+    assert not result["success"] and len(result["runs"]) == 1
+
+
+def test_improvement_significance():
+    initial = {"bench": {"score": 100, "scores": [99, 100, 101]}, "other": {"score": 0, "scores": [0]}}
+    tuned = {"bench": {"score": 110, "scores": [109, 110, 111]}, "other": {"score": 5, "scores": [5]}}
+    improvement = calculate_improvement(initial, tuned)
+    assert list(improvement) == ["bench"]
+    assert improvement["bench"]["percent"] == pytest.approx(10)
+    assert improvement["bench"]["significant"]
+    assert calculate_improvement(initial, tuned, test="mann_whitney")["bench"]["test"] == "mann_whitney"
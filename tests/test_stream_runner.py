@@ -0,0 +1,42 @@
+import time
+
+from utils.stream_runner import StreamingProcess
+
+
+def _shell(script, **kwargs):
+    return StreamingProcess(["/bin/sh", "-c", script], **kwargs)
+
+
+def test_lines_and_tails(tmp_path):
+    lines = []
+    result = _shell("pwd; echo err >&2; printf 'a\\nb\\nno-newline'", tail_lines=2, cwd=str(tmp_path),
+                    on_line=lambda stream, line: lines.append((stream, line))).run()
+    assert result["returncode"] == 0 and not result["aborted"]
+    assert result["output_tail"] == ["b", "no-newline"]
+    assert result["error_tail"] == ["err"]
+    assert ("stdout", str(tmp_path)) in lines and ("stdout", "no-newline") in lines
+
+
+def test_on_line_aborts_process_group(tmp_path):
+    marker = tmp_path / "survived"
+    started = time.monotonic()
+    # 后台子进程与 shell 同属一个进程组，终止时一并结束
+    result = _shell(f"(sleep 2; touch {marker}) & echo stop; sleep 30",
+                    on_line=lambda stream, line: "收到 stop" if line == "stop" else None).run()
+    assert result["aborted"] and result["abort_reason"] == "收到 stop"
+    assert time.monotonic() - started < 10
+    time.sleep(2.5)
+    assert not marker.exists()
+
+
+def test_timeout():
+    result = _shell("echo start; sleep 30", timeout=0.5).run()
+    assert result["aborted"] and "时间限制" in result["abort_reason"]
+    assert result["output_tail"] == ["start"]
+    assert result["elapsed"] < 10
+
+
+def test_nonzero_exit():
+    result = _shell("echo failing >&2; exit 3").run()
+    assert result["returncode"] == 3 and not result["aborted"]
+    assert result["error_tail"] == ["failing"]
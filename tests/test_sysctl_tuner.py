@@ -0,0 +1,64 @@
+import pytest
+
+from modules.base import TuningError
+from modules.sysctl_tuner import ProcSysBackend, SysctlCliBackend, SysctlTuner, create_backend
+
+
+@pytest.fixture
+def proc_sys(tmp_path):
+    root = tmp_path / "sys"
+    (root / "vm").mkdir(parents=True)
+    (root / "net" / "ipv4").mkdir(parents=True)
+    (root / "vm" / "swappiness").write_text("60\n")
+    (root / "vm" / "dirty_ratio").write_text("20\n")
+    (root / "net" / "ipv4" / "tcp_rmem").write_text("4096\t131072\t6291456\n")
+    return root
+
+
+def _tuner(proc_sys, params):
+    return SysctlTuner({"sysctl_tuning": params, "sysctl_backend": {"type": "proc", "proc_root": str(proc_sys)}})
+
+
+def test_backend_selection(proc_sys, tmp_path):
+    assert isinstance(create_backend({"sysctl_backend": {"proc_root": str(proc_sys)}}), ProcSysBackend)
+    assert isinstance(create_backend({"sysctl_backend": {"proc_root": str(tmp_path / "missing")}}), SysctlCliBackend)
+    assert isinstance(create_backend({"sysctl_backend": {"type": "cli"}}), SysctlCliBackend)
+
+
+def test_proc_backend_reads_and_normalizes(proc_sys):
+    backend = ProcSysBackend(str(proc_sys))
+    assert backend.read("vm.swappiness") == "60"
+    assert backend.read("net/ipv4/tcp_rmem") == "4096 131072 6291456"
+    assert backend.read("vm.missing") is None
+    assert backend.snapshot(["vm.swappiness", "vm.missing"]) == {"vm.swappiness": "60"}
+    assert backend.journal_key("vm.swappiness") == ("file", str(proc_sys / "vm" / "swappiness"))
+
+
+def test_apply_and_reset_round_trip(proc_sys, capsys):
+    tuner = _tuner(proc_sys, {"vm.swappiness": 10, "vm.dirty_ratio": None, "vm.nonexistent": 1,
+                              "net.ipv4.tcp_rmem": "4096 87380 16777216"})
+    tuner.apply()
+    assert (proc_sys / "vm" / "swappiness").read_text() == "10"
+    assert (proc_sys / "vm" / "dirty_ratio").read_text() == "20\n"
+    assert tuner.current_state() == {"vm.swappiness": "10", "net.ipv4.tcp_rmem": "4096 87380 16777216"}
+    assert "vm.nonexistent 不存在" in capsys.readouterr().out
+
+    tuner.reset()
+    assert (proc_sys / "vm" / "swappiness").read_text() == "60"
+    assert ProcSysBackend(str(proc_sys)).read("net.ipv4.tcp_rmem") == "4096 131072 6291456"
+
+
+def test_apply_raises_on_mismatch(proc_sys, monkeypatch):
+    tuner = _tuner(proc_sys, {"vm.swappiness": 10})
+    # 内核会把越界的值截断，回读结果与期望不一致
+    monkeypatch.setattr(tuner.backend, "apply", lambda values: {})
+    with pytest.raises(TuningError):
+        tuner.apply()
+
+
+def test_reset_raises_on_failed_restore(proc_sys, monkeypatch):
+    tuner = _tuner(proc_sys, {"vm.swappiness": 10, "vm.dirty_ratio": 5})
+    tuner.apply()
+    monkeypatch.setattr(tuner.backend, "apply", lambda values: {"vm.swappiness": "Permission denied"})
+    with pytest.raises(TuningError, match="2 个 sysctl 参数恢复失败"):
+        tuner.reset()
@@ -0,0 +1,92 @@
+import json
+import os
+
+import pytest
+
+from utils.benchmark_runner import BenchmarkRunner
+from utils.telemetry import RingBuffer, TelemetrySampler, _find_value
+
+DEFAULT_CONFIG = os.path.join(os.path.dirname(__file__), "..", "config", "default.conf")
+MEMINFO = "MemTotal:       1000 kB\nMemFree:         100 kB\nMemAvailable:    400 kB\nCached:          {cached} kB\nDirty:  5 kB\n"
+
+
+def _write_proc(root, busy, idle, ctxt, pgfault, cached=50):
+    (root / "stat").write_text(
+        f"cpu  {busy} 0 0 {idle} 0 0 0 0 0 0\n"
+        f"cpu0 {busy} 0 0 {idle} 0 0 0 0 0 0\n"
+        f"intr 1000 1 2 3\nctxt {ctxt}\nprocs_running 2\n"
+    )
+    (root / "vmstat").write_text(f"nr_free_pages 1\npgfault {pgfault}\npgmajfault 0\n")
+    (root / "meminfo").write_text(MEMINFO.format(cached=cached))
+
+
+@pytest.fixture
+def trees(tmp_path):
+    proc_root = tmp_path / "proc"
+    cpu_root = tmp_path / "cpu"
+    proc_root.mkdir()
+    (cpu_root / "cpu0" / "cpufreq").mkdir(parents=True)
+    (cpu_root / "cpu0" / "cpufreq" / "scaling_cur_freq").write_text("2400000\n")
+    _write_proc(proc_root, busy=100, idle=900, ctxt=5000, pgfault=10)
+    return proc_root, cpu_root
+
+
+def test_ring_buffer_wraps():
+    buffer = RingBuffer(3)
+    assert buffer.summary() == {"min": None, "mean": None, "max": None}
+    for value in range(5):
+        buffer.append(value)
+    assert buffer.values() == [2, 3, 4]
+    assert buffer.summary() == {"min": 2, "mean": 3, "max": 4}
+
+
+def test_find_value():
+    data = b"MemTotal:  1000 kB\nCached: 7 kB\nSwapCached: 9 kB\n"
+    assert _find_value(data, b"MemTotal:") == 1000
+    assert _find_value(data, b"Cached:") == 7
+    assert _find_value(data, b"Missing:") is None
+
+
+def test_sampler_rates_from_fake_proc(trees, monkeypatch):
+    proc_root, cpu_root = trees
+    sampler = TelemetrySampler({"telemetry": {"proc_root": str(proc_root), "cpu_root": str(cpu_root),
+                                              "keep_series": True}})
+    clock = iter([10.0, 12.0])
+    monkeypatch.setattr("utils.telemetry.time.monotonic", lambda: next(clock))
+    sampler._open()
+    try:
+        sampler._sample()
+        _write_proc(proc_root, busy=150, idle=1050, ctxt=7000, pgfault=30, cached=80)
+        sampler._sample()
+    finally:
+        sampler._close()
+
+    values = {name: buffer.values() for name, buffer in sampler.buffers.items()}
+    assert values["cpu0_util"] == [25.0]
+    assert values["ctxt_per_sec"] == [1000.0]
+    assert values["pgfault_per_sec"] == [10.0]
+    assert values["mem_used_kb"] == [600]
+    assert values["cached_kb"] == [80]
+    assert values["dirty_kb"] == [5]
+    assert values["cpu0_freq_khz"] == [2400000]
+    assert values["procs_running"] == [2]
+
+
+def test_sampler_thread_reports_summary(trees):
+    proc_root, cpu_root = trees
+    sampler = TelemetrySampler({"telemetry": {"proc_root": str(proc_root), "cpu_root": str(cpu_root),
+                                              "interval": 0.01}})
+    sampler.start()
+    report = sampler.stop()
+    assert report["samples"] >= 1
+    assert report["metrics"]["mem_used_kb"] == {"min": 600, "mean": 600, "max": 600}
+    assert "series" not in report
+    assert sampler.fds == {} and sampler.freq_fds == {}
+
+
+def test_telemetry_is_off_by_default():
+    with open(DEFAULT_CONFIG) as f:
+        config = json.load(f)
+    assert config["telemetry"]["enable"] is False
+    assert not BenchmarkRunner(config).telemetry
+    assert not BenchmarkRunner({}).telemetry
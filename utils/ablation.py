@@ -0,0 +1,264 @@
+import copy
+import itertools
+import math
+import random
+
+from utils.stats import mean, t_ppf, variance
+
+
+class Knob:
+    """一个可单独开关的调优项
+
+    path 为 None 时表示整个调优模块：关闭时不创建该模块；否则关闭时把配置中
+    path 处的值改为 off（通常为 null，即保持系统原值）。
+    """
+
+    def __init__(self, name, tuner, path=None, off=None):
+        self.name = name
+        self.tuner = tuner
+        self.path = tuple(path) if path is not None else None
+        self.off = off
+
+
+def odd_weight_masks(bits):
+    """按权重从小到大列出 bits 位中所有奇数权重的掩码"""
+    masks = [mask for mask in range(1, 1 << bits) if bin(mask).count("1") % 2]
+    return sorted(masks, key=lambda mask: (bin(mask).count("1"), mask))
+
+
+def fractional_factorial(count):
+    """构造 count 个二水平因子的分式析因设计，返回 (每行各因子是否开启, 各因子的列掩码)
+
+    用 m 个基本因子的 2^m 次运行，每个因子分配一个奇数权重的列掩码。任意两个奇数权重
+    掩码的异或为偶数权重，因此二阶交互不会与主效应混杂（分辨度 IV）；count 不超过 m 时
+    即为全因子设计。
+    """
+    bits = 1
+    while 1 << (bits - 1) < count:
+        bits += 1
+    masks = odd_weight_masks(bits)[:count]
+    rows = [
+        [bin(run & mask).count("1") % 2 == 1 for mask in masks]
+        for run in range(1 << bits)
+    ]
+    return rows, masks
+
+
+def contrast(cells, coefficients, confidence=0.95):
+    """计算各单元均值的线性组合及其置信区间（Welch-Satterthwaite 自由度）
+
+    cells 为 {"mean", "var_mean", "n"} 列表；任一单元只有一次测量时无法估计方差，
+    置信区间为 None。
+    """
+    estimate = sum(c * cell["mean"] for cell, c in zip(cells, coefficients) if c)
+    terms = [(c * c * cell["var_mean"], cell["n"]) for cell, c in zip(cells, coefficients) if c]
+    if any(n < 2 for _, n in terms):
+        return estimate, None, None
+    total = sum(term for term, _ in terms)
+    if total == 0:
+        return estimate, estimate, estimate
+    df = total ** 2 / sum(term ** 2 / (n - 1) for term, n in terms)
+    half_width = t_ppf(0.5 + confidence / 2, df) * math.sqrt(total)
+    return estimate, estimate - half_width, estimate + half_width
+
+
+def verdict(ci_low, ci_high):
+    """根据置信区间判断调优项的作用（得分越高越好）"""
+    if ci_low is None:
+        return "unknown"
+    if ci_low > 0:
+        return "helps"
+    if ci_high < 0:
+        return "hurts"
+    return "neutral"
+
+
+class AblationStudy:
+    """逐项归因：找出哪些调优项真正提升了得分、哪些有害、哪些两两之间存在交互
+
+    one_at_a_time 设计测量全部关闭、全部开启、逐项移除（leave-one-out）和逐项加入
+    （add-one-in）共 2k+2 个配置，再对效应最大的 interaction_top 个调优项两两加入，
+    估计交互作用；fractional_factorial 设计用分辨度 IV 的分式析因设计同时估计主效应
+    和（可能相互混杂的）二阶交互。
+
+    evaluate(config, disabled_tuners) 负责完成一次 apply/run_benchmarks/reset 循环。
+    """
+
+    def __init__(self, config, knobs, evaluate, objective):
+        self.config = config
+        self.knobs = knobs
+        self.evaluate = evaluate
+        self.objective = objective
+
+        options = config.get("ablation", {})
+        self.design = options.get("design", "one_at_a_time")
+        if self.design not in ("one_at_a_time", "fractional_factorial"):
+            raise ValueError(f"未知的消融设计: {self.design}")
+        self.interaction_top = options.get("interaction_top", 4)
+        self.confidence = config.get("run_engine", {}).get("confidence", 0.95)
+        self.rng = random.Random(options.get("seed"))
+        self.cells = {}
+
+    # ---- 配置生成与测量 ----
+
+    def profile(self, active):
+        """返回只开启 active 中调优项的配置，以及需要整体停用的调优模块"""
+        config = copy.deepcopy(self.config)
+        disabled = set()
+        for knob in self.knobs:
+            if knob.name in active:
+                continue
+            if knob.path is None:
+                disabled.add(knob.tuner)
+                continue
+            node = config
+            for key in knob.path[:-1]:
+                node = node.setdefault(key, {})
+            node[knob.path[-1]] = knob.off
+        return config, disabled
+
+    def measure(self, active):
+        """测量一个配置（相同配置只测量一次）"""
+        active = frozenset(active)
+        if active in self.cells:
+            return self.cells[active]
+        config, disabled = self.profile(active)
+        label = ", ".join(sorted(active)) or "全部关闭"
+        print(f"消融测量 [{len(self.cells) + 1}]: {label}")
+        try:
+            result = self.evaluate(config, disabled).get(self.objective, {})
+        except Exception as e:
+            print(f"消融测量失败: {e}")
+            result = {}
+        scores = result.get("scores", []) if result.get("success") else []
+        if not scores:
+            raise RuntimeError(f"配置 [{label}] 的 {self.objective} 测量失败: {result.get('error', '未知错误')}")
+        cell = {
+            "active": sorted(active),
+            "mean": mean(scores),
+            "var_mean": variance(scores) / len(scores) if len(scores) > 1 else 0.0,
+            "n": len(scores)
+        }
+        self.cells[active] = cell
+        return cell
+
+    def _measure_all(self, profiles):
+        """按随机顺序测量一组配置，减少系统漂移对某一类配置的系统性影响"""
+        order = list(dict.fromkeys(frozenset(active) for active in profiles))
+        self.rng.shuffle(order)
+        for active in order:
+            self.measure(active)
+
+    def _effect(self, cells, coefficients, reference):
+        estimate, ci_low, ci_high = contrast(cells, coefficients, self.confidence)
+        return {
+            "effect": estimate,
+            "ci_low": ci_low,
+            "ci_high": ci_high,
+            "percent": estimate / reference * 100 if reference else None,
+            "verdict": verdict(ci_low, ci_high)
+        }
+
+    # ---- 设计 ----
+
+    def _one_at_a_time(self):
+        names = [knob.name for knob in self.knobs]
+        everything = frozenset(names)
+        self._measure_all(
+            [frozenset(), everything]
+            + [everything - {name} for name in names]
+            + [{name} for name in names]
+        )
+        baseline, full = self.cells[frozenset()], self.cells[everything]
+        reference = baseline["mean"]
+
+        ranking = []
+        for name in names:
+            without, alone = self.cells[everything - {name}], self.cells[frozenset({name})]
+            cells = [full, without, alone, baseline]
+            row = {"name": name}
+            # 综合效应取两种情形的平均：0.5 × [(全部 - 去掉该项) + (仅该项 - 全部关闭)]
+            row.update(self._effect(cells, [0.5, -0.5, 0.5, -0.5], reference))
+            row["leave_one_out"] = self._effect(cells, [1, -1, 0, 0], reference)
+            row["add_one_in"] = self._effect(cells, [0, 0, 1, -1], reference)
+            # 两种情形的差异显著说明该项与其他调优项存在交互
+            difference = self._effect(cells, [1, -1, -1, 1], reference)
+            row["non_additive"] = difference["verdict"] in ("helps", "hurts")
+            ranking.append(row)
+        ranking.sort(key=lambda row: abs(row["effect"]), reverse=True)
+
+        top = [row["name"] for row in ranking[:self.interaction_top]]
+        pairs = list(itertools.combinations(top, 2))
+        self._measure_all([set(pair) for pair in pairs])
+        interactions = []
+        for first, second in pairs:
+            cells = [
+                self.cells[frozenset((first, second))],
+                self.cells[frozenset({first})],
+                self.cells[frozenset({second})],
+                baseline
+            ]
+            row = {"pair": [first, second]}
+            row.update(self._effect(cells, [1, -1, -1, 1], reference))
+            interactions.append(row)
+
+        return {"baseline": baseline, "full": full, "reference": reference}, ranking, interactions
+
+    def _fractional_factorial(self):
+        names = [knob.name for knob in self.knobs]
+        rows, masks = fractional_factorial(len(names))
+        profiles = [frozenset(name for name, on in zip(names, row) if on) for row in rows]
+        self._measure_all(profiles)
+        cells = [self.cells[active] for active in profiles]
+        runs = len(rows)
+        reference = mean([cell["mean"] for cell in cells])
+
+        ranking = []
+        for index, name in enumerate(names):
+            coefficients = [(2 if row[index] else -2) / runs for row in rows]
+            row = {"name": name}
+            row.update(self._effect(cells, coefficients, reference))
+            ranking.append(row)
+        ranking.sort(key=lambda row: abs(row["effect"]), reverse=True)
+
+        # 掩码异或相同的交互项相互混杂，无法单独区分
+        alias_groups = {}
+        for first, second in itertools.combinations(range(len(names)), 2):
+            alias_groups.setdefault(masks[first] ^ masks[second], []).append((names[first], names[second]))
+        interactions = []
+        for first, second in itertools.combinations(range(len(names)), 2):
+            # 与 one_at_a_time 相同的尺度：两项同时开启时偏离可加性的量
+            coefficients = [(4 if row[first] == row[second] else -4) / runs for row in rows]
+            pair = (names[first], names[second])
+            row = {"pair": list(pair)}
+            row.update(self._effect(cells, coefficients, reference))
+            row["aliases"] = [list(alias) for alias in alias_groups[masks[first] ^ masks[second]] if alias != pair]
+            interactions.append(row)
+
+        return {"reference": reference}, ranking, interactions
+
+    def run(self):
+        """执行消融实验，返回排名、交互作用与建议的最小配置"""
+        if not self.knobs:
+            raise ValueError("没有可供消融分析的调优项")
+        if self.design == "fractional_factorial":
+            summary, ranking, interactions = self._fractional_factorial()
+        else:
+            summary, ranking, interactions = self._one_at_a_time()
+
+        interactions.sort(key=lambda row: abs(row["effect"]), reverse=True)
+        helpful = [row["name"] for row in ranking if row["verdict"] == "helps"]
+        minimal_config, disabled = self.profile(set(helpful))
+        report = {
+            "design": self.design,
+            "objective": self.objective,
+            "profiles_measured": len(self.cells),
+            "knobs": ranking,
+            "interactions": interactions,
+            "interacting_pairs": [row["pair"] for row in interactions if row["verdict"] in ("helps", "hurts")],
+            "minimal_profile": helpful,
+            "minimal_profile_disabled_tuners": sorted(disabled),
+            "cells": list(self.cells.values())
+        }
+        report.update(summary)
+        return report, minimal_config
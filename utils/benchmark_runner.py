@@ -0,0 +1,147 @@
+from utils.energy import OBJECTIVES, EnergyMeter
+from utils.perf_counters import PerfCounters
+from utils.quiescence import QuiescenceGate
+from utils.stats import mean, summarize
+from utils.telemetry import TelemetrySampler
+
+
+class BenchmarkRunner:
+    """重复运行基准测试：预热、多次测量，置信区间足够窄时提前停止"""
+
+    def __init__(self, config):
+        options = config.get("run_engine", {})
+        self.warmup_runs = options.get("warmup_runs", 1)
+        self.min_runs = max(1, options.get("min_runs", 3))
+        self.max_runs = max(self.min_runs, options.get("max_runs", 10))
+        self.confidence = options.get("confidence", 0.95)
+        self.target_relative_ci = options.get("target_relative_ci", 0.02)
+        self.config = config
+        self.telemetry = config.get("telemetry", {}).get("enable", False)
+        self.perf_counters = config.get("perf_counters", {}).get("enable", False)
+        energy = config.get("energy", {})
+        # objective 为 score_per_watt 时以能效代替原始得分参与统计、收敛判断、搜索与比较
+        self.objective = energy.get("objective", "score")
+        if self.objective not in OBJECTIVES:
+            raise ValueError(f"未知的优化目标: {self.objective}")
+        self.energy = energy.get("enable", False) or self.objective != "score"
+        quiescence = config.get("quiescence", {})
+        self.gate = QuiescenceGate(config) if quiescence.get("enable", False) else None
+        self.gate_per_run = quiescence.get("per_run", False)
+
+    def _converged(self, scores):
+        """判断相对置信区间半宽是否已达到目标"""
+        if len(scores) < max(2, self.min_runs):
+            return False
+        relative_ci = summarize(scores, self.confidence)["relative_ci"]
+        return relative_ci is not None and relative_ci <= self.target_relative_ci
+
+    def run(self, benchmark, max_runs=None, prune=None, quiesce=True):
+        """运行单个基准测试并返回汇总结果
+
+        prune(stats) 在达到 min_runs 后每次测量后调用，返回真时提前终止（标记为 pruned）。
+        quiesce 为假时不做逐次测量前的静默等待（并行批次中其他测试的负载会使等待必然超时）。
+        """
+        max_runs = max_runs or self.max_runs
+
+        for _ in range(self.warmup_runs):
+            benchmark.run()
+
+        runs = []
+        scores = []
+        throughput = []
+        pruned = False
+        while len(runs) < max_runs:
+            quiescence = self.gate.wait() if self.gate and self.gate_per_run and quiesce else None
+            throttle_before = self.gate.throttle_count() if self.gate else None
+            sampler = TelemetrySampler(self.config) if self.telemetry else None
+            if sampler:
+                sampler.start()
+            meter = EnergyMeter(self.config) if self.energy else None
+            if meter:
+                meter.start()
+            # 计数器在采样线程启动之后打开，采样线程不会被计入
+            counters = PerfCounters(self.config) if self.perf_counters else None
+            if counters:
+                counters.start()
+            result = benchmark.run()
+            if counters:
+                result["counters"] = counters.stop()
+            if meter:
+                result["energy"] = meter.stop(result.get("score") if result.get("success", True) else None)
+            if sampler:
+                result["telemetry"] = sampler.stop()
+            if quiescence:
+                result["quiescence"] = quiescence
+            if throttle_before is not None:
+                # 测量期间发生的降频事件数，非零说明结果受温度或功耗墙影响
+                result["throttle_events"] = self.gate.throttle_count() - throttle_before
+            runs.append(result)
+            if result.get("success", True) and self.objective == "score_per_watt" \
+                    and "score_per_watt" not in result["energy"]:
+                result["success"] = False
+                result["error"] = f"能耗数据不可用，无法计算能效: {result['energy'].get('error')}"
+            if not result.get("success", True):
+                # 运行失败时继续测量只会浪费时间
+                break
+            if self.objective == "score_per_watt":
+                throughput.append(result.get("score", 0))
+                scores.append(result["energy"]["score_per_watt"])
+            else:
+                scores.append(result.get("score", 0))
+            if self._converged(scores):
+                break
+            if prune and len(scores) >= self.min_runs and prune(summarize(scores, self.confidence)):
+                pruned = True
+                break
+
+        return self._summarize(runs, scores, throughput, pruned)
+
+    def _summarize(self, runs, scores, throughput, pruned=False):
+        stats = summarize(scores, self.confidence)
+        summary = {
+            "score": stats["mean"],
+            "success": bool(scores) and len(scores) == len(runs),
+            "scores": scores,
+            "stats": stats,
+            "warmup_runs": self.warmup_runs,
+            "converged": self._converged(scores),
+            "pruned": pruned,
+            "runs": runs
+        }
+        if self.perf_counters:
+            summary["counters"] = self._average(run.get("counters", {}).get("derived", {}) for run in runs)
+        if self.energy:
+            summary["energy"] = self._average(
+                (run.get("energy", {}) for run in runs), ("joules", "watts", "score_per_watt")
+            )
+        if self.objective != "score":
+            summary["metric"] = self.objective
+            summary["throughput_scores"] = throughput
+        return summary
+
+    def combine(self, blocks):
+        """合并交替测量得到的多批结果（每批为 {名称: 结果}）：各批的测量值拼接后重新统计"""
+        combined = {}
+        for name in blocks[0]:
+            results = [block[name] for block in blocks if name in block]
+            summary = self._summarize(
+                [run for result in results for run in result["runs"]],
+                [score for result in results for score in result["scores"]],
+                [score for result in results for score in result.get("throughput_scores", [])]
+            )
+            summary["success"] = summary["success"] and all(result["success"] for result in results)
+            summary["blocks"] = len(results)
+            if results[-1].get("cpus") is not None:
+                summary["cpus"] = results[-1]["cpus"]
+            combined[name] = summary
+        return combined
+
+    @staticmethod
+    def _average(reports, fields=None):
+        """各次测量中数值字段的平均值"""
+        values = {}
+        for report in reports:
+            for name, value in report.items():
+                if (fields is None or name in fields) and isinstance(value, (int, float)) and not isinstance(value, bool):
+                    values.setdefault(name, []).append(value)
+        return {name: mean(samples) for name, samples in values.items()}
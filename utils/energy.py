@@ -0,0 +1,149 @@
+import glob
+import os
+import threading
+import time
+
+OBJECTIVES = ("score", "score_per_watt")
+
+
+def _read_int(path):
+    try:
+        with open(path) as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+class RaplDomain:
+    """一个 RAPL 计量域（如 package-0、dram），energy_uj 为单调递增的微焦耳计数，到 max_energy_range_uj 后回绕"""
+
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        self.max_range = _read_int(os.path.join(path, "max_energy_range_uj"))
+        self.fd = None
+        self.previous = None
+        self.total = 0
+
+    def open(self):
+        self.fd = os.open(os.path.join(self.path, "energy_uj"), os.O_RDONLY)
+        self.previous = self.read()
+        self.total = 0
+
+    def read(self):
+        return int(os.pread(self.fd, 32, 0))
+
+    def sample(self):
+        """累加自上次采样以来的能耗；计数小于上次时说明发生了回绕"""
+        current = self.read()
+        delta = current - self.previous
+        if delta < 0:
+            delta += self.max_range or 0
+        self.total += max(delta, 0)
+        self.previous = current
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+def discover_domains(powercap_root="/sys/class/powercap", prefixes=("package", "dram")):
+    """按名称前缀选择 RAPL 计量域
+
+    package 域已包含其下的 core/uncore 子域，dram 域单独计量，因此默认只选这两类，
+    各域能耗相加即为总能耗而不会重复计算。同名的域（intel-rapl 与 intel-rapl-mmio）只保留一个。
+    """
+    domains = {}
+    for path in sorted(glob.glob(os.path.join(powercap_root, "intel-rapl*"))):
+        try:
+            with open(os.path.join(path, "name")) as f:
+                name = f.read().strip()
+        except OSError:
+            continue
+        if name == "dram" and os.path.basename(path).count(":") == 2:
+            # dram 是 package 的子域，以所属 package 编号区分多个插槽
+            name = f"dram-{os.path.basename(path).split(':')[1]}"
+        if name in domains or not any(name.startswith(prefix) for prefix in prefixes):
+            continue
+        if os.path.exists(os.path.join(path, "energy_uj")):
+            domains[name] = RaplDomain(name, path)
+    return list(domains.values())
+
+
+class EnergyMeter:
+    """测量基准测试运行期间 RAPL 计量域的能耗
+
+    后台线程每隔 interval 秒采样一次计数器，每次都按与上次的差值累加，因此即使运行时间超过
+    计数器的回绕周期（大功率下约数十分钟）也能正确计算。RAPL 计量的是整个插槽与内存的能耗，
+    包含同时运行的其他进程。
+    """
+
+    def __init__(self, config):
+        options = config.get("energy", {})
+        self.powercap_root = options.get("powercap_root", "/sys/class/powercap")
+        self.prefixes = tuple(options.get("domains", ["package", "dram"]))
+        self.interval = options.get("interval", 1.0)
+        self.domains = []
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+        self.started = None
+        self.error = None
+
+    def _sample(self):
+        with self.lock:
+            for domain in self.domains:
+                domain.sample()
+
+    def _loop(self):
+        while not self.stop_event.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        """打开各计量域并启动采样线程；不可用时记录原因，stop() 返回 available: false"""
+        self.error = None
+        self.domains = discover_domains(self.powercap_root, self.prefixes)
+        try:
+            if not self.domains:
+                raise OSError(f"{self.powercap_root} 下没有可用的 RAPL 计量域")
+            for domain in self.domains:
+                domain.open()
+        except (OSError, ValueError) as e:
+            # 较新的内核只允许 root 读取 energy_uj
+            self.error = getattr(e, "strerror", None) or str(e)
+            self._close()
+            self.domains = []
+            return
+        self.started = time.perf_counter()
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._loop, name="energy-meter", daemon=True)
+        self.thread.start()
+
+    def _close(self):
+        for domain in self.domains:
+            domain.close()
+
+    def stop(self, score=None):
+        """停止采样，返回各域能耗（焦耳）、总能耗、平均功率，给出 score 时附带 score_per_watt"""
+        if not self.domains:
+            return {"available": False, "error": self.error}
+        self.stop_event.set()
+        self.thread.join()
+        self._sample()
+        elapsed = time.perf_counter() - self.started
+        self._close()
+
+        joules = {domain.name: domain.total / 1e6 for domain in self.domains}
+        total = sum(joules.values())
+        watts = total / elapsed if elapsed > 0 else None
+        report = {
+            "available": True,
+            "domains": joules,
+            "joules": total,
+            "watts": watts,
+            "seconds": elapsed
+        }
+        if score is not None and watts:
+            report["score_per_watt"] = score / watts
+        return report
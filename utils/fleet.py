@@ -0,0 +1,417 @@
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.result_store import ResultStore, hardware_class, profile_hash
+from utils.search import TuningSearch, candidate_key, expand_search_space, prune_rule
+
+
+class FleetError(Exception):
+    """协调端拒绝请求（未注册、认证失败等）"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class HardwareCampaign:
+    """一个硬件类别上的参数搜索：候选参数由该类别的所有代理分摊执行
+
+    搜索空间中的 "auto" 配置节按该类别第一台就绪主机探测到的候选值展开，试验记录写入
+    各类别自己的历史文件，中断后重新启动协调端会跳过已完成的候选。
+    """
+
+    def __init__(self, hardware, config, spaces, output_dir):
+        self.hardware = hardware
+        self.directory = os.path.join(output_dir, hardware)
+        config, self.missing = expand_search_space(config, spaces)
+        config["search"]["history_file"] = os.path.join(self.directory, "history.jsonl")
+        self.config = config
+        self.search = TuningSearch(config, None, config["search"]["objective"])
+        if self.search.strategy not in ("grid", "random"):
+            raise ValueError(f"集群模式只支持 grid 与 random 搜索策略，不支持 {self.search.strategy}")
+        self.pending = self.search.pending_candidates()
+        self.leases = {}
+        # 本次运行中已写入历史记录的候选（按 candidate_key）
+        self.recorded = set()
+
+    def finished(self):
+        return not self.pending and not self.leases
+
+
+class FleetCoordinator:
+    """集群协调端：接受代理注册，按硬件类别分派搜索试验，并把各代理回传的结果汇总到结果库
+
+    代理通过 HTTP POST 发送 JSON 请求（/register、/ready、/lease、/heartbeat、/result），
+    GET /status 返回当前进度。租约超时（代理失联）的试验会重新分派给同类别的其他代理。
+    """
+
+    def __init__(self, config, tuners, benchmarks):
+        self.config = config
+        self.tuners = list(tuners)
+        self.benchmarks = list(benchmarks)
+        options = config.get("fleet", {})
+        self.listen = options.get("listen", "127.0.0.1")
+        self.port = options.get("port", 8765)
+        self.token = options.get("token")
+        self.lease_timeout = options.get("lease_timeout", 600)
+        self.poll_interval = options.get("poll_interval", 5)
+        self.expected_agents = options.get("expected_agents")
+        self.output_dir = options.get("output_dir", "results/fleet")
+        self.store_path = config.get("result_store", {}).get("path", "results/results.db")
+        self.store_enabled = config.get("result_store", {}).get("enable", True)
+
+        search = self.config.setdefault("search", {})
+        search["objective"] = search.get("objective") or self.benchmarks[0]
+        self.lock = threading.Lock()
+        self.agents = {}
+        self.campaigns = {}
+        self.tasks = {}
+        # 已处理过结果的试验，代理重试发送同一结果时直接确认
+        self.finished_tasks = set()
+        self.server = None
+
+    # ---- 请求处理（均在 self.lock 内执行） ----
+
+    def _agent(self, payload):
+        agent = self.agents.get(payload.get("agent_id"))
+        if agent is None:
+            raise FleetError("代理未注册", 409)
+        agent["last_seen"] = time.time()
+        return agent
+
+    def register(self, payload):
+        system_info = payload.get("system_info") or {}
+        hardware = hardware_class(system_info)
+        if hardware is None:
+            raise FleetError("无法根据系统信息确定硬件类别")
+        agent_id = uuid.uuid4().hex[:12]
+        os_info = system_info.get("os") or {}
+        cpu_info = system_info.get("cpu") or {}
+        self.agents[agent_id] = {
+            "host": payload.get("host") or os_info.get("hostname"),
+            "hardware": hardware,
+            "kernel": system_info.get("kernel") or os_info.get("release"),
+            "cpu_model": cpu_info.get("model_name") or cpu_info.get("model"),
+            "ready": False,
+            "trials": 0,
+            "last_seen": time.time()
+        }
+        print(f"代理 {agent_id} 已注册: {self.agents[agent_id]['host']} (硬件类别 {hardware})")
+        return {"agent_id": agent_id, "hardware": hardware, "tuners": self.tuners, "benchmarks": self.benchmarks}
+
+    def ready(self, payload):
+        agent = self._agent(payload)
+        hardware = agent["hardware"]
+        if hardware not in self.campaigns:
+            campaign = HardwareCampaign(hardware, self.config, payload.get("tunable_space") or {}, self.output_dir)
+            self.campaigns[hardware] = campaign
+            print(f"硬件类别 {hardware}: 参数空间 {campaign.search.space.size()} 种组合，"
+                  f"待评估 {len(campaign.pending)} 个候选")
+            for section in campaign.missing:
+                print(f"硬件类别 {hardware}: 没有调优模块为 {section} 提供搜索空间，已忽略该维度")
+        agent["ready"] = True
+        return {}
+
+    def _expire_leases(self):
+        now = time.time()
+        for campaign in self.campaigns.values():
+            for task_id, lease in list(campaign.leases.items()):
+                if lease["deadline"] < now:
+                    print(f"试验 {task_id} 的租约已超时 ({self.agents[lease['agent_id']]['host']})，重新分派")
+                    del campaign.leases[task_id]
+                    campaign.pending.insert(0, lease["candidate"])
+
+    def lease(self, payload):
+        agent = self._agent(payload)
+        if not agent["ready"]:
+            raise FleetError("代理尚未就绪", 409)
+        self._expire_leases()
+        campaign = self.campaigns[agent["hardware"]]
+        if not campaign.pending:
+            # 本类别的候选已全部分派：等待其他代理完成（其租约可能超时而需要重新分派）
+            return {"done": campaign.finished(), "task": None, "retry_after": self.poll_interval}
+
+        candidate = campaign.pending.pop(0)
+        task_id = uuid.uuid4().hex[:16]
+        best = campaign.search.history.best()
+        task = {
+            "task_id": task_id,
+            "candidate": candidate,
+            "config": campaign.search.space.apply_to(campaign.config, candidate),
+            "max_runs": campaign.search.max_runs,
+            "objective": campaign.search.objective,
+            "best_ci_low": best["stats"]["ci_low"] if best else None,
+            "prune_margin": campaign.search.prune_margin,
+            "lease_timeout": self.lease_timeout
+        }
+        campaign.leases[task_id] = {
+            "agent_id": payload["agent_id"],
+            "candidate": candidate,
+            "deadline": time.time() + self.lease_timeout,
+            "started": datetime.now().isoformat()
+        }
+        self.tasks[task_id] = (agent["hardware"], candidate, task["max_runs"])
+        return {"done": False, "task": task}
+
+    def heartbeat(self, payload):
+        agent = self._agent(payload)
+        lease = self.campaigns[agent["hardware"]].leases.get(payload.get("task_id"))
+        if lease is None:
+            return {"valid": False}
+        lease["deadline"] = time.time() + self.lease_timeout
+        return {"valid": True}
+
+    def result(self, payload):
+        agent = self._agent(payload)
+        task_id = payload.get("task_id")
+        if task_id in self.finished_tasks:
+            # 代理未收到上次的响应而重试：结果已处理过
+            return {"ignored": "duplicate"}
+        if task_id not in self.tasks:
+            raise FleetError(f"未知的试验 {task_id}")
+        hardware, candidate, max_runs = self.tasks.pop(task_id)
+        self.finished_tasks.add(task_id)
+        campaign = self.campaigns[hardware]
+        lease = campaign.leases.pop(task_id, None)
+        key = candidate_key(candidate)
+        if key in campaign.recorded:
+            # 租约超时后重新分派的候选已由其他代理完成
+            return {"ignored": "recorded"}
+        if lease is None:
+            if candidate in campaign.pending:
+                # 租约超时后结果才到达：候选已重新排队，不必再评估
+                campaign.pending.remove(candidate)
+            elif any(other["candidate"] == candidate for other in campaign.leases.values()):
+                # 候选已重新分派给其他代理，以新租约的结果为准
+                return {"ignored": "re-leased"}
+        campaign.recorded.add(key)
+
+        results = payload.get("results")
+        agent["trials"] += 1
+        campaign.search.record_trial(
+            candidate, max_runs, results, error=payload.get("error"),
+            timestamp=lease["started"] if lease else None,
+            host=agent["host"], agent_id=payload["agent_id"], task_id=task_id
+        )
+        if results and self.store_enabled:
+            store = ResultStore(self.store_path)
+            config = campaign.search.space.apply_to(campaign.config, candidate)
+            try:
+                for benchmark, result in results.items():
+                    store.add_results(
+                        {benchmark: result}, task_id, host=agent["host"], kernel=agent["kernel"],
+                        cpu_model=agent["cpu_model"], hardware=hardware,
+                        profile=profile_hash(config, benchmark, "search"), phase="search", source="fleet",
+                        commit=False
+                    )
+                store.db.commit()
+            finally:
+                store.close()
+        return {}
+
+    def status(self, payload=None):
+        return {
+            "agents": self.agents,
+            "campaigns": {
+                hardware: {
+                    "pending": len(campaign.pending),
+                    "running": len(campaign.leases),
+                    "trials": len(campaign.search.history.trials),
+                    "best": campaign.search.history.best()
+                }
+                for hardware, campaign in self.campaigns.items()
+            },
+            "done": self.done()
+        }
+
+    HANDLERS = ("register", "ready", "lease", "heartbeat", "result")
+
+    def handle(self, name, payload, token=None):
+        """处理一个请求，返回 (HTTP 状态码, 响应)"""
+        if self.token and token != self.token:
+            return 403, {"error": "认证失败"}
+        if name != "status" and name not in self.HANDLERS:
+            return 404, {"error": f"未知的请求 {name}"}
+        with self.lock:
+            try:
+                return 200, getattr(self, name)(payload)
+            except FleetError as e:
+                return e.status, {"error": str(e)}
+            except ValueError as e:
+                return 400, {"error": str(e)}
+
+    # ---- 服务 ----
+
+    def done(self):
+        """所有硬件类别的候选都已完成，且已注册的代理数达到 expected_agents"""
+        if not self.campaigns or len(self.agents) < (self.expected_agents or 0):
+            return False
+        # 注册后未就绪的代理（仍在准备模块）须等待，超过租约时长仍无响应的视为已退出
+        stale = time.time() - self.lease_timeout
+        if any(not agent["ready"] and agent["last_seen"] > stale for agent in self.agents.values()):
+            return False
+        return all(campaign.finished() for campaign in self.campaigns.values())
+
+    def start(self):
+        """在后台线程中启动 HTTP 服务，返回实际监听的端口"""
+        coordinator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, status, body):
+                data = json.dumps(body, default=str).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._reply(*coordinator.handle(self.path.strip("/"), {}, self.headers.get("X-Fleet-Token")))
+
+            def do_POST(self):
+                try:
+                    payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                except ValueError:
+                    self._reply(400, {"error": "请求不是合法的 JSON"})
+                    return
+                self._reply(*coordinator.handle(self.path.strip("/"), payload, self.headers.get("X-Fleet-Token")))
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((self.listen, self.port), Handler)
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self.port
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def serve(self, timeout=None):
+        """启动服务并等待所有试验完成，返回各硬件类别的最优试验
+
+        完成后继续服务两个轮询周期，让仍在等待的代理收到结束通知。
+        """
+        if self.server is None:
+            self.start()
+        print(f"集群协调端监听 {self.listen}:{self.port}，调优模块 {self.tuners}，基准测试 {self.benchmarks}")
+        started = time.time()
+        try:
+            while not self.done():
+                if timeout and time.time() - started >= timeout:
+                    print("集群搜索超时，未完成的试验将在下次启动时继续")
+                    break
+                time.sleep(0.2)
+            time.sleep(2 * self.poll_interval if self.done() else 0)
+        finally:
+            self.stop()
+
+        summary = {}
+        for hardware, campaign in self.campaigns.items():
+            best = campaign.search.history.best()
+            hosts = sorted({agent["host"] for agent in self.agents.values() if agent["hardware"] == hardware})
+            summary[hardware] = {"hosts": hosts, "trials": len(campaign.search.history.trials), "best": best}
+            if best:
+                best["config"] = campaign.search.space.apply_to(campaign.config, best["candidate"])
+                path = os.path.join(campaign.directory, "best_profile.conf")
+                with open(path, "w") as f:
+                    json.dump(best["config"], f, indent=4)
+                print(f"硬件类别 {hardware} ({', '.join(hosts)}) 最优配置 (得分 {best['score']:.2f}): "
+                      f"{best['candidate']}，已保存至 {path}")
+            else:
+                print(f"硬件类别 {hardware} 没有成功的试验")
+        return summary
+
+
+class FleetAgent:
+    """集群代理：向协调端注册后循环领取试验，在本机完成 apply/run_benchmarks/reset 循环并回传结果
+
+    prepare(tuners, benchmarks) 负责注册协调端指定的模块并返回本机探测到的搜索空间；
+    evaluate(config, max_runs, prune) 与 TuningSearch 的评估函数相同。
+    """
+
+    def __init__(self, url, config, system_info, prepare, evaluate):
+        self.url = url.rstrip("/")
+        self.system_info = system_info
+        self.prepare = prepare
+        self.evaluate = evaluate
+        options = config.get("fleet", {})
+        self.token = options.get("token")
+        self.heartbeat_interval = options.get("heartbeat_interval", 30)
+        self.retry_timeout = options.get("retry_timeout", 60)
+        self.agent_id = None
+        self.trials = 0
+
+    def _post(self, path, payload):
+        """发送请求；连接失败时在 retry_timeout 内重试"""
+        data = json.dumps(dict(payload, agent_id=self.agent_id), default=str).encode()
+        deadline = time.time() + self.retry_timeout
+        while True:
+            request = urllib.request.Request(f"{self.url}/{path}", data=data, method="POST")
+            request.add_header("Content-Type", "application/json")
+            if self.token:
+                request.add_header("X-Fleet-Token", self.token)
+            try:
+                with urllib.request.urlopen(request, timeout=30) as response:
+                    return json.loads(response.read())
+            except urllib.error.HTTPError as e:
+                try:
+                    message = json.loads(e.read()).get("error")
+                except ValueError:
+                    message = e.reason
+                raise FleetError(f"协调端拒绝 /{path}: {message}", e.code) from e
+            except (urllib.error.URLError, OSError) as e:
+                if time.time() >= deadline:
+                    raise FleetError(f"无法连接协调端 {self.url}: {e}") from e
+                time.sleep(1)
+
+    def _heartbeat(self, task_id, stop):
+        while not stop.wait(self.heartbeat_interval):
+            try:
+                self._post("heartbeat", {"task_id": task_id})
+            except FleetError:
+                pass
+
+    def _run_task(self, task):
+        stop = threading.Event()
+        beat = threading.Thread(target=self._heartbeat, args=(task["task_id"], stop), daemon=True)
+        beat.start()
+        try:
+            prune = prune_rule(task["objective"], task["best_ci_low"], task["prune_margin"])
+            results = self.evaluate(task["config"], task["max_runs"], prune)
+            return {"task_id": task["task_id"], "results": results}
+        except Exception as e:
+            return {"task_id": task["task_id"], "error": str(e)}
+        finally:
+            stop.set()
+            beat.join()
+
+    def run(self):
+        """执行直到协调端通知本硬件类别的试验全部完成，返回本代理完成的试验数"""
+        registration = self._post("register", {"system_info": self.system_info})
+        self.agent_id = registration["agent_id"]
+        print(f"已向 {self.url} 注册为代理 {self.agent_id} (硬件类别 {registration['hardware']})")
+        spaces = self.prepare(registration["tuners"], registration["benchmarks"])
+        self._post("ready", {"tunable_space": spaces})
+        while True:
+            response = self._post("lease", {})
+            task = response.get("task")
+            if task is None:
+                if response.get("done"):
+                    print(f"集群搜索已完成，本代理共执行 {self.trials} 次试验")
+                    return self.trials
+                time.sleep(response.get("retry_after", 5))
+                continue
+            print(f"开始试验 {task['task_id']}: {task['candidate']}")
+            self._post("result", self._run_task(task))
+            self.trials += 1
@@ -0,0 +1,93 @@
+from array import array
+
+
+class LatencyHistogram:
+    """对数-线性分桶的延迟直方图（与 HdrHistogram 的分桶方式相同）
+
+    小于 2^precision_bits 的值逐一计数，更大的值在每个 2 的幂区间内再均分为
+    2^(precision_bits-1) 个桶，相对误差不超过 2^-(precision_bits-1)。计数数组预先
+    分配，记录一个值只需一次位运算和一次数组自增，适合在测量循环中调用。
+    """
+
+    def __init__(self, precision_bits=7, max_bits=64):
+        self.precision_bits = precision_bits
+        self.sub_buckets = 1 << precision_bits
+        self.half = self.sub_buckets >> 1
+        self.counts = array("Q", bytes(8 * (self.sub_buckets + (max_bits - precision_bits) * self.half)))
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def _index(self, value):
+        if value < self.sub_buckets:
+            return value
+        exponent = value.bit_length() - self.precision_bits
+        return self.sub_buckets + (exponent - 1) * self.half + (value >> exponent) - self.half
+
+    def _bucket_range(self, index):
+        """返回桶覆盖的 [下界, 上界] 整数区间"""
+        if index < self.sub_buckets:
+            return index, index
+        exponent, offset = divmod(index - self.sub_buckets, self.half)
+        exponent += 1
+        lower = (offset + self.half) << exponent
+        return lower, lower + (1 << exponent) - 1
+
+    def record(self, value):
+        """记录一个非负整数（通常为纳秒）"""
+        value = int(value)
+        if value < 0:
+            value = 0
+        self.counts[self._index(value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        """合并另一个相同精度的直方图（例如各线程各自记录的结果）"""
+        if other.precision_bits != self.precision_bits or len(other.counts) != len(self.counts):
+            raise ValueError("只能合并精度相同的直方图")
+        for index, value in enumerate(other.counts):
+            if value:
+                self.counts[index] += value
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+    def percentile(self, q):
+        """返回第 q 百分位（0-100）所在桶的上界，并截断到观测到的最大值"""
+        if not self.count:
+            return None
+        rank = max(1, -(-self.count * q // 100))
+        seen = 0
+        for index, value in enumerate(self.counts):
+            if value:
+                seen += value
+                if seen >= rank:
+                    return min(self._bucket_range(index)[1], self.max)
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def summary(self, scale=1.0):
+        """返回 count/mean/min/max/p50/p99/p99.9，数值除以 scale（如 1000 表示纳秒转微秒）"""
+        def scaled(value):
+            return None if value is None else value / scale
+
+        return {
+            "count": self.count,
+            "mean": scaled(self.mean()),
+            "min": scaled(self.min),
+            "max": scaled(self.max),
+            "p50": scaled(self.percentile(50)),
+            "p99": scaled(self.percentile(99)),
+            "p99.9": scaled(self.percentile(99.9))
+        }
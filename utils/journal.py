@@ -0,0 +1,125 @@
+import json
+import os
+import subprocess
+import time
+import uuid
+
+
+def restore_entry(entry):
+    """把单条日志记录中的原始值写回系统"""
+    if entry["kind"] == "file":
+        with open(entry["key"], "w") as f:
+            f.write(str(entry["prior"]))
+    elif entry["kind"] == "sysctl":
+        subprocess.run(
+            ["sysctl", "-w", f"{entry['key']}={entry['prior']}"],
+            check=True,
+            capture_output=True,
+            text=True,
+            timeout=30
+        )
+    elif entry["kind"] == "service":
+        # 只记录调优前处于运行状态、被临时停止的服务
+        subprocess.run(
+            ["systemctl", "start", entry["key"]],
+            check=True,
+            capture_output=True,
+            text=True,
+            timeout=60
+        )
+    else:
+        raise ValueError(f"未知的日志记录类型: {entry['kind']}")
+
+
+class TuningJournal:
+    """调优预写日志：在修改每个参数之前把原始值写入磁盘并 fsync
+
+    进程在 apply 与 reset 之间崩溃时，可以根据日志恢复所有未结束事务中的修改。
+    记录类型 file 表示直接写文件（/proc/sys、sysfs），sysctl 表示通过 sysctl 命令写入，
+    service 表示被临时停止的 systemd 服务（如 irqbalance）。
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def _append(self, records):
+        """追加记录并 fsync，保证返回时记录已落盘"""
+        directory = os.path.dirname(self.path) or "."
+        created = not os.path.exists(self.path)
+        os.makedirs(directory, exist_ok=True)
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            os.write(fd, "".join(json.dumps(record) + "\n" for record in records).encode())
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        if created:
+            # 新建文件时还需要 fsync 目录，确保目录项本身已持久化
+            dir_fd = os.open(directory, os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return []
+        records = []
+        with open(self.path, "r") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # 崩溃时最后一行可能只写了一半，忽略即可：对应的修改尚未发生
+                    break
+        return records
+
+    def begin(self):
+        """开始一个调优事务，返回事务 ID"""
+        txn = uuid.uuid4().hex
+        self._append([{"type": "begin", "txn": txn, "pid": os.getpid(), "time": time.time()}])
+        return txn
+
+    def record(self, txn, tuner, changes):
+        """在修改参数之前记录原始值，changes 为 [(类型, 键, 原始值)]"""
+        records = [
+            {"type": "change", "txn": txn, "tuner": tuner, "kind": kind, "key": key, "prior": prior}
+            for kind, key, prior in changes
+            if prior is not None
+        ]
+        if records:
+            self._append(records)
+
+    def end(self, txn):
+        """结束事务；所有事务都已结束时清空日志"""
+        self._append([{"type": "end", "txn": txn, "time": time.time()}])
+        if not self.pending():
+            os.truncate(self.path, 0)
+
+    def pending(self, txn=None):
+        """未结束事务中的修改记录（按写入顺序）"""
+        records = self._read()
+        ended = {record["txn"] for record in records if record["type"] == "end"}
+        return [
+            record for record in records
+            if record["type"] == "change" and record["txn"] not in ended and (txn is None or record["txn"] == txn)
+        ]
+
+    def rollback(self, txn=None):
+        """按相反顺序恢复未结束事务中的修改，返回 (已恢复记录, 失败记录)"""
+        entries = self.pending(txn)
+        restored, failed = [], []
+        # 同一个键可能被记录多次，逆序恢复后最终留下的是最早的原始值
+        for entry in reversed(entries):
+            try:
+                restore_entry(entry)
+                restored.append(entry)
+            except Exception as e:
+                failed.append(dict(entry, error=str(e)))
+
+        if not failed:
+            for open_txn in dict.fromkeys(entry["txn"] for entry in entries):
+                self.end(open_txn)
+            if txn is not None and not entries:
+                self.end(txn)
+        return restored, failed
@@ -42,5 +42,11 @@ def setup_logger(name="performance_tuning", log_level=logging.INFO):
 
     return logger
 
-# 创建一个默认的日志记录器实例
-default_logger = setup_logger()
+_default_logger = None
+
+def get_default_logger():
+    """返回默认的日志记录器，首次调用时才创建日志文件"""
+    global _default_logger
+    if _default_logger is None:
+        _default_logger = setup_logger()
+    return _default_logger
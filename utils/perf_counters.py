@@ -0,0 +1,258 @@
+import ctypes
+import errno
+import fcntl
+import os
+import platform
+import shutil
+import signal
+import struct
+import subprocess
+import tempfile
+import time
+
+# perf_event_open 的系统调用号
+SYSCALL_NUMBERS = {
+    "x86_64": 298,
+    "i386": 336,
+    "i686": 336,
+    "aarch64": 241,
+    "riscv64": 241,
+    "ppc64le": 319,
+    "ppc64": 319,
+    "s390x": 331
+}
+PERF_TYPE_HARDWARE = 0
+PERF_TYPE_SOFTWARE = 1
+PERF_TYPE_HW_CACHE = 3
+# 缓存事件的 config = 缓存 ID | (操作 << 8) | (结果 << 16)，这里都是读操作
+CACHE_LL, CACHE_DTLB = 2, 3
+CACHE_ACCESS, CACHE_MISS = 0, 1
+# 事件名: (perf_event_open 的 type, config, perf stat 的事件名)
+EVENTS = {
+    "cycles": (PERF_TYPE_HARDWARE, 0, "cycles"),
+    "instructions": (PERF_TYPE_HARDWARE, 1, "instructions"),
+    "llc_loads": (PERF_TYPE_HW_CACHE, CACHE_LL | CACHE_ACCESS << 16, "LLC-loads"),
+    "llc_load_misses": (PERF_TYPE_HW_CACHE, CACHE_LL | CACHE_MISS << 16, "LLC-load-misses"),
+    "dtlb_loads": (PERF_TYPE_HW_CACHE, CACHE_DTLB | CACHE_ACCESS << 16, "dTLB-loads"),
+    "dtlb_load_misses": (PERF_TYPE_HW_CACHE, CACHE_DTLB | CACHE_MISS << 16, "dTLB-load-misses"),
+    "task_clock": (PERF_TYPE_SOFTWARE, 1, "task-clock"),
+    "page_faults": (PERF_TYPE_SOFTWARE, 2, "page-faults"),
+    "context_switches": (PERF_TYPE_SOFTWARE, 3, "context-switches"),
+    "cpu_migrations": (PERF_TYPE_SOFTWARE, 4, "cpu-migrations")
+}
+# perf_event_attr.flags 中的位
+FLAG_DISABLED = 1 << 0
+FLAG_INHERIT = 1 << 1
+FLAG_EXCLUDE_KERNEL = 1 << 5
+FLAG_EXCLUDE_HV = 1 << 6
+# read_format：附带启用与实际计数时间，用于换算多路复用时的计数
+READ_FORMAT = 1 | 2
+# PERF_ATTR_SIZE_VER5（112 字节），新内核兼容旧版本大小的结构体
+ATTR_FORMAT = "=IIQQQQQIIQQQQIiQIHH"
+IOC_ENABLE, IOC_DISABLE, IOC_RESET = 0x2400, 0x2401, 0x2403
+
+
+def _attr(event_type, config, exclude_kernel):
+    flags = FLAG_DISABLED | FLAG_INHERIT | FLAG_EXCLUDE_HV
+    if exclude_kernel:
+        flags |= FLAG_EXCLUDE_KERNEL
+    size = struct.calcsize(ATTR_FORMAT)
+    return struct.pack(ATTR_FORMAT, event_type, size, config, 0, 0, READ_FORMAT, flags,
+                       0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0)
+
+
+def derive(counts, wall_seconds=None):
+    """由原始计数计算 IPC、缺失率、每千条指令缺失数（MPKI）与平均频率"""
+    def ratio(numerator, denominator, scale=1.0):
+        a, b = counts.get(numerator), counts.get(denominator)
+        return a / b * scale if a is not None and b else None
+
+    derived = {
+        "ipc": ratio("instructions", "cycles"),
+        "llc_miss_rate": ratio("llc_load_misses", "llc_loads"),
+        "llc_mpki": ratio("llc_load_misses", "instructions", 1000),
+        "dtlb_miss_rate": ratio("dtlb_load_misses", "dtlb_loads"),
+        "dtlb_mpki": ratio("dtlb_load_misses", "instructions", 1000),
+        # task_clock 为纳秒，周期数 / 纳秒即 GHz
+        "ghz": ratio("cycles", "task_clock")
+    }
+    if wall_seconds and counts.get("task_clock") is not None:
+        derived["cpus_utilized"] = counts["task_clock"] / 1e9 / wall_seconds
+    return {name: value for name, value in derived.items() if value is not None}
+
+
+class PerfCounters:
+    """在基准测试运行期间统计硬件与软件性能计数器
+
+    计数器以 inherit 方式打开在当前进程上，之后创建的线程和子进程（如 Himeno 的可执行文件）
+    退出时计数会累加回来，因此无需修改各基准测试模块。优先直接调用 perf_event_open；
+    不可用时退回到附加到当前进程的 perf stat -x；虚拟机中不支持的事件会被跳过并记录在
+    unavailable 中，全部不可用时只返回 available: false，不影响测量本身。
+    """
+
+    def __init__(self, config):
+        options = config.get("perf_counters", {})
+        self.events = options.get("events", list(EVENTS))
+        self.backend = options.get("backend", "auto")
+        self.exclude_kernel = options.get("exclude_kernel")
+        self.attach_delay = options.get("attach_delay", 0.1)
+        self.fds = {}
+        self.unavailable = {}
+        self.process = None
+        self.output = None
+        self.started = None
+        self.backend_used = None
+        self.error = None
+
+        unknown = [event for event in self.events if event not in EVENTS]
+        if unknown:
+            raise ValueError(f"未知的性能计数器事件: {', '.join(unknown)}")
+        if self.backend not in ("auto", "syscall", "perf"):
+            raise ValueError(f"未知的计数器后端: {self.backend}")
+
+    # ---- perf_event_open ----
+
+    def _open_syscall(self):
+        number = SYSCALL_NUMBERS.get(platform.machine())
+        if number is None:
+            raise OSError(errno.ENOSYS, f"不支持的架构 {platform.machine()}")
+        libc = ctypes.CDLL(None, use_errno=True)
+        libc.syscall.restype = ctypes.c_long
+
+        def open_event(event, exclude_kernel):
+            event_type, config, _ = EVENTS[event]
+            attr = ctypes.create_string_buffer(_attr(event_type, config, exclude_kernel))
+            fd = libc.syscall(number, attr, 0, -1, -1, 0)
+            if fd < 0:
+                error = ctypes.get_errno()
+                raise OSError(error, os.strerror(error))
+            return fd
+
+        # 未指定时先统计内核态，perf_event_paranoid 不允许时只统计用户态
+        exclude_kernel = self.exclude_kernel
+        for event in self.events:
+            try:
+                self.fds[event] = open_event(event, bool(exclude_kernel))
+            except OSError as e:
+                if e.errno == errno.EACCES and exclude_kernel is None:
+                    exclude_kernel = True
+                    try:
+                        self.fds[event] = open_event(event, True)
+                        continue
+                    except OSError as retry:
+                        e = retry
+                # ENOENT/EOPNOTSUPP：该事件在当前 CPU 或虚拟机中不存在
+                self.unavailable[event] = e.strerror or str(e)
+            if exclude_kernel is None and event in self.fds:
+                exclude_kernel = False
+        if not self.fds:
+            raise OSError(errno.ENODEV, "没有可用的计数器事件")
+        for fd in self.fds.values():
+            fcntl.ioctl(fd, IOC_RESET, 0)
+            fcntl.ioctl(fd, IOC_ENABLE, 0)
+
+    def _read_syscall(self):
+        counts = {}
+        for event, fd in self.fds.items():
+            fcntl.ioctl(fd, IOC_DISABLE, 0)
+            value, enabled, running = struct.unpack("=QQQ", os.read(fd, 24))
+            os.close(fd)
+            if not running:
+                self.unavailable[event] = "未被调度计数"
+                continue
+            # 事件多于硬件计数器时内核会分时复用，按启用时间换算
+            counts[event] = value * enabled / running if running < enabled else value
+        self.fds = {}
+        return counts
+
+    # ---- perf stat ----
+
+    def _open_perf(self):
+        perf = shutil.which("perf")
+        if perf is None:
+            raise OSError(errno.ENOENT, "未找到 perf")
+        fd, self.output = tempfile.mkstemp(prefix="perf_counters.", suffix=".csv")
+        os.close(fd)
+        self.process = subprocess.Popen(
+            [perf, "stat", "-x", ",", "-o", self.output, "-p", str(os.getpid()),
+             "-e", ",".join(EVENTS[event][2] for event in self.events)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+        )
+        # perf stat 附加到进程需要一点时间，附加完成前的开销不会被统计
+        time.sleep(self.attach_delay)
+        if self.process.poll() is not None:
+            message = self.process.stderr.read().decode(errors="replace").strip()
+            os.unlink(self.output)
+            self.process = None
+            raise OSError(errno.EPERM, message or "perf stat 退出")
+
+    def _read_perf(self):
+        self.process.send_signal(signal.SIGINT)
+        self.process.wait()
+        self.process.stderr.close()
+        self.process = None
+        names = {EVENTS[event][2]: event for event in self.events}
+        counts = {}
+        try:
+            with open(self.output) as f:
+                for line in f:
+                    fields = line.strip().split(",")
+                    # 只能统计用户态时事件名带有 :u 后缀
+                    name = fields[2].split(":")[0] if len(fields) >= 3 else None
+                    if name not in names:
+                        continue
+                    event = names[name]
+                    try:
+                        value = float(fields[0])
+                    except ValueError:
+                        # <not supported> 或 <not counted>
+                        self.unavailable[event] = fields[0].strip("<>")
+                        continue
+                    # perf stat 以毫秒报告 task-clock，统一为纳秒
+                    counts[event] = value * 1e6 if event == "task_clock" else value
+        finally:
+            os.unlink(self.output)
+        return counts
+
+    # ---- 接口 ----
+
+    def start(self):
+        """打开并启用计数器；失败时记录原因，stop() 返回 available: false"""
+        self.error = None
+        self.unavailable = {}
+        backends = ["syscall", "perf"] if self.backend == "auto" else [self.backend]
+        errors = []
+        for backend in backends:
+            try:
+                if backend == "syscall":
+                    self._open_syscall()
+                else:
+                    self._open_perf()
+                self.backend_used = backend
+                break
+            except OSError as e:
+                self._close()
+                errors.append(f"{backend}: {e.strerror or e}")
+        else:
+            self.backend_used = None
+            self.error = "; ".join(errors)
+        self.started = time.perf_counter()
+
+    def _close(self):
+        for fd in self.fds.values():
+            os.close(fd)
+        self.fds = {}
+
+    def stop(self):
+        """停止计数，返回原始计数与派生指标"""
+        wall = time.perf_counter() - self.started
+        if self.backend_used is None:
+            return {"available": False, "error": self.error}
+        counts = self._read_syscall() if self.backend_used == "syscall" else self._read_perf()
+        return {
+            "available": bool(counts),
+            "backend": self.backend_used,
+            "counts": counts,
+            "derived": derive(counts, wall),
+            "unavailable": self.unavailable
+        }
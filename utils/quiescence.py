@@ -0,0 +1,151 @@
+import glob
+import os
+import time
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+class QuiescenceGate:
+    """测量前的静默等待：负载、CPU 空闲率和温度都回落到阈值以内才开始
+
+    条件需连续 stable_samples 次（每次在 sample_seconds 窗口内计算 CPU 空闲率）满足；超过
+    timeout 仍未满足时按 on_timeout 处理（warn 继续测量并在报告中标记，fail 抛出 RuntimeError）。
+    等待前可选地同步并丢弃页缓存、整理内存碎片，使每批测量从相同的缓存状态开始。
+    """
+
+    def __init__(self, config):
+        options = config.get("quiescence", {})
+        self.proc_root = options.get("proc_root", "/proc")
+        self.sysfs_root = options.get("sysfs_root", "/sys")
+        self.max_load_per_cpu = options.get("max_load_per_cpu", 0.2)
+        self.min_idle_percent = options.get("min_idle_percent", 95)
+        self.max_temp_c = options.get("max_temp_c")
+        self.sample_seconds = options.get("sample_seconds", 1.0)
+        self.stable_samples = max(1, options.get("stable_samples", 3))
+        self.timeout = options.get("timeout", 120)
+        self.on_timeout = options.get("on_timeout", "warn")
+        self.drop_caches = options.get("drop_caches", False)
+        self.compact_memory = options.get("compact_memory", False)
+        if self.on_timeout not in ("warn", "fail"):
+            raise ValueError(f"未知的超时处理方式: {self.on_timeout}")
+
+    # ---- 系统状态 ----
+
+    def load_per_cpu(self):
+        """1 分钟平均负载除以 CPU 数"""
+        text = _read(os.path.join(self.proc_root, "loadavg"))
+        if text is None:
+            return None
+        return float(text.split()[0]) / (os.cpu_count() or 1)
+
+    def _cpu_times(self):
+        text = _read(os.path.join(self.proc_root, "stat"))
+        if text is None:
+            return None
+        values = [int(value) for value in text.split("\n", 1)[0].split()[1:]]
+        idle = values[3] + (values[4] if len(values) > 4 else 0)
+        return idle, sum(values[:8])
+
+    def idle_percent(self, seconds):
+        """在 seconds 秒窗口内统计全部 CPU 的空闲百分比（含 iowait）"""
+        before = self._cpu_times()
+        time.sleep(seconds)
+        after = self._cpu_times()
+        if before is None or after is None or after[1] == before[1]:
+            return None
+        return 100.0 * (after[0] - before[0]) / (after[1] - before[1])
+
+    def temperatures(self):
+        """各温度传感器的当前温度（摄氏度）"""
+        temperatures = {}
+        for zone in sorted(glob.glob(os.path.join(self.sysfs_root, "class", "thermal", "thermal_zone*"))):
+            value = _read(os.path.join(zone, "temp"))
+            if value is None or not value.lstrip("-").isdigit():
+                continue
+            name = f"{os.path.basename(zone)}:{_read(os.path.join(zone, 'type')) or 'unknown'}"
+            temperatures[name] = int(value) / 1000
+        return temperatures
+
+    def throttle_count(self):
+        """所有 CPU 的核心与封装降频事件累计次数，没有 thermal_throttle 目录时返回 None"""
+        paths = glob.glob(os.path.join(self.sysfs_root, "devices", "system", "cpu", "cpu[0-9]*",
+                                       "thermal_throttle", "*_throttle_count"))
+        if not paths:
+            return None
+        # 同一封装内各 CPU 的 package_throttle_count 相同，按封装只计一次
+        total = 0
+        packages = {}
+        for path in paths:
+            value = _read(path)
+            if value is None or not value.isdigit():
+                continue
+            if os.path.basename(path).startswith("package"):
+                cpu_dir = os.path.dirname(os.path.dirname(path))
+                package = _read(os.path.join(cpu_dir, "topology", "physical_package_id")) or cpu_dir
+                packages[package] = int(value)
+            else:
+                total += int(value)
+        return total + sum(packages.values())
+
+    # ---- 准备与等待 ----
+
+    def prepare(self):
+        """同步脏页后丢弃页缓存与 slab 缓存、整理内存碎片（需要 root），返回执行的操作"""
+        actions = []
+        if self.drop_caches:
+            os.sync()
+            try:
+                with open(os.path.join(self.proc_root, "sys", "vm", "drop_caches"), "w") as f:
+                    f.write("3")
+                actions.append("drop_caches")
+            except OSError as e:
+                print(f"丢弃页缓存失败: {e.strerror or e}")
+        if self.compact_memory:
+            try:
+                with open(os.path.join(self.proc_root, "sys", "vm", "compact_memory"), "w") as f:
+                    f.write("1")
+                actions.append("compact_memory")
+            except OSError as e:
+                print(f"整理内存碎片失败: {e.strerror or e}")
+        return actions
+
+    def _check(self):
+        """采样一次，返回 (是否满足全部条件, 状态)"""
+        state = {
+            "load_per_cpu": self.load_per_cpu(),
+            "idle_percent": self.idle_percent(self.sample_seconds),
+            "max_temp_c": max(self.temperatures().values(), default=None)
+        }
+        settled = (
+            (state["load_per_cpu"] is None or state["load_per_cpu"] <= self.max_load_per_cpu)
+            and (state["idle_percent"] is None or state["idle_percent"] >= self.min_idle_percent)
+            and (self.max_temp_c is None or state["max_temp_c"] is None or state["max_temp_c"] <= self.max_temp_c)
+        )
+        return settled, state
+
+    def wait(self):
+        """执行准备步骤并等待系统静默，返回等待报告"""
+        started = time.monotonic()
+        actions = self.prepare()
+        stable = 0
+        while True:
+            settled, state = self._check()
+            stable = stable + 1 if settled else 0
+            waited = time.monotonic() - started
+            if stable >= self.stable_samples:
+                break
+            if waited >= self.timeout:
+                message = (f"等待系统静默超时 ({self.timeout} 秒): 负载/CPU {state['load_per_cpu']}, "
+                           f"空闲 {state['idle_percent']}%, 最高温度 {state['max_temp_c']}°C")
+                if self.on_timeout == "fail":
+                    raise RuntimeError(message)
+                print(message)
+                break
+        return dict(state, settled=stable >= self.stable_samples, waited_seconds=waited,
+                    actions=actions, throttle_count=self.throttle_count())
@@ -0,0 +1,194 @@
+import ast
+import importlib
+import os
+
+try:
+    from importlib.metadata import entry_points
+except ImportError:  # Python < 3.8
+    entry_points = None
+
+PLUGIN_KINDS = {"Benchmark": "benchmark", "Tuner": "tuner"}
+ENTRY_POINT_GROUPS = {
+    "benchmark": "performance_tuning.benchmarks",
+    "tuner": "performance_tuning.tuners"
+}
+KIND_LABELS = {"benchmark": "基准测试", "tuner": "调优"}
+METADATA_FIELDS = ("name", "description", "exclusive", "needs_root", "estimated_duration")
+
+
+class RegistryError(Exception):
+    """插件不存在、无法导入或不符合接口约定"""
+
+
+def split_name(name):
+    """把 "command_benchmark:db_load" 形式的名称拆分为 (插件名, 实例名)，没有实例名时为 None"""
+    plugin, _, instance = name.partition(":")
+    return plugin, instance or None
+
+
+class PluginSpec:
+    """已发现但尚未导入的插件"""
+
+    def __init__(self, kind, name, module=None, class_name=None, metadata=None, entry_point=None):
+        self.kind = kind
+        self.name = name
+        self.module = module
+        self.class_name = class_name
+        self.metadata = metadata or {}
+        self.entry_point = entry_point
+
+    @property
+    def source(self):
+        if self.entry_point is not None:
+            return f"entry point {self.entry_point.value}"
+        return f"{self.module}:{self.class_name}"
+
+
+def _base_names(node):
+    names = []
+    for base in node.bases:
+        if isinstance(base, ast.Name):
+            names.append(base.id)
+        elif isinstance(base, ast.Attribute):
+            names.append(base.attr)
+    return names
+
+
+def _class_metadata(node):
+    """读取类体中的字面量元数据属性"""
+    metadata = {}
+    for statement in node.body:
+        if isinstance(statement, ast.Assign) and len(statement.targets) == 1:
+            target = statement.targets[0]
+            if isinstance(target, ast.Name) and target.id in METADATA_FIELDS:
+                try:
+                    metadata[target.id] = ast.literal_eval(statement.value)
+                except ValueError:
+                    pass
+    if not metadata.get("description"):
+        docstring = ast.get_docstring(node)
+        if docstring:
+            metadata["description"] = docstring.splitlines()[0]
+    return metadata
+
+
+class PluginRegistry:
+    """基准测试与调优模块的注册表
+
+    通过静态分析 modules/ 目录和 Python 包入口点发现插件，
+    只有在 create() 时才导入对应模块。
+    """
+
+    def __init__(self, package="modules", package_dir=None):
+        self.package = package
+        self.package_dir = package_dir or os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))), package
+        )
+        self._plugins = None
+
+    def _scan_package(self):
+        """解析 modules/*.py 的语法树，找出 Benchmark/Tuner 的子类"""
+        classes = {}
+        for filename in sorted(os.listdir(self.package_dir)):
+            if not filename.endswith(".py") or filename.startswith("_") or filename == "base.py":
+                continue
+            module = f"{self.package}.{filename[:-3]}"
+            with open(os.path.join(self.package_dir, filename), "r") as f:
+                try:
+                    tree = ast.parse(f.read(), filename)
+                except SyntaxError:
+                    continue
+            for node in tree.body:
+                if isinstance(node, ast.ClassDef) and not node.name.startswith("_"):
+                    classes[node.name] = (module, node)
+
+        # 支持间接继承：反复传播插件类型直到不再变化
+        kinds = dict(PLUGIN_KINDS)
+        changed = True
+        while changed:
+            changed = False
+            for class_name, (_, node) in classes.items():
+                if class_name in kinds:
+                    continue
+                for base in _base_names(node):
+                    if base in kinds:
+                        kinds[class_name] = kinds[base]
+                        changed = True
+                        break
+
+        plugins = []
+        for class_name, (module, node) in classes.items():
+            if class_name not in kinds or class_name in PLUGIN_KINDS:
+                continue
+            metadata = _class_metadata(node)
+            name = metadata.get("name") or module.rsplit(".", 1)[1]
+            plugins.append(PluginSpec(kinds[class_name], name, module, class_name, metadata))
+        return plugins
+
+    def _scan_entry_points(self):
+        """从已安装的 Python 包入口点发现第三方插件"""
+        if entry_points is None:
+            return []
+        plugins = []
+        for kind, group in ENTRY_POINT_GROUPS.items():
+            try:
+                found = entry_points(group=group)
+            except TypeError:  # Python < 3.10
+                found = entry_points().get(group, [])
+            for entry_point in found:
+                plugins.append(PluginSpec(kind, entry_point.name, entry_point=entry_point))
+        return plugins
+
+    def plugins(self, kind=None):
+        """返回已发现的插件（按类型过滤）"""
+        if self._plugins is None:
+            self._plugins = {}
+            # modules/ 目录中的同名插件优先于入口点
+            for spec in self._scan_entry_points() + self._scan_package():
+                self._plugins[(spec.kind, spec.name)] = spec
+        return [spec for spec in self._plugins.values() if kind is None or spec.kind == kind]
+
+    def get(self, kind, name):
+        """按名称查找插件（忽略 :实例名 后缀）"""
+        name = split_name(name)[0]
+        self.plugins()
+        spec = self._plugins.get((kind, name))
+        if spec is None:
+            available = ", ".join(sorted(spec.name for spec in self.plugins(kind))) or "无"
+            raise RegistryError(f"未找到{KIND_LABELS[kind]}模块 {name}（可用: {available}）")
+        return spec
+
+    def load(self, kind, name):
+        """导入插件模块并返回插件类"""
+        spec = self.get(kind, name)
+        try:
+            if spec.entry_point is not None:
+                plugin_class = spec.entry_point.load()
+            else:
+                plugin_class = getattr(importlib.import_module(spec.module), spec.class_name)
+        except Exception as e:
+            raise RegistryError(f"无法加载{KIND_LABELS[kind]}模块 {name} ({spec.source}): {e}") from e
+
+        if spec.entry_point is not None:
+            spec.metadata = {
+                field: getattr(plugin_class, field)
+                for field in METADATA_FIELDS
+                if getattr(plugin_class, field, None) is not None
+            }
+
+        required = ("run",) if kind == "benchmark" else ("apply", "reset")
+        missing = [method for method in required if not callable(getattr(plugin_class, method, None))]
+        if missing:
+            raise RegistryError(f"{KIND_LABELS[kind]}模块 {name} 缺少方法: {', '.join(missing)}")
+        return plugin_class
+
+    def create(self, kind, name, config):
+        """导入并实例化插件，名称带有 :实例名 时作为第二个参数传给构造函数"""
+        instance = split_name(name)[1]
+        plugin_class = self.load(kind, name)
+        try:
+            if instance is not None:
+                return plugin_class(config, instance)
+            return plugin_class(config)
+        except Exception as e:
+            raise RegistryError(f"初始化{KIND_LABELS[kind]}模块 {name} 失败: {e}") from e
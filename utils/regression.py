@@ -0,0 +1,364 @@
+import argparse
+import json
+import math
+import random
+import sys
+from datetime import datetime
+
+from utils.result_store import PHASES, ResultStore, hardware_class, profile_hash
+from utils.stats import mann_whitney_u, median, quantile
+
+METHODS = ("mann_whitney", "bootstrap")
+
+
+def _ranks(values):
+    """平均秩（并列值取平均）"""
+    order = sorted(range(len(values)), key=lambda index: values[index])
+    ranks = [0.0] * len(values)
+    i = 0
+    while i < len(order):
+        j = i
+        while j + 1 < len(order) and values[order[j + 1]] == values[order[i]]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[order[k]] = (i + j) / 2 + 1
+        i = j + 1
+    return ranks
+
+
+def _best_split(ranks, min_size):
+    """在所有切分点中找出标准化 Mann-Whitney 统计量最大的一个，返回 (切分点, |z|)
+
+    切分点 k 前的秩和由前缀和得到，整个扫描为 O(n)。
+    """
+    n = len(ranks)
+    best, best_z = None, 0.0
+    prefix = 0.0
+    for k in range(1, n - min_size + 1):
+        prefix += ranks[k - 1]
+        if k < min_size:
+            continue
+        u = prefix - k * (k + 1) / 2
+        sigma = math.sqrt(k * (n - k) * (n + 1) / 12)
+        z = abs(u - k * (n - k) / 2) / sigma
+        if z > best_z:
+            best, best_z = k, z
+    return best, best_z
+
+
+def change_points(values, min_size=3, alpha=0.05, permutations=500, rng=None):
+    """非参数的二分切分变点检测，返回按位置排序的变点下标（变点后第一个点）
+
+    每段取标准化秩和统计量最大的切分点，用置换检验（打乱段内顺序）估计该最大值的
+    p 值，显著时继续在两侧子段中查找。基于秩的统计量不受个别离群测量的影响。
+    """
+    rng = rng or random.Random()
+    found = []
+    segments = [(0, len(values))]
+    while segments:
+        start, end = segments.pop()
+        if end - start < 2 * min_size:
+            continue
+        ranks = _ranks(values[start:end])
+        split, z = _best_split(ranks, min_size)
+        if split is None or z == 0:
+            continue
+        shuffled = list(ranks)
+        exceed = 0
+        for _ in range(permutations):
+            rng.shuffle(shuffled)
+            if _best_split(shuffled, min_size)[1] >= z:
+                exceed += 1
+        if (exceed + 1) / (permutations + 1) >= alpha:
+            continue
+        found.append(start + split)
+        segments.extend([(start, start + split), (start + split, end)])
+    return sorted(found)
+
+
+def bootstrap_change(baseline, current, resamples=2000, confidence=0.95, rng=None):
+    """自助法估计中位数相对变化（%）的置信区间"""
+    rng = rng or random.Random()
+    changes = []
+    for _ in range(resamples):
+        base = median(rng.choices(baseline, k=len(baseline)))
+        if not base:
+            continue
+        changes.append((median(rng.choices(current, k=len(current))) - base) / abs(base) * 100)
+    if not changes:
+        return None, None
+    tail = (1 - confidence) / 2
+    return quantile(changes, tail), quantile(changes, 1 - tail)
+
+
+def candidates_from_document(document, phase=None):
+    """从 main.py 保存的结果文档中取出待检查的结果（默认取调优后阶段，没有时取初始阶段）"""
+    phases = [entry for entry in PHASES if entry[2] == phase] if phase else list(reversed(PHASES))
+    for results_key, info_key, name in phases:
+        results = document.get(results_key)
+        if not isinstance(results, dict):
+            continue
+        system_info = document.get(info_key) or document.get("initial_system_info") or {}
+        config = document.get("config")
+        return [
+            {
+                "benchmark": benchmark,
+                "scores": result.get("scores") or [result.get("score")],
+                "host": (system_info.get("os") or {}).get("hostname"),
+                "kernel": system_info.get("kernel") or (system_info.get("os") or {}).get("release"),
+                "hardware": hardware_class(system_info),
+                "profile_hash": profile_hash(config, benchmark, name) if config is not None else None,
+                "phase": name,
+                "timestamp": None,
+                "run_id": None
+            }
+            for benchmark, result in results.items() if result.get("success") and not result.get("cached")
+        ]
+    return []
+
+
+def candidates_from_store(store, run_id=None, host=None, phase=None):
+    """取出结果库中的一次运行（默认为该主机最近的一次）作为待检查的结果"""
+    if run_id is None:
+        latest = store.query(limit=1, host=host, phase=phase)
+        if not latest:
+            return []
+        run_id = latest[0]["run_id"]
+    rows = store.query(run_id=run_id, phase=phase)
+    if rows and phase is None:
+        # 一次运行包含初始与调优后两个阶段时，检查调优后的结果
+        phases = {row["phase"] for row in rows}
+        if "tuned" in phases:
+            rows = [row for row in rows if row["phase"] == "tuned"]
+    return [
+        {
+            "benchmark": row["benchmark"],
+            "scores": store.samples(row["id"]) or [row["score"]],
+            "host": row["host"],
+            "kernel": row["kernel"],
+            "hardware": row["hardware"],
+            "profile_hash": row["profile_hash"],
+            "phase": row["phase"],
+            "timestamp": row["timestamp"],
+            "run_id": row["run_id"]
+        }
+        for row in rows
+    ]
+
+
+class RegressionChecker:
+    """把一次运行的测量分布与同一主机、同一硬件类别的滚动基线比较，找出性能退化
+
+    基线为此前最近 window 次运行（同一基准测试、阶段，默认还要求同一配置哈希）的全部
+    测量值；若历史序列中检测到变点，且最近一个变点之后的运行不少于 min_baseline 次，
+    则只用变点之后的运行作为基线，避免旧的性能水平掩盖新的退化。得分越高越好。
+    """
+
+    def __init__(self, store, config):
+        self.store = store
+        options = config.get("regression", {})
+        self.window = options.get("window", 10)
+        self.min_baseline = options.get("min_baseline", 3)
+        self.history = options.get("history", 100)
+        self.threshold = options.get("threshold", 5.0)
+        self.alpha = options.get("alpha", 0.05)
+        self.method = options.get("method", "mann_whitney")
+        self.same_profile = options.get("same_profile", True)
+        self.bootstrap_samples = options.get("bootstrap_samples", 2000)
+        detection = options.get("change_point", {})
+        self.min_segment = detection.get("min_size", 3)
+        self.permutations = detection.get("permutations", 500)
+        self.rng = random.Random(options.get("seed"))
+        if self.method not in METHODS:
+            raise ValueError(f"未知的回归检验方法: {self.method}")
+
+    def _history(self, candidate):
+        """同一主机、硬件类别、基准测试与阶段的历史运行（按时间正序，不含当前运行）"""
+        rows = self.store.query(
+            until=candidate["timestamp"],
+            limit=self.history,
+            host=candidate["host"],
+            hardware=candidate["hardware"],
+            benchmark=candidate["benchmark"],
+            phase=candidate["phase"],
+            profile_hash=candidate["profile_hash"] if self.same_profile else None
+        )
+        rows = [row for row in rows if row["run_id"] != candidate["run_id"]]
+        rows.reverse()
+        for row in rows:
+            row["scores"] = self.store.samples(row["id"]) or [row["score"]]
+        return rows
+
+    def _change_points(self, rows, candidate):
+        """在历史与当前运行组成的时间序列（各次运行的中位数）上检测变点"""
+        series = [median(row["scores"]) for row in rows] + [median(candidate["scores"])]
+        labels = [(row["timestamp"], row["run_id"], row["kernel"]) for row in rows]
+        labels.append((candidate["timestamp"], candidate["run_id"], candidate["kernel"]))
+        indexes = change_points(series, self.min_segment, self.alpha, self.permutations, self.rng)
+        points = []
+        bounds = [0] + indexes + [len(series)]
+        for position, index in enumerate(indexes):
+            before = median(series[bounds[position]:index])
+            after = median(series[index:bounds[position + 2]])
+            timestamp, run_id, kernel = labels[index]
+            points.append({
+                "index": index,
+                "time": datetime.fromtimestamp(timestamp).isoformat(timespec="seconds") if timestamp else "当前运行",
+                "run_id": run_id,
+                "kernel_before": labels[index - 1][2],
+                "kernel_after": kernel,
+                "median_before": before,
+                "median_after": after,
+                "shift_percent": (after - before) / abs(before) * 100 if before else None
+            })
+        return points
+
+    def check_candidate(self, candidate):
+        """检查一个基准测试的结果，返回报告行"""
+        current = [score for score in candidate["scores"] if score is not None]
+        rows = self._history(candidate)
+        points = self._change_points(rows, dict(candidate, scores=current)) if rows and current else []
+
+        baseline_rows = rows[-self.window:]
+        # 最近一个变点落在历史中时，只用变点之后的运行作为基线
+        if points and points[-1]["index"] < len(rows):
+            recent = rows[points[-1]["index"]:][-self.window:]
+            if len(recent) >= self.min_baseline:
+                baseline_rows = recent
+        baseline = [score for row in baseline_rows for score in row["scores"] if score is not None]
+
+        report = {
+            "benchmark": candidate["benchmark"],
+            "phase": candidate["phase"],
+            "baseline_runs": len(baseline_rows),
+            "baseline_samples": len(baseline),
+            "current_samples": len(current),
+            "baseline_median": median(baseline) if baseline else None,
+            "current_median": median(current) if current else None,
+            "change_percent": None,
+            "p_value": None,
+            "ci_low": None,
+            "ci_high": None,
+            "change_points": points,
+            "status": "insufficient_data"
+        }
+        if len(baseline_rows) < self.min_baseline or not current or not report["baseline_median"]:
+            return report
+
+        report["change_percent"] = (report["current_median"] - report["baseline_median"]) / abs(report["baseline_median"]) * 100
+        _, report["p_value"] = mann_whitney_u(baseline, current)
+        report["ci_low"], report["ci_high"] = bootstrap_change(
+            baseline, current, self.bootstrap_samples, 1 - self.alpha, self.rng
+        )
+        if self.method == "bootstrap":
+            if report["ci_low"] is None:
+                return report
+            significant = report["ci_high"] < 0 or report["ci_low"] > 0
+        else:
+            # 只有一次测量时秩检验无法达到显著，结论为数据不足
+            if len(current) < 2:
+                return report
+            significant = report["p_value"] < self.alpha
+        if significant and report["change_percent"] <= -self.threshold:
+            report["status"] = "regressed"
+        elif significant and report["change_percent"] >= self.threshold:
+            report["status"] = "improved"
+        else:
+            report["status"] = "ok"
+        return report
+
+    def check(self, candidates, benchmarks=None):
+        """检查一次运行的全部基准测试，返回报告"""
+        rows = [
+            self.check_candidate(candidate) for candidate in candidates
+            if not benchmarks or candidate["benchmark"] in benchmarks
+        ]
+        return {
+            "method": self.method,
+            "threshold_percent": self.threshold,
+            "alpha": self.alpha,
+            "window": self.window,
+            "results": rows,
+            "regressed": [row["benchmark"] for row in rows if row["status"] == "regressed"]
+        }
+
+
+def print_report(report):
+    """打印回归检查报告"""
+    print("\n性能回归检查:")
+    print("=" * 50)
+    for row in report["results"]:
+        print(f"{row['benchmark']} ({row['phase']}): {row['status']}")
+        print(f"  基线: {row['baseline_runs']} 次运行 / {row['baseline_samples']} 个测量值，中位数 {row['baseline_median']}")
+        print(f"  当前: {row['current_samples']} 个测量值，中位数 {row['current_median']}")
+        if row["change_percent"] is not None:
+            interval = ""
+            if row["ci_low"] is not None:
+                interval = f"，置信区间 [{row['ci_low']:+.2f}%, {row['ci_high']:+.2f}%]"
+            p_value = "N/A" if row["p_value"] is None else f"{row['p_value']:.4f}"
+            print(f"  变化: {row['change_percent']:+.2f}%{interval}，p = {p_value}")
+        for point in row["change_points"]:
+            shift = "N/A" if point["shift_percent"] is None else f"{point['shift_percent']:+.2f}%"
+            kernel = ""
+            if point["kernel_before"] != point["kernel_after"]:
+                kernel = f"，内核 {point['kernel_before']} -> {point['kernel_after']}"
+            print(f"  变点: {point['time']} 处 {shift}{kernel}")
+    if report["regressed"]:
+        print(f"\n超过 {report['threshold_percent']}% 的显著退化: {', '.join(report['regressed'])}")
+    else:
+        print("\n未发现显著退化")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="对照结果库中的历史基线检查性能回归")
+    parser.add_argument("--db", default="results/results.db", help="结果库路径")
+    parser.add_argument("--config", help="配置文件路径（读取其中的 regression 配置）")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--results", help="待检查的 JSON 结果文件（默认检查结果库中最近的一次运行）")
+    source.add_argument("--run-id", help="待检查的结果库运行 ID")
+    parser.add_argument("--host", help="只在该主机的运行中查找最近的一次")
+    parser.add_argument("--phase", choices=[phase for _, _, phase in PHASES])
+    parser.add_argument("--benchmark", nargs="+", help="只检查这些基准测试")
+    parser.add_argument("--window", type=int)
+    parser.add_argument("--threshold", type=float, help="判定为退化的最小变化百分比")
+    parser.add_argument("--alpha", type=float)
+    parser.add_argument("--method", choices=METHODS)
+    parser.add_argument("--format", choices=("table", "json"), default="table")
+    args = parser.parse_args(argv)
+
+    config = {}
+    if args.config:
+        with open(args.config) as f:
+            config = json.load(f)
+    options = config.setdefault("regression", {})
+    for key in ("window", "threshold", "alpha", "method"):
+        if getattr(args, key) is not None:
+            options[key] = getattr(args, key)
+
+    store = ResultStore(args.db)
+    try:
+        checker = RegressionChecker(store, config)
+        if args.results:
+            with open(args.results) as f:
+                candidates = candidates_from_document(json.load(f), args.phase)
+        else:
+            candidates = candidates_from_store(store, args.run_id, args.host, args.phase)
+        if not candidates:
+            print("错误: 没有可检查的结果", file=sys.stderr)
+            return 2
+        report = checker.check(candidates, args.benchmark)
+    except (OSError, ValueError) as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 2
+    finally:
+        store.close()
+
+    if args.format == "json":
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        print_report(report)
+    return 1 if report["regressed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
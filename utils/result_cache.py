@@ -0,0 +1,87 @@
+import hashlib
+import json
+import os
+import time
+
+# 决定结果内容的测量配置节：重复测量方式、遥测、性能计数器、能耗（含得分目标）与静默等待
+RESULT_SECTIONS = ("run_engine", "telemetry", "perf_counters", "energy", "quiescence")
+
+
+def cache_key(*parts):
+    """对若干可 JSON 序列化的对象计算内容哈希"""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResultCache:
+    """基准测试结果的磁盘缓存，按内容哈希寻址，支持 TTL 和 LRU 淘汰"""
+
+    def __init__(self, config):
+        options = config.get("result_cache", {})
+        self.enabled = options.get("enable", True)
+        self.cache_dir = options.get("dir", "results/cache")
+        self.ttl = options.get("ttl", 7 * 24 * 3600)
+        self.max_entries = options.get("max_entries", 256)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        """读取缓存结果，未命中或已过期时返回 None"""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if self.ttl and time.time() - entry.get("created", 0) > self.ttl:
+            self._remove(path)
+            return None
+
+        # 以文件修改时间记录最近使用时间，供 LRU 淘汰
+        os.utime(path)
+        return entry["result"]
+
+    def put(self, key, result, metadata=None):
+        """写入缓存结果（先写临时文件再原子替换）"""
+        if not self.enabled:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"created": time.time(), "metadata": metadata or {}, "result": result}, f)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _evict(self):
+        """删除过期条目，并在超出容量时按最近使用时间淘汰"""
+        entries = []
+        now = time.time()
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                continue
+            entries.append((mtime, path))
+
+        entries.sort()
+        excess = len(entries) - self.max_entries
+        for index, (mtime, path) in enumerate(entries):
+            if index < excess:
+                self._remove(path)
+            elif self.ttl and now - mtime > self.ttl:
+                # 最近使用时间已超过 TTL，创建时间必然更早
+                self._remove(path)
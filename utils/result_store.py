@@ -0,0 +1,455 @@
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+from utils.stats import mean, median, quantile, stdev
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    host TEXT,
+    kernel TEXT,
+    cpu_model TEXT,
+    hardware TEXT,
+    profile_hash TEXT,
+    phase TEXT,
+    benchmark TEXT NOT NULL,
+    score REAL,
+    success INTEGER,
+    n INTEGER,
+    mean REAL,
+    median REAL,
+    stddev REAL,
+    ci_low REAL,
+    ci_high REAL,
+    time_seconds REAL,
+    source TEXT,
+    extra TEXT
+);
+CREATE TABLE IF NOT EXISTS samples (
+    result_id INTEGER NOT NULL REFERENCES results(id),
+    idx INTEGER NOT NULL,
+    score REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ingested_files (
+    path TEXT PRIMARY KEY,
+    size INTEGER,
+    mtime REAL,
+    run_id TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_results_host ON results(host);
+CREATE INDEX IF NOT EXISTS idx_results_hardware ON results(hardware);
+CREATE INDEX IF NOT EXISTS idx_results_kernel ON results(kernel);
+CREATE INDEX IF NOT EXISTS idx_results_profile ON results(profile_hash);
+CREATE INDEX IF NOT EXISTS idx_results_benchmark_time ON results(benchmark, timestamp);
+CREATE INDEX IF NOT EXISTS idx_results_timestamp ON results(timestamp);
+CREATE INDEX IF NOT EXISTS idx_results_run ON results(run_id);
+CREATE INDEX IF NOT EXISTS idx_samples_result ON samples(result_id);
+"""
+
+# 可用于过滤和分组的列
+FILTER_COLUMNS = ("run_id", "host", "kernel", "cpu_model", "hardware", "profile_hash", "phase", "benchmark")
+GROUP_COLUMNS = FILTER_COLUMNS + ("day", "month")
+# 结果文件中按阶段保存的 (结果键, 系统信息键, 阶段名)
+PHASES = (
+    ("initial_results", "initial_system_info", "initial"),
+    ("tuned_results", "final_system_info", "tuned")
+)
+TIMESTAMP_PATTERN = re.compile(r"(\d{8}_\d{6})")
+# 参与配置哈希的调优配置节
+TUNING_SECTIONS = ("sysctl_tuning", "cpu_governor", "memory_tuning", "irq_tuning")
+
+
+def benchmark_section(config, benchmark):
+    """基准测试自己的配置节；command_benchmark:实例名 只取对应实例"""
+    plugin, _, instance = benchmark.partition(":")
+    section = config.get(plugin)
+    if instance and isinstance(section, dict):
+        return section.get(instance)
+    return section
+
+
+def profile_hash(config, benchmark=None, phase=None):
+    """配置哈希：各调优配置节加上该基准测试自己的配置节，相同配置在不同主机上得到相同的值
+
+    重复测量、遥测、结果库等与测量对象无关的配置节以及 *_root 测试路径不参与计算，修改它们
+    不会切断历史基线。未调优阶段（initial）不含调优配置，与任何调优配置的哈希都不同。
+    """
+    tuning = None
+    if phase != "initial":
+        tuning = {}
+        for section in TUNING_SECTIONS:
+            node = config.get(section)
+            if isinstance(node, dict):
+                node = {key: value for key, value in node.items() if not key.endswith("_root")}
+            if node is not None:
+                tuning[section] = node
+    payload = {
+        "tuning": tuning,
+        "benchmark": benchmark_section(config, benchmark) if benchmark else None
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def hardware_class(system_info):
+    """硬件类别：CPU 型号、逻辑核数、内存大小（按 GiB 取整）与架构，不含内核版本
+
+    内核升级前后的结果属于同一硬件类别，可以互相比较。
+    """
+    cpu = system_info.get("cpu") or {}
+    memory = (system_info.get("memory") or {}).get("total")
+    parts = [
+        cpu.get("model_name") or cpu.get("model"),
+        cpu.get("logical_cores"),
+        round(memory / 2 ** 30) if memory else None,
+        (system_info.get("os") or {}).get("machine")
+    ]
+    if not any(parts):
+        return None
+    return hashlib.sha256(json.dumps(parts).encode()).hexdigest()[:16]
+
+
+def _scalar_fields(result):
+    """只保留标量字段，丢弃输出尾部、逐次运行记录等体积较大的内容"""
+    return {
+        key: value for key, value in result.items()
+        if isinstance(value, (int, float, str, bool)) and key not in ("score", "success", "time_seconds")
+    }
+
+
+def _aggregate(values, stat):
+    if stat == "count":
+        return len(values)
+    if not values:
+        return None
+    if stat == "mean":
+        return mean(values)
+    if stat == "median":
+        return median(values)
+    if stat == "min":
+        return min(values)
+    if stat == "max":
+        return max(values)
+    if stat == "stddev":
+        return stdev(values)
+    if re.fullmatch(r"p\d+(\.\d+)?", stat):
+        return quantile(values, float(stat[1:]) / 100)
+    raise ValueError(f"未知的统计量: {stat}")
+
+
+class ResultStore:
+    """仅追加的 SQLite 结果库
+
+    每行是一次运行中一个基准测试的汇总结果，主机、内核、配置哈希、基准测试和时间
+    都建有索引；各次测量的得分单独保存在 samples 表中。
+    """
+
+    def __init__(self, path="results/results.db"):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    # ---- 写入 ----
+
+    def add_results(self, results, run_id, timestamp=None, host=None, kernel=None, cpu_model=None,
+                    hardware=None, profile=None, phase=None, source=None, commit=True):
+        """追加一次运行中各基准测试的结果，返回写入的行数
+
+        命中结果缓存的结果是早先测量的副本（测量时已写入），不再作为新样本追加。
+        """
+        timestamp = timestamp or time.time()
+        rows = 0
+        for benchmark, result in results.items():
+            if not isinstance(result, dict) or result.get("cached"):
+                continue
+            stats = result.get("stats") or {}
+            cursor = self.db.execute(
+                "INSERT INTO results (run_id, timestamp, host, kernel, cpu_model, hardware, profile_hash, phase,"
+                " benchmark, score, success, n, mean, median, stddev, ci_low, ci_high, time_seconds, source, extra)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    run_id, timestamp, host, kernel, cpu_model, hardware, profile, phase, benchmark,
+                    result.get("score"), int(bool(result.get("success"))), stats.get("n"),
+                    stats.get("mean"), stats.get("median"), stats.get("stddev"),
+                    stats.get("ci_low"), stats.get("ci_high"), result.get("time_seconds"),
+                    source, json.dumps(_scalar_fields(result))
+                )
+            )
+            scores = result.get("scores") or []
+            self.db.executemany(
+                "INSERT INTO samples (result_id, idx, score) VALUES (?, ?, ?)",
+                [(cursor.lastrowid, index, score) for index, score in enumerate(scores)]
+            )
+            rows += 1
+        if commit:
+            self.db.commit()
+        return rows
+
+    def add_run(self, results, system_info=None, config=None, phase=None, run_id=None, timestamp=None, source=None,
+                commit=True):
+        """按框架的结果格式追加一次运行（system_info 为 SystemInfo.collect_all() 的输出）"""
+        system_info = system_info or {}
+        os_info = system_info.get("os") or {}
+        cpu_info = system_info.get("cpu") or {}
+        timestamp = timestamp or time.time()
+        run_id = run_id or hashlib.sha256(f"{timestamp}/{os_info.get('hostname')}/{phase}".encode()).hexdigest()[:16]
+        rows = 0
+        # 配置哈希包含各基准测试自己的配置节，因此逐个写入
+        for benchmark, result in results.items():
+            rows += self.add_results(
+                {benchmark: result},
+                run_id,
+                timestamp=timestamp,
+                host=os_info.get("hostname"),
+                kernel=system_info.get("kernel") or os_info.get("release"),
+                cpu_model=cpu_info.get("model_name") or cpu_info.get("model"),
+                hardware=hardware_class(system_info),
+                profile=profile_hash(config, benchmark, phase) if config is not None else None,
+                phase=phase,
+                source=source,
+                commit=False
+            )
+        if commit:
+            self.db.commit()
+        return rows
+
+    def add_document(self, document, run_id=None, timestamp=None, source=None, host=None, commit=True):
+        """追加 main.py 保存的结果文档（包含 initial_results/tuned_results 及对应的系统信息）"""
+        timestamp = timestamp or time.time()
+        run_id = run_id or hashlib.sha256(json.dumps(document, sort_keys=True, default=str).encode()).hexdigest()[:16]
+        rows = 0
+        for results_key, info_key, phase in PHASES:
+            results = document.get(results_key)
+            if not isinstance(results, dict):
+                continue
+            system_info = document.get(info_key) or document.get("initial_system_info") or {}
+            if host and not (system_info.get("os") or {}).get("hostname"):
+                system_info = dict(system_info, os=dict(system_info.get("os") or {}, hostname=host))
+            rows += self.add_run(
+                results, system_info, document.get("config"), phase,
+                run_id=run_id, timestamp=timestamp, source=source, commit=False
+            )
+        if commit:
+            self.db.commit()
+        return rows
+
+    def ingest_file(self, path, host=None):
+        """导入一个已有的 JSON 结果文件；已导入且未修改的文件会被跳过，返回写入的行数"""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        known = self.db.execute("SELECT size, mtime FROM ingested_files WHERE path = ?", (path,)).fetchone()
+        if known and known["size"] == stat.st_size and known["mtime"] == stat.st_mtime:
+            return 0
+
+        with open(path, "r") as f:
+            try:
+                document = json.load(f)
+            except ValueError:
+                return 0
+        if not isinstance(document, dict):
+            return 0
+
+        match = TIMESTAMP_PATTERN.search(os.path.basename(path))
+        timestamp = (
+            datetime.strptime(match.group(1), "%Y%m%d_%H%M%S").timestamp() if match else stat.st_mtime
+        )
+        run_id = hashlib.sha256(f"{path}/{stat.st_size}/{stat.st_mtime}".encode()).hexdigest()[:16]
+        rows = self.add_document(document, run_id, timestamp, source=path, host=host, commit=False)
+        self.db.execute(
+            "INSERT OR REPLACE INTO ingested_files (path, size, mtime, run_id) VALUES (?, ?, ?, ?)",
+            (path, stat.st_size, stat.st_mtime, run_id)
+        )
+        self.db.commit()
+        return rows
+
+    def ingest(self, paths, host=None):
+        """逐个导入文件或目录（递归查找 *.json），每个文件单独提交，返回 (文件数, 行数)"""
+        files = rows = 0
+        for path in paths:
+            if os.path.isdir(path):
+                candidates = (
+                    os.path.join(directory, name)
+                    for directory, _, names in os.walk(path)
+                    for name in sorted(names) if name.endswith(".json")
+                )
+            else:
+                candidates = [path]
+            for candidate in candidates:
+                added = self.ingest_file(candidate, host)
+                if added:
+                    files += 1
+                    rows += added
+        return files, rows
+
+    # ---- 查询 ----
+
+    def _where(self, filters, since=None, until=None, success_only=True):
+        clauses, params = [], []
+        for column, value in filters.items():
+            if column not in FILTER_COLUMNS:
+                raise ValueError(f"不支持按 {column} 过滤")
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("timestamp < ?")
+            params.append(until)
+        if success_only:
+            clauses.append("success = 1")
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(self, since=None, until=None, success_only=True, limit=None, **filters):
+        """按条件查询结果行（按时间倒序）"""
+        where, params = self._where(filters, since, until, success_only)
+        sql = f"SELECT * FROM results{where} ORDER BY timestamp DESC"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        rows = []
+        for row in self.db.execute(sql, params):
+            row = dict(row)
+            row["extra"] = json.loads(row["extra"]) if row["extra"] else {}
+            rows.append(row)
+        return rows
+
+    def samples(self, result_id):
+        """一行结果对应的各次测量得分"""
+        return [row["score"] for row in self.db.execute(
+            "SELECT score FROM samples WHERE result_id = ? ORDER BY idx", (result_id,)
+        )]
+
+    def summary(self, group_by=("kernel",), metric="score", stats=("count", "median"),
+                since=None, until=None, **filters):
+        """按列分组计算统计量，例如各内核版本上 Himeno 得分的中位数"""
+        if metric not in ("score", "mean", "median", "stddev", "time_seconds"):
+            raise ValueError(f"不支持的指标: {metric}")
+        columns = []
+        for column in group_by:
+            if column not in GROUP_COLUMNS:
+                raise ValueError(f"不支持按 {column} 分组")
+            if column == "day":
+                columns.append("date(timestamp, 'unixepoch', 'localtime') AS day")
+            elif column == "month":
+                columns.append("strftime('%Y-%m', timestamp, 'unixepoch', 'localtime') AS month")
+            else:
+                columns.append(column)
+
+        where, params = self._where(filters, since, until)
+        select = ", ".join(columns + [metric])
+        order = ", ".join(list(group_by) + [metric])
+        sql = f"SELECT {select} FROM results{where} ORDER BY {order}"
+
+        groups = {}
+        for row in self.db.execute(sql, params):
+            key = tuple(row[column] for column in group_by)
+            if row[metric] is not None:
+                groups.setdefault(key, []).append(row[metric])
+        return [
+            dict(zip(group_by, key), **{stat: _aggregate(values, stat) for stat in stats})
+            for key, values in groups.items()
+        ]
+
+
+def _print_rows(rows, output_format):
+    if output_format == "json":
+        print(json.dumps(rows, indent=2, ensure_ascii=False, default=str))
+        return
+    if not rows:
+        print("没有匹配的结果")
+        return
+    columns = [column for column in rows[0] if column != "extra"]
+    if output_format == "csv":
+        writer = csv.DictWriter(sys.stdout, fieldnames=columns, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+        return
+
+    def cell(value):
+        if isinstance(value, float):
+            return f"{value:.4g}"
+        return "" if value is None else str(value)
+
+    table = [[cell(row.get(column)) for column in columns] for row in rows]
+    widths = [max(len(column), *(len(line[i]) for line in table)) for i, column in enumerate(columns)]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+    for line in table:
+        print("  ".join(value.ljust(width) for value, width in zip(line, widths)))
+
+
+def _parse_time(value):
+    """解析 2024-05-01 或 2024-05-01T12:00:00 形式的时间"""
+    return datetime.fromisoformat(value).timestamp() if value else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="性能调优结果库")
+    parser.add_argument("--db", default="results/results.db", help="结果库路径")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    ingest = subparsers.add_parser("ingest", help="导入已有的 JSON 结果文件或目录")
+    ingest.add_argument("paths", nargs="+")
+    ingest.add_argument("--host", help="结果文件中没有主机名时使用的主机名")
+
+    for name, help_text in (("query", "查询结果行"), ("summary", "分组统计")):
+        command = subparsers.add_parser(name, help=help_text)
+        for column in FILTER_COLUMNS:
+            command.add_argument(f"--{column.replace('_', '-')}", dest=column)
+        command.add_argument("--since", help="起始时间（ISO 格式）")
+        command.add_argument("--until", help="截止时间（ISO 格式）")
+        command.add_argument("--format", choices=("table", "json", "csv"), default="table")
+        if name == "query":
+            command.add_argument("--limit", type=int, default=50)
+        else:
+            command.add_argument("--group-by", nargs="+", default=["kernel"], choices=GROUP_COLUMNS)
+            command.add_argument("--metric", default="score")
+            command.add_argument("--stats", nargs="+", default=["count", "median"],
+                                 help="count、mean、median、min、max、stddev 或 pNN")
+
+    args = parser.parse_args(argv)
+    store = ResultStore(args.db)
+    try:
+        if args.command == "ingest":
+            files, rows = store.ingest(args.paths, args.host)
+            print(f"已导入 {files} 个文件，共 {rows} 条结果")
+            return 0
+
+        filters = {column: getattr(args, column) for column in FILTER_COLUMNS}
+        since, until = _parse_time(args.since), _parse_time(args.until)
+        if args.command == "query":
+            rows = store.query(since=since, until=until, limit=args.limit, **filters)
+            for row in rows:
+                row["timestamp"] = datetime.fromtimestamp(row["timestamp"]).isoformat(timespec="seconds")
+            columns = ("timestamp", "host", "kernel", "profile_hash", "phase", "benchmark", "score", "n", "stddev")
+            if args.format != "json":
+                rows = [{column: row[column] for column in columns} for row in rows]
+        else:
+            rows = store.summary(args.group_by, args.metric, args.stats, since=since, until=until, **filters)
+        _print_rows(rows, args.format)
+        return 0
+    except ValueError as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 2
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
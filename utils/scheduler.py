@@ -0,0 +1,160 @@
+import glob
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+
+def parse_cpu_list(cpu_list):
+    """解析 "0-3,8,10-11" 形式的 CPU 列表"""
+    cpus = []
+    for part in str(cpu_list).strip().split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-", 1)
+            cpus.extend(range(int(start), int(end) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+
+def numa_nodes(node_root="/sys/devices/system/node"):
+    """读取各 NUMA 节点的 CPU 列表"""
+    nodes = {}
+    for path in glob.glob(os.path.join(node_root, "node[0-9]*", "cpulist")):
+        node = int(re.search(r"node(\d+)", path).group(1))
+        with open(path, "r") as f:
+            cpus = parse_cpu_list(f.read())
+        if cpus:
+            nodes[node] = cpus
+    return dict(sorted(nodes.items()))
+
+
+def _available_cpus():
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def _run_pinned(cpus, runner, benchmark, max_runs=None, prune=None, quiesce=True):
+    """在指定 CPU 集合上运行基准测试，子进程会继承该亲和性"""
+    previous = None
+    if cpus and hasattr(os, "sched_setaffinity"):
+        previous = os.sched_getaffinity(0)
+        os.sched_setaffinity(0, cpus)
+    try:
+        result = runner.run(benchmark, max_runs, prune, quiesce)
+    finally:
+        if previous is not None:
+            os.sched_setaffinity(0, previous)
+    result["cpus"] = sorted(cpus) if cpus else None
+    return result
+
+
+class BenchmarkScheduler:
+    """为基准测试分配 CPU/NUMA 集合，非独占的基准测试并行运行，独占的串行运行"""
+
+    def __init__(self, config):
+        options = config.get("scheduler", {})
+        self.parallel = options.get("parallel", False)
+        self.max_workers = options.get("max_workers")
+        self.cpu_sets = options.get("cpu_sets", {})
+        self.exclusive = options.get("exclusive", {})
+        self.node_root = options.get("node_root", "/sys/devices/system/node")
+
+    def is_exclusive(self, benchmark):
+        """配置优先，其次是基准测试类声明的 exclusive 属性，默认独占"""
+        return self.exclusive.get(benchmark.name, getattr(benchmark, "exclusive", True))
+
+    def _resolve(self, cpu_set):
+        """解析 "node:1" 或 CPU 列表形式的配置"""
+        if isinstance(cpu_set, str) and cpu_set.startswith("node:"):
+            nodes = numa_nodes(self.node_root)
+            return [cpu for node in parse_cpu_list(cpu_set[5:]) for cpu in nodes.get(node, [])]
+        if isinstance(cpu_set, list):
+            return [int(cpu) for cpu in cpu_set]
+        return parse_cpu_list(cpu_set)
+
+    def _partition(self, count, reserved=()):
+        """将可用 CPU（除去 reserved）划分为最多 count 个互不相交的集合，NUMA 节点足够时按节点划分
+
+        CPU 数少于 count 时只返回 len(CPU) 个集合，不让并行测试共享核心。
+        """
+        available = set(_available_cpus()) - set(reserved)
+        nodes = [
+            [cpu for cpu in cpus if cpu in available]
+            for cpus in numa_nodes(self.node_root).values()
+        ]
+        nodes = [cpus for cpus in nodes if cpus]
+        if len(nodes) >= count:
+            groups = [[] for _ in range(count)]
+            for index, cpus in enumerate(nodes):
+                groups[index % count].extend(cpus)
+            return groups
+
+        cpus = sorted(available)
+        count = min(count, len(cpus))
+        if not count:
+            return []
+        size = len(cpus) // count
+        return [cpus[i * size:(i + 1) * size] if i < count - 1 else cpus[i * size:] for i in range(count)]
+
+    def plan(self, benchmarks):
+        """返回 (基准测试, CPU 集合, 是否独占) 列表
+
+        自动划分的集合不包含 cpu_sets 中显式指定的 CPU；互不相交的集合不够分时，
+        多出的基准测试改为串行运行。
+        """
+        pinned = {
+            benchmark.name: self._resolve(self.cpu_sets[benchmark.name])
+            for benchmark in benchmarks if benchmark.name in self.cpu_sets
+        }
+        shared = [
+            benchmark.name for benchmark in benchmarks
+            if self.parallel and not self.is_exclusive(benchmark) and benchmark.name not in pinned
+        ]
+        reserved = {cpu for cpus in pinned.values() for cpu in cpus}
+        partitions = dict(zip(shared, self._partition(len(shared), reserved))) if shared else {}
+        if len(partitions) < len(shared):
+            print(f"可用 CPU 不足以为 {len(shared)} 个并行测试分配互不相交的集合，"
+                  f"{', '.join(shared[len(partitions):])} 改为串行运行")
+
+        plan = []
+        for benchmark in benchmarks:
+            if benchmark.name in pinned:
+                cpus = pinned[benchmark.name]
+                exclusive = not self.parallel or self.is_exclusive(benchmark)
+            else:
+                cpus = partitions.get(benchmark.name)
+                exclusive = benchmark.name not in partitions
+            plan.append((benchmark, cpus, exclusive))
+        return plan
+
+    def run(self, benchmarks, runner, max_runs=None, prune=None, plan=None):
+        """按计划（默认为 plan(benchmarks)）运行基准测试，返回 {名称: 结果}
+
+        prune(name, stats) 只作用于串行运行的基准测试（无法传递给子进程）。并行批次只在开始前
+        由调用方等待一次静默，批次内不做逐次测量前的静默等待。
+        """
+        plan = plan or self.plan(benchmarks)
+        results = {}
+
+        shared = [(benchmark, cpus) for benchmark, cpus, exclusive in plan if not exclusive]
+        if shared:
+            workers = self.max_workers or len(shared)
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {
+                    benchmark.name: pool.submit(_run_pinned, cpus, runner, benchmark, max_runs, None, False)
+                    for benchmark, cpus in shared
+                }
+                for name, future in futures.items():
+                    results[name] = future.result()
+
+        # 独占的基准测试在并行批次结束后依次运行，不与其他测试争用资源
+        for benchmark, cpus, exclusive in plan:
+            if exclusive:
+                benchmark_prune = (lambda stats, name=benchmark.name: prune(name, stats)) if prune else None
+                results[benchmark.name] = _run_pinned(cpus, runner, benchmark, max_runs, benchmark_prune)
+
+        return {benchmark.name: results[benchmark.name] for benchmark in benchmarks}
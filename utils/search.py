@@ -0,0 +1,305 @@
+import copy
+import hashlib
+import itertools
+import json
+import os
+import random
+import time
+from datetime import datetime
+
+
+class SearchSpace:
+    """调优参数空间：每个维度对应配置中的一个取值列表"""
+
+    def __init__(self, dimensions):
+        # dimensions: [(维度名, 配置路径元组, 候选值列表)]
+        self.dimensions = dimensions
+
+    @classmethod
+    def from_config(cls, space_config):
+        """从 search.space 配置构建参数空间，列表即为叶子节点"""
+        dimensions = []
+
+        def walk(path, node):
+            if isinstance(node, list):
+                dimensions.append(("/".join(path), path, node))
+            elif isinstance(node, dict):
+                for key, child in node.items():
+                    walk(path + (key,), child)
+
+        for section, node in space_config.items():
+            walk((section,), node)
+        return cls(dimensions)
+
+    def size(self):
+        """参数组合总数"""
+        total = 1
+        for _, _, values in self.dimensions:
+            total *= len(values)
+        return total
+
+    def grid(self):
+        """按网格顺序遍历所有组合"""
+        names = [name for name, _, _ in self.dimensions]
+        for values in itertools.product(*[values for _, _, values in self.dimensions]):
+            yield dict(zip(names, values))
+
+    def sample(self, rng):
+        """随机抽取一个组合"""
+        return {name: rng.choice(values) for name, _, values in self.dimensions}
+
+    def apply_to(self, config, candidate):
+        """返回叠加了候选参数的配置副本"""
+        config = copy.deepcopy(config)
+        for name, path, _ in self.dimensions:
+            if name not in candidate:
+                continue
+            node = config
+            for key in path[:-1]:
+                if not isinstance(node.get(key), dict):
+                    node[key] = {}
+                node = node[key]
+            node[path[-1]] = candidate[name]
+        return config
+
+
+def candidate_key(candidate):
+    """候选参数的规范化表示，用于去重和断点续跑"""
+    return json.dumps(candidate, sort_keys=True)
+
+
+def expand_search_space(config, spaces):
+    """把 search.space 中取值为 "auto" 的配置节替换为调优模块探测到的候选值
+
+    spaces 为各调优模块 tunable_space() 的合并结果；返回 (新配置, 没有候选值而被忽略的配置节)。
+    """
+    config = copy.deepcopy(config)
+    space = config.setdefault("search", {}).setdefault("space", {})
+    for section, node in spaces.items():
+        if space.get(section) == "auto":
+            space[section] = node
+    missing = [section for section, node in space.items() if node == "auto"]
+    for section in missing:
+        del space[section]
+    return config, missing
+
+
+def prune_rule(objective, best_ci_low, margin=0.0):
+    """置信区间上界低于当前最优下界（再留出 margin）时剪枝"""
+    def prune(name, stats):
+        if best_ci_low is None or name != objective or stats["n"] < 2:
+            return False
+        return stats["ci_high"] < best_ci_low * (1 - margin)
+    return prune
+
+
+def search_scope(config, space, objective):
+    """搜索范围的哈希：参数空间、优化目标和未被搜索的其余配置
+
+    不同的搜索共用同一个历史文件时，只有范围相同的试验才能互相复用。search 配置节（预算、
+    策略、种子等）不影响单次试验的结果，不参与计算。
+    """
+    base = copy.deepcopy(config)
+    base.pop("search", None)
+    for _, path, _ in space.dimensions:
+        node = base
+        for key in path[:-1]:
+            node = node.get(key) if isinstance(node, dict) else None
+        if isinstance(node, dict):
+            node.pop(path[-1], None)
+    payload = {
+        "space": [(name, values) for name, _, values in space.dimensions],
+        "objective": objective,
+        "config": base
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+class TrialHistory:
+    """以 JSON Lines 形式持久化的试验记录，只载入与 scope 相同的搜索留下的记录"""
+
+    def __init__(self, path, scope=None):
+        self.path = path
+        self.scope = scope
+        self.trials = []
+        if path and os.path.exists(path):
+            with open(path, "r") as f:
+                trials = [json.loads(line) for line in f if line.strip()]
+            self.trials = [trial for trial in trials if trial.get("scope") == scope]
+
+    def append(self, trial):
+        trial = dict(trial, scope=self.scope)
+        self.trials.append(trial)
+        if self.path:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(json.dumps(trial) + "\n")
+        return trial
+
+    def completed(self, runs=None):
+        """已完成的试验，按候选参数索引"""
+        return {
+            candidate_key(trial["candidate"]): trial
+            for trial in self.trials
+            if trial["status"] in ("completed", "pruned") and (runs is None or trial["runs"] == runs)
+        }
+
+    def best(self):
+        """重复次数最多的已完成试验中得分最高者"""
+        completed = [trial for trial in self.trials if trial["status"] == "completed"]
+        if not completed:
+            return None
+        most_runs = max(trial["runs"] for trial in completed)
+        return max(
+            (trial for trial in completed if trial["runs"] == most_runs),
+            key=lambda trial: trial["score"]
+        )
+
+
+class TuningSearch:
+    """在参数空间中搜索最优调优配置
+
+    evaluate(config, max_runs, prune) 负责完成一次 apply/run_benchmarks/reset
+    循环并返回基准测试结果；prune(name, stats) 为真时提前终止该候选。
+    """
+
+    def __init__(self, config, evaluate, objective):
+        self.config = config
+        self.evaluate = evaluate
+        self.objective = objective
+
+        options = config.get("search", {})
+        self.space = SearchSpace.from_config(options.get("space", {}))
+        self.strategy = options.get("strategy", "random")
+        self.max_trials = options.get("max_trials", 20)
+        self.max_duration = options.get("max_duration")
+        self.rng = random.Random(options.get("seed"))
+        self.prune_margin = options.get("prune_margin", 0.0)
+        self.eta = options.get("eta", 3)
+        self.min_runs = options.get("min_runs", 1)
+        self.max_runs = options.get("max_runs", config.get("run_engine", {}).get("max_runs", 10))
+        self.history = TrialHistory(
+            options.get("history_file", "results/search/history.jsonl"),
+            search_scope(config, self.space, objective)
+        )
+        self.started = None
+
+    def _budget_left(self, trials_done):
+        """检查试验次数和时间预算"""
+        if trials_done >= self.max_trials:
+            return False
+        if self.max_duration and time.time() - self.started >= self.max_duration:
+            return False
+        return True
+
+    def _should_prune(self, best):
+        return prune_rule(self.objective, best["stats"]["ci_low"] if best else None, self.prune_margin)
+
+    def record_trial(self, candidate, max_runs, results=None, error=None, rung=None, timestamp=None, **extra):
+        """把一次试验的结果（或错误）写入历史记录，extra 为附加字段（如执行试验的主机）"""
+        trial = {
+            "trial": len(self.history.trials),
+            "strategy": self.strategy,
+            "candidate": candidate,
+            "runs": max_runs,
+            "rung": rung,
+            "timestamp": timestamp or datetime.now().isoformat()
+        }
+        trial.update(extra)
+        if error is not None:
+            trial.update({"status": "failed", "score": 0, "stats": None, "error": str(error)})
+        else:
+            result = (results or {}).get(self.objective, {})
+            trial.update({
+                "status": "pruned" if result.get("pruned") else "completed",
+                "score": result.get("score", 0),
+                "stats": result.get("stats"),
+                "results": {name: {"score": r.get("score"), "stats": r.get("stats")} for name, r in (results or {}).items()}
+            })
+            if not result.get("success", False):
+                trial["status"] = "failed"
+                trial["error"] = result.get("error") or f"没有 {self.objective} 的成功结果"
+
+        trial = self.history.append(trial)
+        print(f"试验 {trial['trial']} [{trial['status']}] 得分 {trial['score']:.2f}: {candidate}")
+        return trial
+
+    def _run_trial(self, candidate, max_runs, prune=None, rung=None):
+        """评估单个候选参数并写入历史记录"""
+        timestamp = datetime.now().isoformat()
+        try:
+            results = self.evaluate(self.space.apply_to(self.config, candidate), max_runs, prune)
+        except Exception as e:
+            return self.record_trial(candidate, max_runs, error=str(e), rung=rung, timestamp=timestamp)
+        return self.record_trial(candidate, max_runs, results, rung=rung, timestamp=timestamp)
+
+    def pending_candidates(self):
+        """预算内尚未完成的候选参数（按生成顺序），供多台主机并行评估"""
+        done = self.history.completed(self.max_runs)
+        return [
+            candidate for candidate in itertools.islice(self._candidates(), self.max_trials)
+            if candidate_key(candidate) not in done
+        ]
+
+    def _candidates(self):
+        """按策略生成候选参数（网格或随机，不重复）"""
+        if self.strategy == "grid":
+            yield from self.space.grid()
+            return
+
+        seen = set()
+        while len(seen) < self.space.size():
+            candidate = self.space.sample(self.rng)
+            key = candidate_key(candidate)
+            if key not in seen:
+                seen.add(key)
+                yield candidate
+
+    def _search_sequential(self):
+        """网格/随机搜索，带剪枝"""
+        done = self.history.completed(self.max_runs)
+        trials_done = 0
+        for candidate in self._candidates():
+            if not self._budget_left(trials_done):
+                break
+            trials_done += 1
+            if candidate_key(candidate) in done:
+                continue
+            self._run_trial(candidate, self.max_runs, self._should_prune(self.history.best()))
+
+    def _search_successive_halving(self):
+        """逐次减半：先用少量重复次数评估全部候选，只保留前 1/eta 进入下一轮"""
+        candidates = list(itertools.islice(self._candidates(), self.max_trials))
+        runs = self.min_runs
+        rung = 0
+        while candidates:
+            done = self.history.completed(runs)
+            trials = []
+            for candidate in candidates:
+                if self.max_duration and time.time() - self.started >= self.max_duration:
+                    return
+                trial = done.get(candidate_key(candidate)) or self._run_trial(candidate, runs, rung=rung)
+                trials.append(trial)
+
+            ranked = sorted(
+                (trial for trial in trials if trial["status"] == "completed"),
+                key=lambda trial: trial["score"],
+                reverse=True
+            )
+            if runs >= self.max_runs or len(ranked) <= 1:
+                break
+            candidates = [trial["candidate"] for trial in ranked[:max(1, len(ranked) // self.eta)]]
+            runs = min(self.max_runs, runs * self.eta)
+            rung += 1
+
+    def run(self):
+        """执行搜索并返回最优试验"""
+        self.started = time.time()
+        print(f"开始参数搜索: 策略 {self.strategy}, 参数空间 {self.space.size()} 种组合, 预算 {self.max_trials} 次试验")
+        if self.strategy == "successive_halving":
+            self._search_successive_halving()
+        elif self.strategy in ("grid", "random"):
+            self._search_sequential()
+        else:
+            raise ValueError(f"未知的搜索策略: {self.strategy}")
+        return self.history.best()
@@ -0,0 +1,184 @@
+import math
+
+
+def mean(samples):
+    """算术平均值"""
+    return sum(samples) / len(samples) if samples else 0.0
+
+
+def median(samples):
+    """中位数"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    mid = len(ordered) // 2
+    if len(ordered) % 2:
+        return ordered[mid]
+    return (ordered[mid - 1] + ordered[mid]) / 2
+
+
+def variance(samples):
+    """样本方差（n-1）"""
+    if len(samples) < 2:
+        return 0.0
+    m = mean(samples)
+    return sum((x - m) ** 2 for x in samples) / (len(samples) - 1)
+
+
+def stdev(samples):
+    """样本标准差"""
+    return math.sqrt(variance(samples))
+
+
+def quantile(samples, q):
+    """线性插值分位数"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    pos = (len(ordered) - 1) * q
+    low = int(math.floor(pos))
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
+
+
+def _betacf(a, b, x):
+    """不完全 Beta 函数的连分式展开"""
+    tiny = 1e-300
+    qab, qap, qam = a + b, a + 1.0, a - 1.0
+    c = 1.0
+    d = 1.0 - qab * x / qap
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    h = d
+    for m in range(1, 300):
+        m2 = 2 * m
+        aa = m * (b - m) * x / ((qam + m2) * (a + m2))
+        d = 1.0 + aa * d
+        d = 1.0 / (d if abs(d) > tiny else tiny)
+        c = 1.0 + aa / c
+        c = c if abs(c) > tiny else tiny
+        h *= d * c
+        aa = -(a + m) * (qab + m) * x / ((a + m2) * (qap + m2))
+        d = 1.0 + aa * d
+        d = 1.0 / (d if abs(d) > tiny else tiny)
+        c = 1.0 + aa / c
+        c = c if abs(c) > tiny else tiny
+        delta = d * c
+        h *= delta
+        if abs(delta - 1.0) < 1e-12:
+            break
+    return h
+
+
+def betainc(a, b, x):
+    """正则化不完全 Beta 函数 I_x(a, b)"""
+    if x <= 0.0:
+        return 0.0
+    if x >= 1.0:
+        return 1.0
+    ln_front = (math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b)
+                + a * math.log(x) + b * math.log(1.0 - x))
+    if x < (a + 1.0) / (a + b + 2.0):
+        return math.exp(ln_front) * _betacf(a, b, x) / a
+    return 1.0 - math.exp(ln_front) * _betacf(b, a, 1.0 - x) / b
+
+
+def t_cdf(t, df):
+    """Student t 分布的累积分布函数"""
+    tail = 0.5 * betainc(df / 2.0, 0.5, df / (df + t * t))
+    return 1.0 - tail if t > 0 else tail
+
+
+def t_ppf(p, df):
+    """Student t 分布的分位数（二分法求解）"""
+    low, high = -1e3, 1e3
+    for _ in range(200):
+        mid = (low + high) / 2
+        if t_cdf(mid, df) < p:
+            low = mid
+        else:
+            high = mid
+    return (low + high) / 2
+
+
+def normal_cdf(z):
+    """标准正态分布的累积分布函数"""
+    return 0.5 * (1.0 + math.erf(z / math.sqrt(2.0)))
+
+
+def confidence_interval(samples, confidence=0.95):
+    """基于 t 分布的均值置信区间"""
+    m = mean(samples)
+    if len(samples) < 2:
+        return m, m
+    half_width = t_ppf(0.5 + confidence / 2, len(samples) - 1) * stdev(samples) / math.sqrt(len(samples))
+    return m - half_width, m + half_width
+
+
+def count_outliers(samples, k=1.5):
+    """按 Tukey 栅栏（IQR 的 k 倍）统计离群值个数"""
+    if len(samples) < 4:
+        return 0
+    q1, q3 = quantile(samples, 0.25), quantile(samples, 0.75)
+    iqr = q3 - q1
+    return sum(1 for x in samples if x < q1 - k * iqr or x > q3 + k * iqr)
+
+
+def summarize(samples, confidence=0.95):
+    """汇总一组测量值的描述统计"""
+    ci_low, ci_high = confidence_interval(samples, confidence)
+    m = mean(samples)
+    return {
+        "n": len(samples),
+        "mean": m,
+        "median": median(samples),
+        "stddev": stdev(samples),
+        "min": min(samples) if samples else 0.0,
+        "max": max(samples) if samples else 0.0,
+        "confidence": confidence,
+        "ci_low": ci_low,
+        "ci_high": ci_high,
+        "relative_ci": (ci_high - ci_low) / 2 / abs(m) if m else None,
+        "outliers": count_outliers(samples)
+    }
+
+
+def welch_t_test(a, b):
+    """Welch t 检验（双侧），返回 (t, 自由度, p 值)"""
+    if len(a) < 2 or len(b) < 2:
+        return None, None, None
+    va, vb = variance(a) / len(a), variance(b) / len(b)
+    if va + vb == 0:
+        # 两组都没有方差：均值相同则无差异，否则差异确定
+        return 0.0, None, 1.0 if mean(a) == mean(b) else 0.0
+    t = (mean(b) - mean(a)) / math.sqrt(va + vb)
+    df = (va + vb) ** 2 / (va ** 2 / (len(a) - 1) + vb ** 2 / (len(b) - 1))
+    p = 2 * (1 - t_cdf(abs(t), df))
+    return t, df, p
+
+
+def mann_whitney_u(a, b):
+    """Mann-Whitney U 检验（双侧，正态近似并校正并列秩），返回 (U, p 值)"""
+    if not a or not b:
+        return None, None
+    combined = sorted([(x, 0) for x in a] + [(x, 1) for x in b])
+    ranks = [0.0] * len(combined)
+    tie_term = 0
+    i = 0
+    while i < len(combined):
+        j = i
+        while j + 1 < len(combined) and combined[j + 1][0] == combined[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2 + 1
+        tie_term += (j - i + 1) ** 3 - (j - i + 1)
+        i = j + 1
+
+    n1, n2 = len(a), len(b)
+    rank_sum = sum(r for r, (_, group) in zip(ranks, combined) if group == 1)
+    u = rank_sum - n2 * (n2 + 1) / 2
+    n = n1 + n2
+    sigma = math.sqrt(n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1))))
+    if sigma == 0:
+        return u, 1.0
+    z = (abs(u - n1 * n2 / 2) - 0.5) / sigma
+    return u, min(1.0, 2 * (1 - normal_cdf(max(z, 0.0))))
@@ -0,0 +1,104 @@
+import os
+import selectors
+import signal
+import subprocess
+import time
+from collections import deque
+
+
+class StreamingProcess:
+    """以流式方式运行子进程，逐行回调输出，并可在运行中途终止
+
+    on_line(stream, line) 返回非空字符串时立即终止子进程，该字符串作为终止原因。
+    只保留最后 tail_lines 行输出，避免把完整输出写入结果文件。
+    """
+
+    def __init__(self, cmd, env=None, timeout=None, tail_lines=20, on_line=None, cwd=None):
+        self.cmd = cmd
+        self.env = env
+        self.cwd = cwd
+        self.timeout = timeout
+        self.tail_lines = tail_lines
+        self.on_line = on_line
+        self.process = None
+
+    def _terminate(self):
+        """先发 SIGTERM，宽限期后仍未退出则 SIGKILL 整个进程组"""
+        try:
+            os.killpg(self.process.pid, signal.SIGTERM)
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            os.killpg(self.process.pid, signal.SIGKILL)
+            self.process.wait()
+        except ProcessLookupError:
+            self.process.wait()
+
+    def run(self):
+        """运行子进程并返回 returncode、输出尾部、耗时和终止原因"""
+        tails = {"stdout": deque(maxlen=self.tail_lines), "stderr": deque(maxlen=self.tail_lines)}
+        partial = {"stdout": b"", "stderr": b""}
+        abort_reason = None
+
+        start = time.monotonic()
+        self.process = subprocess.Popen(
+            self.cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=self.env,
+            cwd=self.cwd,
+            start_new_session=True
+        )
+
+        selector = selectors.DefaultSelector()
+        selector.register(self.process.stdout, selectors.EVENT_READ, "stdout")
+        selector.register(self.process.stderr, selectors.EVENT_READ, "stderr")
+
+        def handle_line(stream, raw):
+            line = raw.decode(errors="replace").rstrip("\r")
+            tails[stream].append(line)
+            return self.on_line(stream, line) if self.on_line else None
+
+        try:
+            while selector.get_map() and abort_reason is None:
+                remaining = None
+                if self.timeout is not None:
+                    remaining = self.timeout - (time.monotonic() - start)
+                    if remaining <= 0:
+                        abort_reason = f"超过时间限制 {self.timeout} 秒"
+                        break
+
+                for key, _ in selector.select(timeout=remaining):
+                    stream = key.data
+                    chunk = os.read(key.fileobj.fileno(), 65536)
+                    if not chunk:
+                        selector.unregister(key.fileobj)
+                        if partial[stream]:
+                            abort_reason = handle_line(stream, partial[stream]) or abort_reason
+                            partial[stream] = b""
+                        continue
+
+                    lines = (partial[stream] + chunk).split(b"\n")
+                    partial[stream] = lines.pop()
+                    for raw in lines:
+                        abort_reason = handle_line(stream, raw)
+                        if abort_reason:
+                            break
+                    if abort_reason:
+                        break
+        finally:
+            selector.close()
+            if abort_reason is not None:
+                self._terminate()
+            else:
+                self.process.wait()
+            self.process.stdout.close()
+            self.process.stderr.close()
+
+        return {
+            "returncode": self.process.returncode,
+            "aborted": abort_reason is not None,
+            "abort_reason": abort_reason,
+            "elapsed": time.monotonic() - start,
+            "output_tail": list(tails["stdout"]),
+            "error_tail": list(tails["stderr"])
+        }
@@ -22,6 +22,7 @@ class SystemInfo:
         """获取 CPU 信息"""
         return {
             "model": platform.processor(),
+            "model_name": self.get_cpu_model(),
             "cores": psutil.cpu_count(logical=False),
             "logical_cores": psutil.cpu_count(logical=True),
             "frequency": psutil.cpu_freq().current if psutil.cpu_freq() else None,
@@ -51,6 +52,7 @@ class SystemInfo:
     def get_os_info(self):
         """获取操作系统信息"""
         return {
+            "hostname": platform.node(),
             "system": platform.system(),
             "release": platform.release(),
             "version": platform.version(),
@@ -65,6 +67,27 @@ class SystemInfo:
         except:
             return "unknown"
 
+    def get_cpu_model(self):
+        """从 /proc/cpuinfo 读取 CPU 型号（platform.processor() 在 Linux 上常为空）"""
+        try:
+            with open("/proc/cpuinfo", "r") as f:
+                for line in f:
+                    if line.startswith("model name"):
+                        return line.split(":", 1)[1].strip()
+        except OSError:
+            pass
+        return platform.processor() or platform.machine()
+
+    def fingerprint(self):
+        """用于识别同一硬件/内核环境的系统指纹"""
+        return {
+            "cpu_model": self.get_cpu_model(),
+            "logical_cores": psutil.cpu_count(logical=True),
+            "memory_total": psutil.virtual_memory().total,
+            "kernel": platform.release(),
+            "machine": platform.machine()
+        }
+
     def get_process_info(self):
         """获取进程信息"""
         return {
@@ -0,0 +1,202 @@
+import os
+import threading
+import time
+from array import array
+
+
+class RingBuffer:
+    """预分配的定长环形缓冲区，写满后覆盖最旧的样本"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.data = array("d", bytes(8 * capacity))
+        self.index = 0
+        self.count = 0
+
+    def append(self, value):
+        self.data[self.index] = value
+        self.index = (self.index + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def values(self):
+        """按时间顺序返回缓冲区中的样本"""
+        if self.count < self.capacity:
+            return self.data[:self.count].tolist()
+        return (self.data[self.index:] + self.data[:self.index]).tolist()
+
+    def summary(self):
+        """样本的最小值、平均值和最大值"""
+        values = self.values()
+        if not values:
+            return {"min": None, "mean": None, "max": None}
+        return {"min": min(values), "mean": sum(values) / len(values), "max": max(values)}
+
+
+def _pread_all(fd):
+    """从偏移 0 重新读取整个 proc 文件，复用已打开的文件描述符"""
+    chunks = []
+    offset = 0
+    while True:
+        chunk = os.pread(fd, 65536, offset)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        offset += len(chunk)
+    return b"".join(chunks)
+
+
+def _find_value(data, key):
+    """在 "key value" 或 "key: value kB" 格式的内容中查找单个字段，无需拆分全部行"""
+    pos = data.find(b"\n" + key)
+    if pos < 0:
+        if not data.startswith(key):
+            return None
+        pos = -1
+    start = pos + 1 + len(key)
+    end = data.find(b"\n", start)
+    fields = data[start:end if end >= 0 else None].lstrip(b": \t").split()
+    return int(fields[0]) if fields else None
+
+
+class TelemetrySampler:
+    """后台采样线程：在基准测试运行期间按固定间隔记录系统状态
+
+    直接读取 /proc/stat、/proc/vmstat、/proc/meminfo 和 cpufreq，
+    采样值保存在预分配的环形缓冲区中。
+    """
+
+    def __init__(self, config, proc_root="/proc", cpu_root="/sys/devices/system/cpu"):
+        options = config.get("telemetry", {})
+        self.interval = options.get("interval", 0.1)
+        self.capacity = options.get("capacity", 6000)
+        self.keep_series = options.get("keep_series", False)
+        self.proc_root = options.get("proc_root", proc_root)
+        self.cpu_root = options.get("cpu_root", cpu_root)
+
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.fds = {}
+        self.freq_fds = {}
+        self.previous = None
+        self.buffers = {}
+
+    def _buffer(self, name):
+        if name not in self.buffers:
+            self.buffers[name] = RingBuffer(self.capacity)
+        return self.buffers[name]
+
+    def _open(self):
+        for name in ("stat", "vmstat", "meminfo"):
+            try:
+                self.fds[name] = os.open(os.path.join(self.proc_root, name), os.O_RDONLY)
+            except OSError:
+                pass
+
+        cpu = 0
+        while True:
+            cpu_dir = os.path.join(self.cpu_root, f"cpu{cpu}")
+            if not os.path.isdir(cpu_dir):
+                break
+            try:
+                self.freq_fds[cpu] = os.open(os.path.join(cpu_dir, "cpufreq", "scaling_cur_freq"), os.O_RDONLY)
+            except OSError:
+                pass
+            cpu += 1
+
+    def _close(self):
+        for fd in list(self.fds.values()) + list(self.freq_fds.values()):
+            os.close(fd)
+        self.fds = {}
+        self.freq_fds = {}
+
+    def _read_counters(self):
+        """读取累计计数器：每个 CPU 的 (忙碌, 总计) jiffies、上下文切换、中断、缺页"""
+        counters = {"time": time.monotonic(), "cpus": {}}
+        if "stat" in self.fds:
+            for line in _pread_all(self.fds["stat"]).split(b"\n"):
+                if line.startswith(b"cpu") and line[3:4].isdigit():
+                    fields = line.split()
+                    values = [int(v) for v in fields[1:]]
+                    idle = values[3] + (values[4] if len(values) > 4 else 0)
+                    counters["cpus"][int(fields[0][3:])] = (sum(values[:8]) - idle, sum(values[:8]))
+                elif line.startswith(b"ctxt "):
+                    counters["ctxt"] = int(line.split()[1])
+                elif line.startswith(b"intr "):
+                    counters["intr"] = int(line.split(None, 2)[1])
+                elif line.startswith(b"procs_running "):
+                    counters["procs_running"] = int(line.split()[1])
+        if "vmstat" in self.fds:
+            data = _pread_all(self.fds["vmstat"])
+            counters["pgfault"] = _find_value(data, b"pgfault ")
+            counters["pgmajfault"] = _find_value(data, b"pgmajfault ")
+        return counters
+
+    def _sample(self):
+        """采集一个样本，计数器类指标换算为每秒速率"""
+        current = self._read_counters()
+        previous, self.previous = self.previous, current
+        if previous is None:
+            return
+
+        elapsed = current["time"] - previous["time"] or 1e-9
+        self._buffer("timestamp").append(current["time"])
+
+        for cpu, (busy, total) in current["cpus"].items():
+            prev_busy, prev_total = previous["cpus"].get(cpu, (busy, total))
+            delta = total - prev_total
+            self._buffer(f"cpu{cpu}_util").append(100.0 * (busy - prev_busy) / delta if delta else 0.0)
+
+        for key in ("ctxt", "intr", "pgfault", "pgmajfault"):
+            if current.get(key) is not None and previous.get(key) is not None:
+                self._buffer(f"{key}_per_sec").append((current[key] - previous[key]) / elapsed)
+        if "procs_running" in current:
+            self._buffer("procs_running").append(current["procs_running"])
+
+        if "meminfo" in self.fds:
+            data = _pread_all(self.fds["meminfo"])
+            total = _find_value(data, b"MemTotal:")
+            available = _find_value(data, b"MemAvailable:")
+            if total is not None and available is not None:
+                self._buffer("mem_used_kb").append(total - available)
+            for key in (b"Dirty:", b"Cached:"):
+                value = _find_value(data, key)
+                if value is not None:
+                    self._buffer(f"{key[:-1].decode().lower()}_kb").append(value)
+
+        for cpu, fd in self.freq_fds.items():
+            try:
+                self._buffer(f"cpu{cpu}_freq_khz").append(int(os.pread(fd, 32, 0)))
+            except (OSError, ValueError):
+                pass
+
+    def _loop(self):
+        while not self.stop_event.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        """启动后台采样线程"""
+        self._open()
+        self.previous = None
+        self._sample()
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._loop, name="telemetry-sampler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """停止采样并返回汇总（keep_series 为真时附带完整时间序列）"""
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+        self._sample()
+        self._close()
+
+        samples = self.buffers.get("timestamp")
+        report = {
+            "interval": self.interval,
+            "samples": samples.count if samples else 0,
+            "metrics": {name: buffer.summary() for name, buffer in self.buffers.items() if name != "timestamp"}
+        }
+        if self.keep_series:
+            report["series"] = {name: buffer.values() for name, buffer in self.buffers.items()}
+        return report